@@ -36,6 +36,8 @@ class AgentAdmin(admin.ModelAdmin):
         'total_cost',
         'average_response_time',
         'success_rate',
+        'total_successes',
+        'total_failures',
         'created_at',
         'updated_at',
         'last_invoked_at',
@@ -67,6 +69,8 @@ class AgentAdmin(admin.ModelAdmin):
                 'total_cost',
                 'average_response_time',
                 'success_rate',
+                'total_successes',
+                'total_failures',
                 'execution_count'
             )
         }),
@@ -147,6 +151,8 @@ class AgentAdmin(admin.ModelAdmin):
             agent.total_cost = 0
             agent.average_response_time = 0
             agent.success_rate = 0
+            agent.total_successes = 0
+            agent.total_failures = 0
             agent.save()
         self.message_user(request, f'Metrics reset for {queryset.count()} agent(s).')
     reset_metrics.short_description = 'Reset metrics for selected agents'
@@ -91,6 +91,8 @@ class BaseAgent:
         model_name: str = 'gpt-3.5-turbo',
         temperature: float = 0.7,
         max_tokens: int = 4000,
+        response_cache_enabled: bool = False,
+        response_cache_ttl: Optional[int] = None,
     ):
         """
         Initialize base agent.
@@ -106,6 +108,8 @@ class BaseAgent:
             model_name: Model to use
             temperature: Temperature for generation
             max_tokens: Maximum tokens
+            response_cache_enabled: Serve identical requests from the AI response cache
+            response_cache_ttl: AI response cache TTL in seconds
         """
         self.agent_id = agent_id
         self.name = name
@@ -117,6 +121,8 @@ class BaseAgent:
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.response_cache_enabled = response_cache_enabled
+        self.response_cache_ttl = response_cache_ttl
         
         # Runtime state
         self._registry = None
@@ -222,6 +228,8 @@ class BaseAgent:
         if not adapter:
             raise ValueError(f"Platform {self.preferred_platform} not available")
         
+        adapter = self._apply_response_cache(adapter, context)
+        
         # Create request - check if messages array is available from conversational agent
         messages = None
         if context and context.metadata and 'messages' in context.metadata:
@@ -396,6 +404,8 @@ class BaseAgent:
                 logger.warning(f"Platform {platform_name} not available")
                 continue
             
+            adapter = self._apply_response_cache(adapter, context)
+            
             try:
                 # Check if messages array is available from conversational agent
                 messages = None
@@ -431,6 +441,24 @@ class BaseAgent:
         # All platforms failed
         raise Exception(f"All platforms failed. Last error: {str(last_error)}")
     
+    def _apply_response_cache(self, adapter, context: Optional[AgentContext]):
+        """
+        Wrap adapter with the AI response cache if this agent or the
+        execution context (e.g. a command template) opted in.
+        """
+        from apps.integrations.services.response_cache import ResponseCacheConfig, with_response_cache
+        
+        overrides = None
+        if context and context.metadata:
+            overrides = context.metadata.get('response_cache')
+        config = ResponseCacheConfig.resolve(
+            agent_enabled=self.response_cache_enabled,
+            agent_ttl=self.response_cache_ttl,
+            overrides=overrides,
+            user=context.user if context else None
+        )
+        return with_response_cache(adapter, config)
+    
     async def _get_registry(self):
         """Get or initialize adapter registry (lazy import to avoid MemoryError)."""
         if self._registry is None:
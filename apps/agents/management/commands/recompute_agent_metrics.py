@@ -0,0 +1,45 @@
+"""
+Management command to recompute agent metrics from execution history.
+
+Agent metrics are maintained incrementally as executions finish; run this to
+correct drift (e.g. after executions were deleted or edited by hand).
+
+Usage:
+    python manage.py recompute_agent_metrics
+    python manage.py recompute_agent_metrics --agent-id mistral-7b-assistant
+"""
+
+from django.core.management.base import BaseCommand
+from apps.agents.models import Agent
+
+
+class Command(BaseCommand):
+    help = 'Recompute agent metrics from their full execution history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--agent-id',
+            type=str,
+            help='Specific agent ID to recompute'
+        )
+
+    def handle(self, *args, **options):
+        agent_id = options.get('agent_id')
+        
+        agents = Agent.objects.all()
+        if agent_id:
+            agents = agents.filter(agent_id=agent_id)
+            if not agents.exists():
+                self.stdout.write(self.style.ERROR(f'Agent {agent_id} not found'))
+                return
+        
+        count = 0
+        for agent in agents.iterator():
+            agent.recalculate_metrics()
+            count += 1
+            self.stdout.write(
+                f"  {agent.agent_id}: {agent.total_invocations} invocations, "
+                f"{agent.success_rate:.1f}% success, {agent.average_response_time:.2f}s avg"
+            )
+        
+        self.stdout.write(self.style.SUCCESS(f'Recomputed metrics for {count} agent(s)'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-16 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0005_agent_created_by_agent_updated_by_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='response_cache_enabled',
+            field=models.BooleanField(default=False, help_text='Serve identical completion requests from the AI response cache'),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='response_cache_ttl',
+            field=models.IntegerField(default=3600, help_text='AI response cache TTL in seconds'),
+        ),
+    ]
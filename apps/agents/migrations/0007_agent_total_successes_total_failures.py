@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-16 23:40
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    """Populate success/failure counters and success rate from existing executions."""
+    Agent = apps.get_model('agents', 'Agent')
+    totals = Agent.objects.annotate(
+        successes=Count('executions', filter=Q(executions__status='completed')),
+        failures=Count('executions', filter=Q(executions__status='failed')),
+    ).values_list('id', 'successes', 'failures')
+    for agent_id, successes, failures in totals.iterator():
+        finished = successes + failures
+        Agent.objects.filter(id=agent_id).update(
+            total_successes=successes,
+            total_failures=failures,
+            success_rate=(successes / finished) * 100.0 if finished else 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0006_agent_response_cache_enabled_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='total_successes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='total_failures',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -55,6 +55,16 @@ class Agent(models.Model):
     )
     max_tokens = models.IntegerField(default=4000)
     
+    # Response caching (opt-in): identical requests are served from cache
+    response_cache_enabled = models.BooleanField(
+        default=False,
+        help_text="Serve identical completion requests from the AI response cache"
+    )
+    response_cache_ttl = models.IntegerField(
+        default=3600,
+        help_text="AI response cache TTL in seconds"
+    )
+    
     # Status and metadata
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     version = models.CharField(max_length=20, default='1.0.0')
@@ -63,8 +73,10 @@ class Agent(models.Model):
     total_invocations = models.IntegerField(default=0)
     total_tokens_used = models.BigIntegerField(default=0)
     total_cost = models.DecimalField(max_digits=10, decimal_places=4, default=0)
-    average_response_time = models.FloatField(default=0)  # in seconds
-    success_rate = models.FloatField(default=0)  # percentage
+    average_response_time = models.FloatField(default=0)  # in seconds, EWMA over completed executions
+    success_rate = models.FloatField(default=0)  # percentage of finished executions that completed
+    total_successes = models.IntegerField(default=0)
+    total_failures = models.IntegerField(default=0)
     
     # User tracking
     created_by = models.ForeignKey(
@@ -101,6 +113,91 @@ class Agent(models.Model):
     
     def __str__(self):
         return f'{self.name} ({self.agent_id})'
+    
+    @classmethod
+    def record_execution(
+        cls,
+        agent_id,
+        success: bool,
+        tokens_used: int = 0,
+        cost=0,
+        execution_time: float = 0
+    ):
+        """
+        Fold one finished execution into an agent's metrics.
+        
+        Applied as a single UPDATE of F() expressions, so concurrent
+        completions never overwrite each other and execution history is
+        never read. Response time is an exponentially weighted moving
+        average (AGENT_RESPONSE_TIME_EWMA_ALPHA) over completed executions.
+        """
+        from decimal import Decimal
+        from django.conf import settings
+        from django.db.models import Case, ExpressionWrapper, F, FloatField, Value, When
+        from django.utils import timezone
+        
+        successes = F('total_successes') + (1 if success else 0)
+        finished = F('total_successes') + F('total_failures') + 1
+        updates = {
+            'total_invocations': F('total_invocations') + 1,
+            'total_successes': successes,
+            'total_failures': F('total_failures') + (0 if success else 1),
+            'success_rate': ExpressionWrapper(successes * 100.0 / finished, output_field=FloatField()),
+            'last_invoked_at': timezone.now(),
+        }
+        
+        if success:
+            alpha = getattr(settings, 'AGENT_RESPONSE_TIME_EWMA_ALPHA', 0.1)
+            updates['total_tokens_used'] = F('total_tokens_used') + (tokens_used or 0)
+            updates['total_cost'] = F('total_cost') + Decimal(str(cost or 0))
+            if execution_time:
+                updates['average_response_time'] = Case(
+                    When(total_successes=0, then=Value(float(execution_time))),
+                    default=ExpressionWrapper(
+                        F('average_response_time') * (1 - alpha) + float(execution_time) * alpha,
+                        output_field=FloatField()
+                    ),
+                    output_field=FloatField()
+                )
+        
+        cls.objects.filter(pk=agent_id).update(**updates)
+    
+    def recalculate_metrics(self):
+        """
+        Recompute metrics from the full execution history (drift correction).
+        
+        The average response time becomes the plain mean, which later
+        executions then keep up to date as a moving average.
+        """
+        from django.db.models import Avg, Count, Q, Sum
+        
+        stats = self.executions.aggregate(
+            total=Count('id'),
+            successes=Count('id', filter=Q(status='completed')),
+            failures=Count('id', filter=Q(status='failed')),
+            total_tokens=Sum('tokens_used', filter=Q(status='completed')),
+            total_cost=Sum('cost', filter=Q(status='completed')),
+            avg_time=Avg('execution_time', filter=Q(status='completed')),
+        )
+        finished = stats['successes'] + stats['failures']
+        
+        self.total_invocations = stats['total']
+        self.total_successes = stats['successes']
+        self.total_failures = stats['failures']
+        self.success_rate = (stats['successes'] / finished) * 100.0 if finished else 0
+        self.total_tokens_used = stats['total_tokens'] or 0
+        self.total_cost = stats['total_cost'] or 0
+        self.average_response_time = stats['avg_time'] or 0
+        
+        Agent.objects.filter(id=self.id).update(
+            total_invocations=self.total_invocations,
+            total_successes=self.total_successes,
+            total_failures=self.total_failures,
+            success_rate=self.success_rate,
+            total_tokens_used=self.total_tokens_used,
+            total_cost=self.total_cost,
+            average_response_time=self.average_response_time
+        )
 
 
 class AgentExecution(models.Model):
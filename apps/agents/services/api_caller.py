@@ -45,7 +45,9 @@ class AgentAPICaller:
         # Get backend URL from settings
         self.base_url = settings.BACKEND_URL.rstrip('/')
         self.token = self._get_auth_token()
-        self.client = httpx.AsyncClient(
+        # Shares keep-alive connections with every other caller in the process
+        from apps.integrations.services.http_pool import http_pool
+        self.client = http_pool.client(
             base_url=self.base_url,
             headers={
                 'Authorization': f'Bearer {self.token}',
@@ -270,7 +272,7 @@ class AgentAPICaller:
         return await self.call('GET', f'/projects/{project_id}/sprints/', params=params)
     
     async def close(self):
-        """Close the HTTP client."""
+        """Close the HTTP client (pooled connections stay open for reuse)."""
         await self.client.aclose()
     
     async def __aenter__(self):
@@ -8,7 +8,7 @@ from typing import Dict, Any, Optional
 import logging
 
 from asgiref.sync import sync_to_async
-from apps.agents.models import Agent
+from apps.agents.models import Agent, AgentExecution
 from apps.agents.engine import BaseAgent, TaskAgent, ConversationalAgent, AgentContext, AgentResult
 from .state_manager import state_manager
 
@@ -32,7 +32,8 @@ class ExecutionEngine:
         agent: Agent,
         input_data: Dict[str, Any],
         user: Any,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        execution: Optional[AgentExecution] = None
     ) -> AgentResult:
         """
         Execute an agent with full lifecycle management.
@@ -42,17 +43,23 @@ class ExecutionEngine:
             input_data: Input data for execution
             user: User initiating execution
             context: Additional context
+            execution: Pending execution record created at submission (optional)
             
         Returns:
             AgentResult with execution results
         """
-        # Create execution record
-        execution = await state_manager.create_execution(
-            agent=agent,
-            input_data=input_data,
-            user=user,
-            context=context
-        )
+        if execution is None:
+            # Create execution record
+            execution = await state_manager.create_execution(
+                agent=agent,
+                input_data=input_data,
+                user=user,
+                context=context
+            )
+        else:
+            execution.input_data = input_data
+            execution.context = context or {}
+            await execution.asave(update_fields=['input_data', 'context'])
         
         try:
             # Create agent instance
@@ -284,7 +291,9 @@ class ExecutionEngine:
             fallback_platforms=agent.fallback_platforms or [],
             model_name=agent.model_name,
             temperature=agent.temperature,
-            max_tokens=agent.max_tokens
+            max_tokens=agent.max_tokens,
+            response_cache_enabled=agent.response_cache_enabled,
+            response_cache_ttl=agent.response_cache_ttl
         )
     
     async def get_execution_status(self, execution_id: str) -> Optional[Dict[str, Any]]:
@@ -9,7 +9,6 @@ from datetime import datetime
 import logging
 
 from asgiref.sync import sync_to_async
-from django.db.models import Sum, Avg
 from apps.agents.models import Agent, AgentExecution
 
 
@@ -100,7 +99,7 @@ class StateManager:
         await sync_to_async(execution.save)()
         
         # Update agent metrics
-        await self._update_agent_metrics(execution.agent, success=True)
+        await self._update_agent_metrics(execution, success=True)
         
         logger.info(f"Completed execution {execution.id}")
     
@@ -128,7 +127,7 @@ class StateManager:
         await sync_to_async(execution.save)()
         
         # Update agent metrics
-        await self._update_agent_metrics(execution.agent, success=False)
+        await self._update_agent_metrics(execution, success=False)
         
         logger.error(f"Failed execution {execution.id}: {error_message}")
     
@@ -190,48 +189,24 @@ class StateManager:
         )
         return executions
     
-    async def _update_agent_metrics(self, agent: Agent, success: bool):
+    async def _update_agent_metrics(self, execution: AgentExecution, success: bool):
         """
         Update agent metrics after execution.
         
+        Counters are incremented in place (see Agent.record_execution); the
+        agent's execution history is not re-aggregated.
+        
         Args:
-            agent: Agent instance
+            execution: Finished AgentExecution instance
             success: Whether execution succeeded
         """
-        from django.db.models import Avg, F
-        
-        # Increment invocation count
-        agent.total_invocations = F('total_invocations') + 1
-        agent.last_invoked_at = datetime.now()
-        
-        # Update success rate
-        if success:
-            total_executions = await sync_to_async(
-                agent.executions.count
-            )()
-            successful_executions = await sync_to_async(
-                agent.executions.filter(status='completed').count
-            )()
-            
-            if total_executions > 0:
-                agent.success_rate = (successful_executions / total_executions) * 100
-        
-        # Update from executions
-        stats = await sync_to_async(agent.executions.filter(status='completed').aggregate)(
-            total_tokens=Sum('tokens_used'),
-            total_cost=Sum('cost'),
-            avg_time=Avg('execution_time')
+        await sync_to_async(Agent.record_execution)(
+            execution.agent_id,
+            success=success,
+            tokens_used=execution.tokens_used,
+            cost=execution.cost,
+            execution_time=execution.execution_time
         )
-        
-        if stats['total_tokens']:
-            agent.total_tokens_used = stats['total_tokens']
-        if stats['total_cost']:
-            from decimal import Decimal
-            agent.total_cost = Decimal(str(stats['total_cost']))
-        if stats['avg_time']:
-            agent.average_response_time = stats['avg_time']
-        
-        await sync_to_async(agent.save)()
 
 
 # Global state manager instance
@@ -1,59 +1,26 @@
 """
 Token estimation utilities for AI responses.
 """
-import re
 from typing import Dict, Any
 
 
 def estimate_tokens(text: str, model: str = 'gpt-4') -> int:
     """
-    Estimate token count for text.
+    Count tokens for text.
     
-    Uses a simple heuristic: ~4 characters per token for English text.
-    More accurate for GPT models, approximate for others.
+    Delegates to the shared token counting service, which uses the model
+    family's tokenizer when its vocabulary is available locally and a
+    calibrated heuristic otherwise. Counts are memoized per text.
     
     Args:
-        text: Text to estimate tokens for
-        model: Model name (for model-specific estimation)
+        text: Text to count tokens for
+        model: Model name (selects the tokenizer family)
     
     Returns:
-        Estimated token count
+        Token count
     """
-    if not text:
-        return 0
-    
-    # Basic estimation: ~4 characters per token for English
-    # This is a rough estimate, actual tokenization varies by model
-    char_count = len(text)
-    estimated_tokens = char_count // 4
-    
-    # Adjust for code (more tokens per character)
-    if _is_code(text):
-        estimated_tokens = int(estimated_tokens * 1.2)
-    
-    # Minimum token count
-    return max(estimated_tokens, len(text.split()))
-
-
-def _is_code(text: str) -> bool:
-    """Check if text appears to be code."""
-    code_indicators = [
-        r'def\s+\w+\s*\(',  # Python function
-        r'function\s+\w+\s*\(',  # JavaScript function
-        r'class\s+\w+',  # Class definition
-        r'import\s+',  # Import statement
-        r'const\s+\w+\s*=',  # Const declaration
-        r'let\s+\w+\s*=',  # Let declaration
-        r'var\s+\w+\s*=',  # Var declaration
-        r'<\w+',  # HTML/XML tags
-        r'SELECT\s+.*\s+FROM',  # SQL
-    ]
-    
-    for pattern in code_indicators:
-        if re.search(pattern, text, re.IGNORECASE):
-            return True
-    
-    return False
+    from apps.integrations.services.token_counter import count_tokens
+    return count_tokens(text, model)
 
 
 def estimate_cost(
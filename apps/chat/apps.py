@@ -5,3 +5,7 @@ class ChatConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.chat'
     verbose_name = 'Chat & Conversations'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.chat.signals  # noqa
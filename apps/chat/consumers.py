@@ -5,12 +5,14 @@ WebSocket consumer for real-time chat streaming.
 import json
 import asyncio
 import logging
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 from .models import Conversation, Message, MemberConversation, MemberMessage
+from .services.stream_coalescer import ChunkCoalescer, encode_chunk_frame, FRAME_FORMATS, FRAME_JSON
 from apps.agents.engine.conversational_agent import ConversationalAgent
 from apps.agents.engine.base_agent import AgentContext
 
@@ -26,9 +28,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     Message types:
     - Client -> Server: {"type": "user_message", "content": "..."}
-    - Server -> Client: {"type": "message_chunk", "content": "..."}
+    - Server -> Client: {"type": "message_chunk", "content": "...", "seq": n}
     - Server -> Client: {"type": "message_complete", "message_id": "..."}
     - Server -> Client: {"type": "error", "message": "..."}
+    
+    Streamed chunks are coalesced into frames (see ``ChunkCoalescer``). Pass
+    ``?frames=compact`` for ``{"t": "c", "s": n, "c": "..."}`` text frames or
+    ``?frames=binary`` for binary frames (1-byte type, 4-byte sequence,
+    UTF-8 text).
     """
     
     async def connect(self):
@@ -37,6 +44,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.conversation_group = f'chat_{self.conversation_id}'
         self.processing_message = False  # Track if currently processing a message
         self.last_message_hash = None  # Track last message to prevent duplicates
+        self.frame_format = self._requested_frame_format()
         
         logger.info(f"[ChatConsumer] Connection attempt for conversation: {self.conversation_id}")
         logger.info(f"[ChatConsumer] User: {self.scope.get('user')}")
@@ -292,6 +300,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.conversation_group,
             {
                 'type': 'new_message',
+                'origin': self.channel_name,  # Already sent to this client above
                 'message': {
                     'id': str(user_message.id),
                     'role': 'user',
@@ -305,8 +314,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         conversation = await self.get_conversation()
         agent_model = await database_sync_to_async(lambda: conversation.agent)()
         
-        # Get conversation history
-        history = await self.get_conversation_history()
+        # Get recent history window; the counter includes the message just saved
+        history = await self.get_conversation_history(conversation)
+        total_message_count = conversation.message_count
         
         # Get AI provider context (thread_id, conversation_id, etc.) from conversation
         ai_provider_context = conversation.ai_provider_context or {}
@@ -342,7 +352,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         conversation_context = {
             'ai_provider_context': ai_provider_context,
             'max_recent_messages': conversation.max_recent_messages or 20,
-            'total_message_count': len(history),
+            'total_message_count': total_message_count,
             'conversation_summary': conversation.conversation_summary,  # Include summary if available
             'code_blocks': code_context.get('code_blocks', []),  # Include code blocks
             'referenced_files': code_context.get('referenced_files', []),  # Include file references
@@ -374,7 +384,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'conversation_context': conversation_context,
                 'platform_config': platform_config,  # Pass platform config for strategy determination
                 'model_name': agent_model.model_name,  # Pass model name for token limit calculation
-                'total_message_count': len(history)
+                'total_message_count': total_message_count
             }
         )
         
@@ -394,7 +404,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'conversation_id': str(conversation.id),
                     'conversation_context': conversation_context,
                     'platform_config': platform_config,  # Pass platform config for strategy (already serialized)
-                    'total_message_count': len(history)
+                    'total_message_count': total_message_count
                 }
                 
                 logger.info(f"[ChatConsumer] Starting streaming execution for agent {agent_model.name}")
@@ -404,6 +414,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 chunk_count = 0
                 first_chunk_received = False
                 
+                coalescer = ChunkCoalescer(self.send_stream_frame)
                 try:
                     async for chunk in execution_engine.execute_streaming(
                         agent=agent_model,
@@ -422,35 +433,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
                             if chunk_count <= 3:
                                 logger.info(f"[ChatConsumer] Chunk {chunk_count}: length={len(chunk)}, content={repr(chunk[:100])}, total_so_far={len(full_response)}")
                             
-                            # Send chunk immediately
-                            chunk_data = {
-                                'type': 'message_chunk',
-                                'content': chunk
-                            }
-                            try:
-                                await self.send(text_data=json.dumps(chunk_data))
-                                if chunk_count % 10 == 0:  # Log every 10th chunk to avoid spam
-                                    logger.debug(f"[ChatConsumer] Sent chunk {chunk_count}, total chars: {len(full_response)}")
-                            except Exception as send_error:
-                                logger.error(f"[ChatConsumer] Error sending chunk {chunk_count}: {send_error}", exc_info=True)
-                                # Continue processing even if send fails
-                            
-                            # Broadcast to group
-                            try:
-                                await self.channel_layer.group_send(
-                                    self.conversation_group,
-                                    {
-                                        'type': 'message_chunk',
-                                        'data': chunk_data
-                                    }
-                                )
-                            except Exception as broadcast_error:
-                                logger.error(f"[ChatConsumer] Error broadcasting chunk: {broadcast_error}", exc_info=True)
+                            # Buffered and flushed as one frame per window
+                            coalescer.add(chunk)
                 except Exception as stream_exception:
                     logger.error(f"[ChatConsumer] Error during streaming loop: {stream_exception}", exc_info=True)
                     raise
+                finally:
+                    # Deliver buffered chunks before message_complete or an error frame
+                    await coalescer.close()
                 
-                logger.info(f"[ChatConsumer] Streaming completed: {chunk_count} chunks, {len(full_response)} total chars")
+                logger.info(
+                    f"[ChatConsumer] Streaming completed: {chunk_count} chunks in {coalescer.frames_sent} frames, "
+                    f"{len(full_response)} total chars"
+                )
                 if not first_chunk_received:
                     logger.warning(f"[ChatConsumer] WARNING: No chunks were received from streaming execution!")
                 
@@ -647,31 +642,53 @@ class ChatConsumer(AsyncWebsocketConsumer):
             }))
     
     async def stream_response(self, response):
-        """Stream response text in chunks."""
-        chunk_size = 10  # words per chunk
-        words = response.split()
-        
-        for i in range(0, len(words), chunk_size):
-            chunk = ' '.join(words[i:i + chunk_size])
-            chunk_data = {
-                'type': 'message_chunk',
-                'content': chunk + ' '
-            }
-            # Send to this client
-            await self.send(text_data=json.dumps(chunk_data))
-            # Broadcast to all clients in the group
+        """Stream a complete response text as size-bounded frames."""
+        async with ChunkCoalescer(self.send_stream_frame) as coalescer:
+            for word in response.split():
+                await coalescer.write(word + ' ')
+    
+    async def send_stream_frame(self, content, seq):
+        """
+        Send one coalesced frame to this client and the conversation group.
+        
+        Other members of the group receive it via ``message_chunk``; this
+        consumer skips its own broadcast so each client gets every frame once.
+        """
+        await self.send_chunk(content, seq)
+        try:
             await self.channel_layer.group_send(
                 self.conversation_group,
                 {
                     'type': 'message_chunk',
-                    'data': chunk_data
+                    'origin': self.channel_name,
+                    'data': {
+                        'type': 'message_chunk',
+                        'content': content,
+                        'seq': seq
+                    }
                 }
             )
-            await asyncio.sleep(0.05)  # Small delay between chunks
+        except Exception as broadcast_error:
+            logger.error(f"[ChatConsumer] Error broadcasting chunk: {broadcast_error}", exc_info=True)
+    
+    async def send_chunk(self, content, seq):
+        """Send a chunk frame in this connection's frame format."""
+        frame = encode_chunk_frame(content, seq, self.frame_format)
+        if isinstance(frame, bytes):
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+    
+    def _requested_frame_format(self):
+        query_params = parse_qs(self.scope.get('query_string', b'').decode())
+        frame_format = (query_params.get('frames') or [FRAME_JSON])[0]
+        return frame_format if frame_format in FRAME_FORMATS else FRAME_JSON
     
     async def new_message(self, event):
         """Handle new message event from group."""
         """Broadcast new message to WebSocket client."""
+        if event.get('origin') == self.channel_name:
+            return
         await self.send(text_data=json.dumps({
             'type': 'new_message',
             'message': event['message']
@@ -680,7 +697,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def message_chunk(self, event):
         """Handle message chunk event from group."""
         """Broadcast message chunk to WebSocket client."""
-        await self.send(text_data=json.dumps(event['data']))
+        if event.get('origin') == self.channel_name:
+            return
+        data = event['data']
+        await self.send_chunk(data.get('content', ''), data.get('seq', 0))
     
     async def generate_agent_response(self, agent_model, user_input, context):
         """
@@ -740,18 +760,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
         return message
     
     @database_sync_to_async
-    def get_conversation_history(self):
-        """Get conversation history for agent context."""
-        conversation = Conversation.objects.get(id=self.conversation_id)
-        messages = conversation.messages.all().order_by('created_at')
-        
-        history = []
-        for msg in messages:
-            history.append({
-                'role': msg.role,
-                'content': msg.content
-            })
-        return history
+    def get_conversation_history(self, conversation):
+        """Get the recent history window for agent context (never the full history)."""
+        from apps.chat.services.conversation_history import conversation_history
+        
+        return conversation_history.get_window(conversation)
 
 
 class MemberChatConsumer(AsyncWebsocketConsumer):
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-16 22:10
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+
+
+def backfill_counters(apps, schema_editor):
+    """Populate message/token counters from existing messages (~4 characters per token)."""
+    Conversation = apps.get_model('chat', 'Conversation')
+    totals = Conversation.objects.annotate(
+        messages_total=Count('messages'),
+        characters_total=Sum(Length('messages__content')),
+    ).values_list('id', 'messages_total', 'characters_total')
+    for conversation_id, messages_total, characters_total in totals.iterator():
+        Conversation.objects.filter(id=conversation_id).update(
+            message_count=messages_total,
+            token_count=(characters_total or 0) // 4,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0009_membermessage_delivered_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="message_count",
+            field=models.IntegerField(
+                default=0, help_text="Number of messages in the conversation"
+            ),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="token_count",
+            field=models.IntegerField(
+                default=0, help_text="Estimated total tokens of all message contents"
+            ),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -101,6 +101,16 @@ class Conversation(models.Model):
         help_text="Trigger summarization when conversation tokens exceed this count (approximate)"
     )
     
+    # Running counters maintained on message save/delete (avoid COUNT scans per turn)
+    message_count = models.IntegerField(
+        default=0,
+        help_text="Number of messages in the conversation"
+    )
+    token_count = models.IntegerField(
+        default=0,
+        help_text="Estimated total tokens of all message contents"
+    )
+    
     # Code context tracking (Cursor-style features)
     referenced_files = models.JSONField(
         default=list,
@@ -48,7 +48,7 @@ class ConversationListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_message_count(self, obj):
-        return obj.messages.count()
+        return obj.message_count
     
     def get_last_message(self, obj):
         last_msg = obj.messages.last()
@@ -288,22 +288,19 @@ class CodeContextExtractor:
         return selected
     
     @staticmethod
-    def _estimate_tokens(text: str) -> int:
+    def _estimate_tokens(text: str, model: Optional[str] = None) -> int:
         """
-        Estimate token count for text (approximation).
-        
-        Uses a simple heuristic: ~4 characters per token on average.
+        Count tokens for text with the shared token counting service.
         
         Args:
-            text: Text to estimate
+            text: Text to count
+            model: Optional model name (selects the tokenizer family)
             
         Returns:
-            Estimated token count
+            Token count (at least 1)
         """
-        # Rough approximation: 4 chars per token
-        # More accurate would require actual tokenizer, but this is faster
-        char_count = len(text)
-        return max(1, char_count // 4)
+        from apps.integrations.services.token_counter import count_tokens
+        return max(1, count_tokens(text, model))
     
     @staticmethod
     def _extract_unformatted_code(content: str) -> List[Dict[str, str]]:
@@ -0,0 +1,131 @@
+"""
+Conversation History Provider.
+
+Loads the recent tail of a conversation for each chat turn without scanning
+the whole message table.
+
+The newest messages of each conversation are kept in a cache ring buffer.
+When the buffer is missing, stale or shorter than the requested window, the
+tail is read with a keyset query on (conversation, created_at) and the buffer
+is refilled.
+
+Saving, editing or deleting a message bumps the conversation's generation
+counter instead of patching the buffer in place: a get-modify-set from two
+workers would lose one of the messages. A buffer is only served while its
+generation matches the counter, so a refill that read the database before a
+concurrent save cannot reinstate a tail missing that message.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.chat.models import Conversation, Message
+
+
+class ConversationHistory:
+    """
+    Windowed access to conversation messages.
+    
+    Buffer layout: {'messages': [{id, role, content, created_at}, ...],
+    'complete': bool, 'generation': int}. ``complete`` means the buffer holds
+    every message of the conversation, so shorter-than-requested windows are
+    still exact.
+    """
+    
+    CACHE_KEY_PREFIX = 'chat_history_ring_'
+    GENERATION_KEY_PREFIX = 'chat_history_gen_'
+    
+    @property
+    def ring_size(self) -> int:
+        return getattr(settings, 'CHAT_HISTORY_RING_SIZE', 50)
+    
+    @property
+    def cache_timeout(self) -> int:
+        return getattr(settings, 'CHAT_HISTORY_CACHE_TTL', 3600)
+    
+    def get_window(
+        self,
+        conversation: Conversation,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Get the most recent messages of a conversation, oldest first.
+        
+        Args:
+            conversation: Conversation instance
+            limit: Number of messages (defaults to conversation.max_recent_messages)
+        
+        Returns:
+            List of {'role', 'content'} dicts
+        """
+        limit = limit or conversation.max_recent_messages or 20
+        
+        key, generation_key = self._key(conversation.id), self._generation_key(conversation.id)
+        cached = cache.get_many([key, generation_key])
+        buffer, generation = cached.get(key), cached.get(generation_key)
+        if buffer and (generation is None or buffer.get('generation') != generation):
+            buffer = None
+        if buffer and (buffer['complete'] or len(buffer['messages']) >= limit):
+            entries = buffer['messages'][-limit:]
+        else:
+            entries = self._load_tail(conversation.id, max(limit, self.ring_size))[-limit:]
+        
+        return [{'role': entry['role'], 'content': entry['content']} for entry in entries]
+    
+    def invalidate(self, conversation_id):
+        """Mark the ring buffer stale (after saves, edits or deletes)."""
+        try:
+            cache.incr(self._generation_key(conversation_id))
+        except ValueError:
+            # No counter: no buffer can match, the next refill starts a new one
+            pass
+    
+    def _load_tail(self, conversation_id, count: int) -> List[Dict[str, Any]]:
+        """Read the newest ``count`` messages with a keyset query and refill the buffer."""
+        # Taken before the query: a save committing in between bumps it and
+        # the buffer written below is never served
+        generation = self._current_generation(conversation_id)
+        rows = list(
+            Message.objects.filter(conversation_id=conversation_id)
+            .order_by('-created_at', '-id')
+            .values('id', 'role', 'content', 'created_at')[:count]
+        )
+        rows.reverse()
+        entries = [
+            {
+                'id': str(row['id']),
+                'role': row['role'],
+                'content': row['content'],
+                'created_at': row['created_at'].isoformat(),
+            }
+            for row in rows
+        ]
+        
+        buffer = {
+            'messages': entries[-self.ring_size:],
+            'complete': len(entries) < count and len(entries) <= self.ring_size,
+            'generation': generation,
+        }
+        cache.set(self._key(conversation_id), buffer, self.cache_timeout)
+        return entries
+    
+    def _current_generation(self, conversation_id) -> int:
+        """Read the generation counter, starting one if it is missing."""
+        generation_key = self._generation_key(conversation_id)
+        # Seeded from the clock so an evicted counter never restarts at a
+        # value an older buffer was written with
+        cache.add(generation_key, time.time_ns(), self.cache_timeout)
+        return cache.get(generation_key)
+    
+    def _key(self, conversation_id) -> str:
+        return f"{self.CACHE_KEY_PREFIX}{conversation_id}"
+    
+    def _generation_key(self, conversation_id) -> str:
+        return f"{self.GENERATION_KEY_PREFIX}{conversation_id}"
+
+
+# Global instance
+conversation_history = ConversationHistory()
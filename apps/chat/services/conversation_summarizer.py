@@ -41,8 +41,8 @@ class ConversationSummarizer:
         Returns:
             True if summarization should be triggered
         """
-        # Get message count
-        message_count = conversation.messages.count()
+        # Get message count (maintained counter, no COUNT query)
+        message_count = conversation.message_count
         
         # Get summary metadata
         summary_meta = conversation.summary_metadata or {}
@@ -61,8 +61,8 @@ class ConversationSummarizer:
                 return True
         
         # Check token count threshold (approximate)
-        # Estimate ~100 tokens per message on average
-        estimated_tokens = message_count * 100
+        # Fall back to ~100 tokens per message when the counter is not populated
+        estimated_tokens = conversation.token_count or message_count * 100
         if estimated_tokens >= conversation.summarize_at_token_count:
             if not conversation.conversation_summary:
                 # Never summarized and exceeds token threshold
@@ -96,16 +96,13 @@ class ConversationSummarizer:
         
         # Determine which messages to summarize
         if messages_to_summarize is None:
-            # Get messages before the recent window (to keep recent messages unsummarized)
-            all_messages = list(conversation.messages.all().order_by('created_at'))
-            
-            # Keep recent messages unsummarized
-            recent_count = conversation.max_recent_messages
-            if len(all_messages) > recent_count:
-                messages_to_summarize = all_messages[:-recent_count]
-            else:
+            # Only messages not yet in the summary and older than the recent window
+            messages_to_summarize = ConversationSummarizer._get_unsummarized_messages(conversation)
+            if not messages_to_summarize:
                 # Not enough messages to summarize
-                logger.info(f"[ConversationSummarizer] Not enough messages to summarize: {len(all_messages)}")
+                logger.info(
+                    f"[ConversationSummarizer] Not enough messages to summarize: {conversation.message_count}"
+                )
                 return {
                     'success': False,
                     'reason': 'Not enough messages to summarize'
@@ -205,10 +202,13 @@ CONVERSATION SUMMARY:"""
             new_summary = response.content.strip()
             
             # Update conversation
+            previous_meta = conversation.summary_metadata or {}
             conversation.conversation_summary = new_summary
             conversation.summary_metadata = {
                 'last_summarized_at': timezone.now().isoformat(),
-                'messages_summarized_count': len(messages_to_summarize),
+                # Cumulative: each run folds only new messages into the existing summary
+                'messages_summarized_count': previous_meta.get('messages_summarized_count', 0) + len(messages_to_summarize),
+                'last_summarized_message_at': messages_to_summarize[-1].created_at.isoformat(),
                 'summary_version': (conversation.summary_metadata.get('summary_version', 0) + 1) if conversation.summary_metadata else 1,
                 'summary_tokens': response.tokens_used,
                 'model_used': response.model,
@@ -237,6 +237,33 @@ CONVERSATION SUMMARY:"""
                 'error': str(e)
             }
     
+    @staticmethod
+    def _get_unsummarized_messages(conversation: Conversation) -> List[Message]:
+        """
+        Get messages that are older than the recent window and not yet summarized.
+        
+        Uses a keyset on created_at after the last summarized message, so only
+        the new batch is read.
+        
+        Args:
+            conversation: Conversation instance
+            
+        Returns:
+            Messages oldest first (empty if nothing to summarize)
+        """
+        summary_meta = conversation.summary_metadata or {}
+        summarized_count = summary_meta.get('messages_summarized_count', 0)
+        batch_size = conversation.message_count - conversation.max_recent_messages - summarized_count
+        if batch_size <= 0:
+            return []
+        
+        messages = conversation.messages.order_by('created_at', 'id')
+        last_summarized_at = summary_meta.get('last_summarized_message_at')
+        if last_summarized_at:
+            return list(messages.filter(created_at__gt=last_summarized_at)[:batch_size])
+        # Summaries written before the keyset was recorded: skip the summarized prefix once
+        return list(messages[summarized_count:summarized_count + batch_size])
+    
     @staticmethod
     def _format_messages_for_summary(messages: List[Message]) -> str:
         """Format messages for summarization prompt, including code context."""
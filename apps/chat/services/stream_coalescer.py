@@ -0,0 +1,169 @@
+"""
+Chunk coalescing for streamed chat responses.
+
+Model streams yield many tiny chunks (often a single token). Sending each one
+as its own WebSocket frame and channel-layer message costs far more than the
+payload itself. ``ChunkCoalescer`` buffers chunks and flushes them as one
+frame when a time window elapses or the buffer reaches a byte threshold.
+
+At most one frame is in flight per stream: while a slow client is still
+receiving the previous frame, new chunks keep merging into the next one, so
+the producer never blocks and memory stays bounded by the response itself.
+"""
+
+from typing import Awaitable, Callable, List, Optional, Union
+import asyncio
+import json
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+FRAME_JSON = 'json'
+FRAME_COMPACT = 'compact'
+FRAME_BINARY = 'binary'
+FRAME_FORMATS = (FRAME_JSON, FRAME_COMPACT, FRAME_BINARY)
+
+# Binary frame: 1-byte frame type, 4-byte big-endian sequence, UTF-8 payload
+BINARY_CHUNK_FRAME = 0x01
+_BINARY_HEADER = struct.Struct('>BI')
+
+
+def encode_chunk_frame(content: str, seq: int, frame_format: str = FRAME_JSON) -> Union[str, bytes]:
+    """
+    Encode a message chunk for the wire.
+    
+    Args:
+        content: Chunk text
+        seq: Frame sequence number within the response
+        frame_format: ``json`` (``{"type": "message_chunk", ...}``),
+                      ``compact`` (``{"t": "c", "s": seq, "c": text}``) or
+                      ``binary``
+    
+    Returns:
+        Text frame (str) or binary frame (bytes)
+    """
+    if frame_format == FRAME_BINARY:
+        return _BINARY_HEADER.pack(BINARY_CHUNK_FRAME, seq) + content.encode('utf-8')
+    if frame_format == FRAME_COMPACT:
+        return json.dumps({'t': 'c', 's': seq, 'c': content}, separators=(',', ':'))
+    return json.dumps({'type': 'message_chunk', 'content': content, 'seq': seq})
+
+
+def decode_binary_chunk_frame(frame: bytes):
+    """Return ``(seq, content)`` for a binary chunk frame."""
+    frame_type, seq = _BINARY_HEADER.unpack_from(frame)
+    if frame_type != BINARY_CHUNK_FRAME:
+        raise ValueError(f"Unknown frame type: {frame_type}")
+    return seq, frame[_BINARY_HEADER.size:].decode('utf-8')
+
+
+class ChunkCoalescer:
+    """
+    Buffers streamed chunks and flushes them as frames.
+    
+    Usage::
+    
+        async with ChunkCoalescer(send_frame) as coalescer:
+            async for chunk in stream:
+                coalescer.add(chunk)
+    """
+    
+    def __init__(
+        self,
+        send_frame: Callable[[str, int], Awaitable[None]],
+        flush_interval: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Initialize coalescer.
+        
+        Args:
+            send_frame: Coroutine called with ``(content, seq)`` per frame
+            flush_interval: Seconds a chunk may wait before being flushed
+                            (defaults to ``CHAT_STREAM_FLUSH_INTERVAL_MS``)
+            max_bytes: Buffered bytes that trigger an immediate flush
+                       (defaults to ``CHAT_STREAM_FLUSH_BYTES``)
+        """
+        if flush_interval is None or max_bytes is None:
+            from django.conf import settings
+            if flush_interval is None:
+                flush_interval = getattr(settings, 'CHAT_STREAM_FLUSH_INTERVAL_MS', 30) / 1000
+            if max_bytes is None:
+                max_bytes = getattr(settings, 'CHAT_STREAM_FLUSH_BYTES', 1024)
+        self._send_frame = send_frame
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._buffer: List[str] = []
+        self._size = 0
+        self._has_data = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        self.seq = 0
+        self.chunks_received = 0
+        self.frames_sent = 0
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    def add(self, chunk: str):
+        """Buffer a chunk; never blocks on the client."""
+        if not chunk:
+            return
+        if self._closed:
+            raise RuntimeError("ChunkCoalescer is closed")
+        self._buffer.append(chunk)
+        self._size += len(chunk.encode('utf-8'))
+        self.chunks_received += 1
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        self._has_data.set()
+        if self._size >= self.max_bytes:
+            self._full.set()
+    
+    async def write(self, chunk: str):
+        """Add a chunk and yield to the flush loop (for producers that never await)."""
+        self.add(chunk)
+        await asyncio.sleep(0)
+    
+    async def close(self):
+        """Flush remaining chunks and stop the flush loop."""
+        self._closed = True
+        self._has_data.set()
+        self._full.set()
+        if self._task is not None:
+            await self._task
+        logger.debug(
+            f"[ChunkCoalescer] {self.chunks_received} chunks sent as {self.frames_sent} frames"
+        )
+    
+    async def _run(self):
+        while True:
+            await self._has_data.wait()
+            if not self._closed and self._size < self.max_bytes:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush()
+            if self._closed and not self._buffer:
+                return
+    
+    async def _flush(self):
+        content = ''.join(self._buffer)
+        self._buffer = []
+        self._size = 0
+        self._has_data.clear()
+        self._full.clear()
+        if not content:
+            return
+        self.seq += 1
+        self.frames_sent += 1
+        try:
+            await self._send_frame(content, self.seq)
+        except Exception as e:
+            logger.error(f"[ChunkCoalescer] Error sending frame {self.seq}: {e}", exc_info=True)
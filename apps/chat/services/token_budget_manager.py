@@ -85,43 +85,52 @@ class TokenBudgetManager:
         return budget
     
     @staticmethod
-    def estimate_tokens(text: str) -> int:
+    def estimate_tokens(text: str, model_name: Optional[str] = None) -> int:
         """
-        Estimate token count for text (approximation).
+        Count tokens for text.
         
-        Uses heuristic: ~4 characters per token on average.
-        More accurate would require actual tokenizer, but this is faster.
+        Uses the shared token counting service (model-family tokenizer,
+        memoized per text).
         
         Args:
-            text: Text to estimate
+            text: Text to count
+            model_name: Optional model name (selects the tokenizer family)
             
         Returns:
-            Estimated token count
+            Token count
         """
-        if not text:
-            return 0
-        
-        # Rough approximation: 4 chars per token (conservative)
-        # Actual varies by language, but this is a good average
-        char_count = len(text)
-        return max(1, char_count // 4)
+        from apps.integrations.services.token_counter import count_tokens
+        return count_tokens(text, model_name)
     
     @staticmethod
-    def estimate_message_tokens(message: Dict[str, str]) -> int:
+    def estimate_message_tokens(message: Dict[str, str], model_name: Optional[str] = None) -> int:
         """
-        Estimate tokens for a message dict.
+        Count tokens for a message dict, including role/framing overhead.
         
         Args:
             message: Message dict with 'role' and 'content' keys
+            model_name: Optional model name (selects the tokenizer family)
             
         Returns:
-            Estimated token count
+            Token count
+        """
+        from apps.integrations.services.token_counter import get_token_counter
+        return get_token_counter().count_message(message, model_name)
+    
+    @staticmethod
+    def estimate_messages_tokens(messages: List[Dict[str, str]], model_name: Optional[str] = None) -> List[int]:
         """
-        role = message.get('role', '')
-        content = message.get('content', '')
+        Count tokens for many messages in one batch.
         
-        # Role adds ~2 tokens, content is estimated
-        return 2 + TokenBudgetManager.estimate_tokens(content)
+        Args:
+            messages: List of message dicts
+            model_name: Optional model name (selects the tokenizer family)
+            
+        Returns:
+            Token count per message, in order
+        """
+        from apps.integrations.services.token_counter import get_token_counter
+        return get_token_counter().count_messages(messages, model_name)
     
     @staticmethod
     def prioritize_context_items(
@@ -175,7 +184,8 @@ class TokenBudgetManager:
     @staticmethod
     def fit_messages_in_budget(
         messages: List[Dict[str, str]],
-        budget: int
+        budget: int,
+        model_name: Optional[str] = None
     ) -> List[Dict[str, str]]:
         """
         Fit messages into token budget, prioritizing recent messages.
@@ -183,15 +193,17 @@ class TokenBudgetManager:
         Args:
             messages: List of message dicts
             budget: Maximum tokens to allocate
+            model_name: Optional model name (selects the tokenizer family)
             
         Returns:
             Filtered list of messages that fit within budget
         """
         # Recent messages have higher priority
+        token_counts = TokenBudgetManager.estimate_messages_tokens(messages, model_name)
         items = []
         for idx, msg in enumerate(reversed(messages)):  # Reverse to prioritize recent
             priority = 1.0 / (idx + 1)  # Higher priority for more recent
-            tokens = TokenBudgetManager.estimate_message_tokens(msg)
+            tokens = token_counts[len(messages) - idx - 1]
             items.append({
                 'item': msg,
                 'priority': priority,
@@ -209,26 +221,39 @@ class TokenBudgetManager:
     @staticmethod
     def fit_code_blocks_in_budget(
         code_blocks: List[Dict[str, Any]],
-        budget: int
+        budget: int,
+        model_name: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Fit code blocks into token budget, prioritizing recent and larger blocks.
         
+        Block token counts are recomputed for ``model_name`` when given, since
+        counts stored at extraction time use the default tokenizer.
+        
         Args:
             code_blocks: List of code block dicts
             budget: Maximum tokens to allocate
+            model_name: Optional model name (selects the tokenizer family)
             
         Returns:
             Filtered list of code blocks that fit within budget
         """
+        from apps.integrations.services.token_counter import get_token_counter
+        if model_name or any('tokens' not in block for block in code_blocks):
+            counts = get_token_counter().count_batch(
+                [block.get('content', '') for block in code_blocks], model_name
+            )
+        else:
+            counts = [block['tokens'] for block in code_blocks]
+        
         items = []
         for idx, block in enumerate(reversed(code_blocks)):  # Reverse for recency
+            tokens = counts[len(code_blocks) - idx - 1]
             # Priority based on recency and size
             recency_priority = 1.0 / (idx + 1)
-            size_priority = min(1.0, block.get('tokens', 0) / 500)  # Larger blocks preferred
+            size_priority = min(1.0, tokens / 500)  # Larger blocks preferred
             priority = (recency_priority * 0.6) + (size_priority * 0.4)
             
-            tokens = block.get('tokens', TokenBudgetManager.estimate_tokens(block.get('content', '')))
             items.append({
                 'item': block,
                 'priority': priority,
@@ -0,0 +1,38 @@
+"""
+Signals for chat app to maintain conversation counters and the history buffer.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Conversation, Message
+from .services.conversation_history import conversation_history
+
+
+def _estimate_tokens(content: str) -> int:
+    from apps.agents.utils.token_estimator import estimate_tokens
+    
+    return estimate_tokens(content or '')
+
+
+@receiver(post_save, sender=Message)
+def update_conversation_on_message_save(sender, instance, created, **kwargs):
+    """Bump counters and mark the history ring buffer stale."""
+    if created:
+        Conversation.objects.filter(id=instance.conversation_id).update(
+            message_count=F('message_count') + 1,
+            token_count=F('token_count') + _estimate_tokens(instance.content)
+        )
+    transaction.on_commit(lambda: conversation_history.invalidate(instance.conversation_id))
+
+
+@receiver(post_delete, sender=Message)
+def update_conversation_on_message_delete(sender, instance, **kwargs):
+    """Decrement counters and drop the history ring buffer."""
+    Conversation.objects.filter(id=instance.conversation_id, message_count__gt=0).update(
+        message_count=F('message_count') - 1,
+        token_count=F('token_count') - _estimate_tokens(instance.content)
+    )
+    transaction.on_commit(lambda: conversation_history.invalidate(instance.conversation_id))
@@ -185,7 +185,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
         serializer = MessageSerializer(paginated_messages, many=True)
         
         return Response({
-            'count': messages.count(),
+            'count': conversation.message_count,
             'page': page,
             'page_size': page_size,
                 'results': serializer.data
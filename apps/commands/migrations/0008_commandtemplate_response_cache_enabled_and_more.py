@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-16 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commands', '0007_commandtemplate_avg_execution_time_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commandtemplate',
+            name='response_cache_enabled',
+            field=models.BooleanField(default=False, help_text='Serve repeated executions with identical parameters from the AI response cache'),
+        ),
+        migrations.AddField(
+            model_name='commandtemplate',
+            name='response_cache_ttl',
+            field=models.IntegerField(default=3600, help_text='AI response cache TTL in seconds'),
+        ),
+    ]
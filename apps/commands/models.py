@@ -100,6 +100,16 @@ class CommandTemplate(models.Model):
     estimated_cost = models.FloatField(default=0.0, help_text="Estimated cost per execution")
     estimated_duration = models.IntegerField(default=0, help_text="Estimated duration in seconds")
     
+    # Response caching (opt-in): repeated executions with the same rendered prompt hit the cache
+    response_cache_enabled = models.BooleanField(
+        default=False,
+        help_text="Serve repeated executions with identical parameters from the AI response cache"
+    )
+    response_cache_ttl = models.IntegerField(
+        default=3600,
+        help_text="AI response cache TTL in seconds"
+    )
+    
     # Execution statistics (updated automatically via signals)
     success_rate = models.FloatField(default=100.0, help_text="Percentage of successful executions (0-100)")
     avg_execution_time = models.FloatField(default=0.0, help_text="Average execution time in seconds")
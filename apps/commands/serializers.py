@@ -66,6 +66,10 @@ class CommandExecutionRequestSerializer(serializers.Serializer):
         allow_null=True,
         help_text="Optional: Override the recommended agent"
     )
+    run_async = serializers.BooleanField(
+        default=False,
+        help_text="Queue the execution and return 202 immediately; follow it over the WebSocket"
+    )
     
     def validate_parameters(self, value):
         """Validate parameters is a dict."""
@@ -86,6 +90,17 @@ class CommandExecutionResponseSerializer(serializers.Serializer):
     error = serializers.CharField(required=False, allow_null=True)
 
 
+class CommandExecutionSubmittedSerializer(serializers.Serializer):
+    """Serializer for a queued (run_async) command execution."""
+    
+    success = serializers.BooleanField()
+    execution_id = serializers.UUIDField(help_text="Agent execution ID")
+    status = serializers.CharField()
+    queue = serializers.CharField()
+    status_url = serializers.CharField(help_text="Poll execution status here")
+    stream_url = serializers.CharField(help_text="WebSocket path for progress events")
+
+
 class CommandPreviewRequestSerializer(serializers.Serializer):
     """Serializer for command preview requests."""
     
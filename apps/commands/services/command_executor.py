@@ -13,11 +13,12 @@ from decimal import Decimal
 from asgiref.sync import sync_to_async
 
 from apps.commands.models import CommandTemplate
-from apps.agents.models import Agent
+from apps.agents.models import Agent, AgentExecution
 from apps.authentication.models import User
 from apps.agents.services import execution_engine, dispatcher
 from apps.commands.services.parameter_validator import ParameterValidator, ValidationResult
 from apps.commands.services.template_renderer import TemplateRenderer
+from apps.core.services.job_queue import job_queue
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +55,8 @@ class CommandExecutor:
         parameters: Dict[str, Any],
         agent: Optional[Agent] = None,
         user: Optional[User] = None,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        agent_execution: Optional[AgentExecution] = None
     ) -> CommandExecutionResult:
         """
         Execute command template with parameters.
@@ -74,6 +76,7 @@ class CommandExecutor:
             agent: Optional agent to use (auto-selected if not provided)
             user: User executing the command
             context: Optional execution context
+            agent_execution: Pending agent execution created by ``submit`` (optional)
             
         Returns:
             CommandExecutionResult
@@ -118,11 +121,19 @@ class CommandExecutor:
                 )
             
             # Step 5: Execute with agent
+            execution_context = dict(context or {})
+            if command.response_cache_enabled and 'response_cache' not in execution_context:
+                execution_context['response_cache'] = {
+                    'enabled': True,
+                    'ttl': command.response_cache_ttl,
+                }
+            
             execution_result = await execution_engine.execute_agent(
                 agent=agent,
                 input_data={"prompt": rendered_prompt, **complete_parameters},
                 user=user,
-                context=context or {}
+                context=execution_context,
+                execution=agent_execution
             )
             
             # Step 6: Create execution record and update command metrics
@@ -247,6 +258,67 @@ class CommandExecutor:
         except Exception:
             return None
     
+    async def submit(
+        self,
+        command: CommandTemplate,
+        parameters: Dict[str, Any],
+        agent: Optional[Agent] = None,
+        user: Optional[User] = None,
+        organization=None
+    ) -> Dict[str, Any]:
+        """
+        Validate a command and queue it for background execution.
+        
+        A pending AgentExecution is created up front so clients can follow
+        the run on its ``agent_execution_<id>`` WebSocket group.
+        
+        Args:
+            command: CommandTemplate to execute
+            parameters: User-provided parameters
+            agent: Optional agent to use (auto-selected if not provided)
+            user: User executing the command
+            organization: Organization the execution is billed to
+            
+        Returns:
+            Dictionary with execution_id plus the queue routing info
+            
+        Raises:
+            ValueError: If parameters are invalid or no agent is available
+            JobQueueFull: If the organization has too many executions waiting
+        """
+        validation_result = self.validator.validate(command.parameters, parameters)
+        if not validation_result.is_valid:
+            raise ValueError(f"Parameter validation failed: {'; '.join(validation_result.errors)}")
+        
+        if agent is None:
+            agent = await self._select_agent(command)
+        if agent is None:
+            raise ValueError("No suitable agent available for this command")
+        
+        job_queue.check_capacity(organization)
+        execution = await AgentExecution.objects.acreate(
+            agent=agent,
+            user=user,
+            input_data={'parameters': parameters},
+            context={'command_id': str(command.id)},
+            status='pending',
+            platform_used=agent.preferred_platform,
+            model_used=agent.model_name
+        )
+        
+        job = await sync_to_async(job_queue.submit)(
+            'command_execution',
+            {
+                'command_id': str(command.id),
+                'parameters': parameters,
+                'agent_execution_id': str(execution.id),
+                'user_id': str(user.id) if user else None,
+                'organization_id': str(organization.id) if organization else None,
+            },
+            organization=organization
+        )
+        return {'execution_id': str(execution.id), **job}
+    
     def validate_parameters(
         self,
         command: CommandTemplate,
@@ -274,3 +346,96 @@ class CommandExecutor:
 
 # Global executor instance
 command_executor = CommandExecutor()
+
+
+async def run_command_job(payload: Dict[str, Any]):
+    """
+    Job queue handler: run a command execution submitted asynchronously.
+    
+    Status and the final result are sent to the ``agent_execution_<id>``
+    group served by AgentExecutionConsumer.
+    
+    Args:
+        payload: Arguments recorded by ``CommandExecutor.submit``
+    """
+    from channels.layers import get_channel_layer
+    
+    execution = await AgentExecution.objects.select_related('agent').aget(
+        id=payload['agent_execution_id']
+    )
+    if execution.status != 'pending':
+        # Cancelled while waiting in the queue
+        return
+    
+    command = await CommandTemplate.objects.aget(id=payload['command_id'])
+    user = await User.objects.aget(id=payload['user_id']) if payload.get('user_id') else None
+    channel_layer = get_channel_layer()
+    group_name = f'agent_execution_{execution.id}'
+    
+    if channel_layer:
+        await channel_layer.group_send(group_name, {
+            'type': 'execution_update',
+            'status': 'running',
+            'data': {'id': str(execution.id), 'status': 'running'}
+        })
+    
+    result = await command_executor.execute(
+        command=command,
+        parameters=payload['parameters'],
+        agent=execution.agent,
+        user=user,
+        agent_execution=execution
+    )
+    if not result.success:
+        # Failures before the agent ran leave the record pending
+        await AgentExecution.objects.filter(id=execution.id, status='pending').aupdate(
+            status='failed',
+            error_message=result.error or ''
+        )
+    
+    if channel_layer:
+        if result.success:
+            await channel_layer.group_send(group_name, {
+                'type': 'execution_complete',
+                'execution_id': str(execution.id),
+                'result': {
+                    'success': True,
+                    'output': result.output,
+                    'execution_time': result.execution_time,
+                    'cost': float(result.cost) if result.cost else 0.0,
+                    'tokens_used': result.tokens_used,
+                    'command_execution_id': result.execution_id,
+                }
+            })
+        else:
+            await channel_layer.group_send(group_name, {
+                'type': 'execution_error',
+                'message': result.error or 'Command execution failed'
+            })
+    
+    organization_id = payload.get('organization_id')
+    if organization_id and result.success:
+        from apps.organizations.models import Organization
+        from apps.organizations.services import SubscriptionService
+        
+        try:
+            organization = await Organization.objects.aget(id=organization_id)
+            await sync_to_async(SubscriptionService.increment_usage)(organization, 'command_executions')
+        except Exception as e:
+            logger.warning(f"Failed to increment usage count: {e}")
+    
+    if user:
+        try:
+            from apps.integrations_external.signals import trigger_command_execution_notifications
+            await sync_to_async(trigger_command_execution_notifications)(
+                command_id=str(command.id),
+                command_name=command.name,
+                status='success' if result.success else 'failed',
+                user=user,
+                result_summary=result.output[:200] if result.success and isinstance(result.output, str) else None,
+                execution_time=result.execution_time,
+                cost=float(result.cost) if result.cost else 0.0,
+                error=result.error
+            )
+        except Exception as e:
+            logger.error(f"Failed to trigger command execution notifications: {e}")
@@ -10,6 +10,7 @@ from drf_spectacular.utils import extend_schema
 from asgiref.sync import async_to_sync
 from django.core.cache import cache
 from django.conf import settings
+from django.urls import reverse
 import asyncio
 import logging
 
@@ -18,7 +19,7 @@ from .serializers import (
     CommandCategorySerializer, CommandTemplateSerializer,
     CommandTemplateListSerializer, CommandExecutionRequestSerializer,
     CommandExecutionResponseSerializer, CommandPreviewRequestSerializer,
-    CommandPreviewResponseSerializer
+    CommandPreviewResponseSerializer, CommandExecutionSubmittedSerializer
 )
 from .services import command_executor
 from .services.template_renderer import TemplateRenderer
@@ -26,6 +27,7 @@ from .services.parameter_validator import ParameterValidator
 from apps.agents.models import Agent
 from apps.authentication.permissions import IsAdminUser
 from apps.core.services.roles import RoleService
+from apps.core.services.job_queue import JobQueueFull
 from apps.organizations.services import OrganizationStatusService, SubscriptionService
 
 # Instantiate services
@@ -131,8 +133,11 @@ class CommandTemplateViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         request=CommandExecutionRequestSerializer,
-        responses={200: CommandExecutionResponseSerializer},
-        description="Execute a command template with provided parameters"
+        responses={200: CommandExecutionResponseSerializer, 202: CommandExecutionSubmittedSerializer},
+        description=(
+            "Execute a command template with provided parameters. With run_async the command is "
+            "queued and 202 is returned right away; the result is streamed on the agent execution WebSocket."
+        )
     )
     @action(detail=True, methods=['post'])
     def execute(self, request, pk=None):
@@ -191,6 +196,9 @@ class CommandTemplateViewSet(viewsets.ModelViewSet):
                         'error': f'Agent with ID {agent_id} not found'
                     }, status=status.HTTP_404_NOT_FOUND)
             
+            if serializer.validated_data['run_async']:
+                return self._submit_execution(command, parameters, agent, user, organization)
+            
             # Execute command asynchronously with timeout protection
             # Use async_to_sync to properly handle event loop in Django
             try:
@@ -285,6 +293,31 @@ class CommandTemplateViewSet(viewsets.ModelViewSet):
             
             return Response(error_response, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _submit_execution(self, command, parameters, agent, user, organization):
+        """Queue a command execution and return 202."""
+        try:
+            job = async_to_sync(command_executor.submit)(
+                command=command,
+                parameters=parameters,
+                agent=agent,
+                user=user,
+                organization=organization
+            )
+        except JobQueueFull as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        execution_id = job['execution_id']
+        return Response({
+            'success': True,
+            'execution_id': execution_id,
+            'status': 'pending',
+            'queue': job['queue'],
+            'status_url': reverse('agentexecution-detail', args=[execution_id]),
+            'stream_url': f'/ws/agents/execution/{execution_id}/',
+        }, status=status.HTTP_202_ACCEPTED)
+    
     @extend_schema(
         request=CommandPreviewRequestSerializer,
         responses={200: CommandPreviewResponseSerializer},
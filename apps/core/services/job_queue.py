@@ -0,0 +1,287 @@
+"""
+Background Job Queue Service
+
+Runs long executions (workflows, commands) outside the HTTP request.
+
+Jobs are enqueued to Celery, or to an in-process asyncio worker pool when
+Celery is disabled or its broker is unreachable. In-process jobs run on the
+ASGI server's event loop (see ``bind_server_loop``) so handlers send WebSocket
+events from the loop that owns the channel layer's queues. Each job is routed to a
+priority queue chosen from the organization's subscription tier, and the
+number of jobs running at once is capped per organization: a job that finds
+its organization at the cap is put back on the queue instead of running.
+
+Progress is not reported by the queue itself; handlers emit events to the
+existing WebSocket groups of the execution they run.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# Job kind -> dotted path of an async handler taking the job payload
+JOB_HANDLERS = {
+    'workflow_execution': 'apps.workflows.services.workflow_executor.run_workflow_job',
+    'command_execution': 'apps.commands.services.command_executor.run_command_job',
+}
+
+
+class JobQueueFull(Exception):
+    """Raised when an organization already has too many jobs waiting."""
+    pass
+
+
+class _InProcessPool:
+    """
+    Priority queue drained by asyncio workers.
+    
+    Workers run on the ASGI server's event loop once it is bound, otherwise
+    (WSGI, management commands) on a dedicated event loop thread. Used when
+    Celery is not available; jobs are lost if the process exits.
+    """
+    
+    def __init__(self, queue: 'JobQueue'):
+        self.job_queue = queue
+        self.server_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._thread_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()  # loop -> PriorityQueue
+        self._sequence = itertools.count()
+    
+    def put(self, priority: int, kind: str, payload: Dict[str, Any], org_key: Optional[str]):
+        """Enqueue a job from any thread."""
+        loop = self.server_loop
+        if loop is None or loop.is_closed():
+            loop = self._ensure_thread_loop()
+        item = (priority, next(self._sequence), kind, payload, org_key)
+        loop.call_soon_threadsafe(self._put_nowait, loop, item)
+    
+    def _put_nowait(self, loop: asyncio.AbstractEventLoop, item: tuple):
+        """Add a job to the queue of ``loop``, starting its workers (runs on ``loop``)."""
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = self._queues[loop] = asyncio.PriorityQueue()
+            for _ in range(max(1, getattr(settings, 'JOB_QUEUE_INPROCESS_WORKERS', 4))):
+                loop.create_task(self._worker(queue))
+        queue.put_nowait(item)
+    
+    def _ensure_thread_loop(self) -> asyncio.AbstractEventLoop:
+        if self._thread_loop is not None:
+            return self._thread_loop
+        with self._lock:
+            if self._thread_loop is not None:
+                return self._thread_loop
+            loop = asyncio.new_event_loop()
+            
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.run_forever()
+            
+            threading.Thread(target=run, name='job-queue', daemon=True).start()
+            self._thread_loop = loop
+            return loop
+    
+    async def _worker(self, queue: asyncio.PriorityQueue):
+        retry_delay = getattr(settings, 'JOB_QUEUE_SLOT_RETRY_SECONDS', 5)
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            priority, _, kind, payload, org_key = item
+            try:
+                ran = await self.job_queue.run_job(kind, payload, org_key)
+            except Exception as e:
+                logger.error(f"[JobQueue] In-process job {kind} failed: {e}", exc_info=True)
+                ran = True
+            if not ran:
+                # Organization is at its concurrency cap; try again later
+                loop.call_later(retry_delay, queue.put_nowait, item)
+            queue.task_done()
+
+
+class JobQueue:
+    """
+    Submit and run background jobs.
+    
+    Responsibilities:
+    - Route jobs to a priority queue by subscription tier
+    - Bound waiting jobs and cap running jobs per organization
+    - Dispatch to Celery, falling back to the in-process pool
+    """
+    
+    QUEUED_KEY_PREFIX = 'job_queue_queued_'
+    RUNNING_KEY_PREFIX = 'job_queue_running_'
+    
+    def __init__(self):
+        self._pool = _InProcessPool(self)
+    
+    def bind_server_loop(self, application):
+        """
+        Wrap an ASGI application so in-process jobs run on its event loop.
+        
+        Args:
+            application: ASGI application served by this process
+        
+        Returns:
+            ASGI application recording the loop it is called on
+        """
+        pool = self._pool
+        
+        async def app(scope, receive, send):
+            loop = asyncio.get_running_loop()
+            if pool.server_loop is not loop:
+                pool.server_loop = loop
+            return await application(scope, receive, send)
+        
+        return app
+    
+    def route(self, organization=None) -> Tuple[str, int]:
+        """
+        Get the queue name and priority for an organization.
+        
+        Args:
+            organization: Organization instance or None
+        
+        Returns:
+            Tuple of (queue name, priority); lower priority runs first
+        """
+        tiers = getattr(settings, 'JOB_QUEUE_TIERS', {})
+        tier = getattr(organization, 'subscription_tier', None)
+        route = tiers.get(tier) or getattr(settings, 'JOB_QUEUE_DEFAULT_ROUTE', {})
+        return route.get('queue', 'jobs_default'), route.get('priority', 5)
+    
+    def check_capacity(self, organization=None):
+        """
+        Ensure the organization may queue another job.
+        
+        Raises:
+            JobQueueFull: If the organization's waiting jobs are at the limit
+        """
+        limit = getattr(settings, 'JOB_ORG_MAX_QUEUED', 0)
+        org_key = self._org_key(organization)
+        if not org_key or limit <= 0:
+            return
+        queued = cache.get(f"{self.QUEUED_KEY_PREFIX}{org_key}") or 0
+        if queued >= limit:
+            raise JobQueueFull(
+                f"Too many executions waiting for this organization ({queued}); try again later"
+            )
+    
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        organization=None
+    ) -> Dict[str, Any]:
+        """
+        Enqueue a job.
+        
+        Args:
+            kind: Job kind (key of JOB_HANDLERS)
+            payload: JSON-serializable handler arguments
+            organization: Organization the job is billed to, if any
+        
+        Returns:
+            Dictionary with the backend, queue and priority used
+        
+        Raises:
+            JobQueueFull: If the organization's waiting jobs are at the limit
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        
+        self.check_capacity(organization)
+        queue, priority = self.route(organization)
+        org_key = self._org_key(organization)
+        self._increment(f"{self.QUEUED_KEY_PREFIX}{org_key}", org_key)
+        
+        backend = getattr(settings, 'JOB_QUEUE_BACKEND', 'celery')
+        if backend == 'celery':
+            try:
+                from apps.core.tasks import run_job_task
+                
+                run_job_task.apply_async(
+                    args=[kind, payload, org_key, queue, priority],
+                    queue=queue,
+                    priority=priority
+                )
+            except Exception as e:
+                logger.warning(f"[JobQueue] Celery unavailable, running {kind} in process: {e}")
+                backend = 'inprocess'
+        
+        if backend != 'celery':
+            backend = 'inprocess'
+            self._pool.put(priority, kind, payload, org_key)
+        
+        return {'backend': backend, 'queue': queue, 'priority': priority}
+    
+    async def run_job(self, kind: str, payload: Dict[str, Any], org_key: Optional[str] = None) -> bool:
+        """
+        Run a job if its organization has a free slot.
+        
+        Args:
+            kind: Job kind
+            payload: Handler arguments
+            org_key: Organization key used for the concurrency cap
+        
+        Returns:
+            False if the organization is at its cap and the job must be re-queued
+        """
+        if not self._acquire_slot(org_key):
+            return False
+        
+        self._decrement(f"{self.QUEUED_KEY_PREFIX}{org_key}", org_key)
+        try:
+            handler = import_string(JOB_HANDLERS[kind])
+            await handler(payload)
+        finally:
+            self._decrement(f"{self.RUNNING_KEY_PREFIX}{org_key}", org_key)
+        return True
+    
+    def _acquire_slot(self, org_key: Optional[str]) -> bool:
+        limit = getattr(settings, 'JOB_ORG_MAX_CONCURRENT', 0)
+        if not org_key or limit <= 0:
+            return True
+        key = f"{self.RUNNING_KEY_PREFIX}{org_key}"
+        if self._increment(key, org_key) > limit:
+            self._decrement(key, org_key)
+            return False
+        return True
+    
+    def _increment(self, key: str, org_key: Optional[str]) -> int:
+        if not org_key:
+            return 0
+        # Counters expire so a crashed worker cannot hold a slot forever
+        timeout = getattr(settings, 'JOB_QUEUE_COUNTER_TIMEOUT', 3600)
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout)
+            return 1
+    
+    def _decrement(self, key: str, org_key: Optional[str]):
+        if not org_key:
+            return
+        try:
+            if cache.decr(key) < 0:
+                cache.set(key, 0, getattr(settings, 'JOB_QUEUE_COUNTER_TIMEOUT', 3600))
+        except ValueError:
+            pass
+    
+    @staticmethod
+    def _org_key(organization) -> Optional[str]:
+        return str(organization.id) if organization is not None else None
+
+
+# Global instance
+job_queue = JobQueue()
@@ -15,12 +15,20 @@ Role Hierarchy:
 - Other roles (project-level and system-level)
 """
 
-from typing import List, Dict, Optional, Set
+import time
+from typing import Any, List, Dict, Optional, Set
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import models
 from apps.projects.models import Project, ProjectMember, ProjectConfiguration
 
 User = get_user_model()
 
+# Bumped on every local invalidation so request memos filled earlier in this
+# process are dropped without waiting for their TTL
+_local_generation = 0
+
 
 class RoleService:
     """
@@ -136,6 +144,121 @@ class RoleService:
         'viewer': ['viewer'],
     }
     
+    MATRIX_CACHE_PREFIX = 'role_matrix_'
+    VERSION_CACHE_PREFIX = 'role_version_'
+    REQUEST_CACHE_ATTR = '_role_matrix_cache'
+    
+    @classmethod
+    def get_permission_matrix(cls, user: User) -> Dict[str, Any]:
+        """
+        Resolve all organization and project memberships of a user.
+        
+        Loaded with two queries, then kept on the user instance for the rest
+        of the request and in the shared cache under a per-user version that
+        membership/ownership signals bump (see apps.core.signals).
+        
+        Args:
+            user: User object
+        
+        Returns:
+            Dictionary with:
+            - organizations: {org_id: {'role': str or None, 'is_owner': bool}}
+            - projects: {project_id: {'roles': [str], 'is_owner': bool}}
+            Role is None for organizations the user owns without being a member.
+        """
+        if not getattr(user, 'pk', None):
+            return {'organizations': {}, 'projects': {}}
+        
+        memo = getattr(user, cls.REQUEST_CACHE_ATTR, None)
+        if (
+            memo
+            and memo['generation'] == _local_generation
+            and time.monotonic() - memo['loaded_at'] < getattr(settings, 'ROLE_CACHE_LOCAL_TTL', 5)
+        ):
+            return memo['matrix']
+        
+        key = f"{cls.MATRIX_CACHE_PREFIX}{user.pk}_{cls._get_version(user.pk)}"
+        matrix = cache.get(key)
+        if matrix is None:
+            matrix = cls._load_permission_matrix(user)
+            cache.set(key, matrix, getattr(settings, 'ROLE_CACHE_TTL', 300))
+        
+        setattr(user, cls.REQUEST_CACHE_ATTR, {
+            'matrix': matrix,
+            'generation': _local_generation,
+            'loaded_at': time.monotonic(),
+        })
+        return matrix
+    
+    @classmethod
+    def invalidate_user(cls, user_id):
+        """
+        Drop cached role resolution for a user.
+        
+        Bumps the user's version so every process stops reading the old
+        matrix; entries under older versions simply expire.
+        """
+        global _local_generation
+        _local_generation += 1
+        if not user_id:
+            return
+        key = f"{cls.VERSION_CACHE_PREFIX}{user_id}"
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, cls._new_version(), None)
+    
+    @classmethod
+    def _get_version(cls, user_id) -> int:
+        key = f"{cls.VERSION_CACHE_PREFIX}{user_id}"
+        version = cache.get(key)
+        if version is None:
+            # Seed from the clock so an evicted counter never reuses an old version
+            cache.add(key, cls._new_version(), None)
+            version = cache.get(key) or 0
+        return version
+    
+    @staticmethod
+    def _new_version() -> int:
+        return int(time.time() * 1000)
+    
+    @classmethod
+    def _load_permission_matrix(cls, user: User) -> Dict[str, Any]:
+        """Query memberships and ownerships: one query for organizations, one for projects."""
+        from apps.organizations.models import Organization, OrganizationMember
+        
+        org_rows = Organization.objects.filter(
+            models.Q(owner=user) | models.Q(members__user=user)
+        ).annotate(
+            member_role=models.Subquery(
+                OrganizationMember.objects.filter(
+                    organization=models.OuterRef('pk'), user=user
+                ).values('role')[:1]
+            )
+        ).values_list('id', 'owner_id', 'member_role').distinct()
+        
+        project_rows = Project.objects.filter(
+            models.Q(owner=user) | models.Q(project_members__user=user)
+        ).annotate(
+            member_roles=models.Subquery(
+                ProjectMember.objects.filter(
+                    project=models.OuterRef('pk'), user=user
+                ).values('roles')[:1],
+                output_field=models.JSONField()
+            )
+        ).values_list('id', 'owner_id', 'member_roles').distinct()
+        
+        return {
+            'organizations': {
+                str(org_id): {'role': role, 'is_owner': owner_id == user.pk}
+                for org_id, owner_id, role in org_rows
+            },
+            'projects': {
+                str(project_id): {'roles': list(roles or []), 'is_owner': owner_id == user.pk}
+                for project_id, owner_id, roles in project_rows
+            },
+        }
+    
     @classmethod
     def get_all_system_roles(cls) -> List[str]:
         """Get list of all system role keys."""
@@ -209,16 +332,13 @@ class RoleService:
         
         # 2. Organization-level roles
         if organization:
-            try:
-                from apps.organizations.models import OrganizationMember
-                org_member = OrganizationMember.objects.get(organization=organization, user=user)
-                if org_member.role == 'org_admin' and 'org_admin' not in roles:
+            org_entry = cls.get_permission_matrix(user)['organizations'].get(str(organization.id))
+            if org_entry and org_entry['role'] is not None:
+                if org_entry['role'] == 'org_admin' and 'org_admin' not in roles:
                     roles.append('org_admin')
                 # Organization owner is also org_admin
-                if organization.owner == user and 'org_admin' not in roles:
+                if organization.owner_id == user.pk and 'org_admin' not in roles:
                     roles.append('org_admin')
-            except Exception:
-                pass
         
         # 3. System-level role (from User.role field)
         # Note: Legacy 'admin' role is automatically mapped to 'org_admin' for backward compatibility
@@ -232,16 +352,14 @@ class RoleService:
         
         # 4. Project-specific roles (from ProjectMember)
         if project:
-            try:
-                project_member = ProjectMember.objects.get(project=project, user=user)
-                for role in project_member.roles:
+            project_entry = cls.get_permission_matrix(user)['projects'].get(str(project.id))
+            if project_entry:
+                for role in project_entry['roles']:
                     if role not in roles:
                         roles.append(role)
-            except ProjectMember.DoesNotExist:
-                pass
             
             # Project owner always has owner role
-            if project.owner == user and 'owner' not in roles:
+            if project.owner_id == user.pk and 'owner' not in roles:
                 roles.append('owner')
         
         # If no roles found, default to viewer
@@ -336,26 +454,21 @@ class RoleService:
             return True
         
         # Check if user is org owner
-        if organization and organization.owner == user:
+        if organization and organization.owner_id == user.pk:
             return True
         
+        organizations = cls.get_permission_matrix(user)['organizations']
+        
         # Check OrganizationMember
         if organization:
-            try:
-                from apps.organizations.models import OrganizationMember
-                org_member = OrganizationMember.objects.get(organization=organization, user=user)
-                return org_member.role == 'org_admin'
-            except Exception:
-                pass
+            org_entry = organizations.get(str(organization.id))
+            if org_entry and org_entry['role'] is not None:
+                return org_entry['role'] == 'org_admin'
         
         # If no specific organization is provided, check if user is org_admin in any organization
         # This is for cases where a general 'admin' check is performed without organization context
-        try:
-            from apps.organizations.models import OrganizationMember
-            if OrganizationMember.objects.filter(user=user, role='org_admin').exists():
-                return True
-        except Exception:
-            pass
+        if any(entry['role'] == 'org_admin' for entry in organizations.values()):
+            return True
         
         # Check User.role for org_admin (works without organization parameter)
         if hasattr(user, 'role') and user.role == 'org_admin':
@@ -379,7 +492,7 @@ class RoleService:
             return True
         if organization and cls.is_org_admin(user, organization):
             return True
-        if project and project.owner == user:
+        if project and project.owner_id == user.pk:
             return True
         return False
     
@@ -401,11 +514,21 @@ class RoleService:
     @classmethod
     def get_user_organizations(cls, user: User) -> List:
         """Get all organizations user belongs to."""
-        try:
-            from apps.organizations.models import OrganizationMember
-            return [om.organization for om in OrganizationMember.objects.filter(user=user).select_related('organization')]
-        except Exception:
+        from apps.organizations.models import Organization
+        
+        org_ids = [
+            org_id for org_id, entry in cls.get_permission_matrix(user)['organizations'].items()
+            if entry['role'] is not None
+        ]
+        if not org_ids:
             return []
+        
+        # Instances are memoized for the request only; the matrix drives freshness
+        memo = getattr(user, cls.REQUEST_CACHE_ATTR)
+        if memo.get('organization_ids') != org_ids:
+            memo['organizations'] = list(Organization.objects.filter(id__in=org_ids))
+            memo['organization_ids'] = org_ids
+        return memo['organizations']
     
     @classmethod
     def get_custom_roles(cls, project: Project) -> List[str]:
@@ -0,0 +1,63 @@
+"""
+Signals for core app to invalidate cached role resolution.
+
+Role versions are bumped when the change is saved, so the rest of the
+transaction sees it, and again once it commits: a concurrent request may
+have reloaded the pre-commit memberships and cached them under the first
+bump's version.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from apps.organizations.models import Organization, OrganizationMember
+from apps.projects.models import Project, ProjectMember
+from .services.roles import RoleService
+
+
+def invalidate_roles(*user_ids):
+    """Invalidate cached roles of ``user_ids`` now and after the transaction commits."""
+    def invalidate():
+        for user_id in user_ids:
+            RoleService.invalidate_user(user_id)
+    
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=OrganizationMember)
+@receiver(post_delete, sender=OrganizationMember)
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_member_roles(sender, instance, **kwargs):
+    """Membership or member roles changed."""
+    invalidate_roles(instance.user_id)
+
+
+@receiver(pre_save, sender=Organization)
+@receiver(pre_save, sender=Project)
+def store_previous_owner(sender, instance, update_fields=None, **kwargs):
+    """Remember the stored owner so an ownership transfer invalidates both users."""
+    if instance._state.adding or (update_fields is not None and 'owner' not in update_fields):
+        instance._previous_owner_id = instance.owner_id
+        return
+    instance._previous_owner_id = (
+        sender.objects.filter(pk=instance.pk).values_list('owner_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Project)
+def invalidate_owner_roles(sender, instance, created, **kwargs):
+    """Ownership assigned or transferred."""
+    previous_owner_id = getattr(instance, '_previous_owner_id', None)
+    if created or previous_owner_id != instance.owner_id:
+        invalidate_roles(previous_owner_id, instance.owner_id)
+
+
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=Project)
+def invalidate_deleted_owner_roles(sender, instance, **kwargs):
+    """Owned organization or project deleted."""
+    invalidate_roles(instance.owner_id)
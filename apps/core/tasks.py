@@ -0,0 +1,43 @@
+"""
+Celery tasks for background jobs submitted through the job queue.
+"""
+
+import asyncio
+import logging
+from celery import shared_task
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=None, ignore_result=True)
+def run_job_task(self, kind, payload, org_key=None, queue=None, priority=None):
+    """
+    Run a queued job (workflow or command execution).
+    
+    If the job's organization is at its concurrency cap the task is
+    re-queued on the same queue instead of occupying a worker.
+    
+    Args:
+        kind: Job kind (see apps.core.services.job_queue.JOB_HANDLERS)
+        payload: Handler arguments
+        org_key: Organization key used for the concurrency cap
+        queue: Queue the job was routed to
+        priority: Priority the job was routed with
+    """
+    from apps.core.services.job_queue import job_queue
+    
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        ran = loop.run_until_complete(job_queue.run_job(kind, payload, org_key))
+    finally:
+        loop.close()
+    
+    if not ran:
+        logger.info(f"[run_job_task] Organization {org_key} at concurrency cap, re-queueing {kind}")
+        raise self.retry(
+            countdown=getattr(settings, 'JOB_QUEUE_SLOT_RETRY_SECONDS', 5),
+            queue=queue,
+            priority=priority
+        )
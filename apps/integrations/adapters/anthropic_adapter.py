@@ -6,10 +6,12 @@ Provides integration with Anthropic's Claude API including Claude 3 models
 """
 
 import anthropic
+import httpx
 from typing import Optional, AsyncIterator, Dict, List, Any
 import time
 
 from .base import BaseAIAdapter, CompletionRequest, CompletionResponse
+from ..services.http_pool import http_pool
 from ..utils.pricing import AnthropicPricing
 from ..utils.validators import AnthropicValidator
 from ..utils.exceptions import AnthropicError, ValidationError
@@ -30,7 +32,10 @@ class AnthropicAdapter(BaseAIAdapter):
     def __init__(self, platform_config):
         """Initialize Anthropic adapter."""
         super().__init__(platform_config)
-        self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
+        self.client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            http_client=http_pool.client(timeout=httpx.Timeout(600.0, connect=10.0))
+        )
         self.pricing = AnthropicPricing()
         self.validator = AnthropicValidator()
         self.logger.info(f"Anthropic adapter initialized with model: {self.default_model}")
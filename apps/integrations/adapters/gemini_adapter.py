@@ -11,6 +11,7 @@ import time
 import asyncio
 
 from .base import BaseAIAdapter, CompletionRequest, CompletionResponse
+from ..services.token_counter import get_token_counter
 from ..utils.pricing import GeminiPricing
 from ..utils.validators import GeminiValidator
 from ..utils.exceptions import GeminiError, ValidationError
@@ -80,10 +81,11 @@ class GeminiAdapter(BaseAIAdapter):
             # Extract content
             content = response.text
             
-            # Estimate token count (Gemini doesn't always provide exact counts)
-            # Using rough estimate: 1 token ≈ 4 characters
-            estimated_input_tokens = len(full_prompt) // 4
-            estimated_output_tokens = len(content) // 4
+            # Count tokens locally (Gemini doesn't always provide exact counts)
+            counter = get_token_counter()
+            estimated_input_tokens, estimated_output_tokens = counter.count_batch(
+                [full_prompt, content], model_id
+            )
             total_tokens = estimated_input_tokens + estimated_output_tokens
             
             # Calculate cost
@@ -14,6 +14,7 @@ import time
 import asyncio
 
 from .base import BaseAIAdapter, CompletionRequest, CompletionResponse
+from ..services.http_pool import http_pool
 from ..utils.pricing import OpenAIPricing
 from ..utils.validators import OpenAIValidator
 from ..utils.exceptions import OpenAIError, ValidationError
@@ -35,12 +36,10 @@ class OpenRouterAdapter(BaseAIAdapter):
         # OpenRouter uses OpenAI-compatible API with custom base URL
         base_url = platform_config.api_url or "https://openrouter.ai/api/v1"
         
-        # Create a custom httpx client without proxies to avoid compatibility issues
-        # This works around the issue where OpenAI library tries to pass 'proxies' to httpx.AsyncClient
-        http_client = httpx.AsyncClient(
-            timeout=httpx.Timeout(60.0, connect=10.0),
-            limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
-        )
+        # Use the process-wide connection pool so TLS connections are reused
+        # across adapters and requests (also avoids the OpenAI library passing
+        # 'proxies' to its own default httpx.AsyncClient)
+        http_client = http_pool.client(timeout=httpx.Timeout(60.0, connect=10.0))
         
         # Initialize OpenAI client with OpenRouter base URL and custom http_client
         # Set max_retries=0 to handle retries ourselves (especially for rate limit errors)
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0011_aiplatform_api_stateful_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='platformusage',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
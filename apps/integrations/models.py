@@ -7,6 +7,7 @@ import logging
 
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 from .utils.encryption import encrypt_api_key, decrypt_api_key, is_encrypted
 
@@ -326,7 +327,8 @@ class PlatformUsage(models.Model):
         verbose_name='Updated By'
     )
     
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the request is recorded; rows are written behind in batches
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
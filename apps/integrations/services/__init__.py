@@ -2,16 +2,27 @@
 
 from .adapter_registry import AdapterRegistry, registry, get_registry
 from .fallback_handler import FallbackHandler
+from .circuit_breaker import CircuitBreaker
 from .cost_tracker import CostTracker, tracker
-from .rate_limiter import RateLimiter, limiter
+from .http_pool import HTTPPoolManager, http_pool
+from .token_counter import TokenCounter, get_token_counter, count_tokens
+from .rate_limiter import RateLimiter, RateLimit, RateLimitResult, limiter
 
 __all__ = [
     'AdapterRegistry',
     'registry',
     'get_registry',
     'FallbackHandler',
+    'CircuitBreaker',
     'CostTracker',
     'tracker',
+    'HTTPPoolManager',
+    'http_pool',
+    'TokenCounter',
+    'get_token_counter',
+    'count_tokens',
     'RateLimiter',
+    'RateLimit',
+    'RateLimitResult',
     'limiter',
 ]
@@ -5,11 +5,13 @@ Provides centralized access to all platform adapters and handles
 initialization and lifecycle management.
 """
 
-from typing import Dict, Optional, List, Type
+from typing import Any, Dict, Optional, List, Type
+from dataclasses import dataclass, asdict
 import logging
 
 from apps.integrations.models import AIPlatform
 from ..adapters.base import BaseAIAdapter
+from .circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +51,18 @@ def _get_adapter_class(platform_name: str) -> Optional[Type[BaseAIAdapter]]:
         return None
 
 
+@dataclass
+class HedgeStats:
+    """Hedged request counters for a platform."""
+    primary_requests: int = 0  # Requests where the platform was tried first
+    hedges_launched: int = 0   # Times the platform was started as a hedge
+    hedge_wins: int = 0        # Hedges that answered before the primary
+    cancelled: int = 0         # Requests to the platform cancelled as the loser
+    
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
 class AdapterRegistry:
     """Registry for managing AI platform adapters."""
     
@@ -66,6 +80,9 @@ class AdapterRegistry:
         """Initialize empty registry."""
         self._adapters: Dict[str, BaseAIAdapter] = {}
         self._initialized = False
+        # Kept across refresh(): they describe the platform, not the adapter instance
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._hedge_stats: Dict[str, HedgeStats] = {}
     
     async def initialize(self):
         """
@@ -168,6 +185,36 @@ class AdapterRegistry:
         """
         return list(self._adapters.keys())
     
+    def get_circuit_breaker(self, platform_name: str) -> CircuitBreaker:
+        """
+        Get (or create) the circuit breaker for a platform.
+        
+        Args:
+            platform_name: Name of the platform
+            
+        Returns:
+            CircuitBreaker instance
+        """
+        breaker = self._breakers.get(platform_name)
+        if breaker is None:
+            breaker = self._breakers.setdefault(platform_name, CircuitBreaker(platform_name))
+        return breaker
+    
+    def get_hedge_stats(self, platform_name: str) -> HedgeStats:
+        """
+        Get (or create) hedged request counters for a platform.
+        
+        Args:
+            platform_name: Name of the platform
+            
+        Returns:
+            HedgeStats instance
+        """
+        stats = self._hedge_stats.get(platform_name)
+        if stats is None:
+            stats = self._hedge_stats.setdefault(platform_name, HedgeStats())
+        return stats
+    
     async def refresh(self):
         """
         Refresh adapter registry.
@@ -183,10 +230,13 @@ class AdapterRegistry:
         """
         Check health of all registered adapters.
         
+        Each entry also carries the platform's circuit breaker state and
+        hedged request statistics.
+        
         Returns:
             Dictionary mapping platform names to health status
         """
-        health_results = {}
+        health_results: Dict[str, Dict[str, Any]] = {}
         
         for platform_name, adapter in self._adapters.items():
             try:
@@ -199,6 +249,9 @@ class AdapterRegistry:
                     'error': str(e),
                     'available': False
                 }
+            
+            health_results[platform_name]['circuit_breaker'] = self.get_circuit_breaker(platform_name).snapshot()
+            health_results[platform_name]['hedging'] = self.get_hedge_stats(platform_name).to_dict()
         
         return health_results
 
@@ -0,0 +1,161 @@
+"""
+Circuit breaker for AI platform adapters.
+
+Tracks an exponentially weighted moving average (EWMA) of the error rate and
+latency per adapter. When the error rate or latency crosses its threshold
+the breaker opens and callers skip the platform without an attempt. After a
+cooldown a single probe request is let through (half-open); its outcome
+closes or re-opens the breaker.
+"""
+
+from typing import Any, Dict, Optional
+from collections import deque
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Per-adapter circuit breaker fed by error rate and latency EWMAs."""
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(
+        self,
+        name: str,
+        error_threshold: Optional[float] = None,
+        latency_threshold: Optional[float] = None,
+        cooldown_seconds: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        alpha: float = 0.2,
+        latency_window: int = 100
+    ):
+        """
+        Initialize circuit breaker.
+        
+        Args:
+            name: Platform name
+            error_threshold: EWMA error rate (0-1) at which the breaker opens
+            latency_threshold: EWMA latency in seconds at which the breaker opens
+            cooldown_seconds: Time the breaker stays open before probing
+            min_samples: Samples required before the breaker may open
+            alpha: EWMA smoothing factor
+            latency_window: Number of recent latencies kept for percentiles
+        """
+        self.name = name
+        self.error_threshold = error_threshold if error_threshold is not None else getattr(
+            settings, 'AI_CIRCUIT_BREAKER_ERROR_THRESHOLD', 0.5)
+        self.latency_threshold = latency_threshold if latency_threshold is not None else getattr(
+            settings, 'AI_CIRCUIT_BREAKER_LATENCY_THRESHOLD', 60.0)
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else getattr(
+            settings, 'AI_CIRCUIT_BREAKER_COOLDOWN_SECONDS', 30.0)
+        self.min_samples = min_samples if min_samples is not None else getattr(
+            settings, 'AI_CIRCUIT_BREAKER_MIN_SAMPLES', 5)
+        self.alpha = alpha
+        
+        self.state = self.CLOSED
+        self.error_rate = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.samples = 0
+        self.opened_at: Optional[float] = None
+        self.total_opens = 0
+        self.last_error: Optional[str] = None
+        self._latencies = deque(maxlen=latency_window)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to this platform now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # Half-open: let exactly one probe through
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self, latency: float):
+        with self._lock:
+            self._observe(latency, error=False)
+            if self.state == self.HALF_OPEN:
+                logger.info(f"Circuit breaker for {self.name} closed after successful probe")
+                self.state = self.CLOSED
+                self.error_rate = 0.0
+                self._probe_in_flight = False
+            elif self._should_open():
+                self._open("latency")
+    
+    def record_failure(self, latency: float, error: Optional[str] = None):
+        with self._lock:
+            self._observe(latency, error=True)
+            self.last_error = error
+            if self.state == self.HALF_OPEN or self._should_open():
+                self._open("errors")
+    
+    def release_probe(self):
+        """Release a half-open probe slot whose request was cancelled."""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Return the given latency percentile (0-1) over recent requests."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(int(round(percentile * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current breaker state for health reporting."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'error_rate': round(self.error_rate, 4),
+                'latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+                'samples': self.samples,
+                'total_opens': self.total_opens,
+                'opened_seconds_ago': round(time.monotonic() - self.opened_at, 1) if self.opened_at else None,
+                'last_error': self.last_error,
+            }
+    
+    def _observe(self, latency: float, error: bool):
+        self.samples += 1
+        self.error_rate = self.alpha * (1.0 if error else 0.0) + (1 - self.alpha) * self.error_rate
+        if not error:
+            # Failed calls often return early; only successful latencies drive hedging
+            self._latencies.append(latency)
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+    
+    def _should_open(self) -> bool:
+        if self.state != self.CLOSED or self.samples < self.min_samples:
+            return False
+        if self.error_rate >= self.error_threshold:
+            return True
+        return bool(self.latency_threshold and self.latency_ewma and self.latency_ewma >= self.latency_threshold)
+    
+    def _open(self, reason: str):
+        if self.state != self.OPEN:
+            self.total_opens += 1
+            logger.warning(
+                f"Circuit breaker for {self.name} opened ({reason}): "
+                f"error_rate={self.error_rate:.2f}, latency_ewma={self.latency_ewma}"
+            )
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
@@ -424,7 +424,8 @@ class ConversationManager:
         if code_blocks and budget.get('code_blocks', 0) > 0:
             selected_blocks = TokenBudgetManager.fit_code_blocks_in_budget(
                 code_blocks,
-                budget['code_blocks']
+                budget['code_blocks'],
+                model_name
             )
             
             if selected_blocks:
@@ -458,9 +459,9 @@ class ConversationManager:
                     'content': content
                 })
             
-            # Log token estimates for debugging
+            # Log token counts for debugging (memoized, so fitting below reuses them)
             total_estimated_tokens = sum(
-                TokenBudgetManager.estimate_message_tokens(msg) for msg in formatted_messages
+                TokenBudgetManager.estimate_messages_tokens(formatted_messages, model_name)
             )
             logger.debug(
                 f"[ConversationManager] Estimated tokens for {len(formatted_messages)} messages: "
@@ -470,14 +471,15 @@ class ConversationManager:
             # Fit within token budget
             selected_messages = TokenBudgetManager.fit_messages_in_budget(
                 formatted_messages,
-                budget['recent_messages']
+                budget['recent_messages'],
+                model_name
             )
             
             messages.extend(selected_messages)
             logger.info(
                 f"[ConversationManager] Including {len(selected_messages)}/{len(formatted_messages)} recent messages "
                 f"(budget: {budget['recent_messages']} tokens, "
-                f"estimated: {sum(TokenBudgetManager.estimate_message_tokens(m) for m in selected_messages)} tokens)"
+                f"counted: {sum(TokenBudgetManager.estimate_messages_tokens(selected_messages, model_name))} tokens)"
             )
         elif conversation_history:
             logger.warning(
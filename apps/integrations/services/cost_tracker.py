@@ -6,13 +6,13 @@ including tokens, costs, and performance metrics.
 """
 
 from typing import Optional
-from decimal import Decimal
 import logging
 
 from asgiref.sync import sync_to_async
-from apps.integrations.models import AIPlatform, PlatformUsage
+from apps.integrations.models import PlatformUsage
 from apps.authentication.models import User
 from ..adapters.base import CompletionResponse
+from .usage_accumulator import usage_accumulator
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,10 @@ class CostTracker:
         operation_type: str = 'completion'
     ) -> Optional[PlatformUsage]:
         """
-        Track a completion request in the database.
+        Track a completion request.
+        
+        The usage row and platform totals are written behind (see
+        usage_accumulator); nothing here waits on the database.
         
         Args:
             response: CompletionResponse from adapter
@@ -37,7 +40,7 @@ class CostTracker:
             operation_type: Type of operation (completion, streaming, etc.)
             
         Returns:
-            PlatformUsage instance or None if tracking failed
+            PlatformUsage instance when written synchronously, otherwise None
         """
         try:
             # Skip tracking for mock platform (not in database)
@@ -45,42 +48,28 @@ class CostTracker:
                 logger.debug(f"Skipping cost tracking for mock platform")
                 return None
             
-            # Get platform instance
-            platform = await sync_to_async(
-                AIPlatform.objects.get
-            )(platform_name=platform_name)
-            
-            # Extract token counts from metadata
-            tokens_used = response.tokens_used
+            # Cache hits were already recorded by track_cache_lookup and cost nothing
+            if response.metadata.get('cache_hit'):
+                logger.debug(f"Skipping cost tracking for cached response from {platform_name}")
+                return None
             
-            # Create usage record
-            usage = await sync_to_async(PlatformUsage.objects.create)(
-                platform=platform,
-                user=user,
-                model=response.model,
-                tokens_used=tokens_used,
-                cost=Decimal(str(response.cost)),
+            usage = await CostTracker._record_usage(
+                platform_name,
+                response.model,
+                tokens_used=response.tokens_used,
+                cost=response.cost,
                 success=True,
+                user=user,
                 response_time=response.metadata.get('latency_ms', 0) / 1000,  # Convert to seconds
             )
             
-            # Update platform statistics
-            await sync_to_async(platform.__class__.objects.filter(id=platform.id).update)(
-                total_requests=platform.total_requests + 1,
-                total_tokens=platform.total_tokens + tokens_used,
-                total_cost=platform.total_cost + Decimal(str(response.cost))
-            )
-            
             logger.info(
                 f"Tracked usage: {platform_name}/{response.model} - "
-                f"{tokens_used} tokens, ${response.cost:.6f}"
+                f"{response.tokens_used} tokens, ${response.cost:.6f}"
             )
             
             return usage
             
-        except AIPlatform.DoesNotExist:
-            logger.error(f"Platform not found: {platform_name}")
-            return None
         except Exception as e:
             logger.error(f"Failed to track usage: {str(e)}")
             return None
@@ -95,7 +84,7 @@ class CostTracker:
         latency_ms: int = 0
     ) -> Optional[PlatformUsage]:
         """
-        Track a failed request in the database.
+        Track a failed request (written behind, like track_completion).
         
         Args:
             platform_name: Name of the platform
@@ -106,7 +95,7 @@ class CostTracker:
             latency_ms: Time taken before failure
             
         Returns:
-            PlatformUsage instance or None if tracking failed
+            PlatformUsage instance when written synchronously, otherwise None
         """
         try:
             # Skip tracking for mock platform (not in database)
@@ -114,28 +103,17 @@ class CostTracker:
                 logger.debug(f"Skipping error tracking for mock platform")
                 return None
             
-            platform = await sync_to_async(
-                AIPlatform.objects.get
-            )(platform_name=platform_name)
-            
-            # Create error record
-            usage = await sync_to_async(PlatformUsage.objects.create)(
-                platform=platform,
-                user=user,
-                model=model,
+            usage = await CostTracker._record_usage(
+                platform_name,
+                model,
                 tokens_used=0,
-                cost=Decimal('0'),
+                cost=0,
                 success=False,
+                user=user,
                 error_message=error_message,
                 response_time=latency_ms / 1000  # Convert to seconds
             )
             
-            # Update platform failed requests counter
-            await sync_to_async(platform.__class__.objects.filter(id=platform.id).update)(
-                total_requests=platform.total_requests + 1,
-                failed_requests=platform.failed_requests + 1
-            )
-            
             logger.info(f"Tracked error: {platform_name}/{model} - {error_message[:50]}")
             
             return usage
@@ -144,6 +122,50 @@ class CostTracker:
             logger.error(f"Failed to track error: {str(e)}")
             return None
     
+    @staticmethod
+    async def _record_usage(*args, **kwargs) -> Optional[PlatformUsage]:
+        # Only the memory backend is safe on the event loop; Redis pushes and database writes run in a thread
+        backend = usage_accumulator.backend
+        if backend == 'memory':
+            return usage_accumulator.record_platform_usage(*args, **kwargs)
+        return await sync_to_async(
+            usage_accumulator.record_platform_usage, thread_sensitive=backend == 'sync'
+        )(*args, **kwargs)
+    
+    @staticmethod
+    def track_cache_lookup(
+        platform_name: str,
+        model: str,
+        hit: bool,
+        cache_type: str = 'exact',
+        tokens_saved: int = 0,
+        cost_saved: float = 0.0
+    ):
+        """
+        Record an AI response cache hit or miss.
+        
+        Args:
+            platform_name: Platform the response belongs to
+            model: Model the response belongs to
+            hit: Whether the response was served from cache
+            cache_type: Cache tier (exact, semantic, stream)
+            tokens_saved: Tokens the provider call would have used
+            cost_saved: Cost in USD the provider call would have incurred
+        """
+        try:
+            from apps.monitoring.prometheus_metrics import record_ai_response_cache
+            record_ai_response_cache(platform_name, cache_type, hit, tokens_saved, cost_saved)
+        except Exception as e:
+            logger.debug(f"Failed to record cache metrics: {str(e)}")
+        
+        if hit:
+            logger.info(
+                f"AI response cache HIT ({cache_type}): {platform_name}/{model} - "
+                f"saved {tokens_saved} tokens, ${cost_saved:.6f}"
+            )
+        else:
+            logger.debug(f"AI response cache MISS ({cache_type}): {platform_name}/{model}")
+    
     @staticmethod
     async def get_user_cost_summary(user: User, platform_name: Optional[str] = None):
         """
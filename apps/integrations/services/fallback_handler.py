@@ -5,8 +5,13 @@ Provides intelligent fallback mechanism to try alternative platforms
 when the primary platform fails or is unavailable.
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
 import logging
+import time
+
+from django.conf import settings
 
 from .adapter_registry import registry
 from ..adapters.base import CompletionRequest, CompletionResponse
@@ -16,17 +21,71 @@ logger = logging.getLogger(__name__)
 
 
 class FallbackHandler:
-    """Handles platform fallback on failures."""
+    """
+    Handles platform fallback on failures.
+    
+    In hedged mode (off unless AI_HEDGE_ENABLED is set, since a hedge can
+    pay for two completions), if the current platform has not answered
+    within its latency budget (a configurable percentile of its recent
+    latencies), the next platform is started concurrently; the first success
+    wins and the other request is cancelled. Platforms whose circuit breaker
+    is open are skipped without an attempt.
+    """
     
-    def __init__(self, preferred_platforms: Optional[List[str]] = None):
+    def __init__(
+        self,
+        preferred_platforms: Optional[List[str]] = None,
+        hedge: Optional[bool] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_delay: Optional[float] = None
+    ):
         """
         Initialize fallback handler.
         
         Args:
             preferred_platforms: Ordered list of platform names to try
                                If None, uses all available platforms
+            hedge: Enable hedged requests (defaults to AI_HEDGE_ENABLED)
+            hedge_percentile: Latency percentile (0-1) used as the hedge budget
+            hedge_delay: Budget in seconds used until enough latency samples exist
         """
         self.preferred_platforms = preferred_platforms or ['openai', 'anthropic', 'gemini']
+        self.hedge = hedge if hedge is not None else getattr(settings, 'AI_HEDGE_ENABLED', False)
+        self.hedge_percentile = hedge_percentile or getattr(settings, 'AI_HEDGE_PERCENTILE', 0.95)
+        self.hedge_delay = hedge_delay or getattr(settings, 'AI_HEDGE_DEFAULT_DELAY_SECONDS', 10.0)
+    
+    def _hedge_budget(self, platform_name: str) -> Optional[float]:
+        """Seconds to wait on ``platform_name`` before starting the next one."""
+        if not self.hedge:
+            return None
+        budget = registry.get_circuit_breaker(platform_name).latency_percentile(self.hedge_percentile)
+        return budget if budget is not None else self.hedge_delay
+    
+    async def _attempt(self, platform_name: str, adapter, request: CompletionRequest, model: Optional[str]):
+        """Run one platform attempt, feeding its circuit breaker."""
+        breaker = registry.get_circuit_breaker(platform_name)
+        started = time.monotonic()
+        try:
+            response = await adapter.generate_completion(request, model)
+        except Exception as e:
+            breaker.record_failure(time.monotonic() - started, str(e))
+            raise
+        breaker.record_success(time.monotonic() - started)
+        return response
+    
+    @staticmethod
+    def _release_probe_if_cancelled(platform_name: str):
+        """
+        Done-callback freeing the breaker's probe slot when an attempt is cancelled.
+        
+        Losing a hedge race says nothing about the platform's health. This runs
+        on the task rather than in ``_attempt`` because a task cancelled before
+        its first step never enters the coroutine's exception handlers.
+        """
+        def callback(task: asyncio.Task):
+            if task.cancelled():
+                registry.get_circuit_breaker(platform_name).release_probe()
+        return callback
     
     async def generate_with_fallback(
         self,
@@ -38,7 +97,8 @@ class FallbackHandler:
         Try to generate completion with automatic fallback.
         
         Attempts platforms in preferred order. If a platform fails,
-        automatically tries the next one in the list.
+        automatically tries the next one in the list. In hedged mode a slow
+        platform also triggers the next one concurrently.
         
         Args:
             request: Standardized completion request
@@ -61,6 +121,7 @@ class FallbackHandler:
         
         last_error = None
         attempts = []
+        candidates = deque()
         
         for platform_name in platforms_to_try:
             adapter = registry.get_adapter(platform_name)
@@ -73,39 +134,106 @@ class FallbackHandler:
                     'reason': 'adapter_not_found'
                 })
                 continue
-            
-            try:
-                logger.info(f"Attempting completion with {platform_name}")
-                
-                response = await adapter.generate_completion(request, model)
-                
-                logger.info(
-                    f"Successfully generated completion with {platform_name} "
-                    f"({response.tokens_used} tokens, ${response.cost:.6f})"
-                )
-                
+            candidates.append((platform_name, adapter))
+        
+        running: Dict[asyncio.Task, Tuple[str, bool]] = {}
+        
+        def launch_next(is_hedge: bool) -> bool:
+            while candidates:
+                platform_name, adapter = candidates.popleft()
+                if not registry.get_circuit_breaker(platform_name).allow_request():
+                    logger.warning(f"Skipping {platform_name}: circuit breaker open")
+                    attempts.append({
+                        'platform': platform_name,
+                        'status': 'skipped',
+                        'reason': 'circuit_open'
+                    })
+                    continue
+                stats = registry.get_hedge_stats(platform_name)
+                if is_hedge:
+                    stats.hedges_launched += 1
+                    logger.info(f"Hedging: starting {platform_name} alongside slow platform(s)")
+                else:
+                    stats.primary_requests += 1
+                    logger.info(f"Attempting completion with {platform_name}")
+                task = asyncio.ensure_future(self._attempt(platform_name, adapter, request, model))
+                task.add_done_callback(self._release_probe_if_cancelled(platform_name))
+                running[task] = (platform_name, is_hedge)
+                return True
+            return False
+        
+        def cancel_running():
+            for task, (platform_name, _) in list(running.items()):
+                running.pop(task)
+                if task.done():
+                    # Finished in the same batch as the winner; its breaker already has the outcome
+                    if not task.cancelled():
+                        task.exception()
+                    continue
+                task.cancel()
+                registry.get_hedge_stats(platform_name).cancelled += 1
                 attempts.append({
                     'platform': platform_name,
-                    'status': 'success',
-                    'tokens_used': response.tokens_used,
-                    'cost': response.cost
+                    'status': 'cancelled'
                 })
+        
+        launch_next(is_hedge=False)
+        try:
+            while running:
+                # Wait on the newest attempt's budget before hedging further
+                newest_platform = list(running.values())[-1][0]
+                timeout = self._hedge_budget(newest_platform) if candidates else None
+                done, _ = await asyncio.wait(
+                    running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
                 
-                # Add fallback info to metadata
-                response.metadata['fallback_attempts'] = attempts
-                response.metadata['primary_platform'] = platforms_to_try[0]
+                if not done:
+                    # Budget exceeded: race the next platform against the running ones
+                    launch_next(is_hedge=True)
+                    continue
                 
-                return response
+                for task in done:
+                    platform_name, is_hedge = running.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        logger.error(f"Failed with {platform_name}: {str(e)}")
+                        last_error = e
+                        attempts.append({
+                            'platform': platform_name,
+                            'status': 'failed',
+                            'error': str(e)
+                        })
+                        continue
+                    
+                    logger.info(
+                        f"Successfully generated completion with {platform_name} "
+                        f"({response.tokens_used} tokens, ${response.cost:.6f})"
+                    )
+                    if is_hedge:
+                        registry.get_hedge_stats(platform_name).hedge_wins += 1
+                    
+                    attempts.append({
+                        'platform': platform_name,
+                        'status': 'success',
+                        'hedged': is_hedge,
+                        'tokens_used': response.tokens_used,
+                        'cost': response.cost
+                    })
+                    
+                    cancel_running()
+                    
+                    # Add fallback info to metadata
+                    response.metadata['fallback_attempts'] = list(attempts)
+                    response.metadata['primary_platform'] = platforms_to_try[0]
+                    
+                    return response
                 
-            except Exception as e:
-                logger.error(f"Failed with {platform_name}: {str(e)}")
-                last_error = e
-                attempts.append({
-                    'platform': platform_name,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-                continue
+                if not running:
+                    # Everything in flight failed: fall back sequentially
+                    launch_next(is_hedge=False)
+        finally:
+            cancel_running()
         
         # All platforms failed
         error_msg = (
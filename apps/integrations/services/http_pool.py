@@ -0,0 +1,349 @@
+"""
+Process-wide HTTP connection pools for outbound API calls.
+
+Every SDK client and internal API caller gets a lightweight
+``httpx.AsyncClient`` whose transport routes each request to a shared
+connection pool for the request's upstream origin (scheme, host, port).
+Connections are kept alive and reused across adapters, agents and requests,
+negotiate HTTP/2 when the ``h2`` package is installed, and resolve hostnames
+through a small TTL cache so a new connection does not pay for a DNS lookup
+either: requests are sent to a cached address, with the original hostname
+kept for the Host header, SNI and certificate checks.
+
+Pools are kept per event loop, since connections cannot be shared across
+loops (``async_to_sync`` and Celery tasks run their own loops), and are
+closed when their loop shuts down.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import ipaddress
+import logging
+import socket
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+Origin = Tuple[str, str, int]
+
+
+def _setting(name: str, default):
+    from django.conf import settings
+    return getattr(settings, name, default)
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class DNSCache:
+    """TTL cache of resolved addresses, shared by all pools in the process."""
+    
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+    
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Return the IP addresses for ``host``, resolving on a miss."""
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+    
+    def invalidate(self, host: str, port: int):
+        with self._lock:
+            self._entries.pop((host, port), None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _OriginPool:
+    """Connection pool for one upstream origin on one event loop."""
+    
+    def __init__(self, origin: Origin, manager: 'HTTPPoolManager'):
+        self.origin = origin
+        self.label = f"{origin[1]}:{origin[2]}"
+        self.connections_opened = 0
+        self.pool_timeouts = 0
+        self.transport = httpx.AsyncHTTPTransport(
+            http2=manager.http2,
+            limits=manager.limits,
+            retries=manager.connect_retries,
+        )
+    
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        """httpcore ``trace`` extension callback; counts new connections."""
+        if event_name != 'connection.connect_tcp.complete':
+            return
+        self.connections_opened += 1
+        try:
+            from apps.monitoring.prometheus_metrics import record_http_pool_connection_opened
+            record_http_pool_connection_opened(self.label)
+        except Exception:
+            pass
+    
+    def stats(self) -> Dict[str, int]:
+        pool = getattr(self.transport, '_pool', None)
+        connections = list(getattr(pool, 'connections', []) or [])
+        requests = list(getattr(pool, '_requests', []) or [])
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            'connections': len(connections),
+            'active': len(connections) - idle,
+            'idle': idle,
+            'waiting': sum(1 for r in requests if r.is_queued()),
+            'in_flight': len(requests),
+            'connections_opened': self.connections_opened,
+            'pool_timeouts': self.pool_timeouts,
+        }
+
+
+class SharedPoolTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that dispatches each request to the shared pool for its origin.
+    
+    Closing a client built on this transport does not close the shared
+    connections; use ``HTTPPoolManager.aclose`` for that.
+    """
+    
+    def __init__(self, manager: 'HTTPPoolManager'):
+        self._manager = manager
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        origin_pool = self._manager.get_pool(request.url)
+        try:
+            return await self._send(origin_pool, request)
+        except httpx.PoolTimeout:
+            origin_pool.pool_timeouts += 1
+            self._manager.report(origin_pool, pool_timeout=True)
+            raise
+        finally:
+            self._manager.report(origin_pool)
+    
+    async def _send(self, origin_pool: _OriginPool, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        extensions = dict(request.extensions)
+        caller_trace = extensions.get('trace')
+        
+        async def trace(event_name, info):
+            await origin_pool.trace(event_name, info)
+            if caller_trace is not None:
+                await caller_trace(event_name, info)
+        
+        extensions['trace'] = trace
+        if _is_ip(host) or request.url.scheme not in ('http', 'https'):
+            return await origin_pool.transport.handle_async_request(
+                self._rebuild(request, request.url, extensions)
+            )
+        
+        port = origin_pool.origin[2]
+        try:
+            addresses = await self._manager.dns_cache.resolve(host, port)
+        except OSError:
+            # Let httpx raise its own ConnectError for unresolvable hosts
+            addresses = [host]
+        # The Host header is already set; SNI and certificate checks use sni_hostname
+        extensions['sni_hostname'] = host
+        
+        last_error = None
+        for address in addresses:
+            url = request.url.copy_with(host=address)
+            try:
+                return await origin_pool.transport.handle_async_request(
+                    self._rebuild(request, url, extensions)
+                )
+            except httpx.ConnectError as e:
+                # Nothing was sent; try the next address
+                last_error = e
+        
+        # Cached addresses may be stale; resolve again on the next request
+        self._manager.dns_cache.invalidate(host, port)
+        raise last_error
+    
+    @staticmethod
+    def _rebuild(request: httpx.Request, url: httpx.URL, extensions: Dict[str, Any]) -> httpx.Request:
+        return httpx.Request(
+            request.method,
+            url,
+            headers=request.headers,
+            stream=request.stream,
+            extensions=extensions,
+        )
+    
+    async def aclose(self):
+        pass
+
+
+class HTTPPoolManager:
+    """
+    Owns the shared connection pools.
+    
+    Pool sizing comes from the ``AI_HTTP_POOL_*`` settings.
+    """
+    
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        dns_ttl: Optional[float] = None,
+        connect_retries: Optional[int] = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections if max_connections is not None else _setting(
+                'AI_HTTP_POOL_MAX_CONNECTIONS', 100),
+            max_keepalive_connections=max_keepalive_connections if max_keepalive_connections is not None else _setting(
+                'AI_HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS', 20),
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else _setting(
+                'AI_HTTP_POOL_KEEPALIVE_EXPIRY', 60.0),
+        )
+        wants_http2 = http2 if http2 is not None else _setting('AI_HTTP_POOL_HTTP2', True)
+        self.http2 = bool(wants_http2 and http2_available())
+        if wants_http2 and not self.http2:
+            logger.info("h2 package not installed, shared HTTP pools will use HTTP/1.1")
+        self.dns_cache = DNSCache(dns_ttl if dns_ttl is not None else _setting('AI_HTTP_POOL_DNS_TTL', 300.0))
+        self.connect_retries = connect_retries if connect_retries is not None else _setting(
+            'AI_HTTP_POOL_CONNECT_RETRIES', 1)
+        self._transport = SharedPoolTransport(self)
+        # event loop -> {origin: _OriginPool}; removed when the loop shuts down
+        self._pools: Dict[asyncio.AbstractEventLoop, Dict[Origin, _OriginPool]] = {}
+        # event loop -> async generator whose cleanup closes the loop's pools
+        self._shutdown_hooks: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._lock = threading.Lock()
+    
+    def client(self, timeout: Any = None, **kwargs) -> httpx.AsyncClient:
+        """
+        Build an ``httpx.AsyncClient`` that uses the shared pools.
+        
+        The client itself holds no connections, so it is cheap to create per
+        adapter or per caller and safe to close.
+        
+        Args:
+            timeout: Request timeout (defaults to ``AI_HTTP_POOL_TIMEOUT``
+                     with a separate connect/pool-acquire timeout)
+            **kwargs: Other ``httpx.AsyncClient`` arguments (base_url,
+                      headers, ...); ``transport`` and ``limits`` are managed
+        
+        Returns:
+            httpx.AsyncClient
+        """
+        if timeout is None:
+            timeout = httpx.Timeout(
+                _setting('AI_HTTP_POOL_TIMEOUT', 60.0),
+                connect=_setting('AI_HTTP_POOL_CONNECT_TIMEOUT', 10.0),
+            )
+        kwargs.pop('limits', None)
+        kwargs.pop('http2', None)
+        return httpx.AsyncClient(transport=self._transport, timeout=timeout, **kwargs)
+    
+    def get_pool(self, url: httpx.URL) -> _OriginPool:
+        """Return the pool for ``url``'s origin on the running event loop."""
+        origin = (url.scheme, url.host, url.port or (443 if url.scheme == 'https' else 80))
+        loop = asyncio.get_running_loop()
+        pools = self._pools.get(loop)
+        if pools is None or origin not in pools:
+            with self._lock:
+                if loop not in self._pools:
+                    self._drop_closed_loops()
+                    self._pools[loop] = {}
+                    self._watch_loop(loop)
+                pools = self._pools[loop]
+                if origin not in pools:
+                    pools[origin] = _OriginPool(origin, self)
+        return pools[origin]
+    
+    def _watch_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Close ``loop``'s pools when it shuts down.
+        
+        ``asyncio.run`` and ``async_to_sync`` close the loop's open async
+        generators (``loop.shutdown_asyncgens``) while the loop can still run
+        the transports' ``aclose``, so a suspended generator serves as the hook.
+        """
+        async def close_on_shutdown():
+            try:
+                yield
+            finally:
+                await self._close_loop(loop)
+        
+        hook = close_on_shutdown()
+        # The loop only tracks async generators weakly
+        self._shutdown_hooks[loop] = hook
+        asyncio.ensure_future(hook.__anext__())
+    
+    def _drop_closed_loops(self):
+        """Forget pools of loops closed without shutting down their async generators."""
+        for loop in [loop for loop in self._pools if loop.is_closed()]:
+            self._pools.pop(loop)
+            self._shutdown_hooks.pop(loop, None)
+    
+    async def _close_loop(self, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            pools = self._pools.pop(loop, {})
+            self._shutdown_hooks.pop(loop, None)
+        for origin_pool in pools.values():
+            await origin_pool.transport.aclose()
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Pool saturation per upstream host, summed across event loops."""
+        totals: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            self._drop_closed_loops()
+            origin_pools = [p for pools in self._pools.values() for p in pools.values()]
+        for origin_pool in origin_pools:
+            host_stats = totals.setdefault(origin_pool.label, {'max_connections': self.limits.max_connections})
+            for name, value in origin_pool.stats().items():
+                host_stats[name] = host_stats.get(name, 0) + value
+        return totals
+    
+    def report(self, origin_pool: _OriginPool, pool_timeout: bool = False):
+        """Publish an origin's pool gauges to Prometheus."""
+        try:
+            from apps.monitoring.prometheus_metrics import record_http_pool_stats
+            record_http_pool_stats(
+                origin_pool.label,
+                self.stats().get(origin_pool.label, {}),
+                self.limits.max_connections,
+                pool_timeout=pool_timeout,
+            )
+        except Exception as e:
+            logger.debug(f"Failed to record HTTP pool metrics: {str(e)}")
+    
+    async def aclose(self):
+        """Close the pools owned by the running event loop."""
+        await self._close_loop(asyncio.get_running_loop())
+
+
+# Global pool manager instance
+http_pool = HTTPPoolManager()
+
+
+def get_http_client(**kwargs) -> httpx.AsyncClient:
+    """Shortcut for ``http_pool.client(**kwargs)``."""
+    return http_pool.client(**kwargs)
@@ -1,32 +1,127 @@
 """
 Rate limiter for AI platform requests.
 
-Implements token bucket algorithm using Redis for distributed rate limiting.
+Implements the Generic Cell Rate Algorithm (GCRA), a token bucket variant that
+stores a single "theoretical arrival time" per key. With Redis, every check is
+one atomic server-side Lua script call using the Redis clock with microsecond
+precision, so there are no read-modify-write races between workers and no
+thread-pool hops when a native asyncio client is used.
 """
 
-from typing import Optional
-import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
+import asyncio
 import logging
+import math
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
+# Evaluates N GCRA limits atomically. KEYS are the bucket keys; ARGV holds
+# (emission_interval, burst_window, cost) triplets per key, all in seconds.
+# Either every limit admits the request and all buckets are advanced, or none
+# are. Returns {allowed, remaining_1, retry_after_ms_1, remaining_2, ...}.
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local allowed = 1
+local new_tats = {}
+local remaining_before = {}
+local remaining_after = {}
+local retry_after = {}
+for i, key in ipairs(KEYS) do
+    local emission = tonumber(ARGV[(i - 1) * 3 + 1])
+    local burst = tonumber(ARGV[(i - 1) * 3 + 2])
+    local cost = tonumber(ARGV[(i - 1) * 3 + 3])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + emission * cost
+    local allow_at = new_tat - burst
+    remaining_before[i] = math.max(math.floor((burst - (tat - now)) / emission), 0)
+    new_tats[i] = new_tat
+    if allow_at > now then
+        allowed = 0
+        remaining_after[i] = remaining_before[i]
+        retry_after[i] = math.ceil((allow_at - now) * 1000)
+    else
+        remaining_after[i] = math.floor((burst - (new_tat - now)) / emission)
+        retry_after[i] = 0
+    end
+end
+local result = {allowed}
+for i, key in ipairs(KEYS) do
+    if allowed == 1 then
+        redis.call('SET', key, string.format('%.6f', new_tats[i]), 'PX', math.ceil((new_tats[i] - now) * 1000) + 1)
+        result[#result + 1] = remaining_after[i]
+    else
+        result[#result + 1] = remaining_before[i]
+    end
+    result[#result + 1] = retry_after[i]
+end
+return result
+"""
+
+# Fall back to the local limiter for this long after Redis errors
+REDIS_RETRY_AFTER_SECONDS = 30
+
+
+@dataclass
+class RateLimit:
+    """A single limit to check: ``max_requests`` per ``window_seconds``."""
+    key: str
+    max_requests: int
+    window_seconds: int = 60
+    cost: int = 1
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check."""
+    key: str
+    allowed: bool
+    remaining: int
+    retry_after: float = 0.0  # Seconds until the request would be admitted
+
+
+def _gcra_params(limit: RateLimit) -> Tuple[float, float]:
+    """Return ``(emission_interval, burst_window)`` for a limit."""
+    max_requests = max(limit.max_requests, 1)
+    emission = limit.window_seconds / max_requests
+    return emission, emission * max_requests
+
 
 class RateLimiter:
     """
-    Rate limiter using token bucket algorithm.
+    Rate limiter using the GCRA token bucket algorithm.
     
-    Can use Redis for distributed rate limiting or in-memory for single instance.
+    Uses a native asyncio Redis client when available, a sync Redis client
+    otherwise (e.g. one obtained from django-redis), and falls back to an
+    in-memory bucket store for single-instance deployments or while Redis
+    is unreachable.
     """
     
-    def __init__(self, redis_client=None):
+    def __init__(self, redis_client=None, redis_url: Optional[str] = None):
         """
         Initialize rate limiter.
         
         Args:
-            redis_client: Optional Redis client for distributed limiting
+            redis_client: Optional sync Redis client for distributed limiting
+            redis_url: Optional Redis URL; enables the native asyncio client path
         """
         self.redis = redis_client
-        self.local_buckets = {}  # Fallback to in-memory if no Redis
+        self.redis_url = redis_url
+        self.local_buckets: Dict[str, float] = {}  # key -> theoretical arrival time
+        self._sync_script = redis_client.register_script(GCRA_LUA) if redis_client is not None else None
+        # One asyncio client per event loop: connections cannot be shared across loops
+        self._async_clients: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._redis_down_until = 0.0
+    
+    @property
+    def distributed(self) -> bool:
+        return bool(self.redis_url or self.redis is not None)
     
     async def check_rate_limit(
         self,
@@ -41,88 +136,132 @@ class RateLimiter:
             key: Unique identifier for the limit (e.g., 'platform:openai:user:123')
             max_requests: Maximum requests allowed in window
             window_seconds: Time window in seconds
-            
+        
         Returns:
             Tuple of (allowed: bool, remaining: int)
         """
-        if self.redis:
-            return await self._check_redis_limit(key, max_requests, window_seconds)
-        else:
-            return await self._check_local_limit(key, max_requests, window_seconds)
+        results = await self.check_many([RateLimit(key, max_requests, window_seconds)])
+        return results[0].allowed, results[0].remaining
     
-    async def _check_redis_limit(
-        self,
-        key: str,
-        max_requests: int,
-        window_seconds: int
-    ) -> tuple[bool, int]:
-        """Check rate limit using Redis."""
-        try:
+    async def check_many(self, limits: Sequence[RateLimit]) -> List[RateLimitResult]:
+        """
+        Check several limits in one round-trip.
+        
+        The request is admitted only if every limit allows it, in which case
+        all buckets are consumed atomically; otherwise none are.
+        
+        Args:
+            limits: Limits to evaluate together (e.g. per-user and global)
+        
+        Returns:
+            One RateLimitResult per limit, in order
+        """
+        if not limits:
+            return []
+        if self.distributed and time.monotonic() >= self._redis_down_until:
+            try:
+                return await self._check_redis_limits(limits)
+            except Exception as e:
+                logger.error(f"Redis rate limit check failed, using local limiter: {str(e)}")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+        return self._check_local_limits(limits)
+    
+    def _script_args(self, limits: Sequence[RateLimit]) -> Tuple[List[str], List[float]]:
+        keys, args = [], []
+        for limit in limits:
+            emission, burst = _gcra_params(limit)
+            keys.append(f"ratelimit:{limit.key}")
+            args.extend([emission, burst, limit.cost])
+        return keys, args
+    
+    def _parse_reply(self, limits: Sequence[RateLimit], reply: List[int]) -> List[RateLimitResult]:
+        allowed = bool(int(reply[0]))
+        results = []
+        for i, limit in enumerate(limits):
+            remaining = max(int(reply[1 + i * 2]), 0)
+            retry_after_ms = int(reply[2 + i * 2])
+            results.append(RateLimitResult(
+                key=limit.key,
+                allowed=allowed,
+                remaining=remaining,
+                retry_after=retry_after_ms / 1000,
+            ))
+        return results
+    
+    def _get_async_script(self):
+        """Return the GCRA script bound to an asyncio client for the running loop."""
+        loop = asyncio.get_running_loop()
+        script = self._async_clients.get(loop)
+        if script is None:
+            import redis.asyncio as aioredis
+            client = aioredis.Redis.from_url(self.redis_url)
+            script = client.register_script(GCRA_LUA)
+            self._async_clients[loop] = script
+        return script
+    
+    async def _check_redis_limits(self, limits: Sequence[RateLimit]) -> List[RateLimitResult]:
+        """Evaluate limits with a single EVALSHA call."""
+        keys, args = self._script_args(limits)
+        if self.redis_url:
+            reply = await self._get_async_script()(keys=keys, args=args)
+        else:
             from asgiref.sync import sync_to_async
-            
-            current_time = int(time.time())
-            window_start = current_time - window_seconds
-            
-            # Redis key for this limit
-            redis_key = f"ratelimit:{key}"
-            
-            # Remove old entries
-            await sync_to_async(self.redis.zremrangebyscore)(
-                redis_key, 0, window_start
-            )
-            
-            # Count current requests
-            current_count = await sync_to_async(self.redis.zcard)(redis_key)
-            
-            if current_count >= max_requests:
-                return False, 0
-            
-            # Add new request
-            await sync_to_async(self.redis.zadd)(
-                redis_key, {str(current_time): current_time}
-            )
-            
-            # Set expiry
-            await sync_to_async(self.redis.expire)(redis_key, window_seconds)
-            
-            remaining = max_requests - (current_count + 1)
-            return True, remaining
-            
-        except Exception as e:
-            logger.error(f"Redis rate limit check failed: {str(e)}")
-            # Fallback to allowing request
-            return True, max_requests
+            reply = await sync_to_async(self._sync_script)(keys=keys, args=args)
+        return self._parse_reply(limits, reply)
     
-    async def _check_local_limit(
-        self,
-        key: str,
-        max_requests: int,
-        window_seconds: int
-    ) -> tuple[bool, int]:
-        """Check rate limit using local memory (not distributed)."""
-        current_time = time.time()
-        window_start = current_time - window_seconds
-        
-        # Get or create bucket
-        if key not in self.local_buckets:
-            self.local_buckets[key] = []
+    def _check_local_limits(self, limits: Sequence[RateLimit]) -> List[RateLimitResult]:
+        """Check limits using local memory (not distributed)."""
+        now = time.monotonic()
+        pending = []
+        allowed = True
+        for limit in limits:
+            emission, burst = _gcra_params(limit)
+            tat = max(self.local_buckets.get(limit.key, now), now)
+            new_tat = tat + emission * limit.cost
+            allow_at = new_tat - burst
+            remaining_before = max(math.floor((burst - (tat - now)) / emission), 0)
+            if allow_at > now:
+                allowed = False
+                pending.append((limit, new_tat, remaining_before, remaining_before, allow_at - now))
+            else:
+                remaining_after = math.floor((burst - (new_tat - now)) / emission)
+                pending.append((limit, new_tat, remaining_before, remaining_after, 0.0))
         
-        # Remove old timestamps
-        self.local_buckets[key] = [
-            ts for ts in self.local_buckets[key]
-            if ts > window_start
-        ]
+        results = []
+        for limit, new_tat, remaining_before, remaining_after, retry_after in pending:
+            if allowed:
+                self.local_buckets[limit.key] = new_tat
+            results.append(RateLimitResult(
+                key=limit.key,
+                allowed=allowed,
+                remaining=remaining_after if allowed else remaining_before,
+                retry_after=retry_after,
+            ))
+        return results
+    
+    async def get_platform_limits(self, platform_name: str) -> Optional[Dict[str, int]]:
+        """
+        Get a platform's configured limits from the shared cache.
         
-        current_count = len(self.local_buckets[key])
+        Invalidated by the AIPlatform post_save signal, so the database is
+        only hit on the first check after a change.
+        """
+        from apps.integrations.models import AIPlatform
+        from asgiref.sync import sync_to_async
+        from core.enhanced_caching import aget_or_compute
         
-        if current_count >= max_requests:
-            return False, 0
+        def load():
+            platform = AIPlatform.objects.filter(platform_name=platform_name).values(
+                'rate_limit_per_minute', 'rate_limit_per_day'
+            ).first()
+            # Cache misses too, so unknown platforms don't hit the database every call
+            return platform or {}
         
-        # Add new timestamp
-        self.local_buckets[key].append(current_time)
+        async def compute():
+            return await sync_to_async(load)()
         
-        remaining = max_requests - (current_count + 1)
-        return True, remaining
+        limits, _ = await aget_or_compute(platform_limits_cache_key(platform_name), 300, compute)
+        return limits or None
     
     async def check_platform_limit(
         self,
@@ -135,17 +274,14 @@ class RateLimiter:
         Args:
             platform_name: Name of the platform
             user_id: Optional user ID for per-user limits
-            
+        
         Returns:
             Tuple of (allowed: bool, remaining: int)
         """
-        from apps.integrations.models import AIPlatform
-        from asgiref.sync import sync_to_async
-        
         try:
-            platform = await sync_to_async(
-                AIPlatform.objects.get
-            )(platform_name=platform_name)
+            limits = await self.get_platform_limits(platform_name)
+            if limits is None:
+                raise LookupError(f"Platform not found: {platform_name}")
             
             # Build rate limit key
             if user_id:
@@ -156,21 +292,42 @@ class RateLimiter:
             # Check limit
             return await self.check_rate_limit(
                 key,
-                platform.rate_limit_per_minute,
+                limits['rate_limit_per_minute'],
                 60  # 1 minute window
             )
-            
+        
         except Exception as e:
             logger.error(f"Platform rate limit check failed: {str(e)}")
             # Fallback to allowing request
             return True, 999
 
 
+def platform_limits_cache_key(platform_name: str) -> str:
+    return f"ai_platform:rate_limits:{platform_name}"
+
+
+def _create_limiter() -> RateLimiter:
+    """
+    Use RATE_LIMIT_REDIS_URL when set, else the default cache's Redis, else
+    local buckets.
+    """
+    from django.conf import settings
+    
+    redis_url = getattr(settings, 'RATE_LIMIT_REDIS_URL', None)
+    if not redis_url:
+        default_cache = settings.CACHES.get('default', {})
+        if 'redis' in default_cache.get('BACKEND', '').lower():
+            redis_url = default_cache.get('LOCATION')
+    if isinstance(redis_url, (list, tuple)):
+        redis_url = redis_url[0]
+    if redis_url:
+        return RateLimiter(redis_url=redis_url)
+    return RateLimiter(None)
+
+
 # Global limiter instance (will use Redis if available)
 try:
-    from django.core.cache import cache
-    redis_client = cache._cache.get_client() if hasattr(cache, '_cache') else None
-    limiter = RateLimiter(redis_client)
+    limiter = _create_limiter()
 except Exception:
     # Fallback to local limiter
     limiter = RateLimiter(None)
@@ -0,0 +1,380 @@
+"""
+Response cache for AI platform completions.
+
+Wraps an adapter so that identical completion requests (same prompt, system
+prompt, message history, sampling parameters, platform and model) from the
+same organization and user are served from the multi-layer cache instead of
+calling the provider again. Streams are recorded chunk by chunk and replayed
+the same way.
+
+An optional near-duplicate tier matches prompts whose word shingles overlap
+above a threshold within the same request scope (everything except the
+prompt must be identical). It uses bottom-k MinHash sketches, so no
+embedding model or network call is needed. Since it can answer a different
+prompt, it only runs when the deployment allows it
+(``AI_RESPONSE_CACHE_SEMANTIC_ENABLED``) and the execution opts in.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+from dataclasses import dataclass
+import asyncio
+import hashlib
+import json
+import logging
+import re
+
+from django.conf import settings
+
+from core.enhanced_caching import aget_cached_value, aget_or_compute, aset_cached_value, get_cache
+from ..adapters.base import BaseAIAdapter, CompletionRequest, CompletionResponse
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'ai_response'
+SKETCH_SIZE = 64
+SHINGLE_SIZE = 3
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Resolved response cache settings for a single execution."""
+    
+    enabled: bool = False
+    ttl: int = 3600
+    semantic: bool = False
+    semantic_threshold: float = 0.9
+    organization_id: Optional[str] = None
+    user_id: Optional[str] = None
+    
+    @classmethod
+    def resolve(
+        cls,
+        agent_enabled: bool = False,
+        agent_ttl: Optional[int] = None,
+        overrides: Optional[Dict[str, Any]] = None,
+        user: Any = None
+    ) -> 'ResponseCacheConfig':
+        """
+        Combine agent opt-in with per-execution overrides.
+        
+        Args:
+            agent_enabled: Whether the agent opted in to response caching
+            agent_ttl: Agent-level TTL in seconds
+            overrides: Optional ``context['response_cache']`` dict, e.g. set
+                       by a command template that opted in. The semantic
+                       tier needs ``'semantic': True`` here.
+            user: User the execution runs for; cached responses are scoped
+                  to the user and their organization
+        
+        Returns:
+            ResponseCacheConfig
+        """
+        overrides = overrides or {}
+        organization_id = getattr(user, 'organization_id', None)
+        return cls(
+            enabled=bool(overrides.get('enabled', agent_enabled)),
+            ttl=int(overrides.get('ttl') or agent_ttl or getattr(settings, 'AI_RESPONSE_CACHE_TTL', 3600)),
+            semantic=bool(overrides.get('semantic', False)) and getattr(
+                settings, 'AI_RESPONSE_CACHE_SEMANTIC_ENABLED', False
+            ),
+            semantic_threshold=float(overrides.get(
+                'semantic_threshold', getattr(settings, 'AI_RESPONSE_CACHE_SEMANTIC_THRESHOLD', 0.9)
+            )),
+            organization_id=str(organization_id) if organization_id else None,
+            user_id=str(user.pk) if getattr(user, 'pk', None) else None,
+        )
+
+
+def _digest(payload: Any) -> str:
+    data = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def request_scope(
+    request: CompletionRequest,
+    platform: str,
+    model: str,
+    organization_id: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Everything that determines a response except the prompt itself, plus
+    who may see it: responses can carry data from the caller's context, so
+    they are never shared across organizations or users.
+    """
+    return {
+        'organization': organization_id,
+        'user': user_id or request.user_id,
+        'platform': platform,
+        'model': model,
+        'system_prompt': request.system_prompt,
+        'messages': request.messages,
+        'temperature': request.temperature,
+        'max_tokens': request.max_tokens,
+        'stop_sequences': request.stop_sequences,
+        'top_p': request.top_p,
+        'frequency_penalty': request.frequency_penalty,
+        'presence_penalty': request.presence_penalty,
+    }
+
+
+def build_cache_key(
+    request: CompletionRequest,
+    platform: str,
+    model: str,
+    kind: str = 'completion',
+    organization_id: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> str:
+    """Canonical exact-match key for a completion request within its organization and user."""
+    payload = request_scope(request, platform, model, organization_id, user_id)
+    payload['prompt'] = request.prompt
+    return f"{CACHE_PREFIX}:{kind}:{_digest(payload)}"
+
+
+def is_cacheable(request: CompletionRequest) -> bool:
+    """
+    Requests bound to a provider-side conversation thread are never cached,
+    since the provider state advances with each call.
+    """
+    return not request.conversation_id
+
+
+def compute_sketch(text: str, size: int = SKETCH_SIZE) -> List[int]:
+    """Bottom-k MinHash sketch over word shingles of normalized text."""
+    words = re.findall(r'\w+', (text or '').lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {' '.join(words)}
+    else:
+        shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = {
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+        for s in shingles
+    }
+    return sorted(hashes)[:size]
+
+
+def estimate_similarity(a: List[int], b: List[int], size: int = SKETCH_SIZE) -> float:
+    """Estimate Jaccard similarity from two bottom-k sketches."""
+    if not a or not b:
+        return 0.0
+    set_a, set_b = set(a), set(b)
+    union_bottom = sorted(set_a | set_b)[:size]
+    shared = sum(1 for h in union_bottom if h in set_a and h in set_b)
+    return shared / len(union_bottom)
+
+
+class SemanticIndex:
+    """
+    Bounded per-scope index of recent prompt sketches.
+    
+    Each scope keeps at most ``AI_RESPONSE_CACHE_SEMANTIC_INDEX_SIZE``
+    entries; the oldest are dropped first.
+    """
+    
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.max_entries = getattr(settings, 'AI_RESPONSE_CACHE_SEMANTIC_INDEX_SIZE', 200)
+        self.cache = get_cache()
+    
+    def _index_key(self, scope: Dict[str, Any]) -> str:
+        return f"{CACHE_PREFIX}:semantic:{_digest(scope)}"
+    
+    async def find(self, scope: Dict[str, Any], prompt: str, threshold: float) -> Optional[str]:
+        """Return the exact cache key of the closest prompt above ``threshold``."""
+        entries = await self.cache.aget(self._index_key(scope)) or []
+        if not entries:
+            return None
+        sketch = compute_sketch(prompt)
+        best_key, best_score = None, threshold
+        for entry in entries:
+            score = estimate_similarity(sketch, entry['sketch'])
+            if score >= best_score:
+                best_key, best_score = entry['key'], score
+        return best_key
+    
+    async def add(self, scope: Dict[str, Any], prompt: str, cache_key: str):
+        index_key = self._index_key(scope)
+        entries = [e for e in (await self.cache.aget(index_key) or []) if e['key'] != cache_key]
+        entries.append({'key': cache_key, 'sketch': compute_sketch(prompt)})
+        await self.cache.aset(index_key, entries[-self.max_entries:], self.ttl)
+
+
+def _serializable_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop raw provider objects that cannot be stored safely."""
+    clean = {}
+    for key, value in (metadata or {}).items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        clean[key] = value
+    return clean
+
+
+def _record(platform: str, model: str, hit: bool, kind: str, tokens_saved: int = 0, cost_saved: float = 0.0):
+    from .cost_tracker import CostTracker
+    CostTracker.track_cache_lookup(
+        platform_name=platform,
+        model=model,
+        hit=hit,
+        cache_type=kind,
+        tokens_saved=tokens_saved,
+        cost_saved=cost_saved,
+    )
+
+
+class CachingAdapter:
+    """
+    Adapter wrapper that serves completions from the response cache.
+    
+    Concurrent identical non-streaming requests are coalesced into a single
+    provider call (see ``core.enhanced_caching.aget_or_compute``). Cache hits
+    are returned with ``tokens_used=0`` and ``cost=0`` and carry
+    ``cache_hit``, ``tokens_saved`` and ``cost_saved`` in their metadata so
+    they are not billed twice.
+    """
+    
+    def __init__(self, adapter: BaseAIAdapter, config: ResponseCacheConfig):
+        self._adapter = adapter
+        self.config = config
+        self.semantic_index = SemanticIndex(config.ttl) if config.semantic else None
+    
+    def __getattr__(self, name):
+        return getattr(self._adapter, name)
+    
+    @property
+    def wrapped_adapter(self) -> BaseAIAdapter:
+        return self._adapter
+    
+    async def generate_completion(
+        self,
+        request: CompletionRequest,
+        model: Optional[str] = None
+    ) -> CompletionResponse:
+        model_name = model or self._adapter.default_model
+        platform = self._adapter.platform_name
+        if not is_cacheable(request):
+            return await self._adapter.generate_completion(request, model)
+        
+        owner = {'organization_id': self.config.organization_id, 'user_id': self.config.user_id}
+        key = build_cache_key(request, platform, model_name, **owner)
+        scope = request_scope(request, platform, model_name, **owner)
+        
+        if self.semantic_index is not None and await aget_cached_value(key) is None:
+            similar_key = await self.semantic_index.find(scope, request.prompt, self.config.semantic_threshold)
+            stored = await aget_cached_value(similar_key) if similar_key else None
+            if stored is not None:
+                return self._from_cache(stored, 'semantic')
+        
+        fresh = {}
+        
+        async def compute():
+            response = await self._adapter.generate_completion(request, model)
+            fresh['response'] = response
+            return {
+                'content': response.content,
+                'model': response.model,
+                'platform': response.platform,
+                'tokens_used': response.tokens_used,
+                'cost': response.cost,
+                'finish_reason': response.finish_reason,
+                'metadata': _serializable_metadata(response.metadata),
+            }
+        
+        stored, from_cache = await aget_or_compute(
+            key,
+            self.config.ttl,
+            compute,
+            distributed_lock=True,
+            lock_timeout=getattr(settings, 'AI_RESPONSE_CACHE_LOCK_TIMEOUT', 120),
+        )
+        
+        if from_cache:
+            return self._from_cache(stored, 'exact')
+        
+        _record(platform, model_name, hit=False, kind='exact')
+        if self.semantic_index is not None:
+            await self.semantic_index.add(scope, request.prompt, key)
+        return fresh['response']
+    
+    def _from_cache(self, stored: Dict[str, Any], kind: str) -> CompletionResponse:
+        _record(
+            stored['platform'], stored['model'], hit=True, kind=kind,
+            tokens_saved=stored['tokens_used'], cost_saved=stored['cost'],
+        )
+        metadata = dict(stored['metadata'])
+        metadata.update({
+            'cache_hit': True,
+            'cache_type': kind,
+            'tokens_saved': stored['tokens_used'],
+            'cost_saved': stored['cost'],
+        })
+        return CompletionResponse(
+            content=stored['content'],
+            model=stored['model'],
+            platform=stored['platform'],
+            tokens_used=0,
+            cost=0.0,
+            finish_reason=stored['finish_reason'],
+            metadata=metadata,
+        )
+    
+    async def generate_streaming_completion(
+        self,
+        request: CompletionRequest,
+        model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        model_name = model or self._adapter.default_model
+        platform = self._adapter.platform_name
+        if not is_cacheable(request):
+            async for chunk in self._adapter.generate_streaming_completion(request, model):
+                yield chunk
+            return
+        
+        key = build_cache_key(
+            request, platform, model_name, kind='stream',
+            organization_id=self.config.organization_id, user_id=self.config.user_id,
+        )
+        stored = await aget_cached_value(key)
+        if stored is not None:
+            _record(
+                platform, model_name, hit=True, kind='stream',
+                tokens_saved=stored['tokens'], cost_saved=stored['cost'],
+            )
+            for chunk in stored['chunks']:
+                yield chunk
+                # Let other tasks run between replayed chunks, like a live stream
+                await asyncio.sleep(0)
+            return
+        
+        _record(platform, model_name, hit=False, kind='stream')
+        chunks = []
+        async for chunk in self._adapter.generate_streaming_completion(request, model):
+            chunks.append(chunk)
+            yield chunk
+        
+        # Only complete streams are cached; an interrupted stream never reaches here
+        from apps.agents.utils.token_estimator import estimate_tokens
+        input_tokens = estimate_tokens(
+            ''.join([request.system_prompt or '', request.prompt or ''] +
+                    [m.get('content', '') for m in (request.messages or [])]),
+            model_name
+        )
+        output_tokens = estimate_tokens(''.join(chunks), model_name)
+        try:
+            cost = self._adapter.calculate_cost(model_name, input_tokens, output_tokens)
+        except Exception:
+            cost = 0.0
+        await aset_cached_value(
+            key,
+            {'chunks': chunks, 'tokens': input_tokens + output_tokens, 'cost': cost},
+            self.config.ttl,
+        )
+
+
+def with_response_cache(adapter: BaseAIAdapter, config: ResponseCacheConfig):
+    """Wrap ``adapter`` with the response cache when ``config`` enables it."""
+    if not config.enabled or adapter is None or isinstance(adapter, CachingAdapter):
+        return adapter
+    return CachingAdapter(adapter, config)
@@ -0,0 +1,379 @@
+"""
+Token counting service.
+
+Counts tokens with the tokenizer of the model's family, loaded from local
+vocabulary files (no network access):
+
+- ``<TOKENIZER_VOCAB_DIR>/<encoding>.tiktoken`` for OpenAI BPE encodings
+  (``cl100k_base``, ``o200k_base``), read with ``tiktoken``
+- ``<TOKENIZER_VOCAB_DIR>/<family>.json`` Hugging Face ``tokenizer.json``
+  files for other families (e.g. ``llama.json``, ``mistral.json``)
+
+Vocabulary files are not shipped with the repository; download them into
+TOKENIZER_VOCAB_DIR for exact counts. Families without a local vocabulary
+fall back to a single-pass heuristic that approximates BPE segmentation
+(typically within ~10% for prose), and a warning is logged once per process
+when the directory is missing. Counts are memoized per text hash, so
+re-counting a conversation after a message is appended only tokenizes the
+new message.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+_missing_vocab_dirs = set()
+
+# Regex split patterns of the OpenAI encodings (from tiktoken_ext.openai_public)
+CL100K_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+"""
+    r"""|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+)
+O200K_PATTERN = "|".join([
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""\p{N}{1,3}""",
+    r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+    r"""\s*[\r\n]+""",
+    r"""\s+(?!\S)""",
+    r"""\s+""",
+])
+TIKTOKEN_PATTERNS = {
+    'cl100k_base': CL100K_PATTERN,
+    'o200k_base': O200K_PATTERN,
+}
+
+# Model family -> (vocabulary file stem, heuristic scale relative to cl100k)
+MODEL_FAMILIES = {
+    'o200k': ('o200k_base', 0.95),
+    'cl100k': ('cl100k_base', 1.0),
+    'anthropic': ('anthropic', 1.1),
+    'gemini': ('gemini', 1.0),
+    'llama': ('llama', 1.2),
+    'mistral': ('mistral', 1.2),
+}
+
+# Ordered (prefix, family) rules matched against the normalized model name
+_FAMILY_RULES = [
+    ('gpt-4o', 'o200k'),
+    ('o1', 'o200k'),
+    ('o3', 'o200k'),
+    ('gpt-4', 'cl100k'),
+    ('gpt-3.5', 'cl100k'),
+    ('text-embedding', 'cl100k'),
+    ('claude', 'anthropic'),
+    ('gemini', 'gemini'),
+    ('llama', 'llama'),
+    ('mistral', 'mistral'),
+    ('mixtral', 'mistral'),
+]
+DEFAULT_FAMILY = 'cl100k'
+
+# Per-message framing overhead (role markers, separators) and reply priming
+MESSAGE_OVERHEAD = 3
+REPLY_OVERHEAD = 3
+
+# Letters, up to three digits, whitespace runs, single other characters
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d{1,3}|\s+|[^\w\s]")
+
+
+def model_family(model: Optional[str]) -> str:
+    """Map a model name (including OpenRouter ``vendor/model:tag`` ids) to a family."""
+    if not model:
+        return DEFAULT_FAMILY
+    name = model.lower()
+    if '/' in name:
+        name = name.split('/')[-1]
+    if ':' in name:
+        name = name.split(':')[0]
+    for prefix, family in _FAMILY_RULES:
+        if name.startswith(prefix):
+            return family
+    return DEFAULT_FAMILY
+
+
+class HeuristicTokenizer:
+    """
+    Approximates BPE token counts in a single regex pass.
+    
+    Short words and digit groups of up to three count as one token, long
+    words split every eight letters, punctuation counts per character and
+    whitespace runs containing a newline or indentation count as one.
+    """
+    
+    def __init__(self, name: str = 'heuristic', scale: float = 1.0):
+        self.name = name
+        self.scale = scale
+    
+    def count(self, text: str) -> int:
+        tokens = 0
+        for match in _PIECE_RE.finditer(text):
+            piece = match.group()
+            first = piece[0]
+            if first.isspace():
+                if len(piece) > 1 or first != ' ':
+                    tokens += 1
+            elif first.isalpha():
+                tokens += 1 + (len(piece) - 1) // 8
+            else:
+                tokens += 1
+        return max(1, round(tokens * self.scale))
+    
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        return [self.count(text) for text in texts]
+
+
+class TiktokenTokenizer:
+    """OpenAI BPE encoding loaded from a local ``.tiktoken`` file."""
+    
+    def __init__(self, encoding_name: str, path: str):
+        import tiktoken
+        from tiktoken.load import load_tiktoken_bpe
+        
+        self.name = encoding_name
+        self._encoding = tiktoken.Encoding(
+            name=encoding_name,
+            pat_str=TIKTOKEN_PATTERNS[encoding_name],
+            mergeable_ranks=load_tiktoken_bpe(path),
+            special_tokens={},
+        )
+    
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode_ordinary(text))
+    
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        return [len(ids) for ids in self._encoding.encode_ordinary_batch(list(texts))]
+
+
+class HuggingFaceTokenizer:
+    """Tokenizer loaded from a local Hugging Face ``tokenizer.json`` file."""
+    
+    def __init__(self, name: str, path: str):
+        from tokenizers import Tokenizer
+        
+        self.name = name
+        self._tokenizer = Tokenizer.from_file(path)
+    
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+    
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        encodings = self._tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
+
+
+def load_family_tokenizer(family: str, vocab_dir: Optional[str]):
+    """
+    Load the tokenizer for ``family`` from ``vocab_dir``.
+    
+    Returns a HeuristicTokenizer when no vocabulary file is present or the
+    tokenizer library is not installed.
+    """
+    stem, scale = MODEL_FAMILIES.get(family, MODEL_FAMILIES[DEFAULT_FAMILY])
+    if vocab_dir and not os.path.isdir(vocab_dir):
+        if vocab_dir not in _missing_vocab_dirs:
+            _missing_vocab_dirs.add(vocab_dir)
+            logger.warning(
+                f"Tokenizer vocabulary directory {vocab_dir} does not exist, "
+                f"token counts are heuristic estimates"
+            )
+    elif vocab_dir:
+        tiktoken_path = os.path.join(vocab_dir, f"{stem}.tiktoken")
+        hf_path = os.path.join(vocab_dir, f"{stem}.json")
+        try:
+            if stem in TIKTOKEN_PATTERNS and os.path.exists(tiktoken_path):
+                return TiktokenTokenizer(stem, tiktoken_path)
+            if os.path.exists(hf_path):
+                return HuggingFaceTokenizer(stem, hf_path)
+        except Exception as e:
+            logger.warning(f"Failed to load {family} tokenizer from {vocab_dir}: {str(e)}")
+    logger.debug(f"No local vocabulary for {family}, using heuristic token counts")
+    return HeuristicTokenizer(f"heuristic:{family}", scale)
+
+
+class _CountCache:
+    """Thread-safe LRU of token counts keyed by tokenizer and text hash."""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: tuple) -> Optional[int]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: tuple, value: int):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TokenCounter:
+    """
+    Counts tokens per model family with memoization.
+    
+    Tokenizers are pluggable: ``register_tokenizer`` overrides the tokenizer
+    of a family (anything with ``name``, ``count`` and ``count_batch``).
+    """
+    
+    def __init__(self, vocab_dir: Optional[str] = None, cache_size: Optional[int] = None):
+        """
+        Initialize token counter.
+        
+        Args:
+            vocab_dir: Directory with local vocabulary files (defaults to
+                       ``settings.TOKENIZER_VOCAB_DIR``)
+            cache_size: Maximum memoized counts (defaults to
+                        ``settings.TOKEN_COUNT_CACHE_SIZE``)
+        """
+        if vocab_dir is None or cache_size is None:
+            from django.conf import settings
+            if vocab_dir is None:
+                vocab_dir = getattr(settings, 'TOKENIZER_VOCAB_DIR', None)
+            if cache_size is None:
+                cache_size = getattr(settings, 'TOKEN_COUNT_CACHE_SIZE', 50000)
+        self.vocab_dir = vocab_dir
+        self._tokenizers: Dict[str, object] = {}
+        self._cache = _CountCache(cache_size)
+        self._lock = threading.Lock()
+    
+    def register_tokenizer(self, family: str, tokenizer):
+        with self._lock:
+            self._tokenizers[family] = tokenizer
+        self._cache.clear()
+    
+    def tokenizer_for(self, model: Optional[str] = None):
+        """Return the (lazily loaded) tokenizer for ``model``'s family."""
+        family = model_family(model)
+        tokenizer = self._tokenizers.get(family)
+        if tokenizer is None:
+            with self._lock:
+                tokenizer = self._tokenizers.get(family)
+                if tokenizer is None:
+                    tokenizer = load_family_tokenizer(family, self.vocab_dir)
+                    self._tokenizers[family] = tokenizer
+        return tokenizer
+    
+    @staticmethod
+    def _key(tokenizer, text: str) -> tuple:
+        return (tokenizer.name, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+    
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """
+        Count tokens in ``text`` for ``model``.
+        
+        Args:
+            text: Text to count
+            model: Model name; selects the tokenizer family
+        
+        Returns:
+            Token count (0 for empty text)
+        """
+        if not text:
+            return 0
+        tokenizer = self.tokenizer_for(model)
+        key = self._key(tokenizer, text)
+        tokens = self._cache.get(key)
+        if tokens is None:
+            tokens = tokenizer.count(text)
+            self._cache.set(key, tokens)
+        return tokens
+    
+    def count_batch(self, texts: Sequence[str], model: Optional[str] = None) -> List[int]:
+        """
+        Count tokens for many texts at once.
+        
+        Memoized texts are not re-tokenized; the rest are tokenized in one
+        batch call (parallel for tiktoken and Hugging Face tokenizers).
+        """
+        tokenizer = self.tokenizer_for(model)
+        results: List[Optional[int]] = [0] * len(texts)
+        pending: Dict[tuple, List[int]] = {}
+        pending_texts: List[str] = []
+        for index, text in enumerate(texts):
+            if not text:
+                continue
+            key = self._key(tokenizer, text)
+            tokens = self._cache.get(key)
+            if tokens is not None:
+                results[index] = tokens
+            elif key in pending:
+                pending[key].append(index)
+            else:
+                pending[key] = [index]
+                pending_texts.append(text)
+        
+        if pending_texts:
+            counts = tokenizer.count_batch(pending_texts)
+            for (key, indexes), tokens in zip(pending.items(), counts):
+                self._cache.set(key, tokens)
+                for index in indexes:
+                    results[index] = tokens
+        return results
+    
+    def count_message(self, message: Dict[str, str], model: Optional[str] = None) -> int:
+        """Count tokens for a chat message including its framing overhead."""
+        tokens = MESSAGE_OVERHEAD + self.count(message.get('content') or '', model)
+        if message.get('name'):
+            tokens += 1
+        return tokens
+    
+    def count_messages(self, messages: Iterable[Dict[str, str]], model: Optional[str] = None) -> List[int]:
+        """Per-message token counts (batch API for chat messages)."""
+        messages = list(messages)
+        counts = self.count_batch([m.get('content') or '' for m in messages], model)
+        return [
+            MESSAGE_OVERHEAD + tokens + (1 if m.get('name') else 0)
+            for m, tokens in zip(messages, counts)
+        ]
+    
+    def count_prompt(self, messages: Iterable[Dict[str, str]], model: Optional[str] = None) -> int:
+        """Total prompt tokens for a message list, including reply priming."""
+        return sum(self.count_messages(messages, model)) + REPLY_OVERHEAD
+    
+    def stats(self) -> Dict[str, object]:
+        return {
+            'cache_hits': self._cache.hits,
+            'cache_misses': self._cache.misses,
+            'tokenizers': {family: t.name for family, t in self._tokenizers.items()},
+        }
+
+
+_counter: Optional[TokenCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Return the process-wide token counter."""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = TokenCounter()
+    return _counter
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Shortcut for ``get_token_counter().count(text, model)``."""
+    return get_token_counter().count(text, model)
@@ -0,0 +1,428 @@
+"""
+Usage Accumulator
+
+Write-behind accounting for AI platform usage and organization usage counts.
+
+Backends (USAGE_ACCUMULATOR_BACKEND):
+- ``memory``: usage is buffered in-process and written by a daemon flusher
+  thread every USAGE_FLUSH_INTERVAL seconds or USAGE_BATCH_SIZE events,
+  whichever comes first. Buffered usage is lost if the process dies.
+- ``redis``: usage rows are pushed onto a Redis list and organization counts
+  accumulated with HINCRBY; both are drained by the ``flush_usage`` Celery
+  beat task. Falls back to ``memory`` when the default cache is not
+  Redis-backed. The default when it is.
+- ``sync``: usage is written immediately (used by the test settings).
+
+Rows keep the time the request was recorded, not the time they are flushed.
+A flush bulk-inserts PlatformUsage rows and applies platform and organization
+totals as F() increments, so concurrent writers never lose counts. Each batch
+is written in one transaction; a batch that fails is re-queued whole and
+retried by the next flush, so nothing is dropped or counted twice. Limit
+checks read a live per-month counter in the cache, seeded from the database
+plus whatever is still pending.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict, deque
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# (organization_id, usage_type, year, month)
+CounterKey = Tuple[str, str, int, int]
+
+
+class UsageAccumulator:
+    """Buffers usage events and applies them to the database in batches."""
+    
+    EVENTS_KEY = 'usage:events'
+    COUNTERS_KEY = 'usage:org_counters'
+    LIVE_KEY = 'org_usage:{organization_id}:{usage_type}:{year}:{month}'
+    LIVE_TTL = 40 * 86400  # Outlives the month the counter belongs to
+    
+    def __init__(self):
+        self._events: deque = deque()
+        self._counts: Dict[CounterKey, int] = defaultdict(int)
+        self._counts_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def backend(self) -> str:
+        return getattr(settings, 'USAGE_ACCUMULATOR_BACKEND', 'memory')
+    
+    @property
+    def batch_size(self) -> int:
+        return max(1, getattr(settings, 'USAGE_BATCH_SIZE', 500))
+    
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, 'USAGE_FLUSH_INTERVAL', 5.0)
+    
+    def record_platform_usage(
+        self,
+        platform_name: str,
+        model: str,
+        tokens_used: int = 0,
+        cost=0,
+        success: bool = True,
+        user=None,
+        error_message: str = '',
+        response_time: float = 0
+    ):
+        """
+        Record one AI platform request.
+        
+        Returns:
+            The saved PlatformUsage for the ``sync`` backend, otherwise None
+            (the row is written on the next flush)
+        """
+        event = {
+            'id': str(uuid.uuid4()),
+            'platform_name': platform_name,
+            'user_id': str(user.pk) if user is not None else None,
+            'model': model,
+            'tokens_used': int(tokens_used or 0),
+            'cost': str(Decimal(str(cost or 0))),
+            'success': success,
+            'error_message': error_message or '',
+            'response_time': float(response_time or 0),
+            'timestamp': timezone.now().isoformat(),
+        }
+        
+        if self.backend == 'sync':
+            rows = self.write_usage([event])
+            return rows[0] if rows else None
+        
+        if self.backend == 'redis':
+            client = self._redis()
+            if client is not None:
+                try:
+                    client.rpush(self.EVENTS_KEY, json.dumps(event))
+                    return None
+                except Exception as e:
+                    logger.warning(f"[UsageAccumulator] Redis push failed, buffering in-process: {e}")
+        
+        self._ensure_flusher()
+        self._events.append(event)
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+        return None
+    
+    def increment_org_usage(self, organization_id, usage_type: str, amount: int = 1):
+        """Count usage of a metered feature towards the organization's current month."""
+        now = timezone.now()
+        key = (str(organization_id), usage_type, now.year, now.month)
+        
+        self._bump_live_counter(key, amount)
+        
+        if self.backend == 'sync':
+            self._apply_counts({key: amount})
+            return
+        
+        if self.backend == 'redis':
+            client = self._redis()
+            if client is not None:
+                try:
+                    client.hincrby(self.COUNTERS_KEY, self._field(key), amount)
+                    return
+                except Exception as e:
+                    logger.warning(f"[UsageAccumulator] Redis increment failed, buffering in-process: {e}")
+        
+        self._ensure_flusher()
+        with self._counts_lock:
+            self._counts[key] += amount
+    
+    def get_org_usage(self, organization_id, usage_type: str, year: int, month: int) -> int:
+        """Current usage count, read from the live counter when it is cached."""
+        key = (str(organization_id), usage_type, year, month)
+        live_key = self._live_key(key)
+        
+        value = cache.get(live_key)
+        if value is not None:
+            return int(value)
+        
+        value = self._stored_count(key) + self._pending_count(key)
+        cache.add(live_key, value, self.LIVE_TTL)
+        return value
+    
+    def flush(self) -> int:
+        """
+        Write everything buffered in this process.
+        
+        Stops at the first usage batch that cannot be written and puts it back
+        at the head of the buffer for the next flush.
+        
+        Returns:
+            Number of usage rows written
+        """
+        with self._counts_lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        if counts:
+            try:
+                self._apply_counts(counts)
+            except Exception as e:
+                logger.error(f"[UsageAccumulator] Failed to apply organization usage, re-buffering: {e}", exc_info=True)
+                with self._counts_lock:
+                    for key, amount in counts.items():
+                        self._counts[key] += amount
+        
+        written = 0
+        while self._events:
+            batch = []
+            while self._events and len(batch) < self.batch_size:
+                batch.append(self._events.popleft())
+            try:
+                written += len(self.write_usage(batch))
+            except Exception as e:
+                logger.error(f"[UsageAccumulator] Failed to write {len(batch)} usage events, re-queueing: {e}", exc_info=True)
+                self._events.extendleft(reversed(batch))
+                break
+        return written
+    
+    def flush_redis(self) -> int:
+        """Drain the shared Redis buffers (run by the Celery beat task)."""
+        client = self._redis()
+        if client is None:
+            return 0
+        
+        # Claim the accumulated counts atomically; increments after the rename start a new hash
+        flushing_key = f'{self.COUNTERS_KEY}:flushing:{uuid.uuid4().hex}'
+        try:
+            client.rename(self.COUNTERS_KEY, flushing_key)
+        except Exception:
+            flushing_key = None  # Nothing accumulated
+        if flushing_key:
+            raw_counts = client.hgetall(flushing_key)
+            counts = {}
+            for field, amount in raw_counts.items():
+                field = field.decode() if isinstance(field, bytes) else field
+                counts[self._parse_field(field)] = int(amount)
+            try:
+                self._apply_counts(counts)
+                client.delete(flushing_key)
+            except Exception as e:
+                logger.error(f"[UsageAccumulator] Failed to apply organization usage, re-queueing: {e}", exc_info=True)
+                pipe = client.pipeline()
+                for field, amount in raw_counts.items():
+                    pipe.hincrby(self.COUNTERS_KEY, field, int(amount))
+                pipe.delete(flushing_key)
+                pipe.execute()
+        
+        written = 0
+        while True:
+            pipe = client.pipeline()
+            pipe.lrange(self.EVENTS_KEY, 0, self.batch_size - 1)
+            pipe.ltrim(self.EVENTS_KEY, self.batch_size, -1)
+            raw_events, _ = pipe.execute()
+            if not raw_events:
+                return written
+            
+            batch = [json.loads(raw) for raw in raw_events]
+            try:
+                written += len(self.write_usage(batch))
+            except Exception as e:
+                logger.error(f"[UsageAccumulator] Failed to write {len(batch)} usage events, re-queueing: {e}", exc_info=True)
+                client.lpush(self.EVENTS_KEY, *reversed(raw_events))
+                return written
+    
+    def write_usage(self, events: List[Dict[str, Any]]):
+        """
+        Bulk-insert usage rows and add them to their platforms' totals.
+        
+        Events for platforms that do not exist are dropped.
+        
+        Returns:
+            List of created PlatformUsage instances
+        """
+        from django.contrib.auth import get_user_model
+        from apps.integrations.models import AIPlatform, PlatformUsage
+        
+        platform_ids = dict(
+            AIPlatform.objects.filter(
+                platform_name__in={event['platform_name'] for event in events}
+            ).values_list('platform_name', 'id')
+        )
+        user_ids = {event['user_id'] for event in events if event['user_id']}
+        if user_ids:
+            user_ids = {
+                str(pk) for pk in get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True)
+            }
+        
+        rows = []
+        totals = defaultdict(lambda: {'requests': 0, 'failed': 0, 'tokens': 0, 'cost': Decimal('0')})
+        for event in events:
+            platform_id = platform_ids.get(event['platform_name'])
+            if platform_id is None:
+                logger.error(f"Platform not found: {event['platform_name']}")
+                continue
+            
+            cost = Decimal(event['cost'])
+            rows.append(PlatformUsage(
+                id=uuid.UUID(event['id']),
+                platform_id=platform_id,
+                user_id=event['user_id'] if event['user_id'] in user_ids else None,
+                model=event['model'],
+                tokens_used=event['tokens_used'],
+                cost=cost,
+                success=event['success'],
+                error_message=event['error_message'],
+                response_time=event['response_time'],
+                # Queued before timestamps were recorded: fall back to the write time
+                timestamp=parse_datetime(event['timestamp']) if event.get('timestamp') else timezone.now(),
+            ))
+            
+            platform_totals = totals[platform_id]
+            platform_totals['requests'] += 1
+            if event['success']:
+                platform_totals['tokens'] += event['tokens_used']
+                platform_totals['cost'] += cost
+            else:
+                platform_totals['failed'] += 1
+        
+        with transaction.atomic():
+            PlatformUsage.objects.bulk_create(rows, batch_size=self.batch_size)
+            for platform_id, platform_totals in totals.items():
+                AIPlatform.objects.filter(id=platform_id).update(
+                    total_requests=F('total_requests') + platform_totals['requests'],
+                    failed_requests=F('failed_requests') + platform_totals['failed'],
+                    total_tokens=F('total_tokens') + platform_totals['tokens'],
+                    total_cost=F('total_cost') + platform_totals['cost']
+                )
+        
+        logger.debug(f"[UsageAccumulator] Wrote {len(rows)} usage rows for {len(totals)} platforms")
+        return rows
+    
+    def _apply_counts(self, counts: Dict[CounterKey, int]):
+        """Add counts to OrganizationUsage, all or nothing (failed counts are re-queued whole)."""
+        from apps.organizations.models import OrganizationUsage
+        
+        with transaction.atomic():
+            for (organization_id, usage_type, year, month), amount in counts.items():
+                lookup = {
+                    'organization_id': organization_id,
+                    'usage_type': usage_type,
+                    'year': year,
+                    'month': month,
+                }
+                if OrganizationUsage.objects.filter(**lookup).update(count=F('count') + amount):
+                    continue
+                try:
+                    with transaction.atomic():
+                        OrganizationUsage.objects.create(count=amount, **lookup)
+                except IntegrityError:
+                    # Created concurrently by another flusher
+                    OrganizationUsage.objects.filter(**lookup).update(count=F('count') + amount)
+    
+    def _bump_live_counter(self, key: CounterKey, amount: int):
+        live_key = self._live_key(key)
+        try:
+            cache.incr(live_key, amount)
+            return
+        except ValueError:
+            pass  # Not cached yet
+        
+        seed = self._stored_count(key) + self._pending_count(key) + amount
+        if not cache.add(live_key, seed, self.LIVE_TTL):
+            try:
+                cache.incr(live_key, amount)
+            except ValueError:
+                pass
+    
+    def _stored_count(self, key: CounterKey) -> int:
+        from apps.organizations.models import OrganizationUsage
+        
+        organization_id, usage_type, year, month = key
+        count = OrganizationUsage.objects.filter(
+            organization_id=organization_id,
+            usage_type=usage_type,
+            year=year,
+            month=month
+        ).values_list('count', flat=True).first()
+        return count or 0
+    
+    def _pending_count(self, key: CounterKey) -> int:
+        pending = self._counts.get(key, 0)
+        if self.backend == 'redis':
+            client = self._redis()
+            if client is not None:
+                try:
+                    pending += int(client.hget(self.COUNTERS_KEY, self._field(key)) or 0)
+                except Exception:
+                    pass
+        return pending
+    
+    def _live_key(self, key: CounterKey) -> str:
+        organization_id, usage_type, year, month = key
+        return self.LIVE_KEY.format(organization_id=organization_id, usage_type=usage_type, year=year, month=month)
+    
+    @staticmethod
+    def _field(key: CounterKey) -> str:
+        return '|'.join(str(part) for part in key)
+    
+    @staticmethod
+    def _parse_field(field: str) -> CounterKey:
+        organization_id, usage_type, year, month = field.split('|')
+        return organization_id, usage_type, int(year), int(month)
+    
+    @staticmethod
+    def _redis():
+        from core.enhanced_caching import get_redis_client
+        
+        return get_redis_client()
+    
+    def _ensure_flusher(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Forked worker: the parent's buffers and thread are not ours
+                self._events = deque()
+                self._counts = defaultdict(int)
+                self._wakeup = threading.Event()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='usage-accumulator-flusher', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._events and not self._counts:
+                continue
+            with self._flush_lock:
+                try:
+                    self.flush()
+                finally:
+                    close_old_connections()
+    
+    def _shutdown(self):
+        """Drain the in-process buffers when the interpreter exits."""
+        if not self._events and not self._counts:
+            return
+        with self._flush_lock:
+            self.flush()
+
+
+# Global instance
+usage_accumulator = UsageAccumulator()
+atexit.register(usage_accumulator._shutdown)
@@ -0,0 +1,17 @@
+"""
+Signals for integrations app to keep cached platform configuration fresh.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import AIPlatform
+
+
+@receiver(post_save, sender=AIPlatform)
+@receiver(post_delete, sender=AIPlatform)
+def invalidate_platform_limits(sender, instance, **kwargs):
+    """Drop cached rate limits so the next check reads the new configuration."""
+    from core.enhanced_caching import get_cache
+    from .services.rate_limiter import platform_limits_cache_key
+    
+    get_cache().delete(platform_limits_cache_key(instance.platform_name))
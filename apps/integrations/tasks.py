@@ -0,0 +1,24 @@
+"""
+Celery tasks for AI platform integrations.
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_usage():
+    """
+    Write usage buffered in Redis (USAGE_ACCUMULATOR_BACKEND = 'redis').
+    
+    Scheduled every few seconds by Celery beat; a no-op for other backends.
+    """
+    from apps.integrations.services.usage_accumulator import usage_accumulator
+    
+    written = usage_accumulator.flush_redis()
+    if written:
+        logger.info(f"[flush_usage] Wrote {written} platform usage rows")
+    return written
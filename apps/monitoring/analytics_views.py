@@ -7,15 +7,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Avg, Q, F
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 
-from apps.integrations.models import PlatformUsage, AIPlatform
 from apps.agents.models import AgentExecution
 from apps.core.services.roles import RoleService
 from apps.organizations.services import FeatureService
+from apps.monitoring.usage_rollups import aggregate_usage
 
 
 class AnalyticsViewSet(viewsets.ViewSet):
@@ -71,49 +70,62 @@ class AnalyticsViewSet(viewsets.ViewSet):
         else:  # all
             start_date = None
         
-        # Build queryset
-        queryset = PlatformUsage.objects.filter(success=True)
-        
-        if start_date:
-            queryset = queryset.filter(timestamp__gte=start_date)
+        # Read from the usage rollups (raw rows only for the current hour)
+        filters = {}
         
         if platform_name:
-            queryset = queryset.filter(platform__platform_name=platform_name)
+            filters['platform__platform_name'] = platform_name
         
         if user_id:
-            queryset = queryset.filter(user_id=user_id)
+            filters['user_id'] = user_id
         elif not RoleService.is_admin(request.user):
             # Non-admins only see their own usage
-            queryset = queryset.filter(user=request.user)
+            filters['user_id'] = request.user.id
         
         # Aggregate data
-        total_count = queryset.count()
-        successful_count = queryset.filter(success=True).count()
-        
-        summary = queryset.aggregate(
-            total_requests=Count('id'),
-            total_tokens=Sum('tokens_used'),
-            total_cost=Sum('cost'),
-            avg_response_time=Avg('response_time'),
-        )
+        totals = aggregate_usage(start_date, filters)[0]
+        total_requests = totals['requests']
+        
+        summary = {
+            'total_requests': total_requests,
+            'total_tokens': totals['tokens'],
+            'total_cost': totals['cost'],
+            'avg_response_time': totals['response_time_total'] / total_requests if total_requests else 0,
+        }
         
         # Calculate success rate
-        success_rate = (successful_count * 100.0 / total_count) if total_count > 0 else 0
-        summary['success_rate'] = success_rate
+        attempted = total_requests + totals['failed_requests']
+        summary['success_rate'] = (total_requests * 100.0 / attempted) if attempted > 0 else 0
         
         # Get platform breakdown
-        platform_breakdown = queryset.values('platform__display_name', 'platform__platform_name').annotate(
-            requests=Count('id'),
-            tokens=Sum('tokens_used'),
-            cost=Sum('cost')
-        ).order_by('-cost')
+        platform_breakdown = sorted(
+            (
+                {
+                    'platform__display_name': item['platform__display_name'],
+                    'platform__platform_name': item['platform__platform_name'],
+                    'requests': item['requests'],
+                    'tokens': item['tokens'],
+                    'cost': item['cost'],
+                }
+                for item in aggregate_usage(
+                    start_date, filters, group_by=['platform__display_name', 'platform__platform_name']
+                )
+                if item['requests']
+            ),
+            key=lambda item: item['cost'],
+            reverse=True
+        )
         
         # Get model breakdown
-        model_breakdown = queryset.values('model').annotate(
-            requests=Count('id'),
-            tokens=Sum('tokens_used'),
-            cost=Sum('cost')
-        ).order_by('-cost')[:10]  # Top 10 models
+        model_breakdown = sorted(
+            (
+                {'model': item['model'], 'requests': item['requests'], 'tokens': item['tokens'], 'cost': item['cost']}
+                for item in aggregate_usage(start_date, filters, group_by=['model'])
+                if item['requests']
+            ),
+            key=lambda item: item['cost'],
+            reverse=True
+        )[:10]  # Top 10 models
         
         return Response({
             'period': period,
@@ -164,50 +176,25 @@ class AnalyticsViewSet(viewsets.ViewSet):
         else:
             start_date = now - timedelta(days=30)
         
-        # Build queryset
-        queryset = PlatformUsage.objects.filter(
-            success=True,
-            timestamp__gte=start_date
-        )
+        filters = {}
         
         if platform_name:
-            queryset = queryset.filter(platform__platform_name=platform_name)
+            filters['platform__platform_name'] = platform_name
         
         if not RoleService.is_admin(request.user):
-            queryset = queryset.filter(user=request.user)
-        
-        # Group by date (database-agnostic using Django's TruncDate)
-        from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
-        
-        if group_by == 'day':
-            queryset = queryset.annotate(
-                date=TruncDate('timestamp')
-            ).values('date').annotate(
-                cost=Sum('cost'),
-                tokens=Sum('tokens_used'),
-                requests=Count('id')
-            ).order_by('date')
-        elif group_by == 'week':
-            queryset = queryset.annotate(
-                week=TruncWeek('timestamp')
-            ).values('week').annotate(
-                cost=Sum('cost'),
-                tokens=Sum('tokens_used'),
-                requests=Count('id')
-            ).order_by('week')
-        else:  # month
-            queryset = queryset.annotate(
-                month=TruncMonth('timestamp')
-            ).values('month').annotate(
-                cost=Sum('cost'),
-                tokens=Sum('tokens_used'),
-                requests=Count('id')
-            ).order_by('month')
+            filters['user_id'] = request.user.id
+        
+        # Group by date from the daily/hourly rollups
+        date_key = {'day': 'date', 'week': 'week'}.get(group_by, 'month')
+        buckets = sorted(
+            (item for item in aggregate_usage(start_date, filters, date_trunc=date_key) if item['requests']),
+            key=lambda item: item[date_key]
+        )
         
         timeline_data = []
-        for item in queryset:
+        for item in buckets:
             timeline_data.append({
-                'date': str(item.get('date') or item.get('week') or item.get('month')),
+                'date': str(item[date_key]),
                 'cost': float(item['cost'] or Decimal('0')),
                 'tokens': item['tokens'] or 0,
                 'requests': item['requests'] or 0,
@@ -252,37 +239,38 @@ class AnalyticsViewSet(viewsets.ViewSet):
         else:
             start_date = now - timedelta(days=30)
         
-        # Build queryset
-        queryset = PlatformUsage.objects.filter(
-            success=True,
-            timestamp__gte=start_date
-        )
+        filters = {}
         
         if platform_name:
-            queryset = queryset.filter(platform__platform_name=platform_name)
+            filters['platform__platform_name'] = platform_name
         
         if not RoleService.is_admin(request.user):
-            queryset = queryset.filter(user=request.user)
+            filters['user_id'] = request.user.id
         
         # Get token usage by platform
-        platform_tokens = queryset.values('platform__display_name', 'platform__platform_name').annotate(
-            total_tokens=Sum('tokens_used'),
-            requests=Count('id')
-        ).order_by('-total_tokens')
+        platform_tokens = sorted(
+            (
+                item for item in aggregate_usage(
+                    start_date, filters, group_by=['platform__display_name', 'platform__platform_name']
+                )
+                if item['requests']
+            ),
+            key=lambda item: item['tokens'],
+            reverse=True
+        )
         
         # Get token usage by model
-        model_tokens = queryset.values('model').annotate(
-            total_tokens=Sum('tokens_used'),
-            requests=Count('id')
-        ).order_by('-total_tokens')[:10]  # Top 10 models
-        
-        # Get daily token usage (database-agnostic)
-        from django.db.models.functions import TruncDate
-        daily_tokens = queryset.annotate(
-            date=TruncDate('timestamp')
-        ).values('date').annotate(
-            tokens=Sum('tokens_used')
-        ).order_by('date')
+        model_tokens = sorted(
+            (item for item in aggregate_usage(start_date, filters, group_by=['model']) if item['requests']),
+            key=lambda item: item['tokens'],
+            reverse=True
+        )[:10]  # Top 10 models
+        
+        # Get daily token usage
+        daily_tokens = sorted(
+            (item for item in aggregate_usage(start_date, filters, date_trunc='date') if item['requests']),
+            key=lambda item: item['date']
+        )
         
         return Response({
             'period': period,
@@ -290,7 +278,7 @@ class AnalyticsViewSet(viewsets.ViewSet):
                 {
                     'platform': item['platform__display_name'],
                     'platform_name': item['platform__platform_name'],
-                    'tokens': item['total_tokens'] or 0,
+                    'tokens': item['tokens'] or 0,
                     'requests': item['requests'] or 0,
                 }
                 for item in platform_tokens
@@ -298,7 +286,7 @@ class AnalyticsViewSet(viewsets.ViewSet):
             'model_breakdown': [
                 {
                     'model': item['model'],
-                    'tokens': item['total_tokens'] or 0,
+                    'tokens': item['tokens'] or 0,
                     'requests': item['requests'] or 0,
                 }
                 for item in model_tokens
@@ -352,18 +340,18 @@ class AnalyticsViewSet(viewsets.ViewSet):
             start_date = now - timedelta(days=30)
         
         # Get top users
-        top_users = PlatformUsage.objects.filter(
-            success=True,
-            timestamp__gte=start_date,
-            user__isnull=False
-        ).values(
-            'user__id', 'user__email', 'user__username',
-            'user__first_name', 'user__last_name'
-        ).annotate(
-            total_cost=Sum('cost'),
-            total_tokens=Sum('tokens_used'),
-            total_requests=Count('id')
-        ).order_by('-total_cost')[:limit]
+        top_users = sorted(
+            (
+                item for item in aggregate_usage(
+                    start_date,
+                    {'user__isnull': False},
+                    group_by=['user__id', 'user__email', 'user__username', 'user__first_name', 'user__last_name']
+                )
+                if item['requests']
+            ),
+            key=lambda item: item['cost'],
+            reverse=True
+        )[:limit]
         
         return Response({
             'period': period,
@@ -373,9 +361,9 @@ class AnalyticsViewSet(viewsets.ViewSet):
                     'email': item['user__email'],
                     'username': item['user__username'],
                     'name': f"{item['user__first_name'] or ''} {item['user__last_name'] or ''}".strip() or item['user__username'],
-                    'total_cost': float(item['total_cost'] or Decimal('0')),
-                    'total_tokens': item['total_tokens'] or 0,
-                    'total_requests': item['total_requests'] or 0,
+                    'total_cost': float(item['cost'] or Decimal('0')),
+                    'total_tokens': item['tokens'] or 0,
+                    'total_requests': item['requests'] or 0,
                 }
                 for item in top_users
             ],
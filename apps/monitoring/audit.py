@@ -4,16 +4,40 @@ Comprehensive audit logging utilities with tamper-proof logging.
 import hashlib
 import json
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from .models import AuditLog, AuditConfiguration
+from .audit_sink import audit_sink
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Active configurations, loaded once per process and refreshed after
+# AUDIT_CONFIG_CACHE_TTL seconds or when a configuration is saved/deleted here
+_config_cache: Dict[str, Any] = {'loaded_at': None, 'configurations': []}
+
+
+def get_active_configurations() -> List[AuditConfiguration]:
+    """Get active audit configurations, highest priority first."""
+    loaded_at = _config_cache['loaded_at']
+    ttl = getattr(settings, 'AUDIT_CONFIG_CACHE_TTL', 30)
+    if loaded_at is None or time.monotonic() - loaded_at > ttl:
+        _config_cache['configurations'] = list(
+            AuditConfiguration.objects.filter(is_active=True).order_by('-priority', 'name')
+        )
+        _config_cache['loaded_at'] = time.monotonic()
+    return _config_cache['configurations']
+
+
+def invalidate_audit_configurations():
+    """Reload configurations on next use."""
+    _config_cache['loaded_at'] = None
+
 
 class AuditLogger:
     """
@@ -39,11 +63,12 @@ class AuditLogger:
     def calculate_hash(audit_log: AuditLog) -> str:
         """
         Calculate hash for tamper-proof verification.
-        Includes all fields except the hash itself.
+        Includes all fields except the hash itself, and the previous
+        entry's hash so rows form a chain.
         """
         data = {
             'id': str(audit_log.id),
-            'user_id': str(audit_log.user.id) if audit_log.user else None,
+            'user_id': str(audit_log.user_id) if audit_log.user_id else None,
             'action': audit_log.action,
             'resource_type': audit_log.resource_type,
             'resource_id': audit_log.resource_id,
@@ -52,11 +77,50 @@ class AuditLogger:
             'ip_address': str(audit_log.ip_address) if audit_log.ip_address else '',
             'user_agent': audit_log.user_agent,
             'timestamp': audit_log.timestamp.isoformat(),
+            'previous_hash': audit_log.previous_hash,
         }
         
         data_string = json.dumps(data, sort_keys=True)
         return hashlib.sha256(data_string.encode()).hexdigest()
     
+    @classmethod
+    def resolve_configuration(
+        cls,
+        action: str,
+        resource_type: str,
+        resource_id: str,
+        user: Optional[User] = None,
+        ip_address: Optional[str] = None
+    ) -> Tuple[bool, Optional[AuditConfiguration]]:
+        """
+        Decide whether to audit an action and which configuration applies, in one pass.
+        
+        Logic: if ANY configuration says "audit", we audit; exclusions take
+        precedence - if ANY configuration excludes, we don't. With no active
+        configurations everything is audited (backward compatibility).
+        
+        Returns:
+            Tuple of (should audit, first matching configuration or None)
+        """
+        configurations = get_active_configurations()
+        if not configurations:
+            return True, None
+        
+        matched = None
+        for config in configurations:
+            if config.should_audit(action, resource_type, resource_id, user, ip_address):
+                if matched is None:
+                    matched = config
+            elif (config.exclude_actions and action in config.exclude_actions) or \
+                 (config.exclude_resource_types and resource_type in config.exclude_resource_types) or \
+                 (config.exclude_resources and any(
+                     r.get('resource_type') == resource_type and r.get('resource_id') == resource_id
+                     for r in config.exclude_resources
+                 )):
+                return False, None
+        
+        return matched is not None, matched
+    
     @classmethod
     def should_audit(
         cls,
@@ -79,45 +143,7 @@ class AuditLogger:
         Returns:
             True if action should be audited, False otherwise
         """
-        # Get all active configurations, ordered by priority (higher first)
-        configurations = AuditConfiguration.objects.filter(
-            is_active=True
-        ).order_by('-priority', 'name')
-        
-        # If no configurations exist, audit everything (backward compatibility)
-        # This ensures the system works out of the box
-        if not configurations.exists():
-            return True
-        
-        # Check each configuration
-        # Logic: If ANY configuration says "should audit", we audit
-        # Exclusions take precedence - if ANY config excludes, we don't audit
-        should_audit_result = False
-        excluded = False
-        
-        for config in configurations:
-            # Check if this config excludes the action
-            if config.should_audit(action, resource_type, resource_id, user, ip_address):
-                # This config says "audit"
-                should_audit_result = True
-            else:
-                # Check if this config explicitly excludes
-                # (should_audit returns False, but we need to check if it's an exclusion)
-                if (config.exclude_actions and action in config.exclude_actions) or \
-                   (config.exclude_resource_types and resource_type in config.exclude_resource_types) or \
-                   (config.exclude_resources and any(
-                       r.get('resource_type') == resource_type and r.get('resource_id') == resource_id
-                       for r in config.exclude_resources
-                   )):
-                    excluded = True
-                    break  # Exclusions take precedence
-        
-        # If explicitly excluded, don't audit
-        if excluded:
-            return False
-        
-        # Otherwise, audit if any config says to audit
-        return should_audit_result
+        return cls.resolve_configuration(action, resource_type, resource_id, user, ip_address)[0]
     
     @classmethod
     def get_audit_config_for_action(
@@ -134,11 +160,7 @@ class AuditLogger:
         Returns:
             AuditConfiguration instance or None
         """
-        configurations = AuditConfiguration.objects.filter(
-            is_active=True
-        ).order_by('-priority', 'name')
-        
-        for config in configurations:
+        for config in get_active_configurations():
             if config.should_audit(action, resource_type, resource_id, user, ip_address):
                 return config
         
@@ -175,7 +197,7 @@ class AuditLogger:
             **kwargs: Additional metadata
         
         Returns:
-            Created AuditLog instance or None if not audited
+            AuditLog instance (unsaved until the sink flushes) or None if not audited
         """
         # Get IP and user agent from explicit parameters first, then kwargs, then request
         # Initialize variables first to avoid UnboundLocalError
@@ -209,13 +231,11 @@ class AuditLogger:
         if not user and request and hasattr(request, 'user'):
             user = request.user if request.user.is_authenticated else None
         
-        # Check if we should audit this action
-        if not cls.should_audit(action, resource_type, resource_id, user, final_ip_address):
+        # Check if we should audit this action, and get the configuration to check what to include
+        audit, config = cls.resolve_configuration(action, resource_type, resource_id, user, final_ip_address)
+        if not audit:
             return None
         
-        # Get configuration to check what to include
-        config = cls.get_audit_config_for_action(action, resource_type, resource_id, user, final_ip_address)
-        
         # Prepare audit log data based on configuration
         audit_data = {
             'user': user,
@@ -293,14 +313,8 @@ class AuditLogger:
         # Add any additional kwargs
         audit_data.update(kwargs)
         
-        # Create audit log
-        audit_log = AuditLog.objects.create(**audit_data)
-        
-        # Calculate and store hash for tamper-proof verification
-        hash_value = cls.calculate_hash(audit_log)
-        logger.info(f"Audit log created: {audit_log.id} (hash: {hash_value[:16]}...)")
-        
-        return audit_log
+        # Hand off to the sink; rows are hashed and written in batches
+        return audit_sink.emit(audit_data)
     
     @classmethod
     def verify_integrity(cls, audit_log: AuditLog) -> bool:
@@ -309,10 +323,15 @@ class AuditLogger:
         Returns True if the log is valid and hasn't been tampered with.
         """
         try:
-            calculated_hash = cls.calculate_hash(audit_log)
-            # In a full implementation, we'd compare with stored hash
-            # For now, we just verify the log exists and is valid
-            return audit_log.id is not None
+            if not audit_log.hash:
+                # Written before hash chaining; nothing to compare against
+                return audit_log.id is not None
+            if cls.calculate_hash(audit_log) != audit_log.hash:
+                return False
+            if audit_log.sequence and audit_log.sequence > 1:
+                previous = AuditLog.objects.filter(sequence=audit_log.sequence - 1).values_list('hash', flat=True).first()
+                return previous == audit_log.previous_hash
+            return True
         except Exception as e:
             logger.error(f"Error verifying audit log integrity: {e}")
             return False
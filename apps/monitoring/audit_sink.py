@@ -0,0 +1,321 @@
+"""
+Audit Sink
+
+Buffers audit events and writes them to the database in batches, off the
+request path.
+
+Backends (AUDIT_SINK_BACKEND):
+- ``memory``: events are queued in-process and bulk-inserted by a daemon
+  flusher thread every AUDIT_FLUSH_INTERVAL seconds or AUDIT_BATCH_SIZE
+  events, whichever comes first. Queued events are lost if the process dies.
+- ``redis``: events are pushed onto a Redis list and bulk-inserted by the
+  ``flush_audit_events`` Celery beat task. Falls back to ``memory`` when the
+  default cache is not Redis-backed. The default when it is.
+- ``sync``: events are written immediately, inside the caller's transaction
+  (used by the test settings).
+
+Buffered events are only queued once the surrounding transaction commits, so
+rolled-back changes are not audited. A batch that fails to write is put back
+at the head of its queue and retried by the next flush. Each written row is
+linked into a hash chain (``previous_hash`` -> ``hash``) in insertion order;
+batches take a cache lock so concurrent flushers extend the chain one at a
+time.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class AuditSink:
+    """
+    Entry point for audit writes.
+    
+    Events are plain dicts holding AuditLog field values (``user_id`` instead
+    of ``user``, ISO ``timestamp``), normalized to JSON-safe values at emit
+    time so every backend hashes and stores exactly the same data.
+    """
+    
+    REDIS_KEY = 'audit:events'
+    CHAIN_LOCK_KEY = 'audit_chain_lock'
+    
+    def __init__(self):
+        self._buffer: deque = deque()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def backend(self) -> str:
+        return getattr(settings, 'AUDIT_SINK_BACKEND', 'memory')
+    
+    @property
+    def batch_size(self) -> int:
+        return max(1, getattr(settings, 'AUDIT_BATCH_SIZE', 200))
+    
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0)
+    
+    def emit(self, data: Dict[str, Any]):
+        """
+        Record an audit event.
+        
+        Args:
+            data: AuditLog field values; ``user`` may be a User instance
+        
+        Returns:
+            The saved AuditLog for the ``sync`` backend, otherwise an unsaved
+            AuditLog carrying the id the row will be written with
+        """
+        event = self._normalize(data)
+        
+        if self.backend == 'sync':
+            return self.write_batch([event])[0]
+        
+        transaction.on_commit(lambda: self._enqueue(event))
+        return self._build(event)
+    
+    def flush(self) -> int:
+        """
+        Write everything buffered in this process.
+        
+        Stops at the first batch that cannot be written and puts it back at
+        the head of the buffer for the next flush.
+        
+        Returns:
+            Number of events written
+        """
+        written = 0
+        while self._buffer:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+            try:
+                written += len(self._write_with_retry(batch))
+            except Exception as e:
+                logger.error(f"[AuditSink] Failed to write {len(batch)} audit events, re-queueing: {e}", exc_info=True)
+                self._buffer.extendleft(reversed(batch))
+                break
+        return written
+    
+    def flush_redis(self) -> int:
+        """Drain the shared Redis list (run by the Celery beat task)."""
+        from core.enhanced_caching import get_redis_client
+        
+        client = get_redis_client()
+        if client is None:
+            return 0
+        
+        written = 0
+        while True:
+            pipe = client.pipeline()
+            pipe.lrange(self.REDIS_KEY, 0, self.batch_size - 1)
+            pipe.ltrim(self.REDIS_KEY, self.batch_size, -1)
+            raw_events, _ = pipe.execute()
+            if not raw_events:
+                return written
+            
+            batch = [json.loads(raw) for raw in raw_events]
+            try:
+                written += len(self._write_with_retry(batch))
+            except Exception as e:
+                logger.error(f"[AuditSink] Failed to write {len(batch)} audit events, re-queueing: {e}", exc_info=True)
+                # Back at the head so the chain keeps emit order
+                client.lpush(self.REDIS_KEY, *reversed(raw_events))
+                return written
+    
+    def _write_with_retry(self, events: List[Dict[str, Any]]):
+        try:
+            return self.write_batch(events)
+        except IntegrityError:
+            # Another process extended the chain without the lock; re-read the head once
+            return self.write_batch(events)
+    
+    def write_batch(self, events: List[Dict[str, Any]]):
+        """
+        Bulk-insert events, extending the hash chain.
+        
+        Args:
+            events: Normalized events in the order they should be chained
+        
+        Returns:
+            List of created AuditLog instances
+        """
+        from django.contrib.auth import get_user_model
+        from apps.monitoring.audit import AuditLogger
+        from apps.monitoring.models import AuditLog
+        
+        # Users deleted between emit and flush would violate the foreign key
+        user_ids = {event['user_id'] for event in events if event['user_id']}
+        if user_ids:
+            existing = {
+                str(pk) for pk in get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True)
+            }
+            for event in events:
+                if event['user_id'] and event['user_id'] not in existing:
+                    event['user_id'] = None
+        
+        with self._chain_lock(), transaction.atomic():
+            head = (
+                AuditLog.objects.filter(sequence__isnull=False)
+                .order_by('-sequence')
+                .values('sequence', 'hash')
+                .first()
+            )
+            sequence = head['sequence'] if head else 0
+            previous_hash = head['hash'] if head else ''
+            
+            logs = []
+            for event in events:
+                sequence += 1
+                audit_log = self._build(event)
+                audit_log.sequence = sequence
+                audit_log.previous_hash = previous_hash
+                audit_log.hash = AuditLogger.calculate_hash(audit_log)
+                previous_hash = audit_log.hash
+                logs.append(audit_log)
+            
+            AuditLog.objects.bulk_create(logs, batch_size=self.batch_size)
+        
+        logger.debug(f"[AuditSink] Wrote {len(logs)} audit events (head: {previous_hash[:16]}...)")
+        return logs
+    
+    def _enqueue(self, event: Dict[str, Any]):
+        if self.backend == 'redis':
+            from core.enhanced_caching import get_redis_client
+            
+            client = get_redis_client()
+            if client is not None:
+                try:
+                    client.rpush(self.REDIS_KEY, json.dumps(event))
+                    return
+                except Exception as e:
+                    logger.warning(f"[AuditSink] Redis push failed, buffering in-process: {e}")
+        
+        self._ensure_flusher()
+        self._buffer.append(event)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+    
+    def _ensure_flusher(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Forked worker: the parent's buffer and thread are not ours
+                self._buffer = deque()
+                self._wakeup = threading.Event()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='audit-sink-flusher', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._buffer:
+                continue
+            with self._flush_lock:
+                try:
+                    self.flush()
+                finally:
+                    close_old_connections()
+    
+    def _shutdown(self):
+        """Drain the in-process buffer when the interpreter exits."""
+        if not self._buffer:
+            return
+        with self._flush_lock:
+            self.flush()
+    
+    def _chain_lock(self):
+        return _CacheLock(self.CHAIN_LOCK_KEY, timeout=getattr(settings, 'AUDIT_CHAIN_LOCK_TIMEOUT', 30))
+    
+    @staticmethod
+    def _normalize(data: Dict[str, Any]) -> Dict[str, Any]:
+        user = data.get('user')
+        user_id = data.get('user_id') or (user.pk if user is not None else None)
+        
+        def to_json(value):
+            # Round-trip so the hash is computed over what the JSON column returns
+            return json.loads(json.dumps(value or {}, default=str))
+        
+        return {
+            'id': str(data.get('id') or uuid.uuid4()),
+            'user_id': str(user_id) if user_id else None,
+            'action': data['action'],
+            'resource_type': data['resource_type'],
+            'resource_id': str(data['resource_id']),
+            'description': data.get('description', ''),
+            'changes': to_json(data.get('changes')),
+            'old_values': to_json(data.get('old_values')),
+            'new_values': to_json(data.get('new_values')),
+            'ip_address': data.get('ip_address') or None,
+            'user_agent': data.get('user_agent') or '',
+            'timestamp': (data.get('timestamp') or timezone.now()).isoformat(),
+        }
+    
+    @staticmethod
+    def _build(event: Dict[str, Any]):
+        from apps.monitoring.models import AuditLog
+        
+        fields = dict(event)
+        fields['id'] = uuid.UUID(fields['id'])
+        fields['timestamp'] = parse_datetime(fields['timestamp'])
+        return AuditLog(**fields)
+
+
+class _CacheLock:
+    """
+    Cross-process mutex on the default cache.
+    
+    Waits up to ``timeout`` seconds, then proceeds without the lock rather
+    than dropping audit events; a fork in the chain shows up in verification.
+    """
+    
+    def __init__(self, key: str, timeout: int):
+        self.key = key
+        self.timeout = timeout
+        self.token = None
+    
+    def __enter__(self):
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if cache.add(self.key, token, self.timeout):
+                self.token = token
+                return self
+            if time.monotonic() >= deadline:
+                logger.warning(f"[AuditSink] Could not acquire {self.key}, writing without it")
+                return self
+            time.sleep(0.05)
+    
+    def __exit__(self, *exc):
+        if self.token and cache.get(self.key) == self.token:
+            cache.delete(self.key)
+        return False
+
+
+# Global instance
+audit_sink = AuditSink()
+atexit.register(audit_sink._shutdown)
@@ -0,0 +1,43 @@
+"""
+Django management command to rebuild the usage rollups.
+
+The scheduled rollup only revisits the last few hours; run this after
+backfilling or correcting PlatformUsage rows older than that.
+
+Usage:
+    python manage.py rebuild_usage_rollups
+    python manage.py rebuild_usage_rollups --days 30
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.integrations.models import PlatformUsage
+from apps.monitoring.usage_rollups import roll_up_usage
+
+
+class Command(BaseCommand):
+    help = 'Re-aggregate hourly and daily usage rollups from PlatformUsage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only rebuild the last N days (default: all usage)'
+        )
+
+    def handle(self, *args, **options):
+        days = options.get('days')
+        
+        if days:
+            since = timezone.now() - timedelta(days=days)
+        else:
+            since = PlatformUsage.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+            if since is None:
+                self.stdout.write('No usage to roll up.')
+                return
+        
+        written = roll_up_usage(since=since)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} hourly rollups since {since:%Y-%m-%d %H:00}'))
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('integrations', '0011_aiplatform_api_stateful_and_more'),
+        ('organizations', '0005_alter_tierfeature_value'),
+        ('monitoring', '0007_auditlog_hash_chain'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('rolled_until', models.DateTimeField(help_text='Source rows before this time are reflected in the rollups')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Watermark',
+                'verbose_name_plural': 'Rollup Watermarks',
+                'db_table': 'rollup_watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='UsageRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('model', models.CharField(max_length=100)),
+                ('requests', models.BigIntegerField(default=0)),
+                ('failed_requests', models.BigIntegerField(default=0)),
+                ('tokens', models.BigIntegerField(default=0)),
+                ('cost', models.DecimalField(decimal_places=6, default=0, max_digits=14)),
+                ('response_time_total', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='organizations.organization')),
+                ('platform', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='integrations.aiplatform')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usage_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Usage Rollup',
+                'verbose_name_plural': 'Usage Rollups',
+                'db_table': 'usage_rollups',
+                'ordering': ['-bucket_start'],
+                'indexes': [
+                    models.Index(fields=['granularity', 'bucket_start'], name='usage_rollup_bucket_idx'),
+                    models.Index(fields=['granularity', 'user', 'bucket_start'], name='usage_rollup_user_idx'),
+                    models.Index(fields=['granularity', 'organization', 'bucket_start'], name='usage_rollup_org_idx'),
+                ],
+            },
+        ),
+    ]
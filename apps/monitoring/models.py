@@ -3,6 +3,7 @@ Monitoring and metrics models for HishamOS.
 """
 
 from django.db import models
+from django.utils import timezone
 import uuid
 
 
@@ -106,7 +107,13 @@ class AuditLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Event time, set when the event is emitted (rows are written later in batches)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    # Tamper-evident hash chain, in insertion order (empty/null on rows written before chaining)
+    sequence = models.BigIntegerField(null=True, blank=True, unique=True)
+    previous_hash = models.CharField(max_length=64, blank=True, default='')
+    hash = models.CharField(max_length=64, blank=True, default='')
     
     class Meta:
         db_table = 'audit_logs'
@@ -303,3 +310,81 @@ class AuditConfiguration(models.Model):
                     return False
         
         return True
+
+
+class UsageRollup(models.Model):
+    """
+    AI platform usage pre-aggregated per time bucket and
+    (organization, user, platform, model).
+    
+    Maintained by apps.monitoring.usage_rollups from PlatformUsage rows.
+    Tokens, cost and response time cover successful requests only.
+    """
+    
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='usage_rollups'
+    )
+    user = models.ForeignKey(
+        'authentication.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='usage_rollups'
+    )
+    platform = models.ForeignKey(
+        'integrations.AIPlatform',
+        on_delete=models.CASCADE,
+        related_name='usage_rollups'
+    )
+    model = models.CharField(max_length=100)
+    
+    requests = models.BigIntegerField(default=0)
+    failed_requests = models.BigIntegerField(default=0)
+    tokens = models.BigIntegerField(default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=6, default=0)
+    response_time_total = models.FloatField(default=0)  # in seconds, summed
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'usage_rollups'
+        verbose_name = 'Usage Rollup'
+        verbose_name_plural = 'Usage Rollups'
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start'], name='usage_rollup_bucket_idx'),
+            models.Index(fields=['granularity', 'user', 'bucket_start'], name='usage_rollup_user_idx'),
+            models.Index(fields=['granularity', 'organization', 'bucket_start'], name='usage_rollup_org_idx'),
+        ]
+        ordering = ['-bucket_start']
+    
+    def __str__(self):
+        return f'{self.granularity} {self.bucket_start:%Y-%m-%d %H:00} {self.model}: {self.requests}'
+
+
+class RollupWatermark(models.Model):
+    """How far a rollup has processed its source rows."""
+    
+    name = models.CharField(max_length=100, unique=True)
+    rolled_until = models.DateTimeField(help_text="Source rows before this time are reflected in the rollups")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'rollup_watermarks'
+        verbose_name = 'Rollup Watermark'
+        verbose_name_plural = 'Rollup Watermarks'
+    
+    def __str__(self):
+        return f'{self.name}: {self.rolled_until}'
@@ -107,6 +107,56 @@ cache_misses = Counter(
     ['cache_type']
 )
 
+# AI response cache metrics
+ai_response_cache_requests = Counter(
+    'hishamos_ai_response_cache_requests_total',
+    'AI response cache lookups',
+    ['platform', 'cache_type', 'result']
+)
+
+ai_response_cache_tokens_saved = Counter(
+    'hishamos_ai_response_cache_tokens_saved_total',
+    'Tokens not spent thanks to AI response cache hits',
+    ['platform']
+)
+
+ai_response_cache_cost_saved = Counter(
+    'hishamos_ai_response_cache_cost_saved_total',
+    'Cost in USD not spent thanks to AI response cache hits',
+    ['platform']
+)
+
+# Shared outbound HTTP pool metrics
+http_pool_connections = Gauge(
+    'hishamos_http_pool_connections',
+    'Connections in the shared outbound HTTP pool',
+    ['host', 'state']
+)
+
+http_pool_waiting_requests = Gauge(
+    'hishamos_http_pool_waiting_requests',
+    'Requests waiting for a free pooled connection',
+    ['host']
+)
+
+http_pool_saturation = Gauge(
+    'hishamos_http_pool_saturation_ratio',
+    'Pooled connections in use divided by max_connections',
+    ['host']
+)
+
+http_pool_connections_opened = Counter(
+    'hishamos_http_pool_connections_opened_total',
+    'New TCP/TLS connections opened by the shared HTTP pool',
+    ['host']
+)
+
+http_pool_timeouts = Counter(
+    'hishamos_http_pool_timeouts_total',
+    'Requests that timed out waiting for a pooled connection',
+    ['host']
+)
+
 # Error metrics
 errors_total = Counter(
     'hishamos_errors_total',
@@ -176,3 +226,29 @@ def record_cache_miss(cache_type: str):
     """Record cache miss."""
     cache_misses.labels(cache_type=cache_type).inc()
 
+
+
+def record_ai_response_cache(platform: str, cache_type: str, hit: bool, tokens_saved: int = 0, cost_saved: float = 0.0):
+    """Record an AI response cache lookup."""
+    ai_response_cache_requests.labels(
+        platform=platform, cache_type=cache_type, result='hit' if hit else 'miss'
+    ).inc()
+    if hit:
+        ai_response_cache_tokens_saved.labels(platform=platform).inc(tokens_saved)
+        ai_response_cache_cost_saved.labels(platform=platform).inc(cost_saved)
+
+
+def record_http_pool_stats(host: str, stats: dict, max_connections: int, pool_timeout: bool = False):
+    """Record shared HTTP pool saturation for an upstream host."""
+    http_pool_connections.labels(host=host, state='active').set(stats.get('active', 0))
+    http_pool_connections.labels(host=host, state='idle').set(stats.get('idle', 0))
+    http_pool_waiting_requests.labels(host=host).set(stats.get('waiting', 0))
+    if max_connections:
+        http_pool_saturation.labels(host=host).set(stats.get('active', 0) / max_connections)
+    if pool_timeout:
+        http_pool_timeouts.labels(host=host).inc()
+
+
+def record_http_pool_connection_opened(host: str):
+    """Record a new connection opened by the shared HTTP pool."""
+    http_pool_connections_opened.labels(host=host).inc()
@@ -4,11 +4,13 @@ Automatically logs create, update, and delete operations for all models.
 """
 
 import logging
-from django.db.models.signals import post_save, pre_save, pre_delete
+import threading
+from contextlib import contextmanager
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
-from .audit import audit_logger
+from .audit import audit_logger, invalidate_audit_configurations
+from .models import AuditConfiguration
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -17,7 +19,7 @@ User = get_user_model()
 _model_old_values = {}
 
 # Models to exclude from automatic auditing (system models, etc.)
-EXCLUDED_MODELS = [
+EXCLUDED_MODELS = frozenset(name.lower() for name in [
     'Session',
     'LogEntry',  # Django admin log
     'ContentType',
@@ -27,18 +29,51 @@ EXCLUDED_MODELS = [
     'AuditConfiguration',  # Don't audit audit configurations
     'SystemMetric',
     'HealthCheck',
-]
+    'SearchDocument',  # Derived search index rows
+    'WorkItemSequence',  # Number counters
+])
+
+# Per-thread switch for callers that write one aggregated audit entry themselves
+_suppression = threading.local()
+
+
+@contextmanager
+def suppress_model_audit():
+    """Skip automatic per-row audit entries for saves and deletes inside the block."""
+    previous = getattr(_suppression, 'active', False)
+    _suppression.active = True
+    try:
+        yield
+    finally:
+        _suppression.active = previous
+
+
+# Model class -> (audit model name, excluded), resolved once per class
+_model_audit_info = {}
+
+
+def get_model_audit_info(model) -> tuple:
+    """Get the audit model name of a model class and whether it is excluded."""
+    info = _model_audit_info.get(model)
+    if info is None:
+        # Same value as ContentType.model, without the content type lookup
+        model_name = model._meta.concrete_model._meta.model_name
+        info = (model_name, model_name in EXCLUDED_MODELS)
+        _model_audit_info[model] = info
+    return info
 
 
 def get_model_name(model_instance) -> str:
     """Get a clean model name for audit logging."""
-    # Get the model's app label and model name
-    content_type = ContentType.objects.get_for_model(model_instance.__class__)
-    model_name = content_type.model
-    
-    # Convert to a more readable format
     # e.g., 'user' instead of 'authentication.user'
-    return model_name
+    return get_model_audit_info(model_instance.__class__)[0]
+
+
+@receiver(post_save, sender=AuditConfiguration)
+@receiver(post_delete, sender=AuditConfiguration)
+def reload_audit_configurations(sender, **kwargs):
+    """Drop the in-process configuration cache when a configuration changes."""
+    invalidate_audit_configurations()
 
 
 @receiver(pre_save)
@@ -49,8 +84,8 @@ def set_tracking_fields(sender, instance, **kwargs):
     """
     try:
         # Skip excluded models
-        model_name = get_model_name(instance)
-        if model_name.lower() in [m.lower() for m in EXCLUDED_MODELS]:
+        model_name, excluded = get_model_audit_info(instance.__class__)
+        if excluded:
             return
         
         # Skip if this is a migration or fixture load
@@ -119,8 +154,8 @@ def audit_model_save(sender, instance, created, **kwargs):
     """
     try:
         # Skip excluded models
-        model_name = get_model_name(instance)
-        if model_name.lower() in [m.lower() for m in EXCLUDED_MODELS]:
+        model_name, excluded = get_model_audit_info(instance.__class__)
+        if excluded or getattr(_suppression, 'active', False):
             return
         
         # Skip if this is a migration or fixture load
@@ -268,8 +303,8 @@ def audit_model_delete(sender, instance, **kwargs):
     """
     try:
         # Skip excluded models
-        model_name = get_model_name(instance)
-        if model_name.lower() in [m.lower() for m in EXCLUDED_MODELS]:
+        model_name, excluded = get_model_audit_info(instance.__class__)
+        if excluded or getattr(_suppression, 'active', False):
             return
         
         # Skip if this is a migration or fixture load
@@ -0,0 +1,35 @@
+"""
+Celery tasks for monitoring.
+"""
+
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_audit_events():
+    """
+    Bulk-insert audit events queued in Redis (AUDIT_SINK_BACKEND = 'redis').
+    
+    Scheduled every few seconds by Celery beat; a no-op for other backends.
+    """
+    from apps.monitoring.audit_sink import audit_sink
+    
+    written = audit_sink.flush_redis()
+    if written:
+        logger.info(f"[flush_audit_events] Wrote {written} audit events")
+    return written
+
+
+@shared_task(ignore_result=True)
+def roll_up_usage():
+    """
+    Refresh the hourly and daily usage rollups read by the analytics endpoints.
+    
+    Scheduled every few minutes by Celery beat.
+    """
+    from apps.monitoring.usage_rollups import roll_up_usage as run_rollup
+    
+    return run_rollup()
@@ -0,0 +1,246 @@
+"""
+Usage Rollups
+
+Keeps hourly and daily aggregates of PlatformUsage per (organization, user,
+platform, model) so analytics read a few rollup rows instead of grouping raw
+usage over months.
+
+``roll_up_usage`` (scheduled by Celery beat) re-aggregates every closed hour
+from the watermark, minus USAGE_ROLLUP_LATE_WINDOW_HOURS so rows written
+after their hour was rolled up are picked up, and rebuilds the daily rows of
+the days it touched. PlatformUsage.timestamp is the time the request was
+recorded, so the window has to cover the usage accumulator's flush delay
+plus commit lag. ``aggregate_usage`` answers a query from daily rollups
+for whole days, hourly rollups for the edges, and raw rows only after the
+watermark (the current, partial hour).
+"""
+
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'platform_usage'
+
+DIMENSIONS = ['organization_id', 'user_id', 'platform_id', 'model']
+MEASURES = ['requests', 'failed_requests', 'tokens', 'cost', 'response_time_total']
+
+DATE_TRUNCS = {
+    'date': TruncDate,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_watermark() -> Optional[datetime]:
+    """End of the range the hourly rollups cover, or None before the first run."""
+    from apps.monitoring.models import RollupWatermark
+    
+    return RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list('rolled_until', flat=True).first()
+
+
+def _raw_measures() -> Dict[str, Any]:
+    succeeded = Q(success=True)
+    return {
+        'requests': Count('id', filter=succeeded),
+        'failed_requests': Count('id', filter=Q(success=False)),
+        'tokens': Sum('tokens_used', filter=succeeded),
+        'cost': Sum('cost', filter=succeeded),
+        'response_time_total': Sum('response_time', filter=succeeded),
+    }
+
+
+def _rollup_measures() -> Dict[str, Any]:
+    return {measure: Sum(measure) for measure in MEASURES}
+
+
+def _roll_hours(start: datetime, end: datetime) -> int:
+    from apps.integrations.models import PlatformUsage
+    from apps.monitoring.models import UsageRollup
+    
+    rows = (
+        PlatformUsage.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(bucket=TruncHour('timestamp'))
+        .values('bucket', 'user__organization_id', 'user_id', 'platform_id', 'model')
+        .annotate(**_raw_measures())
+        .order_by()
+    )
+    rollups = [
+        UsageRollup(
+            granularity='hour',
+            bucket_start=row['bucket'],
+            organization_id=row['user__organization_id'],
+            user_id=row['user_id'],
+            platform_id=row['platform_id'],
+            model=row['model'],
+            **{measure: row[measure] or 0 for measure in MEASURES}
+        )
+        for row in rows
+    ]
+    
+    with transaction.atomic():
+        UsageRollup.objects.filter(granularity='hour', bucket_start__gte=start, bucket_start__lt=end).delete()
+        UsageRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def _roll_days(start: datetime, end: datetime) -> int:
+    from apps.monitoring.models import UsageRollup
+    
+    rows = (
+        UsageRollup.objects.filter(granularity='hour', bucket_start__gte=start, bucket_start__lt=end)
+        .annotate(bucket=TruncDay('bucket_start'))
+        .values('bucket', *DIMENSIONS)
+        .annotate(**_rollup_measures())
+        .order_by()
+    )
+    rollups = [
+        UsageRollup(
+            granularity='day',
+            bucket_start=row['bucket'],
+            **{field: row[field] for field in DIMENSIONS},
+            **{measure: row[measure] or 0 for measure in MEASURES}
+        )
+        for row in rows
+    ]
+    
+    with transaction.atomic():
+        UsageRollup.objects.filter(granularity='day', bucket_start__gte=start, bucket_start__lt=end).delete()
+        UsageRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def roll_up_usage(now: Optional[datetime] = None, since: Optional[datetime] = None) -> int:
+    """
+    Bring the rollups up to the last closed hour.
+    
+    Args:
+        now: Current time (for tests)
+        since: Re-roll from this time instead of the watermark (backfills)
+    
+    Returns:
+        Number of hourly rollup rows written
+    """
+    from apps.integrations.models import PlatformUsage
+    from apps.monitoring.models import RollupWatermark
+    
+    end = floor_hour(now or timezone.now())
+    watermark = get_watermark()
+    
+    if since is not None:
+        start = since
+    elif watermark is not None:
+        start = min(watermark, end) - timedelta(hours=getattr(settings, 'USAGE_ROLLUP_LATE_WINDOW_HOURS', 2))
+    else:
+        start = PlatformUsage.objects.order_by('timestamp').values_list('timestamp', flat=True).first() or end
+    start = floor_hour(start)
+    
+    written = 0
+    # One day per transaction keeps each delete/insert bounded
+    day = start
+    while day < end:
+        next_day = min(floor_day(day) + timedelta(days=1), end)
+        written += _roll_hours(day, next_day)
+        day = next_day
+    
+    # Daily rows only for days whose hours are all closed
+    first_day, last_day = floor_day(start), floor_day(end)
+    if first_day < last_day:
+        _roll_days(first_day, last_day)
+    
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'rolled_until': end})
+    
+    if written:
+        logger.info(f"[UsageRollups] Rolled up {written} hourly buckets from {start.isoformat()} to {end.isoformat()}")
+    return written
+
+
+def aggregate_usage(
+    start: Optional[datetime] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    group_by: Iterable[str] = (),
+    date_trunc: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Aggregate usage since ``start`` (from the start of its hour) until now.
+    
+    Args:
+        start: Beginning of the range, or None for all time
+        filters: Lookups valid on both PlatformUsage and UsageRollup
+            (e.g. ``platform__platform_name``, ``user_id``)
+        group_by: Lookups valid on both models (e.g. ``model``, ``user__email``)
+        date_trunc: Also group by 'date', 'week' or 'month' (added as that key)
+    
+    Returns:
+        One dict per group with the group values and MEASURES
+    """
+    from apps.integrations.models import PlatformUsage
+    from apps.monitoring.models import UsageRollup
+    
+    filters = filters or {}
+    fields = list(group_by) + ([date_trunc] if date_trunc else [])
+    start = floor_hour(start) if start else None
+    watermark = get_watermark()
+    
+    sources = []  # (queryset, time field, measures)
+    if watermark is not None:
+        first_day = floor_day(start) + timedelta(days=1) if start and start != floor_day(start) else start
+        day_end = floor_day(watermark)
+        
+        def rollups(granularity, range_start, range_end):
+            queryset = UsageRollup.objects.filter(granularity=granularity, bucket_start__lt=range_end)
+            if range_start is not None:
+                if range_start >= range_end:
+                    return
+                queryset = queryset.filter(bucket_start__gte=range_start)
+            sources.append((queryset, 'bucket_start', _rollup_measures()))
+        
+        if first_day is not None and first_day >= day_end:
+            rollups('hour', start, watermark)
+        else:
+            if start is not None:
+                rollups('hour', start, first_day)
+            rollups('day', first_day, day_end)
+            rollups('hour', day_end, watermark)
+        raw = PlatformUsage.objects.filter(timestamp__gte=max(watermark, start) if start else watermark)
+    else:
+        raw = PlatformUsage.objects.filter(timestamp__gte=start) if start else PlatformUsage.objects.all()
+    sources.append((raw, 'timestamp', _raw_measures()))
+    
+    merged: Dict[tuple, Dict[str, Any]] = OrderedDict()
+    for queryset, time_field, measures in sources:
+        queryset = queryset.filter(**filters)
+        if date_trunc:
+            queryset = queryset.annotate(**{date_trunc: DATE_TRUNCS[date_trunc](time_field)})
+        if fields:
+            rows = queryset.values(*fields).annotate(**measures).order_by()
+        else:
+            rows = [queryset.aggregate(**measures)]
+        for row in rows:
+            key = tuple(row[field] for field in fields)
+            group = merged.get(key)
+            if group is None:
+                group = merged[key] = {field: row[field] for field in fields}
+                group.update({measure: 0 for measure in MEASURES})
+                group['cost'] = Decimal('0')
+            for measure in MEASURES:
+                group[measure] += row[measure] or 0
+    
+    return list(merged.values())
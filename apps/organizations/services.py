@@ -238,6 +238,9 @@ class SubscriptionService:
         """
         Get usage count for a specific feature in the current or specified month.
         
+        Reads the live counter kept by the usage accumulator, which includes
+        increments not yet written to OrganizationUsage.
+        
         Args:
             organization: Organization instance
             usage_type: Type of usage ('agent_executions', 'workflow_executions', 'chat_messages', 'command_executions')
@@ -247,23 +250,14 @@ class SubscriptionService:
         Returns:
             int: Usage count for the period
         """
-        from apps.organizations.models import OrganizationUsage
+        from apps.integrations.services.usage_accumulator import usage_accumulator
         
         if month is None:
             month = timezone.now().month
         if year is None:
             year = timezone.now().year
         
-        try:
-            usage = OrganizationUsage.objects.get(
-                organization=organization,
-                usage_type=usage_type,
-                month=month,
-                year=year
-            )
-            return usage.count
-        except OrganizationUsage.DoesNotExist:
-            return 0
+        return usage_accumulator.get_org_usage(organization.id, usage_type, year, month)
     
     @classmethod
     def check_usage_limit(cls, organization, usage_type: str, user=None, raise_exception=True):
@@ -339,26 +333,16 @@ class SubscriptionService:
         """
         Increment usage count for a feature.
         
+        The OrganizationUsage row is updated behind (see usage_accumulator);
+        the live counter used by limit checks is updated immediately.
+        
         Args:
             organization: Organization instance
             usage_type: Type of usage ('agent_executions', 'workflow_executions', etc.)
         """
-        from apps.organizations.models import OrganizationUsage
-        
-        now = timezone.now()
-        month = now.month
-        year = now.year
-        
-        usage, created = OrganizationUsage.objects.get_or_create(
-            organization=organization,
-            usage_type=usage_type,
-            month=month,
-            year=year,
-            defaults={'count': 0}
-        )
+        from apps.integrations.services.usage_accumulator import usage_accumulator
         
-        usage.count += 1
-        usage.save(update_fields=['count'])
+        usage_accumulator.increment_org_usage(organization.id, usage_type)
 
 
 class FeatureService:
@@ -0,0 +1,22 @@
+"""
+Management command to rebuild the full-text search index.
+"""
+
+from django.core.management.base import BaseCommand
+from apps.projects.services.search_index import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search documents for all projects, epics, stories, tasks, bugs, and issues'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Objects indexed per batch (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} documents'))
@@ -0,0 +1,125 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+DEFAULT_PREFIXES = {
+    'story': 'STORY-',
+    'task': 'TASK-',
+    'bug': 'BUG-',
+    'issue': 'ISSUE-',
+    'epic': 'EPIC-',
+}
+
+MODEL_NAMES = {
+    'story': 'UserStory',
+    'task': 'Task',
+    'bug': 'Bug',
+    'issue': 'Issue',
+    'epic': 'Epic',
+}
+
+
+def parse_number(num_str, prefix):
+    if not num_str or not num_str.startswith(prefix):
+        return None
+    try:
+        return int(num_str[len(prefix):].split('-')[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def backfill_sequences(apps, schema_editor):
+    """Seed one sequence per project and item type from the highest existing number."""
+    Project = apps.get_model('projects', 'Project')
+    ProjectConfiguration = apps.get_model('projects', 'ProjectConfiguration')
+    WorkItemSequence = apps.get_model('projects', 'WorkItemSequence')
+
+    prefixes_by_project = {
+        config.project_id: {
+            item_type: getattr(config, f'{item_type}_prefix', None) or default
+            for item_type, default in DEFAULT_PREFIXES.items()
+        }
+        for config in ProjectConfiguration.objects.all()
+    }
+
+    # (project_id, item_type) -> highest number with the configured prefix
+    max_numbers = {}
+    for item_type, model_name in MODEL_NAMES.items():
+        model = apps.get_model('projects', model_name)
+        project_field = 'story__project_id' if item_type == 'task' else 'project_id'
+        rows = model.objects.exclude(number__isnull=True).exclude(number='').values_list(project_field, 'number')
+        for project_id, number in rows.iterator():
+            prefix = prefixes_by_project.get(project_id, DEFAULT_PREFIXES)[item_type]
+            value = parse_number(number, prefix)
+            if value is not None and value > max_numbers.get((project_id, item_type), 0):
+                max_numbers[(project_id, item_type)] = value
+
+    project_ids = set(Project.objects.values_list('id', flat=True))
+    WorkItemSequence.objects.bulk_create(
+        [
+            WorkItemSequence(
+                project_id=project_id,
+                item_type=item_type,
+                prefix=prefixes_by_project.get(project_id, DEFAULT_PREFIXES)[item_type],
+                last_number=last_number,
+            )
+            for (project_id, item_type), last_number in max_numbers.items()
+            if project_id in project_ids
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0029_alter_project_description"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WorkItemSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "item_type",
+                    models.CharField(
+                        choices=[
+                            ("story", "Story"),
+                            ("task", "Task"),
+                            ("bug", "Bug"),
+                            ("issue", "Issue"),
+                            ("epic", "Epic"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("prefix", models.CharField(max_length=20)),
+                ("last_number", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="work_item_sequences",
+                        to="projects.project",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Work Item Sequence",
+                "verbose_name_plural": "Work Item Sequences",
+                "db_table": "work_item_sequences",
+                "unique_together": {("project", "item_type", "prefix")},
+            },
+        ),
+        migrations.RunPython(backfill_sequences, migrations.RunPython.noop),
+    ]
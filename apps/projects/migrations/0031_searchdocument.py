@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.contrib.postgres.search
+import django.db.models.deletion
+
+
+def create_fulltext_index(apps, schema_editor):
+    from apps.projects.services.search_index import create_fulltext_index
+
+    create_fulltext_index(schema_editor.connection)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    from apps.projects.services.search_index import drop_fulltext_index
+
+    drop_fulltext_index(schema_editor.connection)
+
+
+def backfill_search_documents(apps, schema_editor):
+    from apps.projects.services.search_index import rebuild_search_index
+
+    rebuild_search_index(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("projects", "0030_workitemsequence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_type",
+                    models.CharField(
+                        choices=[
+                            ("project", "Project"),
+                            ("epic", "Epic"),
+                            ("userstory", "User Story"),
+                            ("task", "Task"),
+                            ("bug", "Bug"),
+                            ("issue", "Issue"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.UUIDField()),
+                ("title", models.CharField(max_length=300)),
+                ("body", models.TextField(blank=True, default="")),
+                ("tags", models.TextField(blank=True, default="")),
+                ("status", models.CharField(blank=True, default="", max_length=50)),
+                ("priority", models.CharField(blank=True, default="", max_length=20)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_index=True, help_text="Creation time of the indexed object"
+                    ),
+                ),
+                ("indexed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        editable=False, null=True
+                    ),
+                ),
+                (
+                    "assignee",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Assigned user (owner for projects and epics)",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="projects.project",
+                    ),
+                ),
+                (
+                    "reporter",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Search Document",
+                "verbose_name_plural": "Search Documents",
+                "db_table": "search_documents",
+                "indexes": [
+                    models.Index(
+                        fields=["project", "content_type"],
+                        name="search_docu_project_fe1aa4_idx",
+                    ),
+                    models.Index(
+                        fields=["content_type", "status"],
+                        name="search_docu_content_6149f1_idx",
+                    ),
+                ],
+                "unique_together": {("content_type", "object_id")},
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
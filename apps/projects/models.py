@@ -6,6 +6,7 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 import re
 
@@ -2446,6 +2447,71 @@ class SearchHistory(models.Model):
         return f'{self.user.email} - {self.query[:50]}...'
 
 
+class SearchDocument(models.Model):
+    """
+    Denormalized full-text search entry for a project or work item.
+    
+    Kept in sync by signals (see apps.projects.services.search_index).
+    On PostgreSQL a trigger fills ``search_vector`` (GIN indexed); on SQLite
+    the rows are mirrored into the ``search_documents_fts`` FTS5 table.
+    """
+    
+    CONTENT_TYPE_CHOICES = [
+        ('project', 'Project'),
+        ('epic', 'Epic'),
+        ('userstory', 'User Story'),
+        ('task', 'Task'),
+        ('bug', 'Bug'),
+        ('issue', 'Issue'),
+    ]
+    
+    content_type = models.CharField(max_length=20, choices=CONTENT_TYPE_CHOICES)
+    object_id = models.UUIDField()
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='search_documents',
+        null=True,
+        blank=True
+    )
+    title = models.CharField(max_length=300)
+    body = models.TextField(blank=True, default='')
+    tags = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=50, blank=True, default='')
+    priority = models.CharField(max_length=20, blank=True, default='')
+    assignee = models.ForeignKey(
+        'authentication.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Assigned user (owner for projects and epics)"
+    )
+    reporter = models.ForeignKey(
+        'authentication.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(db_index=True, help_text="Creation time of the indexed object")
+    indexed_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    class Meta:
+        db_table = 'search_documents'
+        verbose_name = 'Search Document'
+        verbose_name_plural = 'Search Documents'
+        unique_together = [['content_type', 'object_id']]
+        indexes = [
+            models.Index(fields=['project', 'content_type']),
+            models.Index(fields=['content_type', 'status']),
+        ]
+    
+    def __str__(self):
+        return f'{self.content_type}: {self.title[:50]}'
+
+
 class FilterPreset(models.Model):
     """Saved filter presets for quick filtering."""
     
@@ -3607,6 +3673,43 @@ class ProjectMember(models.Model):
         return any(role in self.roles for role in roles)
 
 
+class WorkItemSequence(models.Model):
+    """
+    Last issued work item number per project, item type and prefix.
+    
+    Advanced with a single F() update so numbers are assigned in O(1) and
+    concurrent creators serialize on the row lock; see
+    apps.projects.utils.work_item_numbers.
+    """
+    
+    ITEM_TYPE_CHOICES = [
+        ('story', 'Story'),
+        ('task', 'Task'),
+        ('bug', 'Bug'),
+        ('issue', 'Issue'),
+        ('epic', 'Epic'),
+    ]
+    
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='work_item_sequences'
+    )
+    item_type = models.CharField(max_length=20, choices=ITEM_TYPE_CHOICES)
+    prefix = models.CharField(max_length=20)
+    last_number = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'work_item_sequences'
+        verbose_name = 'Work Item Sequence'
+        verbose_name_plural = 'Work Item Sequences'
+        unique_together = [['project', 'item_type', 'prefix']]
+    
+    def __str__(self):
+        return f'{self.project_id} {self.item_type} {self.prefix}{self.last_number}'
+
+
 class GeneratedProject(models.Model):
     """Tracks a generated project's metadata and status."""
     
@@ -97,12 +97,12 @@ class ActivityLogger:
         )
     
     @staticmethod
-    def log_story_status_changed(story, user, old_status: str, new_status: str):
-        """Log story status change."""
+    def log_story_status_changed(story, user, old_status: Optional[str], new_status: str):
+        """Log story status change (``old_status`` is None for stories created with ``new_status``)."""
         return ActivityLogger.log_activity(
             activity_type='story_status_changed',
             user=user,
-            description=f'Changed story status from {old_status} to {new_status}: {story.title}',
+            description=f'Changed story status from {old_status or "new"} to {new_status}: {story.title}',
             content_object=story,
             metadata={
                 'story_id': str(story.id),
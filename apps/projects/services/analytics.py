@@ -6,9 +6,11 @@ Burndown charts, velocity tracking, and sprint health metrics.
 
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta, date
+from asgiref.sync import sync_to_async
 from django.db.models import Sum, Count, Q, Avg, F, Max, Min
 from django.utils import timezone
 from apps.projects.models import Sprint, UserStory, Project, Task, Bug, Issue, TimeLog, EditHistory
+from apps.projects.services.timeseries import cached_series, get_sprint_burndown, get_sprint_points
 # Alias for backward compatibility
 Story = UserStory
 
@@ -35,12 +37,11 @@ class ProjectAnalytics:
         """
         sprint = await Sprint.objects.aget(id=sprint_id)
         
-        # Get all stories in sprint
-        stories = await Story.objects.filter(sprint=sprint).alist()
-        stories_list = list(stories)
-        
-        # Calculate total points
-        total_points = sum(s.story_points for s in stories_list)
+        burndown = await sync_to_async(cached_series)(
+            sprint.project_id, 'burndown', lambda: get_sprint_burndown(sprint), sprint=str(sprint.id)
+        )
+        total_points = burndown['total_points']
+        remaining_by_day = burndown['remaining_points']
         
         # Calculate sprint duration in days
         if sprint.start_date and sprint.end_date:
@@ -55,17 +56,13 @@ class ProjectAnalytics:
         for day in range(sprint_days + 1):
             ideal_burndown[f"day_{day}"] = max(0, total_points - (points_per_day * day))
         
-        # Calculate actual burndown (based on completed stories)
-        actual_burndown = {}
-        completed_points = 0
+        # Actual burndown: day_0 is the sprint start, day_n the end of the n-th sprint day
+        actual_burndown = {"day_0": total_points}
+        for day in range(1, sprint_days + 1):
+            previous = actual_burndown[f"day_{day - 1}"]
+            actual_burndown[f"day_{day}"] = remaining_by_day[day - 1] if day <= len(remaining_by_day) else previous
         
-        for day in range(sprint_days + 1):
-            # Count points completed by this day
-            # In production, would use story completion timestamps
-            completed_stories = [s for s in stories_list if s.status == 'done']
-            completed_points = sum(s.story_points for s in completed_stories)
-            
-            actual_burndown[f"day_{day}"] = total_points - completed_points
+        completed_points = burndown['completed_points'][-1] if burndown['completed_points'] else 0
         
         return {
             "sprint_id": str(sprint.id),
@@ -94,38 +91,33 @@ class ProjectAnalytics:
         Returns:
             Dict with velocity metrics
         """
-        # Get recent completed sprints
-        sprints = await Sprint.objects.filter(
-            project_id=project_id,
-            status='completed'
-        ).order_by('-end_date')[:num_sprints].alist()
+        def load_sprint_velocities():
+            # Recent completed sprints, with their completed points from one grouped query
+            sprints = list(Sprint.objects.filter(
+                project_id=project_id,
+                status='completed'
+            ).order_by('-end_date')[:num_sprints])
+            points = get_sprint_points(sprint.id for sprint in sprints)
+            return [
+                {
+                    "sprint_name": sprint.name,
+                    "velocity": points.get(str(sprint.id), {}).get('completed_points', 0),
+                    "end_date": sprint.end_date.isoformat() if sprint.end_date else None
+                }
+                for sprint in sprints
+            ]
         
-        sprints_list = list(sprints)
+        sprint_velocities = await sync_to_async(cached_series)(
+            project_id, 'sprint_velocities', load_sprint_velocities, num_sprints=num_sprints
+        )
         
-        if not sprints_list:
+        if not sprint_velocities:
             return {
                 "average_velocity": 0,
                 "velocity_trend": "unknown",
                 "sprint_velocities": []
             }
         
-        # Calculate velocity for each sprint
-        sprint_velocities = []
-        
-        for sprint in sprints_list:
-            completed_stories = await Story.objects.filter(
-                sprint=sprint,
-                status='done'
-            ).alist()
-            
-            velocity = sum(s.story_points for s in completed_stories)
-            
-            sprint_velocities.append({
-                "sprint_name": sprint.name,
-                "velocity": velocity,
-                "end_date": sprint.end_date.isoformat() if sprint.end_date else None
-            })
-        
         # Calculate average
         velocities = [sv['velocity'] for sv in sprint_velocities]
         average_velocity = sum(velocities) / len(velocities) if velocities else 0
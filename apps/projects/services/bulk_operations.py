@@ -1,210 +1,439 @@
 """
 Bulk operations service for stories, tasks, bugs, and issues.
 Supports bulk updates, deletions, and status changes.
+
+Items are grouped by type and processed in chunks: each chunk is loaded with
+one ``in_bulk`` query, changed in memory and written back with one
+``bulk_update`` (or one ``DELETE ... WHERE id IN``) inside its own
+transaction. Per-row signals are bypassed, so every chunk records one
+aggregated activity, audit entry and notification instead, refreshes the
+search documents of the rows it changed and emits their work item events
+(automation rules run per item after commit, see work_item_events).
 """
 
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models import Q
-from typing import List, Dict, Any, Optional
-from apps.projects.models import UserStory, Task, Bug, Issue
+from django.utils import timezone
+
 from apps.authentication.models import User
+from apps.projects.models import Activity, Bug, Issue, Project, Task, UserStory
+from apps.projects.services.timeseries import bump_series_version
+from apps.projects.services.work_item_events import work_item_events
+
+logger = logging.getLogger(__name__)
+
+
+# Item type -> model
+ITEM_MODELS = {
+    'story': UserStory,
+    'task': Task,
+    'bug': Bug,
+    'issue': Issue,
+}
+
+# Relations needed to resolve the project and validate statuses without extra queries
+ITEM_RELATED = {
+    'story': ('project__configuration',),
+    'task': ('story__project__configuration',),
+    'bug': ('project',),
+    'issue': ('project',),
+}
+
+# Item type -> search document content type
+SEARCH_CONTENT_TYPES = {
+    'story': 'userstory',
+    'task': 'task',
+    'bug': 'bug',
+    'issue': 'issue',
+}
+
+ACTIVITY_TYPES = {choice for choice, _ in Activity.ACTIVITY_TYPE_CHOICES}
+
+# Called after each chunk with (processed items, total items)
+ProgressCallback = Callable[[int, int], None]
+
+
+def _previous_state(item_type: str, obj) -> Optional[Dict[str, Any]]:
+    """Tracked field values for the work item change event, as the save signals record them."""
+    if item_type == 'story':
+        return {
+            'status': obj.status,
+            'assigned_to': str(obj.assigned_to_id) if obj.assigned_to_id else None,
+            'priority': obj.priority,
+        }
+    if item_type == 'task':
+        return {'status': obj.status}
+    return None
+
+
+def _project_id(item_type: str, obj) -> Optional[Any]:
+    if item_type == 'task':
+        return obj.story.project_id if obj.story_id else None
+    return obj.project_id
 
 
 class BulkOperationsService:
     """Service for performing bulk operations on work items."""
     
     @staticmethod
-    @transaction.atomic
-    def bulk_update_status(items: List[Dict[str, Any]], new_status: str, user: User):
+    def bulk_update_status(
+        items: List[Dict[str, Any]],
+        new_status: str,
+        user: User,
+        progress_callback: Optional[ProgressCallback] = None
+    ):
         """Bulk update status for multiple items."""
-        updated_count = 0
-        errors = []
+        valid_statuses = {}
         
-        for item in items:
-            item_type = item.get('type')  # 'story', 'task', 'bug', 'issue'
-            item_id = item.get('id')
+        def apply(item_type, obj):
+            key = (item_type, _project_id(item_type, obj))
+            if key not in valid_statuses:
+                valid_statuses[key] = set(obj.get_valid_statuses())
+            if new_status not in valid_statuses[key]:
+                return f"Invalid status '{new_status}'"
             
-            try:
-                if item_type == 'story':
-                    obj = UserStory.objects.get(id=item_id)
-                elif item_type == 'task':
-                    obj = Task.objects.get(id=item_id)
-                elif item_type == 'bug':
-                    obj = Bug.objects.get(id=item_id)
-                elif item_type == 'issue':
-                    obj = Issue.objects.get(id=item_id)
-                else:
-                    errors.append(f"Unknown item type: {item_type}")
-                    continue
-                
-                obj.status = new_status
-                obj.updated_by = user
-                obj.save(update_fields=['status', 'updated_at', 'updated_by'])
-                updated_count += 1
-                
-            except Exception as e:
-                errors.append(f"Failed to update {item_type} {item_id}: {str(e)}")
+            changed_fields = ['status']
+            obj.status = new_status
+            if item_type in ('bug', 'issue'):
+                # Mirrors Bug.save()/Issue.save()
+                now = timezone.now()
+                obj.resolved_at = (obj.resolved_at or now) if new_status == 'resolved' else None
+                obj.closed_at = (obj.closed_at or now) if new_status == 'closed' else None
+                changed_fields += ['resolved_at', 'closed_at']
+            return changed_fields
         
-        return {
-            'updated_count': updated_count,
-            'errors': errors,
-        }
+        def record(item_type, project, objs):
+            label = _plural(item_type, len(objs))
+            BulkOperationsService._record_batch(
+                item_type, project, objs, user,
+                activity_type=f'{item_type}_status_changed',
+                description=f"Changed status of {label} to '{new_status}'",
+                metadata={'new_status': new_status},
+                notify=('on_status_change', 'status_change', _assignees(objs)),
+            )
+        
+        return BulkOperationsService._run('update status for', items, user, apply, record, progress_callback)
     
     @staticmethod
-    @transaction.atomic
-    def bulk_assign(items: List[Dict[str, Any]], assignee_id: str, user: User):
+    def bulk_assign(
+        items: List[Dict[str, Any]],
+        assignee_id: str,
+        user: User,
+        progress_callback: Optional[ProgressCallback] = None
+    ):
         """Bulk assign items to a user."""
-        updated_count = 0
-        errors = []
-        
         try:
             assignee = User.objects.get(id=assignee_id)
-        except User.DoesNotExist:
+        except (User.DoesNotExist, ValidationError, ValueError):
             return {
                 'updated_count': 0,
                 'errors': ['Assignee not found'],
+                'item_errors': [],
             }
         
-        for item in items:
-            item_type = item.get('type')
-            item_id = item.get('id')
-            
-            try:
-                if item_type == 'story':
-                    obj = UserStory.objects.get(id=item_id)
-                elif item_type == 'task':
-                    obj = Task.objects.get(id=item_id)
-                elif item_type == 'bug':
-                    obj = Bug.objects.get(id=item_id)
-                elif item_type == 'issue':
-                    obj = Issue.objects.get(id=item_id)
-                else:
-                    errors.append(f"Unknown item type: {item_type}")
-                    continue
-                
-                obj.assigned_to = assignee
-                obj.updated_by = user
-                obj.save(update_fields=['assigned_to', 'updated_at', 'updated_by'])
-                updated_count += 1
-                
-            except Exception as e:
-                errors.append(f"Failed to assign {item_type} {item_id}: {str(e)}")
+        def apply(item_type, obj):
+            obj.assigned_to = assignee
+            return ['assigned_to']
         
-        return {
-            'updated_count': updated_count,
-            'errors': errors,
-        }
+        def record(item_type, project, objs):
+            label = _plural(item_type, len(objs))
+            BulkOperationsService._record_batch(
+                item_type, project, objs, user,
+                activity_type=f'{item_type}_assigned',
+                description=f"Assigned {label} to {assignee.email}",
+                metadata={'assignee_id': str(assignee.id)},
+                notify=('on_assignment', 'assignment', [assignee]),
+            )
+        
+        return BulkOperationsService._run('assign', items, user, apply, record, progress_callback)
     
     @staticmethod
-    @transaction.atomic
-    def bulk_add_labels(items: List[Dict[str, Any]], labels: List[str], user: User):
+    def bulk_add_labels(
+        items: List[Dict[str, Any]],
+        labels: List[str],
+        user: User,
+        progress_callback: Optional[ProgressCallback] = None
+    ):
         """Bulk add labels to items."""
-        updated_count = 0
-        errors = []
         
-        for item in items:
-            item_type = item.get('type')
-            item_id = item.get('id')
-            
-            try:
-                if item_type == 'story':
-                    obj = UserStory.objects.get(id=item_id)
-                elif item_type == 'task':
-                    obj = Task.objects.get(id=item_id)
-                elif item_type == 'bug':
-                    obj = Bug.objects.get(id=item_id)
-                elif item_type == 'issue':
-                    obj = Issue.objects.get(id=item_id)
-                else:
-                    errors.append(f"Unknown item type: {item_type}")
-                    continue
-                
-                # Merge labels
-                current_labels = obj.labels if isinstance(obj.labels, list) else []
-                new_labels = list(set(current_labels + labels))
-                obj.labels = new_labels
-                obj.updated_by = user
-                obj.save(update_fields=['labels', 'updated_at', 'updated_by'])
-                updated_count += 1
-                
-            except Exception as e:
-                errors.append(f"Failed to update labels for {item_type} {item_id}: {str(e)}")
+        def apply(item_type, obj):
+            # Merge labels, keeping existing order
+            current_labels = obj.labels if isinstance(obj.labels, list) else []
+            obj.labels = current_labels + [label for label in labels if label not in current_labels]
+            return ['labels']
         
-        return {
-            'updated_count': updated_count,
-            'errors': errors,
-        }
+        def record(item_type, project, objs):
+            BulkOperationsService._record_batch(
+                item_type, project, objs, user,
+                activity_type='label_added',
+                description=f"Added labels {', '.join(map(str, labels))} to {_plural(item_type, len(objs))}",
+                metadata={'labels': labels},
+            )
+        
+        return BulkOperationsService._run('update labels for', items, user, apply, record, progress_callback)
     
     @staticmethod
-    @transaction.atomic
-    def bulk_delete(items: List[Dict[str, Any]], user: User):
+    def bulk_delete(
+        items: List[Dict[str, Any]],
+        user: User,
+        progress_callback: Optional[ProgressCallback] = None
+    ):
         """Bulk delete items."""
-        deleted_count = 0
-        errors = []
         
-        for item in items:
-            item_type = item.get('type')
-            item_id = item.get('id')
-            
-            try:
-                if item_type == 'story':
-                    obj = UserStory.objects.get(id=item_id)
-                elif item_type == 'task':
-                    obj = Task.objects.get(id=item_id)
-                elif item_type == 'bug':
-                    obj = Bug.objects.get(id=item_id)
-                elif item_type == 'issue':
-                    obj = Issue.objects.get(id=item_id)
-                else:
-                    errors.append(f"Unknown item type: {item_type}")
-                    continue
-                
-                obj.delete()
-                deleted_count += 1
-                
-            except Exception as e:
-                errors.append(f"Failed to delete {item_type} {item_id}: {str(e)}")
+        def record(item_type, project, objs):
+            BulkOperationsService._record_batch(
+                item_type, project, objs, user,
+                activity_type=f'{item_type}_deleted',
+                description=f"Deleted {_plural(item_type, len(objs))}",
+                metadata={'titles': [obj.title for obj in objs]},
+                action='delete',
+                link_objects=False,
+            )
         
-        return {
-            'deleted_count': deleted_count,
-            'errors': errors,
-        }
+        result = BulkOperationsService._run('delete', items, user, None, record, progress_callback)
+        result['deleted_count'] = result.pop('updated_count')
+        return result
     
     @staticmethod
-    @transaction.atomic
-    def bulk_move_to_sprint(items: List[Dict[str, Any]], sprint_id: str, user: User):
+    def bulk_move_to_sprint(
+        items: List[Dict[str, Any]],
+        sprint_id: str,
+        user: User,
+        progress_callback: Optional[ProgressCallback] = None
+    ):
         """Bulk move items to a sprint."""
-        updated_count = 0
-        errors = []
-        
         from apps.projects.models import Sprint
         try:
             sprint = Sprint.objects.get(id=sprint_id)
-        except Sprint.DoesNotExist:
+        except (Sprint.DoesNotExist, ValidationError, ValueError):
             return {
                 'updated_count': 0,
                 'errors': ['Sprint not found'],
+                'item_errors': [],
             }
         
+        def apply(item_type, obj):
+            if item_type != 'story':
+                return f"Cannot move {item_type} to sprint (only stories supported)"
+            obj.sprint = sprint
+            return ['sprint']
+        
+        def record(item_type, project, objs):
+            BulkOperationsService._record_batch(
+                item_type, project, objs, user,
+                activity_type='story_moved_to_sprint',
+                description=f"Moved {_plural(item_type, len(objs))} to sprint '{sprint.name}'",
+                metadata={'sprint_id': str(sprint.id)},
+            )
+        
+        return BulkOperationsService._run('move', items, user, apply, record, progress_callback)
+    
+    @staticmethod
+    def _run(
+        verb: str,
+        items: List[Dict[str, Any]],
+        user: User,
+        apply: Optional[Callable[[str, Any], Any]],
+        record: Callable[[str, Optional[Project], List[Any]], None],
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply an operation to items in chunks.
+        
+        Args:
+            verb: Used in error messages ("Failed to <verb> story <id>")
+            items: [{'type': 'story'|'task'|'bug'|'issue', 'id': ...}, ...]
+            user: User performing the operation
+            apply: Called per loaded item; returns the changed field names, or
+                an error message to skip the item. None deletes the items.
+            record: Called once per chunk and project with the changed items
+            progress_callback: Called after each chunk
+        
+        Returns:
+            Dict with updated_count, errors (messages) and item_errors
+            ({'type', 'id', 'error'} per failed item)
+        """
+        chunk_size = max(1, getattr(settings, 'BULK_OPERATION_CHUNK_SIZE', 500))
+        processed = 0
+        updated_count = 0
+        item_errors = []
+        
+        def fail(item_type, item_id, error):
+            item_errors.append({'type': item_type, 'id': str(item_id) if item_id else None, 'error': error})
+        
+        # Item type -> normalized ids, first occurrence order
+        ids_by_type = defaultdict(dict)
         for item in items:
             item_type = item.get('type')
             item_id = item.get('id')
-            
+            if item_type not in ITEM_MODELS:
+                fail(item_type, item_id, f"Unknown item type: {item_type}")
+                processed += 1
+                continue
             try:
-                if item_type == 'story':
-                    obj = UserStory.objects.get(id=item_id)
-                    obj.sprint = sprint
-                    obj.updated_by = user
-                    obj.save(update_fields=['sprint', 'updated_at', 'updated_by'])
-                    updated_count += 1
-                else:
-                    errors.append(f"Cannot move {item_type} to sprint (only stories supported)")
-                
-            except Exception as e:
-                errors.append(f"Failed to move {item_type} {item_id}: {str(e)}")
+                ids_by_type[item_type][str(uuid.UUID(str(item_id)))] = None
+            except ValueError:
+                fail(item_type, item_id, f"'{item_id}' is not a valid UUID.")
+                processed += 1
+        ids_by_type = {item_type: list(ids) for item_type, ids in ids_by_type.items()}
+        # Duplicates count towards progress once
+        total = processed + sum(len(ids) for ids in ids_by_type.values())
+        
+        for item_type, ids in ids_by_type.items():
+            model = ITEM_MODELS[item_type]
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                try:
+                    updated_count += BulkOperationsService._run_chunk(
+                        item_type, model, chunk, user, apply, record, fail
+                    )
+                except Exception as e:
+                    logger.error(f"Bulk operation failed for {len(chunk)} {item_type} items: {e}", exc_info=True)
+                    for item_id in chunk:
+                        fail(item_type, item_id, str(e))
+                processed += len(chunk)
+                if progress_callback:
+                    progress_callback(processed, total)
         
         return {
             'updated_count': updated_count,
-            'errors': errors,
+            'errors': [
+                error['error'] if error['error'].startswith('Unknown item type')
+                else f"Failed to {verb} {error['type']} {error['id']}: {error['error']}"
+                for error in item_errors
+            ],
+            'item_errors': item_errors,
         }
+    
+    @staticmethod
+    def _run_chunk(item_type, model, ids, user, apply, record, fail) -> int:
+        from apps.monitoring.signals import suppress_model_audit
+        from apps.projects.services.search_index import index_objects
+        
+        with transaction.atomic():
+            objs = model.objects.select_related(*ITEM_RELATED[item_type]).in_bulk(ids)
+            found = {str(pk): obj for pk, obj in objs.items()}
+            
+            changed = []
+            fields = set()
+            previous_by_id = {}
+            for item_id in ids:
+                obj = found.get(item_id)
+                if obj is None:
+                    fail(item_type, item_id, f"{model.__name__} matching query does not exist.")
+                    continue
+                if apply is None:
+                    changed.append(obj)
+                    continue
+                previous = _previous_state(item_type, obj)
+                result = apply(item_type, obj)
+                if isinstance(result, str):
+                    fail(item_type, item_id, result)
+                    continue
+                fields.update(result)
+                changed.append(obj)
+                # Task events only matter for completion (see handle_task_events)
+                if previous is not None and (item_type != 'task' or previous['status'] != obj.status):
+                    previous_by_id[obj.pk] = previous
+            
+            if not changed:
+                return 0
+            
+            if apply is None:
+                # Per-row audit entries are replaced by the aggregated one below
+                with suppress_model_audit():
+                    model.objects.filter(pk__in=[obj.pk for obj in changed]).delete()
+            else:
+                now = timezone.now()
+                for obj in changed:
+                    obj.updated_by = user
+                    obj.updated_at = now
+                model.objects.bulk_update(changed, sorted(fields) + ['updated_by', 'updated_at'])
+                index_objects(SEARCH_CONTENT_TYPES[item_type], changed)
+                work_item_events.emit_bulk(item_type, previous_by_id, actor=user)
+            
+            by_project = defaultdict(list)
+            for obj in changed:
+                by_project[_project_id(item_type, obj)].append(obj)
+            projects = Project.objects.in_bulk([pk for pk in by_project if pk])
+            for project_id, project_objs in by_project.items():
+                record(item_type, projects.get(project_id), project_objs)
+        
+        return len(changed)
+    
+    @staticmethod
+    def _record_batch(
+        item_type: str,
+        project: Optional[Project],
+        objs: List[Any],
+        user: User,
+        activity_type: str,
+        description: str,
+        metadata: Dict[str, Any],
+        notify: Optional[Tuple[str, str, List[User]]] = None,
+        action: str = 'update',
+        link_objects: bool = True
+    ):
+        """Write one activity, one audit entry and one notification per recipient for a chunk."""
+        from apps.monitoring.audit import audit_logger
+        from apps.projects.services.notifications import get_notification_service
+        
+        item_ids = [str(obj.id) for obj in objs]
+        metadata = {**metadata, 'bulk': True, 'item_type': item_type, 'item_ids': item_ids, 'count': len(objs)}
+        
+        if activity_type not in ACTIVITY_TYPES:
+            activity_type = f'{item_type}_updated'
+        content_type = ContentType.objects.get_for_model(objs[0].__class__) if link_objects and len(objs) == 1 else None
+        Activity.objects.create(
+            activity_type=activity_type,
+            user=user,
+            project=project,
+            content_type=content_type,
+            object_id=objs[0].id if content_type else None,
+            description=description,
+            metadata=metadata,
+        )
+        # Queryset updates skip the signals that version cached series
+        bump_series_version(project.id if project else None)
+        
+        audit_logger.log_action(
+            action=action,
+            resource_type=ITEM_MODELS[item_type]._meta.model_name,
+            resource_id=item_ids[0] if len(item_ids) == 1 else f"bulk:{len(item_ids)}",
+            description=description,
+            user=user,
+            changes={'_new_values': metadata},
+        )
+        
+        if notify and project:
+            event_type, notification_type, recipients = notify
+            try:
+                get_notification_service(project).notify_bulk_change(
+                    event_type=event_type,
+                    notification_type=notification_type,
+                    recipients=recipients,
+                    title=f"{description} in {project.name}",
+                    message=f"{user.get_full_name() or user.email}: {description}",
+                    changed_by=user,
+                    metadata=metadata,
+                )
+            except Exception as e:
+                logger.error(f"Error sending bulk change notification: {e}", exc_info=True)
+
+
+def _plural(item_type: str, count: int) -> str:
+    names = {'story': ('story', 'stories')}
+    singular, plural = names.get(item_type, (item_type, f'{item_type}s'))
+    return f"{count} {singular if count == 1 else plural}"
+
 
+def _assignees(objs: List[Any]) -> List[User]:
+    assignee_ids = {obj.assigned_to_id for obj in objs if obj.assigned_to_id}
+    return list(User.objects.filter(id__in=assignee_ids)) if assignee_ids else []
@@ -0,0 +1,378 @@
+"""
+Project dependency graph.
+
+Ordering edges between stories: unresolved StoryDependency rows (the source
+story waits on the target) and StoryLink rows whose type orders work
+(``blocked_by``/``depends_on``: the source waits; ``blocks``/``required_by``:
+the target waits). A project's graph is loaded with two queries and kept per
+process. Dependency and link signals apply each change to the loaded graph
+after commit and move a per-project version in the shared cache, so other
+processes reload on their next read instead of serving a stale graph.
+
+Analysis runs in memory in time linear in stories and edges: one iterative
+Tarjan pass finds the cycles and orders the strongly connected components
+so every component comes after the ones it waits on; closure sizes (int
+bitsets) and the critical path are accumulated over that order.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+
+# Link type -> whether the source story waits on the target; other types do not order work
+LINK_SOURCE_WAITS = {
+    'blocked_by': True,
+    'depends_on': True,
+    'blocks': False,
+    'required_by': False,
+}
+
+GRAPH_VERSION_KEY = 'dependency_graph_version:{project_id}'
+
+EdgeKey = Tuple[str, str]  # ('dependency' | 'link', pk)
+Edge = Tuple[str, str, str]  # (waiting story, blocking story, dependency or link type)
+
+
+def dependency_edge(dependency) -> Optional[Edge]:
+    """Edge of a StoryDependency, or None once it is resolved."""
+    if dependency.resolved:
+        return None
+    return str(dependency.source_story_id), str(dependency.target_story_id), dependency.dependency_type
+
+
+def link_edge(link) -> Optional[Edge]:
+    """Edge of a StoryLink, or None for link types that do not order work."""
+    source_waits = LINK_SOURCE_WAITS.get(link.link_type)
+    if source_waits is None:
+        return None
+    source, target = str(link.source_story_id), str(link.target_story_id)
+    return (source, target, link.link_type) if source_waits else (target, source, link.link_type)
+
+
+class DependencyGraph:
+    """
+    Waits-on edges between stories, indexed both ways.
+    
+    ``upstream[story]`` maps edge keys to the stories it waits on,
+    ``downstream[story]`` to the stories waiting on it.
+    """
+    
+    def __init__(self):
+        self.edges: Dict[EdgeKey, Edge] = {}
+        self.upstream: Dict[str, Dict[EdgeKey, str]] = {}
+        self.downstream: Dict[str, Dict[EdgeKey, str]] = {}
+    
+    @classmethod
+    def load(cls, project_id) -> 'DependencyGraph':
+        """Build a project's graph from its dependencies and links (two queries)."""
+        from apps.projects.models import StoryDependency, StoryLink
+        
+        graph = cls()
+        dependencies = StoryDependency.objects.filter(
+            Q(source_story__project_id=project_id) | Q(target_story__project_id=project_id),
+            resolved=False
+        ).values_list('id', 'source_story_id', 'target_story_id', 'dependency_type')
+        for pk, source, target, dependency_type in dependencies:
+            graph.add_edge(('dependency', str(pk)), (str(source), str(target), dependency_type))
+        
+        links = StoryLink.objects.filter(
+            project_id=project_id,
+            link_type__in=list(LINK_SOURCE_WAITS)
+        ).values_list('id', 'source_story_id', 'target_story_id', 'link_type')
+        for pk, source, target, link_type in links:
+            source, target = str(source), str(target)
+            edge = (source, target, link_type) if LINK_SOURCE_WAITS[link_type] else (target, source, link_type)
+            graph.add_edge(('link', str(pk)), edge)
+        return graph
+    
+    def copy(self) -> 'DependencyGraph':
+        graph = DependencyGraph()
+        graph.edges = dict(self.edges)
+        graph.upstream = {node: dict(edges) for node, edges in self.upstream.items()}
+        graph.downstream = {node: dict(edges) for node, edges in self.downstream.items()}
+        return graph
+    
+    def add_edge(self, key: EdgeKey, edge: Edge):
+        """Add an edge, replacing the one stored under the same key."""
+        self.remove_edge(key)
+        waiting, blocking, _ = edge
+        self.edges[key] = edge
+        self.upstream.setdefault(waiting, {})[key] = blocking
+        self.downstream.setdefault(blocking, {})[key] = waiting
+    
+    def remove_edge(self, key: EdgeKey):
+        edge = self.edges.pop(key, None)
+        if edge is None:
+            return
+        waiting, blocking, _ = edge
+        for index, node in ((self.upstream, waiting), (self.downstream, blocking)):
+            index[node].pop(key, None)
+            if not index[node]:
+                del index[node]
+    
+    @property
+    def nodes(self) -> set:
+        return set(self.upstream) | set(self.downstream)
+    
+    def blocking(self, story_id: str) -> List[Tuple[str, str]]:
+        """(story, type) of every edge the story waits on."""
+        return [(blocking, self.edges[key][2]) for key, blocking in self.upstream.get(story_id, {}).items()]
+    
+    def blocked(self, story_id: str) -> List[Tuple[str, str]]:
+        """(story, type) of every edge waiting on the story."""
+        return [(waiting, self.edges[key][2]) for key, waiting in self.downstream.get(story_id, {}).items()]
+    
+    def walk(self, story_id: str, direction: str = 'up') -> Iterator[str]:
+        """Stories reachable from a story, nearest first ('up': what it waits on, 'down': what waits on it)."""
+        index = self.upstream if direction == 'up' else self.downstream
+        seen = {story_id}
+        queue = deque([story_id])
+        while queue:
+            for neighbor in index.get(queue.popleft(), {}).values():
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+                    yield neighbor
+    
+    def would_create_cycle(self, waiting: str, blocking: str) -> bool:
+        """Whether making ``waiting`` wait on ``blocking`` closes a cycle."""
+        waiting, blocking = str(waiting), str(blocking)
+        return waiting == blocking or any(node == waiting for node in self.walk(blocking, 'up'))
+    
+    def strongly_connected_components(self) -> List[List[str]]:
+        """
+        Tarjan's algorithm, iterative.
+        
+        Components come out in dependency order: each after every component
+        it waits on.
+        """
+        index_of: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        
+        for root in self.nodes:
+            if root in index_of:
+                continue
+            index_of[root] = lowlink[root] = len(index_of)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.upstream.get(root, {}).values()))]
+            while work:
+                node, neighbors = work[-1]
+                descended = False
+                for neighbor in neighbors:
+                    if neighbor not in index_of:
+                        index_of[neighbor] = lowlink[neighbor] = len(index_of)
+                        stack.append(neighbor)
+                        on_stack.add(neighbor)
+                        work.append((neighbor, iter(self.upstream.get(neighbor, {}).values())))
+                        descended = True
+                        break
+                    if neighbor in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[neighbor])
+                if descended:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+        return components
+    
+    def analyze(self, weights: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """
+        Cycles, transitive closure sizes and the critical path.
+        
+        Args:
+            weights: Remaining work per story (stories not listed weigh 0)
+        
+        Returns:
+            Dict with ``cycles`` (lists of story ids), ``upstream_counts`` and
+            ``downstream_counts`` (stories transitively waited on / waiting,
+            per story), ``critical_path`` (story ids, first to do first) and
+            ``critical_path_weight``
+        """
+        weights = weights or {}
+        components = self.strongly_connected_components()
+        component_of = {node: i for i, component in enumerate(components) for node in component}
+        bit_of = {node: 1 << bit for bit, node in enumerate(component_of)}
+        masks = [sum(bit_of[node] for node in component) for component in components]
+        
+        def neighbors(i, index):
+            found = set()
+            for node in components[i]:
+                for neighbor in index.get(node, {}).values():
+                    j = component_of[neighbor]
+                    if j != i:
+                        found.add(j)
+            return found
+        
+        # Dependency order: everything a component waits on is already done
+        up_reach = [0] * len(components)
+        finish = [0] * len(components)
+        previous: List[Optional[int]] = [None] * len(components)
+        for i in range(len(components)):
+            best = None
+            for j in neighbors(i, self.upstream):
+                up_reach[i] |= masks[j] | up_reach[j]
+                if best is None or finish[j] > finish[best]:
+                    best = j
+            previous[i] = best
+            finish[i] = sum(weights.get(node, 0) for node in components[i]) + (finish[best] if best is not None else 0)
+        
+        # Reverse order for the stories waiting on each component
+        down_reach = [0] * len(components)
+        for i in reversed(range(len(components))):
+            for j in neighbors(i, self.downstream):
+                down_reach[i] |= masks[j] | down_reach[j]
+        
+        cycles = []
+        upstream_counts: Dict[str, int] = {}
+        downstream_counts: Dict[str, int] = {}
+        for i, component in enumerate(components):
+            in_cycle = len(component) > 1 or component[0] in self.upstream.get(component[0], {}).values()
+            if in_cycle:
+                cycles.append(sorted(component))
+            # Stories in a cycle reach each other (and themselves, which is not counted)
+            own = masks[i] if in_cycle else 0
+            for node in component:
+                upstream_counts[node] = ((up_reach[i] | own) & ~bit_of[node]).bit_count()
+                downstream_counts[node] = ((down_reach[i] | own) & ~bit_of[node]).bit_count()
+        
+        critical_path: List[str] = []
+        critical_path_weight = 0
+        if components and max(finish) > 0:
+            last = max(range(len(components)), key=finish.__getitem__)
+            critical_path_weight = finish[last]
+            while last is not None:
+                critical_path[:0] = sorted(components[last])
+                last = previous[last]
+        
+        return {
+            'cycles': cycles,
+            'upstream_counts': upstream_counts,
+            'downstream_counts': downstream_counts,
+            'critical_path': critical_path,
+            'critical_path_weight': critical_path_weight,
+        }
+
+
+class DependencyGraphCache:
+    """Per-process project graphs, checked against a version in the shared cache."""
+    
+    def __init__(self):
+        self._graphs: 'OrderedDict[str, Tuple[int, DependencyGraph]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @property
+    def max_projects(self) -> int:
+        return max(1, getattr(settings, 'DEPENDENCY_GRAPH_CACHE_SIZE', 100))
+    
+    def get(self, project_id) -> DependencyGraph:
+        """A project's graph; loaded when this process has none or it is out of date."""
+        project_id = str(project_id)
+        version = self._get_version(project_id)
+        with self._lock:
+            cached = self._graphs.get(project_id)
+            if cached and cached[0] == version:
+                self._graphs.move_to_end(project_id)
+                return cached[1]
+        
+        graph = DependencyGraph.load(project_id)
+        self._store(project_id, version, graph)
+        return graph
+    
+    def dependency_changed(self, dependency, deleted: bool = False):
+        """Apply a saved or deleted StoryDependency after commit."""
+        from apps.projects.models import UserStory
+        
+        project_ids = set(
+            UserStory.objects.filter(
+                pk__in=[dependency.source_story_id, dependency.target_story_id]
+            ).values_list('project_id', flat=True)
+        )
+        edge = None if deleted else dependency_edge(dependency)
+        self._on_commit(project_ids, ('dependency', str(dependency.pk)), edge)
+    
+    def link_changed(self, link, deleted: bool = False):
+        """Apply a saved or deleted StoryLink after commit."""
+        edge = None if deleted else link_edge(link)
+        self._on_commit([link.project_id], ('link', str(link.pk)), edge)
+    
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+    
+    def _on_commit(self, project_ids: Iterable, key: EdgeKey, edge: Optional[Edge]):
+        project_ids = [str(project_id) for project_id in project_ids if project_id]
+        
+        def apply():
+            for project_id in project_ids:
+                version = self._bump_version(project_id)
+                with self._lock:
+                    cached = self._graphs.pop(project_id, None)
+                if not cached or version is None or cached[0] != version - 1:
+                    # Not loaded here, or missed another change: reload on next read
+                    continue
+                # Copy so readers holding the old graph never see it change
+                graph = cached[1].copy()
+                if edge is None:
+                    graph.remove_edge(key)
+                else:
+                    graph.add_edge(key, edge)
+                self._store(project_id, version, graph)
+        
+        transaction.on_commit(apply)
+    
+    def _store(self, project_id: str, version: int, graph: DependencyGraph):
+        with self._lock:
+            self._graphs[project_id] = (version, graph)
+            self._graphs.move_to_end(project_id)
+            while len(self._graphs) > self.max_projects:
+                self._graphs.popitem(last=False)
+    
+    @staticmethod
+    def _get_version(project_id: str) -> int:
+        key = GRAPH_VERSION_KEY.format(project_id=project_id)
+        version = cache.get(key)
+        if version is None:
+            # Seeded from the clock so an evicted version never matches an old graph
+            version = time.time_ns()
+            if not cache.add(key, version, None):
+                version = cache.get(key) or version
+        return version
+    
+    @staticmethod
+    def _bump_version(project_id: str) -> Optional[int]:
+        key = GRAPH_VERSION_KEY.format(project_id=project_id)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+        except Exception as e:
+            logger.warning(f"[DependencyGraph] Could not bump graph version for project {project_id}: {e}")
+        return None
+
+
+# Global instance
+dependency_graphs = DependencyGraphCache()
@@ -1,84 +1,67 @@
 """
 Dependency Impact Analysis Service.
 Analyzes the impact of dependencies on stories and provides insights.
+
+Dependencies and links come from the project's in-memory dependency graph
+(see dependency_graph); only story attributes are read per call.
 """
 
-from django.db.models import Q, Count, Prefetch
-from typing import Dict, List, Optional, Set
-from apps.projects.models import UserStory, StoryDependency, StoryLink
+from typing import Dict, List, Tuple
+from apps.projects.models import UserStory
+from apps.projects.services.dependency_graph import DependencyGraph, dependency_graphs
+
+STORY_FIELDS = ('id', 'title', 'status', 'priority', 'story_points', 'project_id')
 
 
 class DependencyImpactService:
     """Service for analyzing dependency impact."""
     
     @staticmethod
-    def analyze_impact(story_id: str) -> Dict:
-        """
-        Analyze the impact of a story's dependencies.
-        
-        Returns:
-            Dict with impact analysis including:
-            - blocking_stories: Stories that block this one
-            - blocked_stories: Stories blocked by this one
-            - impact_score: Overall impact score
-            - critical_path: Whether this story is on a critical path
-            - estimated_delay: Estimated delay if dependencies aren't resolved
-        """
-        try:
-            story = UserStory.objects.select_related('project').prefetch_related(
-                'dependencies',
-                'blocking_dependencies',
-                'story_links'
-            ).get(pk=story_id)
-        except UserStory.DoesNotExist:
-            return {'error': 'Story not found'}
-        
-        # Get blocking dependencies (stories this one depends on)
-        # StoryDependency uses source_story and target_story, not story and depends_on
-        blocking_deps = StoryDependency.objects.filter(
-            source_story=story,
-            resolved=False
-        ).select_related('target_story')
-        
-        # Get blocked dependencies (stories that depend on this one)
-        blocked_deps = StoryDependency.objects.filter(
-            target_story=story,
-            resolved=False
-        ).select_related('source_story')
-        
-        # Get story links
-        blocking_links = StoryLink.objects.filter(
-            target_content_type__model='userstory',
-            target_object_id=story_id,
-            link_type__in=['blocks', 'depends_on']
-        ).select_related('source_content_type')
-        
-        blocked_links = StoryLink.objects.filter(
-            source_content_type__model='userstory',
-            source_object_id=story_id,
-            link_type__in=['blocks', 'depends_on']
-        ).select_related('target_content_type')
-        
-        # Calculate impact metrics
-        blocking_stories = []
-        for dep in blocking_deps:
-            blocking_stories.append({
-                'id': str(dep.target_story.id),
-                'title': dep.target_story.title,
-                'status': dep.target_story.status,
-                'dependency_type': dep.dependency_type,
-                'resolved': dep.resolved,
-            })
-        
-        blocked_stories = []
-        for dep in blocked_deps:
-            blocked_stories.append({
-                'id': str(dep.source_story.id),
-                'title': dep.source_story.title,
-                'status': dep.source_story.status,
-                'dependency_type': dep.dependency_type,
-                'resolved': dep.resolved,
-            })
+    def _load_project(project_id) -> Tuple[DependencyGraph, Dict[str, Dict], Dict]:
+        """Graph, story attributes and graph analysis of a project."""
+        graph = dependency_graphs.get(project_id)
+        stories = {
+            str(row['id']): row
+            for row in UserStory.objects.filter(project_id=project_id).values(*STORY_FIELDS)
+        }
+        # Dependencies may cross into other projects
+        missing = graph.nodes - stories.keys()
+        if missing:
+            stories.update(
+                (str(row['id']), row)
+                for row in UserStory.objects.filter(id__in=list(missing)).values(*STORY_FIELDS)
+            )
+        
+        # Critical path weight: remaining points, done stories weigh nothing
+        weights = {
+            story_id: 0 if row['status'] == 'done' else (row['story_points'] or 1)
+            for story_id, row in stories.items()
+        }
+        return graph, stories, graph.analyze(weights)
+    
+    @staticmethod
+    def _story_impact(story_id: str, graph: DependencyGraph, stories: Dict[str, Dict], analysis: Dict,
+                      critical_path: set) -> Dict:
+        """Impact of one story, from the project graph and its analysis."""
+        story = stories[story_id]
+        
+        def describe(edges: List[Tuple[str, str]]) -> List[Dict]:
+            return [
+                {
+                    'id': other_id,
+                    'title': stories[other_id]['title'],
+                    'status': stories[other_id]['status'],
+                    'dependency_type': edge_type,
+                    'resolved': False,
+                }
+                for other_id, edge_type in edges
+                if other_id in stories
+            ]
+        
+        # Stories this one waits on, and stories waiting on it (unresolved edges only)
+        blocking_stories = describe(graph.blocking(story_id))
+        blocked_stories = describe(graph.blocked(story_id))
+        transitive_blocked = analysis['downstream_counts'].get(story_id, 0)
         
         # Calculate impact score (0-100)
         # Higher score = more critical
@@ -87,52 +70,73 @@ class DependencyImpactService:
         # Blocking stories increase impact
         impact_score += len(blocking_stories) * 10
         
-        # Blocked stories increase impact
+        # Blocked stories increase impact, indirect ones less so
         impact_score += len(blocked_stories) * 15
+        impact_score += max(0, transitive_blocked - len(blocked_stories)) * 5
         
         # Unresolved dependencies increase impact
-        unresolved_blocking = sum(1 for s in blocking_stories if not s.get('resolved', True))
+        unresolved_blocking = len(blocking_stories)
         impact_score += unresolved_blocking * 20
         
         # Status-based impact
-        if story.status in ['in_progress', 'review']:
+        if story['status'] in ['in_progress', 'review']:
             impact_score += 20
-        elif story.status == 'done':
+        elif story['status'] == 'done':
             impact_score -= 10
         
         # Priority-based impact
         priority_weights = {'critical': 30, 'high': 20, 'medium': 10, 'low': 5}
-        impact_score += priority_weights.get(story.priority, 0)
+        impact_score += priority_weights.get(story['priority'], 0)
         
         impact_score = min(100, max(0, impact_score))
         
-        # Check if on critical path
-        is_critical = len(blocked_stories) > 0 and len(blocking_stories) > 0
-        
         # Estimate delay
         estimated_delay = 0
         for blocking in blocking_stories:
-            if not blocking.get('resolved', True):
-                # Estimate delay based on blocking story status
-                if blocking['status'] in ['backlog', 'todo']:
-                    estimated_delay += 3  # days
-                elif blocking['status'] == 'in_progress':
-                    estimated_delay += 1  # days
+            # Estimate delay based on blocking story status
+            if blocking['status'] in ['backlog', 'todo']:
+                estimated_delay += 3  # days
+            elif blocking['status'] == 'in_progress':
+                estimated_delay += 1  # days
         
         return {
-            'story_id': str(story.id),
-            'story_title': story.title,
+            'story_id': story_id,
+            'story_title': story['title'],
             'blocking_stories': blocking_stories,
             'blocked_stories': blocked_stories,
             'blocking_count': len(blocking_stories),
             'blocked_count': len(blocked_stories),
+            'transitive_blocking_count': analysis['upstream_counts'].get(story_id, 0),
+            'transitive_blocked_count': transitive_blocked,
             'impact_score': impact_score,
-            'is_critical_path': is_critical,
+            'is_critical_path': story_id in critical_path,
             'estimated_delay_days': estimated_delay,
             'unresolved_blocking': unresolved_blocking,
             'risk_level': 'high' if impact_score > 70 else 'medium' if impact_score > 40 else 'low',
         }
     
+    @staticmethod
+    def analyze_impact(story_id: str) -> Dict:
+        """
+        Analyze the impact of a story's dependencies.
+        
+        Returns:
+            Dict with impact analysis including:
+            - blocking_stories: Stories that block this one
+            - blocked_stories: Stories blocked by this one
+            - impact_score: Overall impact score
+            - critical_path: Whether this story is on the project's critical path
+            - estimated_delay: Estimated delay if dependencies aren't resolved
+        """
+        story = UserStory.objects.filter(pk=story_id).values('id', 'project_id').first()
+        if story is None:
+            return {'error': 'Story not found'}
+        
+        graph, stories, analysis = DependencyImpactService._load_project(story['project_id'])
+        return DependencyImpactService._story_impact(
+            str(story['id']), graph, stories, analysis, set(analysis['critical_path'])
+        )
+    
     @staticmethod
     def analyze_project_impact(project_id: str) -> Dict:
         """
@@ -141,26 +145,28 @@ class DependencyImpactService:
         Returns:
             Dict with project-wide impact analysis
         """
-        stories = UserStory.objects.filter(project_id=project_id).select_related('project')
+        graph, stories, analysis = DependencyImpactService._load_project(project_id)
+        critical_path = set(analysis['critical_path'])
         
         impact_data = []
         total_blocking = 0
         total_blocked = 0
         critical_stories = []
         
-        for story in stories:
-            analysis = DependencyImpactService.analyze_impact(str(story.id))
-            if 'error' not in analysis:
-                impact_data.append(analysis)
-                total_blocking += analysis['blocking_count']
-                total_blocked += analysis['blocked_count']
-                
-                if analysis['is_critical_path']:
-                    critical_stories.append({
-                        'id': analysis['story_id'],
-                        'title': analysis['story_title'],
-                        'impact_score': analysis['impact_score'],
-                    })
+        for story_id, story in stories.items():
+            if str(story['project_id']) != str(project_id):
+                continue
+            analysis_data = DependencyImpactService._story_impact(story_id, graph, stories, analysis, critical_path)
+            impact_data.append(analysis_data)
+            total_blocking += analysis_data['blocking_count']
+            total_blocked += analysis_data['blocked_count']
+            
+            if analysis_data['is_critical_path']:
+                critical_stories.append({
+                    'id': analysis_data['story_id'],
+                    'title': analysis_data['story_title'],
+                    'impact_score': analysis_data['impact_score'],
+                })
         
         # Sort by impact score
         impact_data.sort(key=lambda x: x['impact_score'], reverse=True)
@@ -172,6 +178,9 @@ class DependencyImpactService:
             'total_blocking_dependencies': total_blocking,
             'total_blocked_dependencies': total_blocked,
             'critical_path_stories': critical_stories,
+            'critical_path': analysis['critical_path'],
+            'critical_path_points': analysis['critical_path_weight'],
+            'circular_dependencies': analysis['cycles'],
             'high_impact_stories': [s for s in impact_data if s['impact_score'] > 70],
             'medium_impact_stories': [s for s in impact_data if 40 < s['impact_score'] <= 70],
             'low_impact_stories': [s for s in impact_data if s['impact_score'] <= 40],
@@ -188,77 +197,33 @@ class DependencyImpactService:
             direction: 'up' (blocking), 'down' (blocked), or 'both'
         
         Returns:
-            Dict with dependency chain
+            Dict with dependency chain, nearest stories first
         """
-        try:
-            story = UserStory.objects.get(pk=story_id)
-        except UserStory.DoesNotExist:
+        story = UserStory.objects.filter(pk=story_id).values('id', 'title', 'project_id').first()
+        if story is None:
             return {'error': 'Story not found'}
         
-        def get_upstream(story, visited=None):
-            """Get all stories that block this one."""
-            if visited is None:
-                visited = set()
-            
-            if str(story.id) in visited:
-                return []
-            
-            visited.add(str(story.id))
-            
-            deps = StoryDependency.objects.filter(
-                source_story=story,
-                resolved=False
-            ).select_related('target_story')
-            
-            upstream = []
-            for dep in deps:
-                upstream.append({
-                    'id': str(dep.target_story.id),
-                    'title': dep.target_story.title,
-                    'status': dep.target_story.status,
-                })
-                # Recursively get upstream
-                upstream.extend(get_upstream(dep.target_story, visited))
-            
-            return upstream
+        graph = dependency_graphs.get(story['project_id'])
+        chains = {}
+        if direction in ['up', 'both']:
+            chains['upstream'] = list(graph.walk(str(story['id']), 'up'))
+        if direction in ['down', 'both']:
+            chains['downstream'] = list(graph.walk(str(story['id']), 'down'))
         
-        def get_downstream(story, visited=None):
-            """Get all stories blocked by this one."""
-            if visited is None:
-                visited = set()
-            
-            if str(story.id) in visited:
-                return []
-            
-            visited.add(str(story.id))
-            
-            deps = StoryDependency.objects.filter(
-                target_story=story,
-                resolved=False
-            ).select_related('source_story')
-            
-            downstream = []
-            for dep in deps:
-                downstream.append({
-                    'id': str(dep.source_story.id),
-                    'title': dep.source_story.title,
-                    'status': dep.source_story.status,
-                })
-                # Recursively get downstream
-                downstream.extend(get_downstream(dep.source_story, visited))
-            
-            return downstream
+        chain_ids = {chain_id for chain in chains.values() for chain_id in chain}
+        rows = {
+            str(row['id']): row
+            for row in UserStory.objects.filter(id__in=list(chain_ids)).values('id', 'title', 'status')
+        } if chain_ids else {}
         
         result = {
-            'story_id': str(story.id),
-            'story_title': story.title,
+            'story_id': str(story['id']),
+            'story_title': story['title'],
         }
-        
-        if direction in ['up', 'both']:
-            result['upstream'] = get_upstream(story)
-        
-        if direction in ['down', 'both']:
-            result['downstream'] = get_downstream(story)
-        
+        for name, chain in chains.items():
+            result[name] = [
+                {'id': chain_id, 'title': rows[chain_id]['title'], 'status': rows[chain_id]['status']}
+                for chain_id in chain
+                if chain_id in rows
+            ]
         return result
-
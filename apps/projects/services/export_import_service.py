@@ -1,214 +1,349 @@
 """
 Export/Import Service.
 Handles exporting and importing stories, tasks, and other work items.
+
+Exports stream rows straight from a server-side cursor, so memory stays flat
+whatever the project size. Imports read the file twice - a validation pass,
+then a write pass that bulk-inserts valid rows in batches - and report
+progress under a job id in the cache.
 """
 
+import codecs
 import csv
-import json
-from io import StringIO, BytesIO
-from typing import Dict, List, Optional
-from django.http import HttpResponse
-from apps.projects.models import UserStory, Task, Bug, Issue, Project
+import logging
+import tempfile
+import uuid
+from typing import Dict, Iterator, List, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from apps.projects.models import UserStory, Project
+from apps.projects.utils.work_item_numbers import reserve_work_item_numbers
+
+logger = logging.getLogger(__name__)
+
+STORY_EXPORT_HEADERS = [
+    'ID', 'Title', 'Description', 'Status', 'Priority', 'Story Points',
+    'Story Type', 'Component', 'Assigned To', 'Epic', 'Sprint',
+    'Due Date', 'Tags', 'Labels', 'Created At', 'Updated At'
+]
+
+# Fixed Excel column widths; write-only sheets cannot be measured after the fact
+STORY_EXPORT_WIDTHS = [38, 50, 50, 15, 12, 12, 15, 20, 30, 30, 20, 12, 30, 30, 26, 26]
+
+IMPORT_PROGRESS_KEY = 'story_import_{job_id}'
+IMPORT_ERROR_LIMIT = 1000  # Row errors kept in the progress record
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back to the caller."""
+    
+    def write(self, value):
+        return value
 
 
 class ExportImportService:
     """Service for exporting and importing data."""
     
     @staticmethod
-    def export_stories_to_csv(project_id: str, story_ids: Optional[List[str]] = None) -> HttpResponse:
-        """
-        Export stories to CSV.
-        
-        Returns:
-            HttpResponse with CSV file
-        """
+    def _story_queryset(project_id: str, story_ids: Optional[List[str]] = None):
         queryset = UserStory.objects.filter(project_id=project_id)
         
         if story_ids:
             queryset = queryset.filter(id__in=story_ids)
         
-        stories = queryset.select_related('assigned_to', 'epic', 'sprint').order_by('created_at')
+        return queryset.select_related('assigned_to', 'epic', 'sprint').order_by('created_at')
+    
+    @staticmethod
+    def _story_row(story) -> list:
+        return [
+            str(story.id),
+            story.title,
+            story.description,
+            story.status,
+            story.priority,
+            story.story_points or '',
+            story.story_type,
+            story.component or '',
+            story.assigned_to.email if story.assigned_to else '',
+            story.epic.title if story.epic else '',
+            story.sprint.name if story.sprint else '',
+            story.due_date.isoformat() if story.due_date else '',
+            ','.join(story.tags) if story.tags else '',
+            ','.join(str(l) for l in story.labels) if story.labels else '',
+            story.created_at.isoformat(),
+            story.updated_at.isoformat(),
+        ]
+    
+    @staticmethod
+    def iter_story_rows(project_id: str, story_ids: Optional[List[str]] = None) -> Iterator[list]:
+        """Yield export rows, reading stories EXPORT_CHUNK_SIZE at a time."""
+        chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+        queryset = ExportImportService._story_queryset(project_id, story_ids)
+        for story in queryset.iterator(chunk_size=chunk_size):
+            yield ExportImportService._story_row(story)
+    
+    @staticmethod
+    def export_stories_to_csv(project_id: str, story_ids: Optional[List[str]] = None) -> StreamingHttpResponse:
+        """
+        Export stories to CSV.
+        
+        Rows are written to the response as they are read from the database.
         
-        # Create CSV
-        output = StringIO()
-        writer = csv.writer(output)
+        Returns:
+            StreamingHttpResponse with CSV file
+        """
+        writer = csv.writer(_Echo())
         
-        # Write header
-        writer.writerow([
-            'ID', 'Title', 'Description', 'Status', 'Priority', 'Story Points',
-            'Story Type', 'Component', 'Assigned To', 'Epic', 'Sprint',
-            'Due Date', 'Tags', 'Labels', 'Created At', 'Updated At'
-        ])
+        def stream():
+            yield writer.writerow(STORY_EXPORT_HEADERS)
+            for row in ExportImportService.iter_story_rows(project_id, story_ids):
+                yield writer.writerow(row)
         
-        # Write data
-        for story in stories:
-            writer.writerow([
-                str(story.id),
-                story.title,
-                story.description,
-                story.status,
-                story.priority,
-                story.story_points or '',
-                story.story_type,
-                story.component or '',
-                story.assigned_to.email if story.assigned_to else '',
-                story.epic.title if story.epic else '',
-                story.sprint.name if story.sprint else '',
-                story.due_date.isoformat() if story.due_date else '',
-                ','.join(story.tags) if story.tags else '',
-                ','.join(str(l) for l in story.labels) if story.labels else '',
-                story.created_at.isoformat(),
-                story.updated_at.isoformat(),
-            ])
-        
-        # Create response
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="stories_export_{project_id}.csv"'
         
         return response
     
     @staticmethod
-    def export_stories_to_excel(project_id: str, story_ids: Optional[List[str]] = None) -> HttpResponse:
+    def export_stories_to_excel(project_id: str, story_ids: Optional[List[str]] = None):
         """
         Export stories to Excel.
         
+        Uses a write-only workbook, which flushes rows to a temporary file
+        instead of keeping cells in memory; the file is then streamed.
+        
         Returns:
-            HttpResponse with Excel file
+            FileResponse with Excel file
         """
         try:
             import openpyxl
+            from openpyxl.cell import WriteOnlyCell
             from openpyxl.styles import Font, Alignment
+            from openpyxl.utils import get_column_letter
         except ImportError:
             # Fallback to CSV if openpyxl not available
             return ExportImportService.export_stories_to_csv(project_id, story_ids)
         
-        queryset = UserStory.objects.filter(project_id=project_id)
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Stories")
         
-        if story_ids:
-            queryset = queryset.filter(id__in=story_ids)
-        
-        stories = queryset.select_related('assigned_to', 'epic', 'sprint').order_by('created_at')
-        
-        # Create workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Stories"
+        for index, width in enumerate(STORY_EXPORT_WIDTHS, start=1):
+            ws.column_dimensions[get_column_letter(index)].width = width
         
         # Write header
-        headers = [
-            'ID', 'Title', 'Description', 'Status', 'Priority', 'Story Points',
-            'Story Type', 'Component', 'Assigned To', 'Epic', 'Sprint',
-            'Due Date', 'Tags', 'Labels', 'Created At', 'Updated At'
-        ]
-        ws.append(headers)
-        
-        # Style header
-        for cell in ws[1]:
+        header = []
+        for title in STORY_EXPORT_HEADERS:
+            cell = WriteOnlyCell(ws, value=title)
             cell.font = Font(bold=True)
             cell.alignment = Alignment(horizontal='center')
+            header.append(cell)
+        ws.append(header)
         
         # Write data
-        for story in stories:
-            ws.append([
-                str(story.id),
-                story.title,
-                story.description,
-                story.status,
-                story.priority,
-                story.story_points or '',
-                story.story_type,
-                story.component or '',
-                story.assigned_to.email if story.assigned_to else '',
-                story.epic.title if story.epic else '',
-                story.sprint.name if story.sprint else '',
-                story.due_date.isoformat() if story.due_date else '',
-                ','.join(story.tags) if story.tags else '',
-                ','.join(str(l) for l in story.labels) if story.labels else '',
-                story.created_at.isoformat(),
-                story.updated_at.isoformat(),
-            ])
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Create response
-        output = BytesIO()
+        for row in ExportImportService.iter_story_rows(project_id, story_ids):
+            ws.append(row)
+        
+        output = tempfile.TemporaryFile()
         wb.save(output)
         output.seek(0)
         
-        response = HttpResponse(
-            output.read(),
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"stories_export_{project_id}.xlsx",
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = f'attachment; filename="stories_export_{project_id}.xlsx"'
+    
+    @staticmethod
+    def start_story_import(project_id: str, csv_file, user=None) -> str:
+        """
+        Queue a CSV import and return its job id.
         
-        return response
+        The upload is copied to default storage and imported by a Celery
+        task; poll ``get_import_progress(job_id)`` for its state.
+        """
+        from apps.projects.tasks import import_stories_task
+        
+        job_id = uuid.uuid4().hex
+        file_name = default_storage.save(f'imports/stories_{job_id}.csv', csv_file)
+        ExportImportService._set_progress(job_id, {'status': 'queued', 'project_id': str(project_id)})
+        
+        user_id = str(user.pk) if user is not None else None
+        try:
+            import_stories_task.delay(str(project_id), file_name, job_id, user_id)
+        except Exception as e:
+            logger.warning(f"[ExportImport] Could not queue import {job_id}, running inline: {e}")
+            import_stories_task(str(project_id), file_name, job_id, user_id)
+        
+        return job_id
+    
+    @staticmethod
+    def get_import_progress(job_id: str) -> Optional[Dict]:
+        """Progress of an import job, or None if unknown or expired."""
+        return cache.get(IMPORT_PROGRESS_KEY.format(job_id=job_id))
+    
+    @staticmethod
+    def _set_progress(job_id: Optional[str], progress: Dict):
+        if job_id:
+            timeout = getattr(settings, 'IMPORT_PROGRESS_TTL', 86400)
+            cache.set(IMPORT_PROGRESS_KEY.format(job_id=job_id), progress, timeout)
+    
+    @staticmethod
+    def _read_rows(csv_file) -> Iterator[Dict]:
+        """Rewind the file and yield its rows without reading it whole."""
+        csv_file.seek(0)
+        lines = codecs.iterdecode(csv_file, 'utf-8-sig')
+        return csv.DictReader(lines)
+    
+    @staticmethod
+    def _parse_story_row(row: Dict, valid_statuses: List[str], default_status: str) -> Dict:
+        """
+        Validate one CSV row and return UserStory field values.
+        
+        Raises:
+            ValueError: If the row cannot be imported
+        """
+        title = (row.get('Title') or '').strip()
+        if not title:
+            raise ValueError('Title is required')
+        
+        status = row.get('Status') or default_status
+        if status not in valid_statuses:
+            raise ValueError(
+                f"Invalid status '{status}'. Valid statuses for this project are: {', '.join(valid_statuses)}"
+            )
+        
+        story_type = row.get('Story Type') or 'feature'
+        if story_type not in dict(UserStory.STORY_TYPE_CHOICES):
+            raise ValueError(f"Invalid story type '{story_type}'")
+        
+        story_points = row.get('Story Points')
+        
+        return {
+            'title': title[:300],
+            'description': row.get('Description', ''),
+            'status': status,
+            'priority': row.get('Priority') or UserStory.DEFAULT_PRIORITY,
+            'story_points': int(story_points) if story_points else None,
+            'story_type': story_type,
+            'component': (row.get('Component') or '')[:100],
+            'tags': [tag.strip() for tag in row['Tags'].split(',') if tag.strip()] if row.get('Tags') else [],
+        }
     
     @staticmethod
-    def import_stories_from_csv(project_id: str, csv_file) -> Dict:
+    def import_stories_from_csv(project_id: str, csv_file, job_id: Optional[str] = None, user=None) -> Dict:
         """
         Import stories from CSV file.
         
+        The file is validated in one streaming pass; numbers for the valid
+        rows are then reserved in one statement and the stories are created
+        with ``bulk_create`` in batches of IMPORT_BATCH_SIZE, each in its own
+        transaction. Progress is published under ``job_id`` when given.
+        
         Returns:
             Dict with import results
         """
         try:
             project = Project.objects.get(pk=project_id)
         except Project.DoesNotExist:
+            ExportImportService._set_progress(job_id, {'status': 'failed', 'error': 'Project not found'})
             return {'error': 'Project not found'}
         
-        # Read CSV
-        decoded_file = csv_file.read().decode('utf-8')
-        csv_reader = csv.DictReader(StringIO(decoded_file))
+        from apps.projects.services.search_index import index_objects
+        from apps.projects.services.timeseries import bump_series_version
+        from apps.projects.services.work_item_events import work_item_events
+        
+        batch_size = max(1, getattr(settings, 'IMPORT_BATCH_SIZE', 500))
+        probe = UserStory(project=project)
+        valid_statuses = probe.get_valid_statuses()
+        default_status = probe.get_default_status()
+        
+        progress = {
+            'status': 'validating',
+            'project_id': str(project.id),
+            'total': 0,
+            'processed': 0,
+            'imported_count': 0,
+            'error_count': 0,
+            'errors': [],
+        }
+        
+        def record_error(row_num, error):
+            progress['error_count'] += 1
+            if len(progress['errors']) < IMPORT_ERROR_LIMIT:
+                progress['errors'].append({'row': row_num, 'error': str(error)})
+        
+        # Pass 1: validate, keeping only the numbers of the rows that failed
+        invalid_rows = set()
+        for row_num, row in enumerate(ExportImportService._read_rows(csv_file), start=2):  # Start at 2 (header is row 1)
+            progress['total'] += 1
+            try:
+                ExportImportService._parse_story_row(row, valid_statuses, default_status)
+            except (ValueError, TypeError) as e:
+                invalid_rows.add(row_num)
+                record_error(row_num, e)
+        
+        valid_count = progress['total'] - len(invalid_rows)
+        progress['status'] = 'importing'
+        ExportImportService._set_progress(job_id, progress)
+        
+        # Claim all story numbers in one statement instead of one per row
+        numbers = iter(reserve_work_item_numbers(str(project.id), 'story', valid_count) if valid_count else [])
         
         imported = []
-        errors = []
         
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 (header is row 1)
+        def write_batch(batch):
             try:
-                # Create story
-                story = UserStory.objects.create(
-                    project=project,
-                    title=row.get('Title', ''),
-                    description=row.get('Description', ''),
-                    status=row.get('Status', 'backlog'),
-                    priority=row.get('Priority', 'medium'),
-                    story_points=int(row['Story Points']) if row.get('Story Points') else None,
-                    story_type=row.get('Story Type', 'feature'),
-                    component=row.get('Component', ''),
-                )
-                
-                # Parse tags
-                if row.get('Tags'):
-                    story.tags = [tag.strip() for tag in row['Tags'].split(',') if tag.strip()]
-                
-                story.save()
-                
-                imported.append({
-                    'row': row_num,
-                    'story_id': str(story.id),
-                    'title': story.title,
-                })
+                with transaction.atomic():
+                    UserStory.objects.bulk_create(batch)
+                    index_objects('userstory', batch)
+                    for story in batch:
+                        work_item_events.emit('story', story.pk, created=True)
             except Exception as e:
-                errors.append({
-                    'row': row_num,
-                    'error': str(e),
-                })
+                logger.error(f"[ExportImport] Failed to import {len(batch)} stories: {e}", exc_info=True)
+                for story in batch:
+                    record_error(story._import_row, e)
+            else:
+                progress['imported_count'] += len(batch)
+                imported.extend(
+                    {'row': story._import_row, 'story_id': str(story.id), 'title': story.title}
+                    for story in batch
+                )
+            progress['processed'] = batch[-1]._import_row - 1
+            ExportImportService._set_progress(job_id, progress)
+        
+        # Pass 2: build and insert the valid rows in batches
+        batch = []
+        for row_num, row in enumerate(ExportImportService._read_rows(csv_file), start=2):
+            if row_num in invalid_rows:
+                continue
+            story = UserStory(
+                project=project,
+                number=next(numbers),
+                created_by=user,
+                **ExportImportService._parse_story_row(row, valid_statuses, default_status)
+            )
+            story._import_row = row_num
+            batch.append(story)
+            if len(batch) >= batch_size:
+                write_batch(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+        if progress['imported_count']:
+            # bulk_create skips the signals that version cached series
+            bump_series_version(project.id)
+        
+        progress['processed'] = progress['total']
+        progress['status'] = 'completed'
+        ExportImportService._set_progress(job_id, progress)
         
         return {
-            'imported_count': len(imported),
-            'error_count': len(errors),
+            'imported_count': progress['imported_count'],
+            'error_count': progress['error_count'],
             'imported': imported,
-            'errors': errors,
+            'errors': progress['errors'],
         }
-
@@ -671,6 +671,53 @@ class NotificationService:
         logger.info(f"Created {len(notifications)} notifications via automation for {item.__class__.__name__} {item.id}")
         return notifications
     
+    @transaction.atomic
+    def notify_bulk_change(
+        self,
+        event_type: str,
+        notification_type: str,
+        recipients: List[User],
+        title: str,
+        message: str,
+        changed_by: Optional[User] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Notification]:
+        """
+        Create one notification per recipient for a change applied to many items at once.
+        
+        Args:
+            event_type: Settings key checked per recipient (e.g. 'on_status_change')
+            notification_type: Notification.NOTIFICATION_TYPE_CHOICES value
+            recipients: Users to notify (the user who made the change is skipped)
+            title: Notification title
+            message: Notification message
+            changed_by: User who made the change
+            metadata: Extra data (e.g. item ids)
+        
+        Returns:
+            List of created notifications
+        """
+        notifications = []
+        
+        for recipient in {r for r in recipients if r is not None and r != changed_by}:
+            if not self._should_send_notification(event_type, recipient):
+                continue
+            
+            notification = Notification.objects.create(
+                recipient=recipient,
+                notification_type=notification_type,
+                title=title[:255],
+                message=message,
+                project=self.project,
+                metadata=metadata or {},
+                created_by=changed_by
+            )
+            notifications.append(notification)
+            _send_websocket_notification(notification)
+        
+        logger.info(f"Created {len(notifications)} bulk change notifications ({event_type})")
+        return notifications
+    
     @transaction.atomic
     def notify_due_date_approaching(
         self,
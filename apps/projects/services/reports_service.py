@@ -8,6 +8,7 @@ from django.utils import timezone
 from datetime import timedelta, datetime
 from typing import Dict, List, Any, Optional
 from apps.projects.models import UserStory, Task, Bug, Issue, Sprint, TimeLog, Epic
+from apps.projects.services.timeseries import cached_series, get_sprint_burndown, get_sprint_points
 
 
 class ReportsService:
@@ -58,77 +59,55 @@ class ReportsService:
     
     @staticmethod
     def get_burndown_chart(sprint_id: str):
-        """Generate burndown chart data for a sprint."""
+        """Generate burndown chart data for a sprint from its status transition history."""
         try:
             sprint = Sprint.objects.get(id=sprint_id)
         except Sprint.DoesNotExist:
             return None
         
-        # Get all stories in sprint
-        stories = UserStory.objects.filter(sprint_id=sprint_id)
-        total_points = stories.aggregate(total=Sum('story_points'))['total'] or 0
-        
-        # Calculate daily progress
-        dates = []
-        remaining_points = []
-        completed_points = []
-        
-        current_date = sprint.start_date
-        while current_date <= sprint.end_date:
-            completed = stories.filter(
-                status='done',
-                updated_at__date__lte=current_date
-            ).aggregate(total=Sum('story_points'))['total'] or 0
-            
-            remaining = total_points - completed
-            
-            dates.append(current_date.isoformat())
-            remaining_points.append(remaining)
-            completed_points.append(completed)
-            
-            current_date += timedelta(days=1)
+        burndown = cached_series(
+            sprint.project_id, 'burndown', lambda: get_sprint_burndown(sprint), sprint=sprint_id
+        )
         
         return {
             'sprint_id': sprint_id,
             'sprint_name': sprint.name,
             'start_date': sprint.start_date.isoformat(),
             'end_date': sprint.end_date.isoformat(),
-            'total_points': total_points,
-            'dates': dates,
-            'remaining_points': remaining_points,
-            'completed_points': completed_points,
+            **burndown,
         }
     
     @staticmethod
     def get_velocity_tracking(project_id: str, num_sprints: int = 5):
         """Track velocity across sprints."""
-        sprints = Sprint.objects.filter(
-            project_id=project_id,
-            status='completed'
-        ).order_by('-sprint_number')[:num_sprints]
-        
-        velocity_data = []
-        for sprint in sprints:
-            stories = UserStory.objects.filter(sprint_id=sprint.id)
-            completed_stories = stories.filter(status='done')
+        def compute():
+            sprints = list(Sprint.objects.filter(
+                project_id=project_id,
+                status='completed'
+            ).order_by('-sprint_number')[:num_sprints])
+            points = get_sprint_points(sprint.id for sprint in sprints)
             
-            total_points = stories.aggregate(total=Sum('story_points'))['total'] or 0
-            completed_points = completed_stories.aggregate(total=Sum('story_points'))['total'] or 0
+            velocity_data = []
+            for sprint in sprints:
+                sprint_points = points.get(str(sprint.id), {})
+                total_points = sprint_points.get('total_points', 0)
+                completed_points = sprint_points.get('completed_points', 0)
+                velocity_data.append({
+                    'sprint_id': str(sprint.id),
+                    'sprint_name': sprint.name,
+                    'sprint_number': sprint.sprint_number,
+                    'total_points': total_points,
+                    'completed_points': completed_points,
+                    'completion_rate': (completed_points / total_points * 100) if total_points > 0 else 0,
+                })
             
-            velocity_data.append({
-                'sprint_id': str(sprint.id),
-                'sprint_name': sprint.name,
-                'sprint_number': sprint.sprint_number,
-                'total_points': total_points,
-                'completed_points': completed_points,
-                'completion_rate': (completed_points / total_points * 100) if total_points > 0 else 0,
-            })
+            return {
+                'project_id': project_id,
+                'sprints': velocity_data,
+                'average_velocity': sum(v['completed_points'] for v in velocity_data) / len(velocity_data) if velocity_data else 0,
+            }
         
-        return {
-            'project_id': project_id,
-            'sprints': velocity_data,
-            'average_velocity': sum(v['completed_points'] for v in velocity_data) / len(velocity_data) if velocity_data else 0,
-        }
+        return cached_series(project_id, 'velocity', compute, num_sprints=num_sprints)
     
     @staticmethod
     def get_estimation_history(project_id: str, story_id: Optional[str] = None):
@@ -1,16 +1,30 @@
 """
 Advanced search service for project management system.
 Supports full-text search with operators, filters, and multi-model searching.
+
+Queries run against the SearchDocument index (see search_index.py): one
+ranked query across all content types, using PostgreSQL tsvector/GIN or
+SQLite FTS5 depending on the database.
+
+``highlighted_title`` and ``snippet`` are HTML: the database marks matches
+with control-character sentinels, the text is escaped, and only then are the
+sentinels turned into ``<mark>`` tags.
 """
 
-from django.db.models import Q, TextField
-from django.contrib.contenttypes.models import ContentType
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
-from apps.projects.models import (
-    Project, UserStory, Task, Bug, Issue, Epic, StoryComment, StoryAttachment
-)
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Q, QuerySet, TextField, Value, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Left, RowNumber
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from apps.projects.models import Project, SearchDocument
 from typing import List, Dict, Any, Optional
+import html
 import re
+import uuid
+
+# SQLite FTS5 table mirroring search_documents (created in migration 0031)
+FTS_TABLE = 'search_documents_fts'
 
 
 class SearchService:
@@ -37,6 +51,35 @@ class SearchService:
         'attachment': ['file_name', 'description'],
     }
     
+    DEFAULT_CONTENT_TYPES = ['userstory', 'task', 'bug', 'issue', 'epic']
+    
+    # field:value query parts matched against index columns
+    FILTER_FIELDS = ['status', 'priority', 'title']
+    USER_FIELDS = ['assigned_to', 'owner', 'assignee', 'reporter']
+    
+    # filters argument key -> index column
+    FILTER_COLUMNS = {
+        'status': 'status',
+        'priority': 'priority',
+        'assigned_to': 'assignee_id',
+        'assignee': 'assignee_id',
+        'owner': 'assignee_id',
+        'reporter': 'reporter_id',
+        'project': 'project_id',
+        'project_id': 'project_id',
+    }
+    
+    RESULT_FIELDS = [
+        'content_type', 'object_id', 'title', 'highlighted_title', 'snippet',
+        'project_id', 'status', 'rank', 'created_at',
+    ]
+    
+    TEXT_SEARCH_CONFIG = 'english'
+    # Sentinels around matches in database output, replaced after escaping
+    HIGHLIGHT_START = '\x02'
+    HIGHLIGHT_STOP = '\x03'
+    SNIPPET_LENGTH = 200
+    
     @staticmethod
     def parse_query(query: str) -> Dict[str, Any]:
         """
@@ -86,12 +129,6 @@ class SearchService:
             if value:  # Only add non-empty values
                 result['field_queries'][field].append(value)
         
-        # Debug logging
-        import logging
-        logger = logging.getLogger(__name__)
-        if result['field_queries']:
-            logger.debug(f"Parsed field queries: {result['field_queries']}")
-        
         # Remove field queries from query
         query_without_fields = re.sub(field_pattern, '', query_without_phrases)
         
@@ -110,265 +147,221 @@ class SearchService:
         return result
     
     @staticmethod
-    def build_q_objects(parsed_query: Dict[str, Any], model_fields: List[str], model_class=None) -> Q:
+    def split_query(parsed_query: Dict[str, Any]):
         """
-        Build Django Q objects from parsed query for a specific model.
-        
-        Args:
-            parsed_query: Parsed query dictionary
-            model_fields: List of field names to search in
-            model_class: Optional model class to validate fields exist
+        Split a parsed query into full-text parts and column filters.
         
         Returns:
-            Q object for filtering
+            Tuple of (terms, phrases, excluded, field_filters); field queries
+            on columns the index does not store are searched as text.
         """
-        # Start with a Q object that matches nothing (we'll build it up)
-        # Using Q() and then combining with &= means we need at least one condition
-        q_objects = None
-        
-        # Validate fields exist on model if model_class provided
-        valid_fields = model_fields
-        if model_class:
-            valid_fields = [f for f in model_fields if hasattr(model_class, f)]
+        terms = list(parsed_query['text_terms'])
+        field_filters = {}
+        for field, values in parsed_query['field_queries'].items():
+            if field in SearchService.FILTER_FIELDS or field in SearchService.USER_FIELDS:
+                field_filters.setdefault(field, []).extend(values)
+            else:
+                terms.extend(values)
+        return terms, list(parsed_query['phrases']), list(parsed_query['excluded_terms']), field_filters
+    
+    @staticmethod
+    def build_queryset(
+        query: str,
+        content_types: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        project: Optional[Project] = None,
+        user=None
+    ) -> QuerySet:
+        """
+        Build the ranked search query over the search index.
         
-        # Debug logging
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.debug(f"Building Q objects: parsed_query={parsed_query}, valid_fields={valid_fields}, model={model_class.__name__ if model_class else 'None'}")
+        Args:
+            query: Search query string
+            content_types: Content types to search (defaults to work items)
+            filters: Column filters (status, priority, assignee, reporter)
+            project: Optional project to limit search to
+            user: User performing the search (for permission filtering)
         
-        # Text terms - search across all fields
-        if parsed_query['text_terms'] and valid_fields:
-            text_q = Q()
-            for term in parsed_query['text_terms']:
-                term_q = Q()
-                for field in valid_fields:
-                    try:
-                        if field == 'tags':
-                            # Tags are stored as JSON array - use JSONField lookup
-                            term_q |= Q(**{f'{field}__icontains': term})
-                        else:
-                            # Use icontains for case-insensitive partial matching
-                            term_q |= Q(**{f'{field}__icontains': term})
-                    except Exception as e:
-                        # Skip fields that cause errors
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.debug(f"Skipping field {field} for term {term}: {e}")
-                        continue
-                if term_q.children:  # Only add if we have valid conditions
-                    text_q &= term_q  # All terms must match (AND between terms)
-            if text_q.children:
-                if q_objects is None:
-                    q_objects = text_q
-                else:
-                    q_objects &= text_q  # Combine with other conditions using AND
+        Returns:
+            SearchDocument queryset annotated with rank, highlighted_title and
+            snippet, ordered by relevance then recency
+        """
+        content_types = content_types or SearchService.DEFAULT_CONTENT_TYPES
+        queryset = SearchDocument.objects.filter(content_type__in=content_types)
         
-        # Quoted phrases - exact phrase matching
-        if parsed_query['phrases'] and valid_fields:
-            phrase_q = Q()
-            for phrase in parsed_query['phrases']:
-                phrase_term_q = Q()
-                for field in valid_fields:
-                    try:
-                        if field == 'tags':
-                            phrase_term_q |= Q(**{f'{field}__icontains': phrase})
-                        else:
-                            phrase_term_q |= Q(**{f'{field}__icontains': phrase})
-                    except Exception:
-                        continue
-                if phrase_term_q.children:
-                    phrase_q |= phrase_term_q
-            if phrase_q.children:
-                if q_objects is None:
-                    q_objects = phrase_q
+        # Access: a single subquery instead of materializing project ids
+        if project:
+            queryset = queryset.filter(project=project)
+        elif user and not user.is_anonymous:
+            from apps.core.services.roles import RoleService
+            if not RoleService.is_admin(user):
+                queryset = queryset.filter(
+                    project_id__in=Project.objects.filter(
+                        Q(owner=user) | Q(members__id=user.id)
+                    ).values('id')
+                )
+        
+        for key, value in (filters or {}).items():
+            column = SearchService.FILTER_COLUMNS.get(key)
+            if column and value not in (None, ''):
+                if isinstance(value, list):
+                    queryset = queryset.filter(**{f'{column}__in': value})
                 else:
-                    q_objects &= phrase_q
-        
-        # Field-specific queries
-        # Special handling: if both 'assigned_to' and 'owner' are specified with the same values,
-        # combine them with OR logic (since different models use different field names)
-        user_fields = ['assigned_to', 'owner', 'assignee', 'reporter']
-        user_field_values = {}
-        other_field_queries = {}
+                    queryset = queryset.filter(**{column: value})
         
-        for field, values in parsed_query['field_queries'].items():
-            if field in user_fields:
-                # Collect user field queries to handle OR logic
-                if field not in user_field_values:
-                    user_field_values[field] = []
-                user_field_values[field].extend(values)
-            else:
-                other_field_queries[field] = values
+        terms, phrases, excluded, field_filters = SearchService.split_query(
+            SearchService.parse_query(query)
+        )
+        queryset = SearchService._apply_field_filters(queryset, field_filters)
+        queryset = SearchService._apply_text_search(queryset, terms, phrases, excluded)
         
-        # Process user fields with OR logic if both assigned_to and owner are present
-        if 'assigned_to' in user_field_values or 'owner' in user_field_values or 'assignee' in user_field_values or 'reporter' in user_field_values:
-            user_field_q = Q()
-            all_user_values = set()
-            if 'assigned_to' in user_field_values:
-                all_user_values.update(user_field_values['assigned_to'])
-            if 'owner' in user_field_values:
-                all_user_values.update(user_field_values['owner'])
-            if 'assignee' in user_field_values:
-                all_user_values.update(user_field_values['assignee'])
-            if 'reporter' in user_field_values:
-                all_user_values.update(user_field_values['reporter'])
-            
-            # Debug logging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.debug(f"Processing user fields: {user_field_values}, all_user_values: {all_user_values}, model: {model_class.__name__ if model_class else 'None'}")
-            
-            for value in all_user_values:
-                value_q = Q()
-                from apps.authentication.models import User
-                user_found = False
-                user = None
-                
-                # Try to find user by UUID first
-                try:
-                    user = User.objects.get(id=value)
-                    user_found = True
-                except (User.DoesNotExist, ValueError):
-                    # Try to find by email (case-insensitive)
+        return queryset.order_by('-rank', '-created_at')
+    
+    @staticmethod
+    def _apply_field_filters(queryset: QuerySet, field_filters: Dict[str, List[str]]) -> QuerySet:
+        """Apply field:value filters from the query string to index columns."""
+        user_q = Q()
+        for field, values in field_filters.items():
+            if field in SearchService.USER_FIELDS:
+                # assigned_to/owner/assignee/reporter all match either user column
+                for value in values:
                     try:
-                        user = User.objects.get(email__iexact=value)
-                        user_found = True
-                    except User.DoesNotExist:
-                        pass
-                
-                if user_found and user:
-                    # User found - use direct user object matching (most efficient)
-                    if model_class:
-                        if hasattr(model_class, 'assigned_to'):
-                            value_q |= Q(**{'assigned_to': user})
-                        if hasattr(model_class, 'owner'):
-                            value_q |= Q(**{'owner': user})
-                        if hasattr(model_class, 'assignee'):
-                            value_q |= Q(**{'assignee': user})
-                        if hasattr(model_class, 'reporter'):
-                            value_q |= Q(**{'reporter': user})
-                    else:
-                        # If no model_class, try all fields
-                        value_q |= Q(**{'assigned_to': user}) | Q(**{'owner': user})
-                else:
-                    # User not found by UUID or email - try name-based matching
-                    if model_class:
-                        if hasattr(model_class, 'assigned_to'):
-                            value_q |= (
-                                Q(**{'assigned_to__first_name__icontains': value}) |
-                                Q(**{'assigned_to__last_name__icontains': value}) |
-                                Q(**{'assigned_to__username__icontains': value}) |
-                                Q(**{'assigned_to__email__icontains': value})
-                            )
-                        if hasattr(model_class, 'owner'):
-                            value_q |= (
-                                Q(**{'owner__first_name__icontains': value}) |
-                                Q(**{'owner__last_name__icontains': value}) |
-                                Q(**{'owner__username__icontains': value}) |
-                                Q(**{'owner__email__icontains': value})
-                            )
-                    else:
-                        value_q |= (
-                            Q(**{'assigned_to__first_name__icontains': value}) |
-                            Q(**{'assigned_to__last_name__icontains': value}) |
-                            Q(**{'assigned_to__username__icontains': value}) |
-                            Q(**{'assigned_to__email__icontains': value}) |
-                            Q(**{'owner__first_name__icontains': value}) |
-                            Q(**{'owner__last_name__icontains': value}) |
-                            Q(**{'owner__username__icontains': value}) |
-                            Q(**{'owner__email__icontains': value})
+                        user_id = uuid.UUID(value)
+                        user_q |= Q(assignee_id=user_id) | Q(reporter_id=user_id)
+                    except ValueError:
+                        user_q |= (
+                            Q(assignee__email__iexact=value) |
+                            Q(reporter__email__iexact=value) |
+                            Q(assignee__first_name__icontains=value) |
+                            Q(assignee__last_name__icontains=value) |
+                            Q(assignee__username__icontains=value)
                         )
-                
-                if value_q.children:
-                    user_field_q |= value_q
-                    logger.debug(f"Added user field condition for value '{value}': {value_q}, user_found={user_found}, user={user.email if user else 'None'}")
-                else:
-                    # Log if no conditions were added for debugging
-                    logger.warning(f"No conditions added for user field value: '{value}', model: {model_class.__name__ if model_class else 'None'}, user_found={user_found}")
-            
-            if user_field_q.children:
-                logger.debug(f"User field Q object has conditions: {user_field_q}")
-                if q_objects is None:
-                    q_objects = user_field_q
-                else:
-                    q_objects &= user_field_q
+            elif field == 'title':
+                title_q = Q()
+                for value in values:
+                    title_q |= Q(title__icontains=value)
+                queryset = queryset.filter(title_q)
             else:
-                logger.warning(f"User field Q object is empty for values: {all_user_values}, model: {model_class.__name__ if model_class else 'None'}")
-        
-        # Process other field queries
-        for field, values in other_field_queries.items():
-            # Map 'owner' to 'assigned_to' for models that don't have 'owner' field
-            # Epic and Project have 'owner', but UserStory, Task, Bug, Issue have 'assigned_to'
-            actual_field = field
-            if model_class:
-                if field == 'owner' and not hasattr(model_class, 'owner') and hasattr(model_class, 'assigned_to'):
-                    actual_field = 'assigned_to'
-                elif field == 'assigned_to' and not hasattr(model_class, 'assigned_to') and hasattr(model_class, 'owner'):
-                    actual_field = 'owner'
-            
-            # Check if field is in valid_fields or is a special field
-            # Also check if the field exists on the model (for fields like 'owner', 'assigned_to')
-            special_fields = ['status', 'priority', 'title', 'description', 'acceptance_criteria']
-            field_exists = False
-            if model_class:
-                # Check if field exists on the model (using actual_field)
-                field_exists = hasattr(model_class, actual_field)
-            
-            if field in valid_fields or field in special_fields or field_exists:
-                field_q = Q()
+                value_q = Q()
                 for value in values:
-                    try:
-                        if actual_field in ['status', 'priority']:
-                            field_q |= Q(**{f'{actual_field}__iexact': value})
-                        else:
-                            # For text fields, use icontains for case-insensitive partial matching
-                            field_q |= Q(**{f'{actual_field}__icontains': value})
-                    except Exception as e:
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.debug(f"Error building field query for {field}={value} (actual_field={actual_field}): {e}")
-                        continue
-                if field_q.children:
-                    if q_objects is None:
-                        q_objects = field_q
-                    else:
-                        q_objects &= field_q
-        
-        # Excluded terms
-        if parsed_query['excluded_terms'] and valid_fields:
-            exclude_q = Q()
-            for term in parsed_query['excluded_terms']:
-                for field in valid_fields:
-                    try:
-                        exclude_q |= Q(**{f'{field}__icontains': term})
-                    except Exception:
-                        continue
-            if exclude_q.children:
-                if q_objects is None:
-                    q_objects = ~exclude_q
-                else:
-                    q_objects &= ~exclude_q  # NOT
-        
-        # If no conditions were added, return an empty Q object (matches nothing)
-        if q_objects is None:
-            q_objects = Q()
+                    value_q |= Q(**{f'{field}__iexact': value})
+                queryset = queryset.filter(value_q)
+        if user_q.children:
+            queryset = queryset.filter(user_q)
+        return queryset
+    
+    @staticmethod
+    def _apply_text_search(
+        queryset: QuerySet,
+        terms: List[str],
+        phrases: List[str],
+        excluded: List[str]
+    ) -> QuerySet:
+        """Filter by full text and annotate rank, highlighted_title and snippet."""
+        term_tokens = [token for term in terms for token in _tokens(term)]
+        phrase_tokens = [tokens for tokens in (_tokens(phrase) for phrase in phrases) if tokens]
+        excluded_tokens = [token for term in excluded for token in _tokens(term)]
+        
+        vendor = connection.vendor
+        if not term_tokens and not phrase_tokens:
+            queryset = queryset.annotate(
+                rank=Value(0.0, output_field=FloatField()),
+                highlighted_title=F('title'),
+                snippet=Left('body', SearchService.SNIPPET_LENGTH),
+            )
+        elif vendor == 'postgresql':
+            search_query = SearchQuery(
+                ' & '.join(
+                    [f'{token}:*' for token in term_tokens] +
+                    [f"({' <-> '.join(tokens)})" for tokens in phrase_tokens]
+                ),
+                search_type='raw',
+                config=SearchService.TEXT_SEARCH_CONFIG
+            )
+            headline = {
+                'config': SearchService.TEXT_SEARCH_CONFIG,
+                'start_sel': SearchService.HIGHLIGHT_START,
+                'stop_sel': SearchService.HIGHLIGHT_STOP,
+            }
+            queryset = queryset.filter(search_vector=search_query).annotate(
+                rank=SearchRank(F('search_vector'), search_query),
+                highlighted_title=SearchHeadline('title', search_query, highlight_all=True, **headline),
+                snippet=SearchHeadline('body', search_query, max_words=35, min_words=15, **headline),
+            )
+        elif vendor == 'sqlite':
+            match = ' '.join(
+                [f'"{token}"*' for token in term_tokens] +
+                [f'"{" ".join(tokens)}"' for tokens in phrase_tokens]
+            )
+            fts = f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {SearchDocument._meta.db_table}.id'
+            start, stop = SearchService.HIGHLIGHT_START, SearchService.HIGHLIGHT_STOP
+            queryset = queryset.filter(
+                id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+            ).annotate(
+                # bm25() is lower-is-better; title and tags weigh more than the body
+                rank=RawSQL(f'SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) {fts}', [match], output_field=FloatField()),
+                highlighted_title=RawSQL(
+                    f"SELECT highlight({FTS_TABLE}, 0, '{start}', '{stop}') {fts}", [match],
+                    output_field=TextField()
+                ),
+                snippet=RawSQL(
+                    f"SELECT snippet({FTS_TABLE}, 2, '{start}', '{stop}', '...', 24) {fts}", [match],
+                    output_field=TextField()
+                ),
+            )
+        else:
+            # No full-text support: substring match, unranked
+            text_q = Q()
+            for token in term_tokens + [' '.join(tokens) for tokens in phrase_tokens]:
+                text_q &= Q(title__icontains=token) | Q(body__icontains=token) | Q(tags__icontains=token)
+            queryset = queryset.filter(text_q).annotate(
+                rank=Value(0.0, output_field=FloatField()),
+                highlighted_title=F('title'),
+                snippet=Left('body', SearchService.SNIPPET_LENGTH),
+            )
+        
+        if excluded_tokens:
+            if vendor == 'postgresql':
+                queryset = queryset.exclude(search_vector=SearchQuery(
+                    ' | '.join(f'{token}:*' for token in excluded_tokens),
+                    search_type='raw',
+                    config=SearchService.TEXT_SEARCH_CONFIG
+                ))
+            elif vendor == 'sqlite':
+                queryset = queryset.exclude(id__in=RawSQL(
+                    f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                    [' OR '.join(f'"{token}"*' for token in excluded_tokens)]
+                ))
+            else:
+                for token in excluded_tokens:
+                    queryset = queryset.exclude(
+                        Q(title__icontains=token) | Q(body__icontains=token) | Q(tags__icontains=token)
+                    )
         
-        # Debug logging
-        import logging
-        logger = logging.getLogger(__name__)
-        # Check if Q object has children - it might be a Q() with no children (empty) or Q() with children
-        has_children = bool(q_objects.children) if q_objects else False
-        logger.debug(
-            f"Built Q object: has_children={has_children}, "
-            f"parsed_query={parsed_query}, valid_fields={valid_fields}, "
-            f"q_objects={q_objects}, type={type(q_objects)}"
+        return queryset
+    
+    @staticmethod
+    def _render_highlights(text: str) -> str:
+        """Escape indexed text as HTML and mark the highlighted matches."""
+        return (
+            html.escape(text or '')
+            .replace(SearchService.HIGHLIGHT_START, '<mark>')
+            .replace(SearchService.HIGHLIGHT_STOP, '</mark>')
         )
-        
-        # If we have an empty Q object but field_queries exist, log a warning
-        if not has_children and parsed_query.get('field_queries'):
-            logger.warning(f"Q object is empty but field_queries exist: {parsed_query.get('field_queries')}")
-        
-        return q_objects
+    
+    @staticmethod
+    def _serialize(document: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'content_type': document['content_type'],
+            'id': str(document['object_id']),
+            'title': document['title'],
+            'highlighted_title': SearchService._render_highlights(document['highlighted_title'] or document['title']),
+            'snippet': SearchService._render_highlights(document['snippet'] or ''),
+            'project_id': str(document['project_id']) if document['project_id'] else None,
+            'status': document['status'],
+            'rank': document['rank'],
+            'created_at': document['created_at'],
+        }
     
     @staticmethod
     def search(
@@ -393,143 +386,22 @@ class SearchService:
         Returns:
             dict with search results organized by content type
         """
-        if content_types is None:
-            content_types = ['userstory', 'task', 'bug', 'issue', 'epic']
-        
-        if filters is None:
-            filters = {}
-        
-        # Parse the query
-        parsed_query = SearchService.parse_query(query)
-        
-        # Get accessible projects for user
-        accessible_projects = []
-        if user and not user.is_anonymous:
-            from apps.core.services.roles import RoleService
-            if RoleService.is_admin(user):
-                accessible_projects = list(Project.objects.all().values_list('id', flat=True))
-            else:
-                accessible_projects = list(Project.objects.filter(
-                    Q(owner=user) | Q(members__id=user.id)
-                ).values_list('id', flat=True))
-        
-        results = {}
-        
-        # Search each content type
-        for content_type in content_types:
-            model_class = None
-            search_fields = []
-            
-            if content_type == 'userstory':
-                model_class = UserStory
-                search_fields = SearchService.SEARCHABLE_FIELDS['userstory']
-            elif content_type == 'task':
-                model_class = Task
-                search_fields = SearchService.SEARCHABLE_FIELDS['task']
-            elif content_type == 'bug':
-                model_class = Bug
-                search_fields = SearchService.SEARCHABLE_FIELDS['bug']
-            elif content_type == 'issue':
-                model_class = Issue
-                search_fields = SearchService.SEARCHABLE_FIELDS['issue']
-            elif content_type == 'epic':
-                model_class = Epic
-                search_fields = SearchService.SEARCHABLE_FIELDS['epic']
-            elif content_type == 'project':
-                model_class = Project
-                search_fields = SearchService.SEARCHABLE_FIELDS['project']
-            
-            if not model_class:
-                continue
-            
-            # Build base queryset
-            queryset = model_class.objects.all()
-            
-            # Apply project filter
-            if project:
-                if hasattr(model_class, 'project'):
-                    queryset = queryset.filter(project=project)
-                elif hasattr(model_class, 'story') and hasattr(model_class.story, 'project'):
-                    # For Task model, filter through story
-                    queryset = queryset.filter(story__project=project)
-            elif accessible_projects:
-                # Filter to accessible projects
-                if hasattr(model_class, 'project'):
-                    queryset = queryset.filter(project_id__in=accessible_projects)
-                elif hasattr(model_class, 'story') and hasattr(model_class.story, 'project'):
-                    queryset = queryset.filter(story__project_id__in=accessible_projects)
-            
-            # Debug: Log queryset count before search filter
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.debug(f"Base queryset for {content_type} (project={project.id if project else 'all'}): {queryset.count()} items")
-            
-            # Apply additional filters
-            for filter_key, filter_value in filters.items():
-                if hasattr(model_class, filter_key):
-                    if isinstance(filter_value, list):
-                        queryset = queryset.filter(**{f'{filter_key}__in': filter_value})
-                    else:
-                        queryset = queryset.filter(**{filter_key: filter_value})
-            
-            # Apply search query
-            if query and query.strip():
-                try:
-                    search_q = SearchService.build_q_objects(parsed_query, search_fields, model_class)
-                    if search_q.children:  # Only filter if we have valid conditions
-                        queryset_before = queryset.count()
-                        queryset = queryset.filter(search_q)
-                        queryset_after = queryset.count()
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.debug(
-                            f"Applied search filter for {content_type}: "
-                            f"{queryset_before} -> {queryset_after} items, "
-                            f"Q object: {search_q}"
-                        )
-                    else:
-                        # If query exists but no valid conditions were built, return empty results
-                        # This means the query couldn't be matched to any searchable fields
-                        import logging
-                        logger = logging.getLogger(__name__)
-                        logger.warning(f"Search query '{query}' resulted in empty Q object for {content_type}. Parsed: {parsed_query}")
-                        results[content_type] = []
-                        continue
-                except Exception as e:
-                    # If search query building fails, log error but don't fail completely
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Search query failed for {content_type}: {str(e)}", exc_info=True)
-                    results[content_type] = []
-                    continue
-            
-            # Apply limit
-            if limit:
-                queryset = queryset[:limit]
-            
-            # Get appropriate fields based on model
-            if content_type == 'project':
-                # Project uses 'name' instead of 'title'
-                results[content_type] = [
-                    {
-                        'id': item['id'],
-                        'title': item.get('name', ''),
-                        'created_at': item.get('created_at')
-                    }
-                    for item in queryset.values('id', 'name', 'created_at')
-                ]
-            else:
-                # All other models use 'title'
-                result_list = list(queryset.values('id', 'title', 'created_at'))
-                results[content_type] = result_list
-                
-                # Debug: Log final result count
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.debug(f"Final results for {content_type}: {len(result_list)} items")
-                if len(result_list) > 0:
-                    logger.debug(f"Sample result: {result_list[0]}")
-        
+        content_types = content_types or SearchService.DEFAULT_CONTENT_TYPES
+        queryset = SearchService.build_queryset(query, content_types, filters, project, user)
+        
+        if limit:
+            # Top results per type in the same query
+            queryset = queryset.annotate(
+                type_position=Window(
+                    RowNumber(),
+                    partition_by=[F('content_type')],
+                    order_by=[F('rank').desc(), F('created_at').desc()]
+                )
+            ).filter(type_position__lte=limit)
+        
+        results = {content_type: [] for content_type in content_types}
+        for document in queryset.values(*SearchService.RESULT_FIELDS):
+            results[document['content_type']].append(SearchService._serialize(document))
         return results
     
     @staticmethod
@@ -539,41 +411,31 @@ class SearchService:
         filters: Optional[Dict[str, Any]] = None,
         project: Optional[Project] = None,
         user=None,
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        offset: int = 0
     ) -> List[Dict[str, Any]]:
         """
-        Perform unified search across all models and return a single sorted list.
+        Perform unified search across all models and return a single ranked page.
+        
+        Args:
+            limit: Page size (defaults to SEARCH_PAGE_SIZE)
+            offset: Number of results to skip
         
         Returns:
-            List of results with content_type and object data
+            List of results with content_type, highlighted title and snippet
         """
-        results = SearchService.search(
-            query=query,
-            content_types=content_types,
-            filters=filters,
-            project=project,
-            user=user,
-            limit=limit
-        )
-        
-        unified_results = []
-        for content_type, items in results.items():
-            for item in items:
-                unified_results.append({
-                    'content_type': content_type,
-                    'id': str(item['id']),
-                    'title': item.get('title', ''),
-                    'created_at': item.get('created_at'),
-                })
-        
-        # Sort by created_at (newest first)
-        unified_results.sort(key=lambda x: x.get('created_at') or '', reverse=True)
-        
-        return unified_results
+        limit = limit or getattr(settings, 'SEARCH_PAGE_SIZE', 50)
+        queryset = SearchService.build_queryset(query, content_types, filters, project, user)
+        page = queryset.values(*SearchService.RESULT_FIELDS)[offset:offset + limit]
+        return [SearchService._serialize(document) for document in page]
+
+
+def _tokens(text: str) -> List[str]:
+    """Word tokens safe to embed in tsquery/FTS5 syntax."""
+    return re.findall(r'\w+', text.lower())
 
 
 # Convenience function
 def search(*args, **kwargs):
     """Convenience function to perform search."""
     return SearchService.search(*args, **kwargs)
-
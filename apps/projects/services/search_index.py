@@ -0,0 +1,245 @@
+"""
+Search index maintenance.
+
+Projects and work items are denormalized into SearchDocument rows, one per
+object, which the database indexes for full text (PostgreSQL tsvector/GIN,
+SQLite FTS5). Documents are written by signals on save/delete; bulk updates
+that bypass signals are picked up by ``manage.py rebuild_search_index``.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from django.apps import apps as global_apps
+
+logger = logging.getLogger(__name__)
+
+
+# Full-text index over search_documents, per database vendor. Statements are
+# idempotent: they run from migration 0031 and again after every migrate so
+# test databases built without migrations get them too.
+POSTGRES_FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION search_documents_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.tags, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.body, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    "DROP TRIGGER IF EXISTS search_documents_vector_trigger ON search_documents;",
+    """
+    CREATE TRIGGER search_documents_vector_trigger
+    BEFORE INSERT OR UPDATE ON search_documents
+    FOR EACH ROW EXECUTE FUNCTION search_documents_vector_update();
+    """,
+    "CREATE INDEX IF NOT EXISTS search_documents_vector_gin ON search_documents USING GIN (search_vector);",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS search_documents_vector_gin;",
+    "DROP TRIGGER IF EXISTS search_documents_vector_trigger ON search_documents;",
+    "DROP FUNCTION IF EXISTS search_documents_vector_update();",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5(
+        title, tags, body,
+        content='search_documents', content_rowid='id', tokenize='unicode61'
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_fts_insert AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_documents_fts(rowid, title, tags, body)
+        VALUES (new.id, new.title, new.tags, new.body);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_fts_delete AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, tags, body)
+        VALUES ('delete', old.id, old.title, old.tags, old.body);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_fts_update AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, tags, body)
+        VALUES ('delete', old.id, old.title, old.tags, old.body);
+        INSERT INTO search_documents_fts(rowid, title, tags, body)
+        VALUES (new.id, new.title, new.tags, new.body);
+    END;
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS search_documents_fts_update;",
+    "DROP TRIGGER IF EXISTS search_documents_fts_delete;",
+    "DROP TRIGGER IF EXISTS search_documents_fts_insert;",
+    "DROP TABLE IF EXISTS search_documents_fts;",
+]
+
+
+# content type -> model name in the projects app
+INDEXED_MODELS = {
+    'project': 'Project',
+    'epic': 'Epic',
+    'userstory': 'UserStory',
+    'task': 'Task',
+    'bug': 'Bug',
+    'issue': 'Issue',
+}
+
+# Text fields folded into the document body, per content type
+BODY_FIELDS = {
+    'project': ['description'],
+    'epic': ['description'],
+    'userstory': ['description', 'acceptance_criteria'],
+    'task': ['description'],
+    'bug': ['description', 'reproduction_steps', 'expected_behavior', 'actual_behavior'],
+    'issue': ['description'],
+}
+
+
+def build_document(content_type: str, instance) -> Dict[str, Any]:
+    """
+    Build SearchDocument field values for an object.
+    
+    Only reads concrete fields, so it also works with historical models in
+    migrations.
+    """
+    if content_type == 'project':
+        project_id = instance.id
+        title = instance.name
+    elif content_type == 'task':
+        project_id = instance.story.project_id if instance.story_id else None
+        title = instance.title
+    else:
+        project_id = instance.project_id
+        title = instance.title
+    
+    body = '\n'.join(
+        str(value) for value in (getattr(instance, field, None) for field in BODY_FIELDS[content_type])
+        if value
+    )
+    tags = getattr(instance, 'tags', None) or []
+    
+    return {
+        'project_id': project_id,
+        'title': (title or '')[:300],
+        'body': body,
+        'tags': ' '.join(str(tag) for tag in tags) if isinstance(tags, list) else str(tags),
+        'status': getattr(instance, 'status', '') or '',
+        'priority': getattr(instance, 'priority', '') or '',
+        'assignee_id': getattr(instance, 'assigned_to_id', None) or getattr(instance, 'owner_id', None),
+        'reporter_id': getattr(instance, 'reporter_id', None),
+        'created_at': instance.created_at,
+    }
+
+
+def index_object(content_type: str, instance):
+    """Create or refresh the search document of an object."""
+    from apps.projects.models import SearchDocument
+    
+    SearchDocument.objects.update_or_create(
+        content_type=content_type,
+        object_id=instance.id,
+        defaults=build_document(content_type, instance)
+    )
+
+
+def index_objects(content_type: str, instances):
+    """Refresh the search documents of many objects of one type (writes that bypass signals)."""
+    from apps.projects.models import SearchDocument
+    
+    instances = list(instances)
+    if not instances:
+        return
+    SearchDocument.objects.filter(
+        content_type=content_type,
+        object_id__in=[instance.id for instance in instances]
+    ).delete()
+    SearchDocument.objects.bulk_create([
+        SearchDocument(content_type=content_type, object_id=instance.id, **build_document(content_type, instance))
+        for instance in instances
+    ])
+
+
+def remove_object(content_type: str, object_id):
+    """Delete the search document of an object."""
+    from apps.projects.models import SearchDocument
+    
+    SearchDocument.objects.filter(content_type=content_type, object_id=object_id).delete()
+
+
+def get_content_type(model) -> Optional[str]:
+    """Content type key for an indexed model class, or None."""
+    for content_type, model_name in INDEXED_MODELS.items():
+        if model.__name__ == model_name and model._meta.app_label == 'projects':
+            return content_type
+    return None
+
+
+def create_fulltext_index(connection):
+    """Create the vendor-specific full-text index (no-op on other databases)."""
+    statements = {
+        'postgresql': POSTGRES_FORWARD,
+        'sqlite': SQLITE_FORWARD,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_fulltext_index(connection):
+    """Drop the vendor-specific full-text index."""
+    statements = {
+        'postgresql': POSTGRES_REVERSE,
+        'sqlite': SQLITE_REVERSE,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(apps=None, batch_size: int = 500) -> int:
+    """
+    Re-create every search document.
+    
+    Args:
+        apps: App registry (historical registry when run from a migration)
+        batch_size: Objects read and written per batch
+    
+    Returns:
+        Number of documents written
+    """
+    apps = apps or global_apps
+    SearchDocument = apps.get_model('projects', 'SearchDocument')
+    SearchDocument.objects.all().delete()
+    
+    total = 0
+    for content_type, model_name in INDEXED_MODELS.items():
+        model = apps.get_model('projects', model_name)
+        queryset = model.objects.all()
+        if content_type == 'task':
+            queryset = queryset.select_related('story')
+        
+        batch = []
+        for instance in queryset.iterator(chunk_size=batch_size):
+            batch.append(SearchDocument(
+                content_type=content_type,
+                object_id=instance.id,
+                **build_document(content_type, instance)
+            ))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            SearchDocument.objects.bulk_create(batch)
+            total += len(batch)
+    
+    logger.info(f"Rebuilt search index: {total} documents")
+    return total
@@ -2,32 +2,40 @@
 Statistics Service for Project Management
 
 Provides backend statistics calculation for story types, components, and other metrics.
-Includes caching for performance optimization.
+Results are cached under the project's series version (see timeseries), which
+changes whenever a work item of the project changes.
 """
 
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from django.conf import settings
 from django.db.models import Count, Q, Sum, Avg, F
 from django.core.cache import cache
 from django.utils import timezone
 from apps.projects.models import UserStory, Task, Bug, Issue, Project
+from apps.projects.services.timeseries import bump_series_version, get_daily_counts, get_series_version
 
 logger = logging.getLogger(__name__)
 
 
+def _start_of(day):
+    """Local midnight of a day, so day filters can use the created_at index."""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
 class StatisticsService:
     """
     Service for calculating project statistics.
-    Includes caching for performance.
+    Cached results are invalidated by work item changes, not by expiry.
     """
     
-    CACHE_TIMEOUT = 300  # 5 minutes
+    CACHE_TIMEOUT = getattr(settings, 'SERIES_CACHE_TIMEOUT', 86400)  # Only bounds unused entries
     
     @staticmethod
     def _get_cache_key(project_id: str, stat_type: str, **kwargs) -> str:
-        """Generate cache key for statistics."""
-        key_parts = [f'stats:{project_id}:{stat_type}']
+        """Generate cache key for statistics, tied to the project's series version."""
+        key_parts = [f'stats:{project_id}:{get_series_version(project_id)}:{stat_type}']
         for k, v in sorted(kwargs.items()):
             key_parts.append(f'{k}:{v}')
         return ':'.join(key_parts)
@@ -171,7 +179,10 @@ class StatisticsService:
         Returns:
             List of dictionaries with date and counts per story type
         """
-        cache_key = self._get_cache_key(project_id, 'story_type_trends', days=days)
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=days)
+        # Keyed by day as well: the window moves even when nothing changes
+        cache_key = self._get_cache_key(project_id, 'story_type_trends', days=days, end=end_date.isoformat())
         
         if use_cache:
             cached = cache.get(cache_key)
@@ -179,36 +190,11 @@ class StatisticsService:
                 return cached
         
         try:
-            start_date = timezone.now() - timedelta(days=days)
-            
-            # Get stories created in the time period
             stories = UserStory.objects.filter(
                 project_id=project_id,
-                created_at__gte=start_date
+                created_at__gte=_start_of(start_date)
             )
-            
-            # Group by date and story_type
-            trends = []
-            current_date = start_date.date()
-            end_date = timezone.now().date()
-            
-            while current_date <= end_date:
-                day_stories = stories.filter(
-                    created_at__date=current_date
-                )
-                
-                day_counts = {}
-                for story in day_stories:
-                    story_type = story.story_type or 'unknown'
-                    day_counts[story_type] = day_counts.get(story_type, 0) + 1
-                
-                trends.append({
-                    'date': current_date.isoformat(),
-                    'counts': day_counts,
-                    'total': day_stories.count()
-                })
-                
-                current_date += timedelta(days=1)
+            trends = get_daily_counts([stories], 'story_type', start_date, end_date)
             
             if use_cache:
                 cache.set(cache_key, trends, self.CACHE_TIMEOUT)
@@ -236,7 +222,9 @@ class StatisticsService:
         Returns:
             List of dictionaries with date and counts per component
         """
-        cache_key = self._get_cache_key(project_id, 'component_trends', days=days)
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=days)
+        cache_key = self._get_cache_key(project_id, 'component_trends', days=days, end=end_date.isoformat())
         
         if use_cache:
             cached = cache.get(cache_key)
@@ -244,67 +232,15 @@ class StatisticsService:
                 return cached
         
         try:
-            start_date = timezone.now() - timedelta(days=days)
-            
-            # Get all work items with components created in the time period
-            stories = UserStory.objects.filter(
-                project_id=project_id,
-                component__isnull=False,
-                component__gt='',
-                created_at__gte=start_date
-            )
-            
-            # Tasks are related to projects through stories
-            tasks = Task.objects.filter(
-                story__project_id=project_id,
-                component__isnull=False,
-                component__gt='',
-                created_at__gte=start_date
-            )
-            
-            bugs = Bug.objects.filter(
-                project_id=project_id,
-                component__isnull=False,
-                component__gt='',
-                created_at__gte=start_date
-            )
-            
-            issues = Issue.objects.filter(
-                project_id=project_id,
-                component__isnull=False,
-                component__gt='',
-                created_at__gte=start_date
-            )
-            
-            # Combine all items
-            all_items = []
-            for model in [stories, tasks, bugs, issues]:
-                all_items.extend(list(model))
-            
-            # Group by date and component
-            trends = []
-            current_date = start_date.date()
-            end_date = timezone.now().date()
-            
-            while current_date <= end_date:
-                day_items = [
-                    item for item in all_items
-                    if item.created_at.date() == current_date
-                ]
-                
-                day_counts = {}
-                for item in day_items:
-                    component = item.component
-                    if component:
-                        day_counts[component] = day_counts.get(component, 0) + 1
-                
-                trends.append({
-                    'date': current_date.isoformat(),
-                    'counts': day_counts,
-                    'total': len(day_items)
-                })
-                
-                current_date += timedelta(days=1)
+            with_component = Q(component__isnull=False, component__gt='', created_at__gte=_start_of(start_date))
+            querysets = [
+                UserStory.objects.filter(with_component, project_id=project_id),
+                # Tasks are related to projects through stories
+                Task.objects.filter(with_component, story__project_id=project_id),
+                Bug.objects.filter(with_component, project_id=project_id),
+                Issue.objects.filter(with_component, project_id=project_id),
+            ]
+            trends = get_daily_counts(querysets, 'component', start_date, end_date)
             
             if use_cache:
                 cache.set(cache_key, trends, self.CACHE_TIMEOUT)
@@ -319,26 +255,15 @@ class StatisticsService:
         """
         Invalidate cache for project statistics.
         
+        Every cached statistic and series of the project is dropped by moving
+        it to a new version; signals already do this on work item changes, so
+        this is only needed after writes that bypass them.
+        
         Args:
             project_id: UUID of the project
-            stat_type: Specific stat type to invalidate, or None for all
+            stat_type: Kept for compatibility; all stat types are invalidated
         """
-        if stat_type:
-            # Invalidate specific stat type
-            pattern = f'stats:{project_id}:{stat_type}*'
-            # Note: Django cache doesn't support pattern deletion directly
-            # This would need Redis or similar for pattern matching
-            logger.warning(f"Cache invalidation for pattern {pattern} not fully supported with default cache backend")
-        else:
-            # Invalidate all stats for project
-            patterns = [
-                f'stats:{project_id}:story_type_distribution',
-                f'stats:{project_id}:component_distribution',
-                f'stats:{project_id}:story_type_trends*',
-                f'stats:{project_id}:component_trends*',
-            ]
-            for pattern in patterns:
-                logger.warning(f"Cache invalidation for pattern {pattern} not fully supported with default cache backend")
+        bump_series_version(project_id)
 
 
 # Singleton instance
@@ -0,0 +1,282 @@
+"""
+Project time series.
+
+Burndown, velocity and trend series are computed from a fixed number of
+queries: the rows a series needs are fetched once (or grouped by the
+database) and the daily values are built in a single pass over them.
+
+Burndown follows real status transitions, read from ``story_status_changed``
+activities. Single saves write one per story (see signals), bulk operations
+one per chunk with the stories in ``metadata.item_ids``. Stories whose
+history does not explain their current status (changed before transitions
+were recorded, or by a raw queryset update) fall back to ``updated_at`` for
+their last move in or out of done.
+
+Computed series are cached under a per-project version that signals and bulk
+writes bump on every work item change, so a cached series is served until the
+data behind it changes. SERIES_CACHE_TIMEOUT only bounds how long unused
+entries stay in the cache.
+"""
+
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# Statuses that count a story's points as burned
+DONE_STATUSES = ('done',)
+
+SERIES_VERSION_KEY = 'series_version:{project_id}'
+
+
+def get_series_version(project_id) -> int:
+    """Current cache version of a project's series."""
+    key = SERIES_VERSION_KEY.format(project_id=project_id)
+    version = cache.get(key)
+    if version is None:
+        # Seeded from the clock so an evicted version never reuses old entries
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def bump_series_version(project_id):
+    """Invalidate every cached series of a project (call after any work item change)."""
+    if not project_id:
+        return
+    key = SERIES_VERSION_KEY.format(project_id=project_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    except Exception as e:
+        logger.warning(f"[TimeSeries] Could not bump series version for project {project_id}: {e}")
+
+
+def series_cache_key(project_id, name: str, **params) -> str:
+    """Cache key of a series, tied to the project's current version."""
+    key_parts = [f'series:{project_id}:{get_series_version(project_id)}:{name}']
+    for k, v in sorted(params.items()):
+        key_parts.append(f'{k}:{v}')
+    return ':'.join(key_parts)
+
+
+def cached_series(project_id, name: str, compute: Callable[[], Any], **params):
+    """Return a cached series, computing and storing it on a miss."""
+    key = series_cache_key(project_id, name, **params)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'SERIES_CACHE_TIMEOUT', 86400))
+    return value
+
+
+def date_range(start: date, end: date) -> List[date]:
+    """Days from start to end, inclusive."""
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def _local_date(value: datetime) -> date:
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def load_status_transitions(
+    project_id,
+    story_ids: Iterable,
+    since: Optional[datetime] = None
+) -> Dict[str, List[Tuple[datetime, Optional[str], str]]]:
+    """
+    Status transitions of stories, in one query.
+    
+    Args:
+        project_id: Project the stories belong to
+        story_ids: Stories to collect transitions for
+        since: Ignore transitions before this time (e.g. the oldest story's creation)
+    
+    Returns:
+        Dict of story id -> [(timestamp, old_status or None, new_status)], oldest first
+    """
+    from apps.projects.models import Activity
+    
+    wanted = {str(story_id) for story_id in story_ids}
+    transitions: Dict[str, List[Tuple[datetime, Optional[str], str]]] = {}
+    if not wanted:
+        return transitions
+    
+    activities = Activity.objects.filter(project_id=project_id, activity_type='story_status_changed')
+    if since:
+        activities = activities.filter(created_at__gte=since)
+    
+    for object_id, metadata, created_at in activities.order_by('created_at').values_list(
+        'object_id', 'metadata', 'created_at'
+    ):
+        metadata = metadata or {}
+        new_status = metadata.get('new_status')
+        if not new_status:
+            continue
+        item_ids = metadata.get('item_ids') or ([str(object_id)] if object_id else [])
+        for item_id in item_ids:
+            if item_id in wanted:
+                transitions.setdefault(item_id, []).append((created_at, metadata.get('old_status'), new_status))
+    return transitions
+
+
+def completed_points_series(
+    stories: List[Dict[str, Any]],
+    transitions: Dict[str, List[Tuple[datetime, Optional[str], str]]],
+    days: List[date],
+    done_statuses: Iterable[str] = DONE_STATUSES
+) -> List[int]:
+    """
+    Points done at the end of each day.
+    
+    Each story contributes +points on the day it moves into done and -points
+    on the day it moves out; the series is the running sum of those deltas.
+    Moves before the first day land on the first day, moves after the last
+    day are dropped.
+    
+    Args:
+        stories: Dicts with ``id``, ``story_points``, ``status`` and ``updated_at``
+        transitions: Output of ``load_status_transitions``
+        days: Consecutive days of the series
+        done_statuses: Statuses that count as done
+    """
+    if not days:
+        return []
+    done_statuses = set(done_statuses)
+    first_day = days[0]
+    deltas = [0] * len(days)
+    
+    def add(moment: Optional[datetime], points: int):
+        index = max(0, (_local_date(moment) - first_day).days) if moment else 0
+        if index < len(deltas):
+            deltas[index] += points
+    
+    for story in stories:
+        points = story['story_points'] or 0
+        if not points:
+            continue
+        history = transitions.get(str(story['id']), [])
+        
+        done = bool(history) and history[0][1] in done_statuses
+        if done:
+            add(None, points)
+        for moment, _, new_status in history:
+            now_done = new_status in done_statuses
+            if now_done != done:
+                add(moment, points if now_done else -points)
+                done = now_done
+        
+        if done != (story['status'] in done_statuses):
+            add(story['updated_at'], -points if done else points)
+    
+    series = []
+    running = 0
+    for delta in deltas:
+        running += delta
+        series.append(running)
+    return series
+
+
+def get_sprint_burndown(sprint) -> Dict[str, Any]:
+    """
+    Daily burndown of a sprint from status transition history.
+    
+    Returns:
+        Dict with ``total_points`` and per-day ``dates``, ``completed_points``
+        and ``remaining_points``
+    """
+    from apps.projects.models import UserStory
+    
+    stories = list(
+        UserStory.objects.filter(sprint_id=sprint.id)
+        .order_by()
+        .values('id', 'story_points', 'status', 'created_at', 'updated_at')
+    )
+    total_points = sum(story['story_points'] or 0 for story in stories)
+    days = date_range(sprint.start_date, sprint.end_date) if sprint.start_date and sprint.end_date else []
+    
+    transitions = load_status_transitions(
+        sprint.project_id,
+        [story['id'] for story in stories],
+        since=min((story['created_at'] for story in stories), default=None)
+    )
+    completed = completed_points_series(stories, transitions, days)
+    
+    return {
+        'total_points': total_points,
+        'dates': [day.isoformat() for day in days],
+        'completed_points': completed,
+        'remaining_points': [total_points - points for points in completed],
+    }
+
+
+def get_sprint_points(sprint_ids: Iterable) -> Dict[str, Dict[str, int]]:
+    """
+    Committed and completed points of several sprints in one grouped query.
+    
+    Returns:
+        Dict of sprint id -> {'total_points', 'completed_points'}; sprints
+        without stories are missing
+    """
+    from apps.projects.models import UserStory
+    
+    rows = (
+        UserStory.objects.filter(sprint_id__in=list(sprint_ids))
+        .order_by()
+        .values('sprint_id')
+        .annotate(
+            total_points=Sum('story_points'),
+            completed_points=Sum('story_points', filter=Q(status__in=DONE_STATUSES)),
+        )
+    )
+    return {
+        str(row['sprint_id']): {
+            'total_points': row['total_points'] or 0,
+            'completed_points': row['completed_points'] or 0,
+        }
+        for row in rows
+    }
+
+
+def get_daily_counts(querysets: Iterable, field: str, start: date, end: date) -> List[Dict[str, Any]]:
+    """
+    Items created per day, broken down by a field.
+    
+    Each queryset is grouped by creation day and ``field`` in the database;
+    empty values are counted as 'unknown'.
+    
+    Returns:
+        One {'date', 'counts', 'total'} entry per day from start to end
+    """
+    by_day: Dict[date, Dict[str, int]] = {}
+    for queryset in querysets:
+        rows = (
+            queryset.order_by()
+            .annotate(day=TruncDate('created_at'))
+            .values('day', field)
+            .annotate(count=Count('id'))
+        )
+        for row in rows:
+            counts = by_day.setdefault(row['day'], {})
+            key = row[field] or 'unknown'
+            counts[key] = counts.get(key, 0) + row['count']
+    
+    return [
+        {
+            'date': day.isoformat(),
+            'counts': by_day.get(day, {}),
+            'total': sum(by_day.get(day, {}).values()),
+        }
+        for day in date_range(start, end)
+    ]
@@ -0,0 +1,495 @@
+"""
+Work Item Event Pipeline
+
+Post-save work for stories, epics, tasks and comments (automation rules,
+assignment rules, auto-tagging, mentions, notifications and their WebSocket
+pushes) runs off the request path.
+
+Signals emit compact change events; once the transaction commits, events are
+handed to a consumer (WORK_ITEM_EVENTS_BACKEND):
+- ``celery``: events are pushed onto a Redis list and the first event of each
+  batch window schedules ``process_work_item_events``. Falls back to
+  ``inprocess`` when the default cache is not Redis-backed.
+- ``inprocess``: a daemon thread drains an in-process queue every batch window.
+- ``sync``: events are processed immediately in the save path (test settings).
+
+Consumers process events in batches, coalescing all events for the same item
+into one run. Each step of a run claims an idempotency key first, so a retried
+batch does not repeat rules or notifications that already ran.
+
+Saves made while handling events (rule actions, auto-tagging) do not emit new
+events, so the pipeline never feeds itself.
+
+Bulk operations emit events too (``emit_bulk``). Their items run the same
+rules, but skip per-item notifications and mentions: the bulk operation sends
+one aggregated notification and does not change text.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+_state = threading.local()
+
+
+def get_request_user():
+    """Get the authenticated user of the current request (set by the audit middleware), if any."""
+    try:
+        from apps.monitoring.middleware import _thread_locals
+    except Exception:
+        return None
+    user = getattr(_thread_locals, 'user', None)
+    if user is not None and not getattr(user, 'is_authenticated', False):
+        return None
+    return user
+
+
+class WorkItemEventBus:
+    """
+    Emit, queue and process work item change events.
+    
+    Event layout: {'id', 'item_type', 'item_id', 'created', 'previous', 'actor_id', 'bulk'}
+    where ``previous`` holds the tracked field values before the save.
+    """
+    
+    REDIS_KEY = 'work_item_events'
+    SCHEDULED_KEY = 'work_item_events_scheduled'
+    IDEMPOTENCY_KEY_PREFIX = 'work_item_event_done_'
+    
+    def __init__(self):
+        self._queue: deque = deque()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self._thread: Optional[threading.Thread] = None
+        self._handlers: Dict[str, Callable] = {
+            'story': handle_story_events,
+            'epic': handle_epic_events,
+            'task': handle_task_events,
+            'comment': handle_comment_events,
+        }
+    
+    @property
+    def backend(self) -> str:
+        return getattr(settings, 'WORK_ITEM_EVENTS_BACKEND', 'celery')
+    
+    @property
+    def batch_size(self) -> int:
+        return max(1, getattr(settings, 'WORK_ITEM_EVENTS_BATCH_SIZE', 100))
+    
+    @property
+    def batch_window(self) -> float:
+        return getattr(settings, 'WORK_ITEM_EVENTS_BATCH_WINDOW', 1.0)
+    
+    def emit(
+        self,
+        item_type: str,
+        item_id,
+        created: bool = False,
+        previous: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Record a change to a work item.
+        
+        Args:
+            item_type: 'story', 'epic', 'task' or 'comment'
+            item_id: Primary key of the item
+            created: Whether the save created the item
+            previous: Tracked field values before the save (JSON-serializable)
+        """
+        if getattr(_state, 'processing', False):
+            return
+        
+        actor = get_request_user()
+        self._dispatch([self._event(item_type, item_id, created, previous, actor)])
+    
+    def emit_bulk(
+        self,
+        item_type: str,
+        previous_by_id: Dict[Any, Dict[str, Any]],
+        actor: Optional[Any] = None
+    ):
+        """
+        Record a bulk update of work items of one type, one event per item.
+        
+        Args:
+            item_type: 'story', 'epic', 'task' or 'comment'
+            previous_by_id: Item primary key -> tracked field values before the update
+            actor: User performing the operation (defaults to the request user)
+        """
+        if getattr(_state, 'processing', False) or not previous_by_id:
+            return
+        
+        actor = actor or get_request_user()
+        self._dispatch([
+            self._event(item_type, item_id, False, previous, actor, bulk=True)
+            for item_id, previous in previous_by_id.items()
+        ])
+    
+    @staticmethod
+    def _event(item_type, item_id, created, previous, actor, bulk=False) -> Dict[str, Any]:
+        return {
+            'id': uuid.uuid4().hex,
+            'item_type': item_type,
+            'item_id': str(item_id),
+            'created': created,
+            'previous': previous or {},
+            'actor_id': str(actor.pk) if actor else None,
+            'bulk': bulk,
+        }
+    
+    def _dispatch(self, events: List[Dict[str, Any]]):
+        if self.backend == 'sync':
+            self.process(events)
+            return
+        transaction.on_commit(lambda: self._enqueue(events))
+    
+    def process(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Process a batch of events, one handler run per item.
+        
+        Returns:
+            Number of items processed
+        """
+        groups = coalesce_events(events)
+        _state.processing = True
+        try:
+            for group in groups:
+                handler = self._handlers.get(group['item_type'])
+                if handler is None:
+                    continue
+                try:
+                    handler(group, self.claim)
+                except Exception as e:
+                    logger.error(
+                        f"[WorkItemEvents] Error processing {group['item_type']} {group['item_id']}: {e}",
+                        exc_info=True
+                    )
+        finally:
+            _state.processing = False
+        return len(groups)
+    
+    def claim(self, group: Dict[str, Any], step: str) -> bool:
+        """
+        Claim an idempotency key for one step of a coalesced event group.
+        
+        Returns:
+            False if the step already ran for this group
+        """
+        key = f"{self.IDEMPOTENCY_KEY_PREFIX}{group['key']}_{step}"
+        return cache.add(key, 1, getattr(settings, 'WORK_ITEM_EVENTS_IDEMPOTENCY_TTL', 86400))
+    
+    def drain_redis(self) -> int:
+        """Process everything queued in Redis (run by the Celery task)."""
+        from core.enhanced_caching import get_redis_client
+        
+        # Clear the flag first so events pushed from now on schedule a new run
+        cache.delete(self.SCHEDULED_KEY)
+        client = get_redis_client()
+        if client is None:
+            return 0
+        
+        processed = 0
+        while True:
+            pipe = client.pipeline()
+            pipe.lrange(self.REDIS_KEY, 0, self.batch_size - 1)
+            pipe.ltrim(self.REDIS_KEY, self.batch_size, -1)
+            raw_events, _ = pipe.execute()
+            if not raw_events:
+                return processed
+            processed += self.process([json.loads(raw) for raw in raw_events])
+    
+    def _enqueue(self, events: List[Dict[str, Any]]):
+        if self.backend == 'celery' and self._push_redis(events):
+            return
+        self._ensure_worker()
+        self._queue.extend(events)
+    
+    def _push_redis(self, events: List[Dict[str, Any]]) -> bool:
+        from core.enhanced_caching import get_redis_client
+        
+        client = get_redis_client()
+        if client is None:
+            return False
+        try:
+            client.rpush(self.REDIS_KEY, *[json.dumps(event) for event in events])
+        except Exception as e:
+            logger.warning(f"[WorkItemEvents] Redis push failed, processing in-process: {e}")
+            return False
+        
+        # First event of a window schedules the batch
+        if cache.add(self.SCHEDULED_KEY, 1, int(self.batch_window) + 60):
+            try:
+                from apps.projects.tasks import process_work_item_events
+                process_work_item_events.apply_async(countdown=self.batch_window)
+            except Exception as e:
+                # Left in Redis; the periodic sweep picks them up
+                cache.delete(self.SCHEDULED_KEY)
+                logger.warning(f"[WorkItemEvents] Could not schedule event processing: {e}")
+        return True
+    
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Forked worker: the parent's queue and thread are not ours
+                self._queue = deque()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='work-item-events', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.batch_window)
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+                try:
+                    self.process(batch)
+                finally:
+                    close_old_connections()
+
+
+def coalesce_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge events for the same item, keeping first-seen order.
+    
+    The merged group is created if any event created the item, is bulk only
+    if every event was, keeps the oldest ``previous`` state and the latest
+    actor, and is keyed by its last event id.
+    """
+    groups: Dict[tuple, Dict[str, Any]] = OrderedDict()
+    for event in events:
+        ident = (event['item_type'], event['item_id'])
+        group = groups.get(ident)
+        if group is None:
+            groups[ident] = {
+                'item_type': event['item_type'],
+                'item_id': event['item_id'],
+                'created': event['created'],
+                'previous': dict(event['previous']),
+                'actor_id': event['actor_id'],
+                'bulk': event.get('bulk', False),
+                'key': event['id'],
+            }
+            continue
+        group['created'] = group['created'] or event['created']
+        group['bulk'] = group['bulk'] and event.get('bulk', False)
+        for field, value in event['previous'].items():
+            group['previous'].setdefault(field, value)
+        group['actor_id'] = event['actor_id'] or group['actor_id']
+        group['key'] = event['id']
+    return list(groups.values())
+
+
+def _get_user(user_id) -> Optional[Any]:
+    if not user_id:
+        return None
+    return User.objects.filter(pk=user_id).first()
+
+
+def find_mentioned_user(mention_text: str):
+    """Resolve @mention text to a user by email, username, email prefix, then case-insensitive username."""
+    if '@' in mention_text and mention_text.count('@') == 1:
+        return User.objects.filter(email=mention_text).first()
+    return (
+        User.objects.filter(username=mention_text).first()
+        or User.objects.filter(email__istartswith=mention_text + '@').first()
+        or User.objects.filter(username__iexact=mention_text).first()
+    )
+
+
+def handle_story_events(group: Dict[str, Any], claim: Callable[[Dict[str, Any], str], bool]):
+    """Automation, assignment, tagging, mentions and notifications for a story."""
+    from apps.projects.models import Mention, UserStory
+    from apps.projects.services.assignment_rules import AssignmentRulesService
+    from apps.projects.services.auto_tagging import AutoTaggingService
+    from apps.projects.services.automation import execute_automation_rules
+    from apps.projects.services.notifications import get_notification_service
+    
+    story = UserStory.objects.select_related('project', 'assigned_to', 'created_by').filter(pk=group['item_id']).first()
+    if story is None:
+        return
+    
+    actor = _get_user(group['actor_id']) or story.created_by
+    notification_service = get_notification_service(story.project)
+    
+    if group['created']:
+        if claim(group, 'rules'):
+            results = execute_automation_rules('on_story_create', story)
+            if results:
+                logger.info(f"Executed {len(results)} automation rules on story creation: {story.id}")
+        
+        if claim(group, 'assignment'):
+            try:
+                assignee = AssignmentRulesService.apply_assignment_rules(str(story.project_id), 'story', str(story.id))
+                if assignee:
+                    logger.info(f"Applied assignment rule for story {story.id}: assigned to {assignee.email}")
+            except Exception as e:
+                logger.error(f"Error applying assignment rules: {e}", exc_info=True)
+        
+        if claim(group, 'tagging'):
+            try:
+                applied_tags = AutoTaggingService.apply_auto_tagging(str(story.project_id), 'story', str(story.id))
+                if applied_tags:
+                    logger.info(f"Applied auto-tagging for story {story.id}: {applied_tags}")
+            except Exception as e:
+                logger.error(f"Error applying auto-tagging: {e}", exc_info=True)
+        
+        if actor and claim(group, 'notify'):
+            try:
+                notification_service.notify_story_created(story, actor)
+            except Exception as e:
+                logger.error(f"Error sending story creation notification: {e}", exc_info=True)
+    else:
+        previous = group['previous']
+        old_status = previous.get('status')
+        old_assignee_id = previous.get('assigned_to')
+        new_assignee_id = str(story.assigned_to_id) if story.assigned_to_id else None
+        status_changed = bool(old_status) and old_status != story.status
+        assignee_changed = old_assignee_id != new_assignee_id
+        
+        if status_changed and claim(group, 'status_rules'):
+            results = execute_automation_rules(
+                'on_status_change',
+                story,
+                context={'old_status': old_status, 'new_status': story.status}
+            )
+            if results:
+                logger.info(f"Executed {len(results)} automation rules on status change: {story.id}")
+        
+        if claim(group, 'rules'):
+            results = execute_automation_rules('on_story_update', story, previous)
+            if results:
+                logger.info(f"Executed {len(results)} automation rules on story update: {story.id}")
+        
+        # Bulk operations send one aggregated notification themselves
+        if actor and not group['bulk'] and claim(group, 'notify'):
+            try:
+                if status_changed:
+                    notification_service.notify_status_change(story, old_status, story.status, actor)
+                if assignee_changed and story.assigned_to:
+                    notification_service.notify_assignment(story, _get_user(old_assignee_id), story.assigned_to, actor)
+                if not status_changed and not assignee_changed:
+                    notification_service.notify_story_updated(story, actor)
+            except Exception as e:
+                logger.error(f"Error sending story update notifications: {e}", exc_info=True)
+    
+    # Mentions are re-extracted on every change to catch mentions added later
+    if not group['bulk'] and claim(group, 'mentions'):
+        for mention_text in story.extract_mentions():
+            user = find_mentioned_user(mention_text)
+            if not user:
+                logger.warning(f"[WorkItemEvents] User not found for mention '{mention_text}' in story {story.id}")
+                continue
+            mention, _ = Mention.objects.get_or_create(
+                story=story,
+                mentioned_user=user,
+                mention_text=f"@{mention_text}",
+                defaults={'created_by': actor}
+            )
+            try:
+                notification_service.notify_mention(mention, story)
+            except Exception as e:
+                logger.error(f"Error sending mention notification: {e}", exc_info=True)
+
+
+def handle_comment_events(group: Dict[str, Any], claim: Callable[[Dict[str, Any], str], bool]):
+    """Comment notifications and mentions for a new comment."""
+    from apps.projects.models import Mention, StoryComment
+    from apps.projects.services.notifications import get_notification_service
+    
+    if not group['created']:
+        return
+    comment = StoryComment.objects.select_related('story__project').filter(pk=group['item_id']).first()
+    if comment is None:
+        return
+    
+    actor = _get_user(group['actor_id'])
+    notification_service = get_notification_service(comment.story.project)
+    
+    if claim(group, 'notify'):
+        try:
+            notification_service.notify_comment(comment, comment.story)
+        except Exception as e:
+            logger.error(f"Error sending comment notification: {e}", exc_info=True)
+    
+    if claim(group, 'mentions'):
+        for mention_text in comment.extract_mentions():
+            user = find_mentioned_user(mention_text)
+            if not user:
+                logger.warning(f"[WorkItemEvents] User not found for mention '{mention_text}' in comment {comment.id}")
+                continue
+            mention = Mention.objects.create(
+                comment=comment,
+                story=comment.story,
+                mentioned_user=user,
+                mention_text=f"@{mention_text}",
+                created_by=actor,
+            )
+            try:
+                notification_service.notify_mention(mention, comment.story)
+            except Exception as e:
+                logger.error(f"Error sending mention notification: {e}", exc_info=True)
+
+
+def handle_epic_events(group: Dict[str, Any], claim: Callable[[Dict[str, Any], str], bool]):
+    """Owner assignment notification for an epic."""
+    from apps.projects.models import Epic
+    from apps.projects.services.notifications import get_notification_service
+    
+    epic = Epic.objects.select_related('project', 'owner', 'created_by', 'updated_by').filter(pk=group['item_id']).first()
+    if epic is None or not epic.owner_id:
+        return
+    old_owner_id = group['previous'].get('owner')
+    if str(epic.owner_id) == old_owner_id or not claim(group, 'notify'):
+        return
+    
+    assigned_by = _get_user(group['actor_id']) or epic.updated_by or epic.created_by or epic.owner
+    try:
+        get_notification_service(epic.project).notify_epic_owner_assignment(
+            epic=epic,
+            old_owner=_get_user(old_owner_id),
+            new_owner=epic.owner,
+            assigned_by=assigned_by
+        )
+        logger.info(f"Sent owner assignment notification for epic {epic.id} to {epic.owner.email}")
+    except Exception as e:
+        logger.error(f"Error sending epic owner assignment notification: {e}", exc_info=True)
+
+
+def handle_task_events(group: Dict[str, Any], claim: Callable[[Dict[str, Any], str], bool]):
+    """on_task_complete automation for a task that moved to done."""
+    from apps.projects.models import Task
+    from apps.projects.services.automation import execute_automation_rules
+    
+    task = Task.objects.select_related('story__project').filter(pk=group['item_id']).first()
+    if task is None or not task.story or task.status != 'done':
+        return
+    if group['previous'].get('status') == 'done' or not claim(group, 'rules'):
+        return
+    
+    results = execute_automation_rules('on_task_complete', task.story, context={'task': task})
+    if results:
+        logger.info(f"Executed {len(results)} automation rules on task completion: {task.id}")
+
+
+# Global instance
+work_item_events = WorkItemEventBus()
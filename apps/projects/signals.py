@@ -2,28 +2,29 @@
 Django signals for Project Management app.
 """
 
-from django.db.models.signals import post_save, pre_save
+from django.db import connections
+from django.db.models.signals import post_save, post_delete, post_migrate, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Project, ProjectConfiguration, UserStory, Mention, StoryComment, Task, Epic, Bug, Issue
-from .services.automation import execute_automation_rules
-from .services.notifications import get_notification_service
-from .services.assignment_rules import AssignmentRulesService
-from .services.auto_tagging import AutoTaggingService
-from .utils.work_item_numbers import get_next_work_item_number
+from .models import (
+    Project, ProjectConfiguration, UserStory, StoryComment, Task, Epic, Bug, Issue, Sprint,
+    StoryDependency, StoryLink,
+)
+from .services.activity_logger import ActivityLogger
+from .services.dependency_graph import dependency_graphs
+from .services.search_index import create_fulltext_index, get_content_type, index_object, remove_object
+from .services.timeseries import DONE_STATUSES, bump_series_version
+from .utils.work_item_numbers import (
+    get_next_work_item_number,
+    invalidate_work_item_prefixes,
+    sync_work_item_sequence,
+)
+from .services.work_item_events import get_request_user, work_item_events
 import logging
-import threading
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
-# Store previous state for status change detection
-_story_previous_state = {}
-_epic_previous_state = {}
-
-# Thread locks for thread-safe state management
-_epic_state_lock = threading.Lock()
-
 
 @receiver(post_save, sender=Project)
 def create_project_configuration(sender, instance, created, **kwargs):
@@ -39,6 +40,22 @@ def create_project_configuration(sender, instance, created, **kwargs):
             logger.error(f"Error creating default configuration for project {instance.name}: {e}", exc_info=True)
 
 
+def _sync_explicit_number(project_id, item_type, number):
+    """Keep the number sequence ahead of numbers that were set explicitly."""
+    if not project_id:
+        return
+    try:
+        sync_work_item_sequence(str(project_id), item_type, number)
+    except Exception as e:
+        logger.error(f"[SIGNAL] Error syncing {item_type} number sequence: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=ProjectConfiguration)
+def invalidate_cached_work_item_prefixes(sender, instance, **kwargs):
+    """Work item prefixes are cached per project; drop them when the configuration changes."""
+    invalidate_work_item_prefixes(str(instance.project_id))
+
+
 @receiver(pre_save, sender=UserStory)
 def store_story_previous_state(sender, instance, **kwargs):
     """Store previous state of story before save to detect changes and auto-generate number."""
@@ -60,354 +77,60 @@ def store_story_previous_state(sender, instance, **kwargs):
             logger.error(f"[SIGNAL] ✗ Error generating story number: {e}", exc_info=True)
     elif is_new:
         logger.info(f"[SIGNAL] New story already has number: {instance.number}")
+        _sync_explicit_number(instance.project_id, 'story', instance.number)
     
-    # Store previous state for existing stories
+    # Store previous state on the instance for the change event
     if not is_new:
-        try:
-            old_instance = UserStory.objects.get(pk=instance.pk)
-            _story_previous_state[instance.pk] = {
-                'status': old_instance.status,
-                'assigned_to': old_instance.assigned_to_id,
-                'priority': old_instance.priority,
+        previous = UserStory.objects.filter(pk=instance.pk).values('status', 'assigned_to_id', 'priority').first()
+        if previous:
+            instance._previous_state = {
+                'status': previous['status'],
+                'assigned_to': str(previous['assigned_to_id']) if previous['assigned_to_id'] else None,
+                'priority': previous['priority'],
             }
-        except UserStory.DoesNotExist:
-            pass
 
 
 @receiver(post_save, sender=UserStory)
-def handle_story_automation(sender, instance, created, **kwargs):
+def emit_story_event(sender, instance, created, **kwargs):
     """
-    Execute automation rules when a story is created or updated.
-    Also send notifications for story events.
+    Queue automation rules, assignment rules, auto-tagging, mention extraction
+    and notifications for a story; they run after commit (see work_item_events).
     """
-    try:
-        # Get current user for notifications
-        current_user = None
-        try:
-            from apps.monitoring.middleware import _thread_locals
-            if hasattr(_thread_locals, 'user'):
-                current_user = getattr(_thread_locals, 'user', None)
-                if current_user and hasattr(current_user, 'is_authenticated') and not current_user.is_authenticated:
-                    current_user = None
-        except Exception:
-            pass
-        
-        if not current_user and hasattr(instance, 'created_by') and instance.created_by:
-            current_user = instance.created_by
-        
-        notification_service = get_notification_service(instance.project)
-        
-        if created:
-            # Execute on_story_create rules
-            results = execute_automation_rules('on_story_create', instance)
-            if results:
-                logger.info(f"Executed {len(results)} automation rules on story creation: {instance.id}")
-            
-            # Apply assignment rules
-            try:
-                assignee = AssignmentRulesService.apply_assignment_rules(
-                    str(instance.project.id),
-                    'story',
-                    str(instance.id)
-                )
-                if assignee:
-                    logger.info(f"Applied assignment rule for story {instance.id}: assigned to {assignee.email}")
-            except Exception as e:
-                logger.error(f"Error applying assignment rules: {e}", exc_info=True)
-            
-            # Apply auto-tagging
-            try:
-                applied_tags = AutoTaggingService.apply_auto_tagging(
-                    str(instance.project.id),
-                    'story',
-                    str(instance.id)
-                )
-                if applied_tags:
-                    logger.info(f"Applied auto-tagging for story {instance.id}: {applied_tags}")
-            except Exception as e:
-                logger.error(f"Error applying auto-tagging: {e}", exc_info=True)
-            
-            # Send story creation notification
-            if current_user:
-                try:
-                    notification_service.notify_story_created(instance, current_user)
-                except Exception as e:
-                    logger.error(f"Error sending story creation notification: {e}", exc_info=True)
-        else:
-            # Check if status changed
-            previous_state = _story_previous_state.get(instance.pk, {})
-            old_status = previous_state.get('status')
-            old_assignee_id = previous_state.get('assigned_to')
-            
-            if old_status and old_status != instance.status:
-                # Execute on_status_change rules
-                results = execute_automation_rules(
-                    'on_status_change',
-                    instance,
-                    context={'old_status': old_status, 'new_status': instance.status}
-                )
-                if results:
-                    logger.info(f"Executed {len(results)} automation rules on status change: {instance.id}")
-                
-                # Send status change notification
-                if current_user:
-                    try:
-                        notification_service.notify_status_change(
-                            instance,
-                            old_status,
-                            instance.status,
-                            current_user
-                        )
-                    except Exception as e:
-                        logger.error(f"Error sending status change notification: {e}", exc_info=True)
-            
-            # Check if assignee changed
-            if old_assignee_id != instance.assigned_to_id and instance.assigned_to and current_user:
-                try:
-                    old_assignee = User.objects.get(id=old_assignee_id) if old_assignee_id else None
-                    notification_service.notify_assignment(
-                        instance,
-                        old_assignee,
-                        instance.assigned_to,
-                        current_user
-                    )
-                except Exception as e:
-                    logger.error(f"Error sending assignment notification: {e}", exc_info=True)
-            
-            # Execute on_story_update rules
-            results = execute_automation_rules('on_story_update', instance, previous_state)
-            if results:
-                logger.info(f"Executed {len(results)} automation rules on story update: {instance.id}")
-            
-            # Send story update notification (if not already sent for status/assignment)
-            if current_user and old_status == instance.status and old_assignee_id == instance.assigned_to_id:
-                try:
-                    notification_service.notify_story_updated(instance, current_user)
-                except Exception as e:
-                    logger.error(f"Error sending story update notification: {e}", exc_info=True)
-        
-        # Clean up stored state
-        if instance.pk in _story_previous_state:
-            del _story_previous_state[instance.pk]
-            
-    except Exception as e:
-        logger.error(f"Error executing automation rules for story {instance.id}: {e}", exc_info=True)
+    if kwargs.get('raw', False):
+        return
+    work_item_events.emit('story', instance.pk, created, getattr(instance, '_previous_state', None))
 
 
 @receiver(post_save, sender=UserStory)
-def extract_story_mentions(sender, instance, created, **kwargs):
+def record_story_status_transition(sender, instance, created, **kwargs):
     """
-    Extract @mentions from story description and acceptance_criteria.
-    Creates Mention objects for each mentioned user.
-    Note: This runs on both create and update to catch mentions added later.
+    Log a story_status_changed activity when a story's status changes.
+    
+    Burndown reads these for completion times (see timeseries), so they are
+    written synchronously rather than through the coalescing event queue.
+    Stories created already done get one as well.
     """
-    try:
-        # Extract mentions from story
-        mentions = instance.extract_mentions()
-        logger.info(f"[extract_story_mentions] Story {instance.id} ({instance.title}): Extracted {len(mentions)} mentions: {mentions}")
-        logger.info(f"[extract_story_mentions] Story description: {instance.description[:100] if instance.description else 'None'}")
-        logger.info(f"[extract_story_mentions] Story acceptance_criteria: {instance.acceptance_criteria[:100] if instance.acceptance_criteria else 'None'}")
-        
-        if not mentions:
-            logger.info(f"[extract_story_mentions] No mentions found in story {instance.title}")
+    if kwargs.get('raw', False):
+        return
+    old_status = (getattr(instance, '_previous_state', None) or {}).get('status')
+    if created:
+        if instance.status not in DONE_STATUSES:
             return
-        
-        # Get current user from thread-local storage (set by middleware)
-        current_user = None
-        try:
-            from apps.monitoring.middleware import _thread_locals
-            if hasattr(_thread_locals, 'user'):
-                current_user = getattr(_thread_locals, 'user', None)
-                # Ensure user is authenticated
-                if current_user and hasattr(current_user, 'is_authenticated') and not current_user.is_authenticated:
-                    current_user = None
-        except Exception:
-            pass
-        
-        # Fallback: use instance's created_by if available
-        if not current_user and hasattr(instance, 'created_by') and instance.created_by:
-            current_user = instance.created_by
-        
-        # Find users by email or username
-        for mention_text in mentions:
-            logger.info(f"[extract_story_mentions] Looking up user for mention: '{mention_text}'")
-            # Try to find user by email first, then by username, then by email prefix
-            user = None
-            if '@' in mention_text and mention_text.count('@') == 1:
-                # It's an email (has @ but not part of @mention syntax)
-                try:
-                    user = User.objects.get(email=mention_text)
-                    logger.info(f"[extract_story_mentions] Found user by email: {user.email}")
-                except User.DoesNotExist:
-                    logger.warning(f"[extract_story_mentions] User not found by email: {mention_text}")
-                    continue
-            else:
-                # It's a username - try multiple lookup strategies
-                # 1. Try exact username match
-                try:
-                    user = User.objects.get(username=mention_text)
-                    logger.info(f"[extract_story_mentions] Found user by username: {user.username} ({user.email})")
-                except User.DoesNotExist:
-                    # 2. Try email prefix match (e.g., 'hisham' matches 'hisham@example.com')
-                    try:
-                        user = User.objects.filter(email__istartswith=mention_text + '@').first()
-                        if user:
-                            logger.info(f"[extract_story_mentions] Found user by email prefix: {user.email}")
-                    except Exception as e:
-                        logger.warning(f"[extract_story_mentions] Error in email prefix lookup: {e}")
-                    
-                    # 3. Try case-insensitive username match
-                    if not user:
-                        try:
-                            user = User.objects.filter(username__iexact=mention_text).first()
-                            if user:
-                                logger.info(f"[extract_story_mentions] Found user by case-insensitive username: {user.username}")
-                        except Exception as e:
-                            logger.warning(f"[extract_story_mentions] Error in case-insensitive username lookup: {e}")
-                
-                if not user:
-                    logger.warning(f"[extract_story_mentions] User not found for mention: '{mention_text}' (tried username, email prefix, case-insensitive)")
-                    continue
-            
-            # Create or update mention
-            # Note: We use get_or_create to avoid duplicates, but we'll always send notification
-            # if the mention is new OR if it's an update (to handle cases where user re-mentions)
-            mention, created = Mention.objects.get_or_create(
-                story=instance,
-                mentioned_user=user,
-                mention_text=f"@{mention_text}",
-                defaults={
-                    'created_by': current_user if current_user and current_user.is_authenticated else None,
-                }
-            )
-            
-            if created:
-                logger.info(f"[extract_story_mentions] Created new mention: {mention_text} in story {instance.title} for user {user.email}")
-            else:
-                logger.info(f"[extract_story_mentions] Mention already exists: {mention_text} in story {instance.title} for user {user.email} - will still send notification")
-            
-            # Always send notification for mentions (even if mention already existed)
-            # This ensures users get notified when they're mentioned, regardless of whether it's a new or existing mention
-            try:
-                notification_service = get_notification_service(instance.project)
-                logger.info(f"[extract_story_mentions] Notification service created for project {instance.project.id}")
-                result = notification_service.notify_mention(mention, instance)
-                if result:
-                    logger.info(f"[extract_story_mentions] Successfully created mention notification {result.id} for user {user.email}")
-                else:
-                    logger.warning(f"[extract_story_mentions] Notification service returned None for mention {mention.id} - check notification service logs above")
-            except Exception as e:
-                logger.error(f"[extract_story_mentions] Error sending mention notification: {e}", exc_info=True)
-        
-    except Exception as e:
-        logger.error(f"Error extracting mentions from story {instance.id}: {e}", exc_info=True)
-
-
-@receiver(post_save, sender=StoryComment)
-def handle_comment_notifications(sender, instance, created, **kwargs):
-    """
-    Send notifications when a comment is created.
-    """
-    if not created:
+    elif not old_status or old_status == instance.status:
         return
     
     try:
-        notification_service = get_notification_service(instance.story.project)
-        notification_service.notify_comment(instance, instance.story)
+        ActivityLogger.log_story_status_changed(instance, get_request_user(), old_status, instance.status)
     except Exception as e:
-        logger.error(f"Error sending comment notification: {e}", exc_info=True)
+        logger.error(f"[SIGNAL] Error logging status change of story {instance.pk}: {e}", exc_info=True)
 
 
 @receiver(post_save, sender=StoryComment)
-def extract_comment_mentions(sender, instance, created, **kwargs):
-    """
-    Extract @mentions from comment content.
-    Creates Mention objects for each mentioned user.
-    """
-    if not created:
+def emit_comment_event(sender, instance, created, **kwargs):
+    """Queue comment notifications and mention extraction for a new comment."""
+    if not created or kwargs.get('raw', False):
         return
-    
-    try:
-        # Extract mentions from comment
-        mentions = instance.extract_mentions()
-        logger.info(f"[extract_comment_mentions] Comment {instance.id}: Extracted {len(mentions)} mentions: {mentions}")
-        logger.info(f"[extract_comment_mentions] Comment content: {instance.content[:100] if instance.content else 'None'}")
-        
-        if not mentions:
-            logger.info(f"[extract_comment_mentions] No mentions found in comment {instance.id}")
-            return
-        
-        # Get current user from thread-local storage
-        from apps.monitoring.signals import get_current_user
-        current_user = get_current_user()
-        logger.info(f"[extract_comment_mentions] Current user: {current_user.email if current_user and hasattr(current_user, 'email') else 'None'}")
-        
-        # Find users by email or username
-        for mention_text in mentions:
-            logger.info(f"[extract_comment_mentions] Looking up user for mention: '{mention_text}'")
-            # Try to find user by email first, then by username, then by email prefix
-            user = None
-            if '@' in mention_text and mention_text.count('@') == 1:
-                # It's an email (has @ but not part of @mention syntax)
-                try:
-                    user = User.objects.get(email=mention_text)
-                    logger.info(f"[extract_comment_mentions] Found user by email: {user.email}")
-                except User.DoesNotExist:
-                    logger.warning(f"[extract_comment_mentions] User not found by email: {mention_text}")
-                    continue
-            else:
-                # It's a username - try multiple lookup strategies
-                # 1. Try exact username match
-                try:
-                    user = User.objects.get(username=mention_text)
-                    logger.info(f"[extract_comment_mentions] Found user by username: {user.username} ({user.email})")
-                except User.DoesNotExist:
-                    # 2. Try email prefix match (e.g., 'hisham' matches 'hisham@example.com')
-                    try:
-                        user = User.objects.filter(email__istartswith=mention_text + '@').first()
-                        if user:
-                            logger.info(f"[extract_comment_mentions] Found user by email prefix: {user.email}")
-                    except Exception as e:
-                        logger.warning(f"[extract_comment_mentions] Error in email prefix lookup: {e}")
-                    
-                    # 3. Try case-insensitive username match
-                    if not user:
-                        try:
-                            user = User.objects.filter(username__iexact=mention_text).first()
-                            if user:
-                                logger.info(f"[extract_comment_mentions] Found user by case-insensitive username: {user.username}")
-                        except Exception as e:
-                            logger.warning(f"[extract_comment_mentions] Error in case-insensitive username lookup: {e}")
-                
-                if not user:
-                    logger.warning(f"[extract_comment_mentions] User not found for mention: '{mention_text}' (tried username, email prefix, case-insensitive)")
-                    continue
-            
-            # Create mention
-            mention = Mention.objects.create(
-                comment=instance,
-                story=instance.story,
-                mentioned_user=user,
-                mention_text=f"@{mention_text}",
-                created_by=current_user if current_user and current_user.is_authenticated else None,
-            )
-            
-            logger.info(f"[extract_comment_mentions] Created mention: {mention_text} in comment {instance.id} on story {instance.story.title} for user {user.email}")
-            
-            # Send notification
-            try:
-                notification_service = get_notification_service(instance.story.project)
-                logger.info(f"[extract_comment_mentions] Notification service created for project {instance.story.project.id}")
-                result = notification_service.notify_mention(mention, instance.story)
-                if result:
-                    logger.info(f"[extract_comment_mentions] Successfully created mention notification {result.id} for user {user.email}")
-                else:
-                    logger.warning(f"[extract_comment_mentions] Notification service returned None for mention {mention.id} - check notification service logs above")
-            except Exception as e:
-                logger.error(f"[extract_comment_mentions] Error sending mention notification: {e}", exc_info=True)
-        
-    except Exception as e:
-        logger.error(f"Error extracting mentions from comment {instance.id}: {e}", exc_info=True)
+    work_item_events.emit('comment', instance.pk, created)
 
 
 @receiver(pre_save, sender=Epic)
@@ -422,18 +145,17 @@ def store_epic_previous_state(sender, instance, **kwargs):
             logger.info(f"[SIGNAL] Auto-generated epic number: {instance.number}")
         except Exception as e:
             logger.error(f"[SIGNAL] Error generating epic number: {e}", exc_info=True)
+    elif is_new:
+        _sync_explicit_number(instance.project_id, 'epic', instance.number)
     
-    # Store previous state for existing epics
+    # Store previous state on the instance for the change event
     if not is_new:
-        try:
-            with _epic_state_lock:
-                old_instance = Epic.objects.select_for_update().get(pk=instance.pk)
-                _epic_previous_state[instance.pk] = {
-                    'owner': old_instance.owner_id,
-                    'status': old_instance.status,
-                }
-        except Epic.DoesNotExist:
-            pass
+        previous = Epic.objects.filter(pk=instance.pk).values('owner_id', 'status').first()
+        if previous:
+            instance._previous_state = {
+                'owner': str(previous['owner_id']) if previous['owner_id'] else None,
+                'status': previous['status'],
+            }
 
 
 @receiver(pre_save, sender=Task)
@@ -448,6 +170,8 @@ def generate_task_number(sender, instance, **kwargs):
                 logger.info(f"[SIGNAL] Auto-generated task number: {instance.number}")
         except Exception as e:
             logger.error(f"[SIGNAL] Error generating task number: {e}", exc_info=True)
+    elif is_new and instance.story_id:
+        _sync_explicit_number(instance.story.project_id, 'task', instance.number)
 
 
 @receiver(pre_save, sender=Bug)
@@ -460,6 +184,8 @@ def generate_bug_number(sender, instance, **kwargs):
             logger.info(f"[SIGNAL] Auto-generated bug number: {instance.number}")
         except Exception as e:
             logger.error(f"[SIGNAL] Error generating bug number: {e}", exc_info=True)
+    elif is_new:
+        _sync_explicit_number(instance.project_id, 'bug', instance.number)
 
 
 @receiver(pre_save, sender=Issue)
@@ -472,90 +198,101 @@ def generate_issue_number(sender, instance, **kwargs):
             logger.info(f"[SIGNAL] Auto-generated issue number: {instance.number}")
         except Exception as e:
             logger.error(f"[SIGNAL] Error generating issue number: {e}", exc_info=True)
+    elif is_new:
+        _sync_explicit_number(instance.project_id, 'issue', instance.number)
 
 
 @receiver(post_save, sender=Epic)
-def handle_epic_owner_assignment(sender, instance, created, **kwargs):
-    """
-    Send notification when epic owner is assigned or changed.
-    """
-    from django.db import transaction
-    
+def emit_epic_event(sender, instance, created, **kwargs):
+    """Queue the owner assignment notification when an epic's owner is set or changed."""
+    if kwargs.get('raw', False) or not instance.owner_id:
+        return
+    previous = getattr(instance, '_previous_state', None) or {}
+    if previous.get('owner') == str(instance.owner_id):
+        return
+    work_item_events.emit('epic', instance.pk, created, previous)
+
+
+@receiver(post_save, sender=Task)
+def emit_task_event(sender, instance, created, **kwargs):
+    """Queue on_task_complete automation when a task moves to done."""
+    if created or instance.status != 'done' or kwargs.get('raw', False):
+        return
+    # Callers that track completion set _previous_status before saving
+    if hasattr(instance, '_previous_status') and instance._previous_status != 'done':
+        work_item_events.emit('task', instance.pk, created, {'status': instance._previous_status})
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Epic)
+@receiver(post_save, sender=UserStory)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Bug)
+@receiver(post_save, sender=Issue)
+def update_search_document(sender, instance, **kwargs):
+    """Refresh the search index entry of a project or work item."""
+    try:
+        index_object(get_content_type(sender), instance)
+    except Exception as e:
+        logger.error(f"Error indexing {sender.__name__} {instance.pk} for search: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Epic)
+@receiver(post_delete, sender=UserStory)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Bug)
+@receiver(post_delete, sender=Issue)
+def delete_search_document(sender, instance, **kwargs):
+    """Drop the search index entry of a deleted project or work item."""
     try:
-        # Get previous state with lock
-        with _epic_state_lock:
-            previous_state = _epic_previous_state.get(instance.pk, {})
-            old_owner_id = previous_state.get('owner')
-            new_owner_id = instance.owner_id if instance.owner else None
-            
-            # Clean up state
-            if instance.pk in _epic_previous_state:
-                del _epic_previous_state[instance.pk]
-        
-        # Only send notification if owner changed and new owner exists
-        if new_owner_id and new_owner_id != old_owner_id:
-            with transaction.atomic():
-                notification_service = get_notification_service(instance.project)
-                
-                # Get current user (who made the change)
-                current_user = None
-                try:
-                    from apps.monitoring.middleware import _thread_locals
-                    if hasattr(_thread_locals, 'user'):
-                        current_user = getattr(_thread_locals, 'user', None)
-                        if current_user and hasattr(current_user, 'is_authenticated') and not current_user.is_authenticated:
-                            current_user = None
-                except Exception:
-                    pass
-                
-                if not current_user and hasattr(instance, 'updated_by') and instance.updated_by:
-                    current_user = instance.updated_by
-                elif not current_user and hasattr(instance, 'created_by') and instance.created_by:
-                    current_user = instance.created_by
-                
-                # Get old owner if exists
-                old_owner = None
-                if old_owner_id:
-                    try:
-                        old_owner = User.objects.get(id=old_owner_id)
-                    except User.DoesNotExist:
-                        pass
-                
-                # Send notification to new owner
-                if instance.owner:
-                    try:
-                        notification_service.notify_epic_owner_assignment(
-                            epic=instance,
-                            old_owner=old_owner,
-                            new_owner=instance.owner,
-                            assigned_by=current_user or instance.owner
-                        )
-                        logger.info(f"Sent owner assignment notification for epic {instance.id} to {instance.owner.email}")
-                    except Exception as e:
-                        logger.error(f"Error sending epic owner assignment notification: {e}", exc_info=True)
+        remove_object(get_content_type(sender), instance.pk)
     except Exception as e:
-        logger.error(f"Error handling epic owner assignment for epic {instance.id}: {e}", exc_info=True)
+        logger.error(f"Error removing {sender.__name__} {instance.pk} from search: {e}", exc_info=True)
 
 
+@receiver(post_save, sender=Sprint)
+@receiver(post_save, sender=UserStory)
 @receiver(post_save, sender=Task)
-def handle_task_complete_automation(sender, instance, created, **kwargs):
-    """
-    Execute automation rules when a task is completed.
-    """
-    if created or instance.status != 'done':
+@receiver(post_save, sender=Bug)
+@receiver(post_save, sender=Issue)
+@receiver(post_delete, sender=Sprint)
+@receiver(post_delete, sender=UserStory)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Bug)
+@receiver(post_delete, sender=Issue)
+def invalidate_project_series(sender, instance, **kwargs):
+    """Move the project's cached burndown, velocity, trends and statistics to a new version."""
+    try:
+        if sender is Task:
+            project_id = instance.story.project_id if instance.story_id else None
+        else:
+            project_id = instance.project_id
+        bump_series_version(project_id)
+    except Exception as e:
+        logger.error(f"Error invalidating series for {sender.__name__} {instance.pk}: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=StoryDependency)
+@receiver(post_save, sender=StoryLink)
+@receiver(post_delete, sender=StoryDependency)
+@receiver(post_delete, sender=StoryLink)
+def update_dependency_graph(sender, instance, signal, **kwargs):
+    """Apply a dependency or link change to the cached project dependency graphs after commit."""
+    if kwargs.get('raw', False):
         return
-    
     try:
-        # Check if task was just completed (status changed to done)
-        if hasattr(instance, '_previous_status') and instance._previous_status != 'done':
-            story = instance.story
-            if story:
-                results = execute_automation_rules(
-                    'on_task_complete',
-                    story,
-                    context={'task': instance}
-                )
-                if results:
-                    logger.info(f"Executed {len(results)} automation rules on task completion: {instance.id}")
+        if sender is StoryLink:
+            dependency_graphs.link_changed(instance, deleted=signal is post_delete)
+        else:
+            dependency_graphs.dependency_changed(instance, deleted=signal is post_delete)
     except Exception as e:
-        logger.error(f"Error executing automation rules for task {instance.id}: {e}", exc_info=True)
+        logger.error(f"Error updating dependency graph for {sender.__name__} {instance.pk}: {e}", exc_info=True)
+
+
+@receiver(post_migrate)
+def ensure_search_fulltext_index(sender, using='default', **kwargs):
+    """Create the full-text index also on databases built without migrations (tests)."""
+    if sender.name != 'apps.projects':
+        return
+    create_fulltext_index(connections[using])
@@ -198,3 +198,48 @@ def export_repository_task(
         if self.request.retries < self.max_retries:
             raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
         raise
+
+
+@shared_task(ignore_result=True)
+def process_work_item_events():
+    """
+    Process work item change events queued in Redis.
+    
+    Scheduled once per batch window by the first queued event, and swept
+    periodically by Celery beat for events whose scheduling failed.
+    """
+    from apps.projects.services.work_item_events import work_item_events
+    
+    processed = work_item_events.drain_redis()
+    if processed:
+        logger.info(f"[process_work_item_events] Processed events for {processed} work items")
+    return processed
+
+
+@shared_task(ignore_result=True)
+def import_stories_task(project_id: str, file_name: str, job_id: str, user_id: str = None):
+    """
+    Import stories from a CSV file in default storage.
+    
+    Progress is published under ``job_id`` (see ExportImportService.get_import_progress);
+    the file is deleted once the import finishes.
+    """
+    from django.contrib.auth import get_user_model
+    from django.core.files.storage import default_storage
+    from apps.projects.services.export_import_service import ExportImportService
+    
+    user = get_user_model().objects.filter(pk=user_id).first() if user_id else None
+    try:
+        with default_storage.open(file_name, 'rb') as csv_file:
+            result = ExportImportService.import_stories_from_csv(project_id, csv_file, job_id=job_id, user=user)
+    except Exception as e:
+        logger.error(f"[import_stories_task] Import {job_id} failed: {e}", exc_info=True)
+        ExportImportService._set_progress(job_id, {'status': 'failed', 'error': str(e)})
+        raise
+    finally:
+        default_storage.delete(file_name)
+    
+    logger.info(
+        f"[import_stories_task] Import {job_id}: {result.get('imported_count', 0)} imported, "
+        f"{result.get('error_count', 0)} errors"
+    )
@@ -5,28 +5,38 @@ Handles auto-incrementing numbers for Stories, Tasks, Bugs, Issues, and Epics
 based on project-specific prefixes.
 """
 
-from django.db import transaction
-from django.db.models import Max
-from apps.projects.models import UserStory, Task, Bug, Issue, Epic, ProjectConfiguration
+from typing import List
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.projects.models import UserStory, Task, Bug, Issue, Epic, ProjectConfiguration, WorkItemSequence
 import logging
 
 logger = logging.getLogger(__name__)
 
+PREFIX_CACHE_KEY = 'work_item_prefixes_{project_id}'
+PREFIX_CACHE_TIMEOUT = 3600
 
-def get_next_work_item_number(project_id: str, item_type: str, prefix: str = None) -> str:
+MODEL_MAP = {
+    'story': UserStory,
+    'task': Task,
+    'bug': Bug,
+    'issue': Issue,
+    'epic': Epic,
+}
+
+
+def get_work_item_prefix(project_id: str, item_type: str) -> str:
     """
-    Generate the next work item number for a project.
-    
-    Args:
-        project_id: UUID of the project
-        item_type: Type of work item ('story', 'task', 'bug', 'issue', 'epic')
-        prefix: Optional custom prefix (will use project config if not provided)
+    Get the configured number prefix for a work item type.
     
-    Returns:
-        str: Formatted work item number (e.g., "STORY-123")
+    Prefixes of a project are cached; the cache is cleared when its
+    ProjectConfiguration is saved.
     """
-    # Get prefix from project configuration if not provided
-    if not prefix:
+    key = PREFIX_CACHE_KEY.format(project_id=project_id)
+    prefix_map = cache.get(key)
+    if prefix_map is None:
         try:
             config = ProjectConfiguration.objects.get(project_id=project_id)
             prefix_map = {
@@ -36,56 +46,136 @@ def get_next_work_item_number(project_id: str, item_type: str, prefix: str = Non
                 'issue': getattr(config, 'issue_prefix', None) or 'ISSUE-',
                 'epic': getattr(config, 'epic_prefix', None) or 'EPIC-',
             }
-            prefix = prefix_map.get(item_type, f'{item_type.upper()}-')
-            logger.info(f"Using prefix '{prefix}' for {item_type} in project {project_id}")
         except ProjectConfiguration.DoesNotExist:
-            prefix = f'{item_type.upper()}-'
-            logger.warning(f"No configuration found for project {project_id}, using default prefix: {prefix}")
+            prefix_map = {}
+            logger.warning(f"No configuration found for project {project_id}, using default prefixes")
+        cache.set(key, prefix_map, PREFIX_CACHE_TIMEOUT)
+    return prefix_map.get(item_type) or f'{item_type.upper()}-'
+
+
+def invalidate_work_item_prefixes(project_id: str):
+    """Drop cached prefixes after the project's configuration changes."""
+    cache.delete(PREFIX_CACHE_KEY.format(project_id=project_id))
+
+
+def get_next_work_item_number(project_id: str, item_type: str, prefix: str = None) -> str:
+    """
+    Generate the next work item number for a project.
+    
+    Args:
+        project_id: UUID of the project
+        item_type: Type of work item ('story', 'task', 'bug', 'issue', 'epic')
+        prefix: Optional custom prefix (will use project config if not provided)
+    
+    Returns:
+        str: Formatted work item number (e.g., "STORY-123")
+    """
+    result = reserve_work_item_numbers(project_id, item_type, 1, prefix=prefix)[0]
+    logger.info(f"Generated work item number: {result} (type: {item_type}, project: {project_id})")
+    return result
+
+
+def reserve_work_item_numbers(project_id: str, item_type: str, count: int, prefix: str = None) -> List[str]:
+    """
+    Claim a block of consecutive work item numbers.
+    
+    The project's sequence row is advanced by ``count`` in one UPDATE, so bulk
+    creators (imports, AI generation) pay the same as a single create.
+    Numbers of a block that end up unused are simply skipped.
+    
+    Args:
+        project_id: UUID of the project
+        item_type: Type of work item ('story', 'task', 'bug', 'issue', 'epic')
+        count: How many numbers to reserve
+        prefix: Optional custom prefix (will use project config if not provided)
+    
+    Returns:
+        List of formatted numbers in ascending order
+    """
+    if item_type not in MODEL_MAP:
+        raise ValueError(f"Invalid item type: {item_type}")
+    if count <= 0:
+        return []
+    
+    if not prefix:
+        prefix = get_work_item_prefix(project_id, item_type)
     
-    # Use database transaction for atomicity
     with transaction.atomic():
-        # Get the model class
-        model_map = {
-            'story': UserStory,
-            'task': Task,
-            'bug': Bug,
-            'issue': Issue,
-            'epic': Epic,
-        }
-        model = model_map.get(item_type)
-        
-        if not model:
-            raise ValueError(f"Invalid item type: {item_type}")
-        
-        # Find the highest number for this project and type
-        # Parse existing numbers to find the max numeric value
-        if item_type == 'task':
-            existing_numbers = model.objects.filter(
-                story__project_id=project_id,
-                number__startswith=prefix
-            ).values_list('number', flat=True)
-        else:
-            existing_numbers = model.objects.filter(
-                project_id=project_id,
-                number__startswith=prefix
-            ).values_list('number', flat=True)
-        
-        max_number = 0
-        for num_str in existing_numbers:
-            try:
-                # Extract numeric part after prefix
-                numeric_part = num_str.replace(prefix, '').split('-')[0]
-                number = int(numeric_part)
-                if number > max_number:
-                    max_number = number
-            except (ValueError, IndexError):
-                continue
+        last_number = _advance_sequence(project_id, item_type, prefix, count)
+    
+    first_number = last_number - count + 1
+    return [format_work_item_number(number, prefix) for number in range(first_number, last_number + 1)]
+
+
+def sync_work_item_sequence(project_id: str, item_type: str, number: str, prefix: str = None):
+    """
+    Move the sequence past an explicitly assigned number.
+    
+    Keeps generated numbers from colliding with numbers users typed in.
+    """
+    if not number or item_type not in MODEL_MAP:
+        return
+    if not prefix:
+        prefix = get_work_item_prefix(project_id, item_type)
+    value = _parse_number(number, prefix)
+    if value is None:
+        return
+    WorkItemSequence.objects.filter(
+        project_id=project_id,
+        item_type=item_type,
+        prefix=prefix,
+        last_number__lt=value
+    ).update(last_number=value, updated_at=timezone.now())
+
+
+def _advance_sequence(project_id: str, item_type: str, prefix: str, count: int) -> int:
+    """Advance the sequence row by ``count`` and return its new value. Must run in a transaction."""
+    sequences = WorkItemSequence.objects.filter(project_id=project_id, item_type=item_type, prefix=prefix)
+    for _ in range(2):
+        # The UPDATE takes the row lock, held until the surrounding transaction ends
+        if sequences.update(last_number=F('last_number') + count, updated_at=timezone.now()):
+            return sequences.values_list('last_number', flat=True).get()
         
-        # Generate next number
-        next_number = max_number + 1
-        result = f"{prefix}{next_number}"
-        logger.info(f"Generated work item number: {result} (type: {item_type}, project: {project_id})")
-        return result
+        # First number for this prefix: seed from existing items once
+        try:
+            with transaction.atomic():
+                WorkItemSequence.objects.create(
+                    project_id=project_id,
+                    item_type=item_type,
+                    prefix=prefix,
+                    last_number=_scan_max_number(project_id, item_type, prefix) + count
+                )
+            return sequences.values_list('last_number', flat=True).get()
+        except IntegrityError:
+            # Another creator seeded it first; advance the existing row
+            continue
+    raise RuntimeError(f"Could not advance {item_type} sequence for project {project_id}")
+
+
+def _scan_max_number(project_id: str, item_type: str, prefix: str) -> int:
+    """Highest number already used with a prefix (only used to seed a sequence)."""
+    model = MODEL_MAP[item_type]
+    if item_type == 'task':
+        existing_numbers = model.objects.filter(story__project_id=project_id, number__startswith=prefix)
+    else:
+        existing_numbers = model.objects.filter(project_id=project_id, number__startswith=prefix)
+    
+    max_number = 0
+    for num_str in existing_numbers.values_list('number', flat=True).iterator():
+        number = _parse_number(num_str, prefix)
+        if number is not None and number > max_number:
+            max_number = number
+    return max_number
+
+
+def _parse_number(num_str: str, prefix: str):
+    """Extract the numeric part after a prefix (e.g. 'STORY-12' -> 12)."""
+    if not num_str or not num_str.startswith(prefix):
+        return None
+    try:
+        return int(num_str[len(prefix):].split('-')[0])
+    except (ValueError, IndexError):
+        return None
 
 
 def validate_work_item_number(project_id: str, item_type: str, number: str, current_id: str = None) -> tuple[bool, str]:
@@ -105,14 +195,7 @@ def validate_work_item_number(project_id: str, item_type: str, number: str, curr
         return True, ""  # Empty is OK (will be auto-generated)
     
     # Get the model class
-    model_map = {
-        'story': UserStory,
-        'task': Task,
-        'bug': Bug,
-        'issue': Issue,
-        'epic': Epic,
-    }
-    model = model_map.get(item_type)
+    model = MODEL_MAP.get(item_type)
     
     if not model:
         return False, f"Invalid item type: {item_type}"
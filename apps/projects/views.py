@@ -2895,24 +2895,13 @@ class StoryDependencyViewSet(viewsets.ModelViewSet):
         return Response({'has_circular': has_circular})
     
     def _check_circular_dependency(self, source_id, target_id):
-        """Recursively check for circular dependencies."""
-        if source_id == target_id:
-            return True
+        """Check whether source waiting on target would close a cycle in the project's dependency graph."""
+        project_id = UserStory.objects.filter(pk=source_id).values_list('project_id', flat=True).first()
+        if project_id is None:
+            return str(source_id) == str(target_id)
         
-        # Get all stories that target_story depends on
-        dependencies = StoryDependency.objects.filter(
-            source_story_id=target_id,
-            resolved=False
-        ).select_related('target_story')
-        
-        for dep in dependencies:
-            if dep.target_story_id == source_id:
-                return True
-            # Recursively check
-            if self._check_circular_dependency(source_id, dep.target_story_id):
-                return True
-        
-        return False
+        from apps.projects.services.dependency_graph import dependency_graphs
+        return dependency_graphs.get(project_id).would_create_cycle(source_id, target_id)
 
 
 class StoryAttachmentViewSet(viewsets.ModelViewSet):
@@ -3848,20 +3837,28 @@ class SearchViewSet(viewsets.ViewSet):
                 'in': 'query',
                 'required': False,
                 'schema': {'type': 'integer'},
-                'description': 'Total limit on results'
+                'description': 'Page size (default 50)'
+            },
+            {
+                'name': 'offset',
+                'in': 'query',
+                'required': False,
+                'schema': {'type': 'integer'},
+                'description': 'Number of results to skip'
             },
         ],
         responses={200: {'type': 'object'}}
     )
     @action(detail=False, methods=['get'], url_path='unified')
     def unified_search(self, request):
-        """Perform unified search returning a single sorted list."""
+        """Perform unified search returning a single ranked page."""
         from apps.projects.services.search import SearchService
         
         query = request.query_params.get('q', '')
         content_types_param = request.query_params.get('content_types', '')
         project_id = request.query_params.get('project', None)
         limit = request.query_params.get('limit', None)
+        offset = request.query_params.get('offset', None)
         
         # Parse content types
         content_types = None
@@ -3894,7 +3891,8 @@ class SearchViewSet(viewsets.ViewSet):
                 content_types=content_types,
                 project=project,
                 user=request.user,
-                limit=int(limit) if limit else None
+                limit=int(limit) if limit else None,
+                offset=int(offset) if offset else 0
             )
             
             # Save search history
@@ -3916,7 +3914,8 @@ class SearchViewSet(viewsets.ViewSet):
             return Response({
                 'query': query,
                 'results': results,
-                'total_count': len(results)
+                'total_count': len(results),
+                'offset': int(offset) if offset else 0
             })
         except Exception as e:
             import traceback
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-16 21:22
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0004_workflow_updated_by_workflowexecution_created_by_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowStateCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sequence', models.IntegerField()),
+                ('step_id', models.CharField(max_length=200)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('execution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='workflows.workflowexecution')),
+            ],
+            options={
+                'verbose_name': 'Workflow State Checkpoint',
+                'verbose_name_plural': 'Workflow State Checkpoints',
+                'db_table': 'workflow_state_checkpoints',
+                'ordering': ['execution', 'sequence'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='workflowstatecheckpoint',
+            constraint=models.UniqueConstraint(fields=('execution', 'sequence'), name='workflow_checkpoint_execution_seq_uniq'),
+        ),
+    ]
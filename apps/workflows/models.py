@@ -203,3 +203,37 @@ class WorkflowStep(models.Model):
     
     def __str__(self):
         return f'{self.step_name} - {self.status}'
+
+
+class WorkflowStateCheckpoint(models.Model):
+    """
+    Append-only step output log of a running workflow execution.
+    
+    ``WorkflowExecution.state`` holds the compact head (input and workflow
+    context); each finished step appends one checkpoint with only its own
+    output. Checkpoints are folded back into ``state`` when the execution
+    completes, fails or is cancelled.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    execution = models.ForeignKey(
+        WorkflowExecution,
+        on_delete=models.CASCADE,
+        related_name='checkpoints'
+    )
+    sequence = models.IntegerField()
+    step_id = models.CharField(max_length=200)
+    data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'workflow_state_checkpoints'
+        verbose_name = 'Workflow State Checkpoint'
+        verbose_name_plural = 'Workflow State Checkpoints'
+        ordering = ['execution', 'sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['execution', 'sequence'], name='workflow_checkpoint_execution_seq_uniq'),
+        ]
+    
+    def __str__(self):
+        return f'{self.execution_id} #{self.sequence} {self.step_id}'
@@ -132,6 +132,10 @@ class WorkflowExecutionRequestSerializer(serializers.Serializer):
     input_data = serializers.JSONField(
         help_text="Input data for workflow execution"
     )
+    run_async = serializers.BooleanField(
+        default=False,
+        help_text="Queue the execution and return 202 immediately; follow it over the WebSocket"
+    )
 
 
 class WorkflowExecutionStatusSerializer(serializers.ModelSerializer):
@@ -160,6 +164,17 @@ class WorkflowExecutionStatusSerializer(serializers.ModelSerializer):
         return None
 
 
+class WorkflowExecutionSubmittedSerializer(serializers.Serializer):
+    """Response serializer for a queued (run_async) workflow execution."""
+    
+    success = serializers.BooleanField()
+    execution_id = serializers.UUIDField()
+    status = serializers.CharField()
+    queue = serializers.CharField()
+    status_url = serializers.CharField(help_text="Poll execution status here")
+    stream_url = serializers.CharField(help_text="WebSocket path for progress events")
+
+
 class WorkflowExecutionResponseSerializer(serializers.Serializer):
     """Response serializer for workflow execution."""
     
@@ -3,12 +3,20 @@ Workflow State Manager Service
 
 Manages workflow execution state persistence and recovery.
 Handles state saving to database and Redis for fast access.
+
+Step outputs are not rewritten into ``WorkflowExecution.state`` on every step.
+The execution row keeps a compact head (input and workflow context) and each
+finished step appends a ``WorkflowStateCheckpoint`` holding only its own
+output. The full state is materialized on demand and compacted back into the
+execution row when it completes, fails or is cancelled.
 """
 
 import json
 from datetime import datetime
 from typing import Dict, Any, Optional
 from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Max
 from django.utils import timezone
 
 
@@ -17,7 +25,9 @@ class WorkflowStateManager:
     Manage workflow execution state.
     
     Responsibilities:
-    - Save execution state to database and Redis
+    - Save the execution head to database and Redis
+    - Append per-step output checkpoints
+    - Materialize and compact the full state
     - Recover state from last successful step
     - Track execution progress
     - Handle state transitions
@@ -25,6 +35,8 @@ class WorkflowStateManager:
     
     CACHE_TIMEOUT = 3600  # 1 hour
     CACHE_KEY_PREFIX = 'workflow_execution_'
+    SEQUENCE_KEY_PREFIX = 'workflow_execution_seq_'
+    SEQUENCE_RETRIES = 3
     
     async def save_state(
         self,
@@ -34,7 +46,10 @@ class WorkflowStateManager:
         status: str = 'running'
     ):
         """
-        Save workflow execution state.
+        Save workflow execution head state.
+        
+        Step outputs should be written with ``save_step_state``; outputs
+        already present in ``state['steps']`` are kept as the compacted base.
         
         Args:
             execution_id: Execution UUID
@@ -45,25 +60,19 @@ class WorkflowStateManager:
         from apps.workflows.models import WorkflowExecution
         
         # Update database
-        execution = await WorkflowExecution.objects.aget(id=execution_id)
-        execution.current_step = current_step
-        execution.state = state
-        execution.status = status
-        await execution.asave()
+        await WorkflowExecution.objects.filter(id=execution_id).aupdate(
+            current_step=current_step,
+            state=state,
+            status=status,
+            updated_at=timezone.now()
+        )
         
         # Cache in Redis for fast access
-        cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
-        cache_data = {
-            'current_step': current_step,
-            'state': state,
-            'status': status,
-            'updated_at': datetime.now().isoformat()
-        }
-        cache.set(cache_key, json.dumps(cache_data), self.CACHE_TIMEOUT)
+        self._cache_head(execution_id, current_step, state, status)
     
     async def get_state(self, execution_id: str) -> Optional[Dict[str, Any]]:
         """
-        Get current execution state.
+        Get current execution state with all step checkpoints applied.
         
         Args:
             execution_id: Execution UUID
@@ -71,6 +80,24 @@ class WorkflowStateManager:
         Returns:
             State dictionary or None
         """
+        head = await self._get_head(execution_id)
+        
+        if head is None:
+            return None
+        
+        head['state'] = await self.materialize_state(execution_id, head.get('state'))
+        return head
+    
+    async def _get_head(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the execution head (status, current step and compacted state).
+        
+        Args:
+            execution_id: Execution UUID
+            
+        Returns:
+            Head dictionary or None
+        """
         # Try cache first
         cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
         cached = cache.get(cache_key)
@@ -101,6 +128,158 @@ class WorkflowStateManager:
         except WorkflowExecution.DoesNotExist:
             return None
     
+    def _cache_head(
+        self,
+        execution_id: str,
+        current_step: Optional[str],
+        state: Dict[str, Any],
+        status: str
+    ):
+        """Cache the execution head in Redis."""
+        cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
+        cache_data = {
+            'current_step': current_step,
+            'state': state,
+            'status': status,
+            'updated_at': datetime.now().isoformat()
+        }
+        cache.set(cache_key, json.dumps(cache_data), self.CACHE_TIMEOUT)
+    
+    async def materialize_state(
+        self,
+        execution_id: str,
+        base_state: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the full state from the head and the step checkpoints.
+        
+        Args:
+            execution_id: Execution UUID
+            base_state: Head state to apply checkpoints to (loaded if omitted)
+            
+        Returns:
+            Full state dictionary
+        """
+        from apps.workflows.models import WorkflowStateCheckpoint
+        
+        if base_state is None:
+            head = await self._get_head(execution_id)
+            base_state = head['state'] if head else None
+        
+        state = dict(base_state or {})
+        steps = dict(state.get('steps') or {})
+        
+        # Later checkpoints for the same step (retries, normalized results) win
+        checkpoints = WorkflowStateCheckpoint.objects.filter(
+            execution_id=execution_id
+        ).order_by('sequence').values_list('step_id', 'data')
+        async for step_id, data in checkpoints:
+            steps[step_id] = data
+        
+        state['steps'] = steps
+        return state
+    
+    async def save_step_state(
+        self,
+        execution_id: str,
+        step_id: str,
+        step_data: Dict[str, Any]
+    ):
+        """
+        Append one step's state as a checkpoint.
+        
+        Only the step's own data is written; the execution row and the rest
+        of the state are left untouched.
+        
+        Args:
+            execution_id: Execution UUID
+            step_id: Step ID
+            step_data: Step result (output, success, ...)
+        """
+        from apps.workflows.models import WorkflowStateCheckpoint
+        
+        for attempt in range(self.SEQUENCE_RETRIES):
+            sequence = await self._next_sequence(execution_id, reseed=attempt > 0)
+            try:
+                await WorkflowStateCheckpoint.objects.acreate(
+                    execution_id=execution_id,
+                    sequence=sequence,
+                    step_id=step_id,
+                    data=step_data
+                )
+                return
+            except IntegrityError:
+                # Sequence counter was lost (cache eviction); reseed from the table
+                if attempt == self.SEQUENCE_RETRIES - 1:
+                    raise
+    
+    async def _next_sequence(self, execution_id: str, reseed: bool = False) -> int:
+        """
+        Get the next checkpoint sequence number for an execution.
+        
+        The counter lives in the cache so concurrent steps never need to
+        read the checkpoint table; it is seeded from the table when missing.
+        """
+        seq_key = f"{self.SEQUENCE_KEY_PREFIX}{execution_id}"
+        last = None
+        
+        if reseed or cache.get(seq_key) is None:
+            last = await self._last_sequence(execution_id)
+            if reseed:
+                cache.set(seq_key, last, self.CACHE_TIMEOUT)
+            else:
+                cache.add(seq_key, last, self.CACHE_TIMEOUT)
+        
+        try:
+            return cache.incr(seq_key)
+        except ValueError:
+            # No shared counter (cache disabled or key evicted); derive from the table
+            if last is None:
+                last = await self._last_sequence(execution_id)
+            return last + 1
+    
+    async def _last_sequence(self, execution_id: str) -> int:
+        """Get the highest checkpoint sequence stored for an execution."""
+        from apps.workflows.models import WorkflowStateCheckpoint
+        
+        result = await WorkflowStateCheckpoint.objects.filter(
+            execution_id=execution_id
+        ).aaggregate(last=Max('sequence'))
+        return result['last'] or 0
+    
+    async def compact(self, execution_id: str):
+        """
+        Fold step checkpoints into ``WorkflowExecution.state``.
+        
+        Checkpoints appended while compacting are kept for the next run.
+        
+        Args:
+            execution_id: Execution UUID
+        """
+        from apps.workflows.models import WorkflowExecution, WorkflowStateCheckpoint
+        
+        checkpoints = WorkflowStateCheckpoint.objects.filter(execution_id=execution_id)
+        result = await checkpoints.aaggregate(last=Max('sequence'))
+        last_sequence = result['last']
+        if last_sequence is None:
+            return
+        
+        execution = await WorkflowExecution.objects.only('state').aget(id=execution_id)
+        state = dict(execution.state or {})
+        steps = dict(state.get('steps') or {})
+        folded = checkpoints.filter(
+            sequence__lte=last_sequence
+        ).order_by('sequence').values_list('step_id', 'data')
+        async for step_id, data in folded:
+            steps[step_id] = data
+        state['steps'] = steps
+        
+        await WorkflowExecution.objects.filter(id=execution_id).aupdate(
+            state=state,
+            updated_at=timezone.now()
+        )
+        await checkpoints.filter(sequence__lte=last_sequence).adelete()
+    
     async def record_step_start(
         self,
         execution_id: str,
@@ -115,7 +294,9 @@ class WorkflowStateManager:
         """
         from apps.workflows.models import WorkflowExecution
         
-        execution = await WorkflowExecution.objects.aget(id=execution_id)
+        execution = await WorkflowExecution.objects.defer(
+            'state', 'input_data', 'output_data'
+        ).aget(id=execution_id)
         
         # Update current step and status
         if execution.status == 'pending':
@@ -123,7 +304,7 @@ class WorkflowStateManager:
             execution.started_at = timezone.now()
         
         execution.current_step = step_id
-        await execution.asave()
+        await execution.asave(update_fields=['status', 'started_at', 'current_step', 'updated_at'])
     
     async def record_step_completion(
         self,
@@ -141,27 +322,15 @@ class WorkflowStateManager:
             output: Step output
             success: Whether step succeeded
         """
-        execution_state = await self.get_state(execution_id)
-        
-        if execution_state:
-            state = execution_state['state']
-            
-            # Store step output in state
-            if 'steps' not in state:
-                state['steps'] = {}
-            
-            state['steps'][step_id] = {
+        await self.save_step_state(
+            execution_id,
+            step_id,
+            {
                 'output': output,
                 'success': success,
                 'completed_at': datetime.now().isoformat()
             }
-            
-            await self.save_state(
-                execution_id,
-                execution_state['current_step'],
-                state,
-                execution_state['status']
-            )
+        )
     
     async def record_execution_complete(
         self,
@@ -185,11 +354,8 @@ class WorkflowStateManager:
         execution.output_data = final_output
         execution.completed_at = timezone.now()
         
-        await execution.asave()
-        
-        # Clear cache
-        cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
-        cache.delete(cache_key)
+        await execution.asave(update_fields=['status', 'output_data', 'completed_at', 'updated_at'])
+        await self._finalize(execution_id)
     
     async def record_execution_failure(
         self,
@@ -214,11 +380,18 @@ class WorkflowStateManager:
         execution.retry_count = retry_count
         execution.completed_at = timezone.now()
         
-        await execution.asave()
+        await execution.asave(update_fields=['status', 'error_message', 'retry_count', 'completed_at', 'updated_at'])
+        await self._finalize(execution_id)
+    
+    async def _finalize(self, execution_id: str):
+        """Compact checkpoints and clear cached state of a finished execution."""
+        await self.compact(execution_id)
         
         # Clear cache
-        cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
-        cache.delete(cache_key)
+        cache.delete_many([
+            f"{self.CACHE_KEY_PREFIX}{execution_id}",
+            f"{self.SEQUENCE_KEY_PREFIX}{execution_id}",
+        ])
     
     async def recover(self, execution_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -264,10 +437,10 @@ class WorkflowStateManager:
         
         if execution.status == 'running':
             execution.status = 'paused'
-            await execution.asave()
+            await execution.asave(update_fields=['status', 'updated_at'])
             
             # Update cache
-            state = await self.get_state(execution_id)
+            state = await self._get_head(execution_id)
             if state:
                 state['status'] = 'paused'
                 cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
@@ -286,10 +459,10 @@ class WorkflowStateManager:
         
         if execution.status == 'paused':
             execution.status = 'running'
-            await execution.asave()
+            await execution.asave(update_fields=['status', 'updated_at'])
             
             # Update cache
-            state = await self.get_state(execution_id)
+            state = await self._get_head(execution_id)
             if state:
                 state['status'] = 'running'
                 cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
@@ -309,11 +482,8 @@ class WorkflowStateManager:
         if execution.status in ['pending', 'running', 'paused']:
             execution.status = 'cancelled'
             execution.completed_at = timezone.now()
-            await execution.asave()
-            
-            # Clear cache
-            cache_key = f"{self.CACHE_KEY_PREFIX}{execution_id}"
-            cache.delete(cache_key)
+            await execution.asave(update_fields=['status', 'completed_at', 'updated_at'])
+            await self._finalize(execution_id)
 
 
 # Global instance
@@ -7,7 +7,8 @@ Integrates with agents, manages execution lifecycle, and handles failures gracef
 
 import uuid
 import asyncio
-from typing import Dict, Any, Optional, List, Tuple
+import logging
+from typing import Dict, Any, Optional, List, Set, Tuple
 from datetime import datetime
 from pathlib import Path
 from django.utils import timezone
@@ -19,11 +20,13 @@ from asgiref.sync import async_to_sync
 from .workflow_parser import workflow_parser, ParsedWorkflow, ParsedStep
 from .conditional_evaluator import conditional_evaluator, ConditionalEvaluationError
 from .state_manager import workflow_state_manager
-from .workflow_executor_parallel import find_parallel_steps, execute_parallel_steps
+from .workflow_executor_parallel import StepScheduler, build_workflow_graph, tenant_semaphore
 from .loop_executor import execute_loop, LoopExecutionError
 from .sub_workflow_executor import execute_sub_workflow, SubWorkflowExecutionError
 from apps.agents.services.execution_engine import execution_engine
 
+logger = logging.getLogger(__name__)
+
 
 class WorkflowExecutionError(Exception):
     """Raised when workflow execution fails."""
@@ -69,6 +72,41 @@ class WorkflowExecutor:
         Raises:
             WorkflowExecutionError: If execution fails critically
         """
+        execution, workflow, parsed_workflow = await self._prepare(workflow_id, input_data, user_id)
+        return await self._run(execution, workflow, parsed_workflow, user_id)
+    
+    async def prepare(
+        self,
+        workflow_id: str,
+        input_data: Dict[str, Any],
+        user_id: Optional[str] = None
+    ):
+        """
+        Validate a workflow and create its pending execution.
+        
+        The execution is run later with ``run`` (e.g. by the job queue).
+        
+        Args:
+            workflow_id: Workflow UUID
+            input_data: Input data for workflow
+            user_id: Optional user ID who triggered execution
+            
+        Returns:
+            WorkflowExecution instance (status 'pending')
+            
+        Raises:
+            WorkflowExecutionError: If the workflow is missing or invalid
+        """
+        execution, _, _ = await self._prepare(workflow_id, input_data, user_id)
+        return execution
+    
+    async def _prepare(
+        self,
+        workflow_id: str,
+        input_data: Dict[str, Any],
+        user_id: Optional[str] = None
+    ):
+        """Load, parse and validate a workflow, then create its execution."""
         from apps.workflows.models import Workflow, WorkflowExecution
         
         # Step 1: Get workflow and parse definition (with caching)
@@ -77,30 +115,7 @@ class WorkflowExecutor:
         except Workflow.DoesNotExist:
             raise WorkflowExecutionError(f"Workflow '{workflow_id}' not found")
         
-        # Check cache for parsed workflow
-        cache_key = f'workflow_parsed_{workflow_id}_{workflow.updated_at.timestamp()}'
-        parsed_workflow = cache.get(cache_key)
-        
-        if parsed_workflow is None:
-            # Ensure definition has required fields from model
-            definition = workflow.definition.copy() if isinstance(workflow.definition, dict) else {}
-            if 'name' not in definition:
-                definition['name'] = workflow.name
-            if 'version' not in definition:
-                definition['version'] = workflow.version
-            if 'description' not in definition and workflow.description:
-                definition['description'] = workflow.description
-            
-            # Validate definition has steps
-            if 'steps' not in definition or not definition['steps']:
-                raise WorkflowExecutionError("Workflow definition must have at least one step")
-            
-            try:
-                parsed_workflow = self.parser.parse(definition)
-                # Cache parsed workflow for 10 minutes
-                cache.set(cache_key, parsed_workflow, settings.CACHE_TIMEOUT_LONG)
-            except Exception as e:
-                raise WorkflowExecutionError(f"Failed to parse workflow definition: {str(e)}")
+        parsed_workflow = self._get_parsed_workflow(workflow)
         
         # Validate that all agents exist (using async ORM)
         from apps.agents.models import Agent
@@ -127,19 +142,54 @@ class WorkflowExecutor:
             status='pending',
             state={'steps': {}, 'input': input_data}
         )
+        return execution, workflow, parsed_workflow
+    
+    async def run(self, execution_id: str) -> Dict[str, Any]:
+        """
+        Run a pending execution created by ``prepare``.
+        
+        Args:
+            execution_id: Execution UUID
+            
+        Returns:
+            Execution result dictionary
+            
+        Raises:
+            WorkflowExecutionError: If execution fails critically
+        """
+        from apps.workflows.models import WorkflowExecution
+        
+        execution = await WorkflowExecution.objects.select_related('workflow').aget(id=execution_id)
+        workflow = execution.workflow
+        user_id = str(execution.user_id) if execution.user_id else None
         
+        try:
+            parsed_workflow = self._get_parsed_workflow(workflow)
+        except WorkflowExecutionError as e:
+            await self.state_manager.record_execution_failure(str(execution.id), str(e))
+            raise
+        return await self._run(execution, workflow, parsed_workflow, user_id)
+    
+    async def _run(
+        self,
+        execution,
+        workflow,
+        parsed_workflow: ParsedWorkflow,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Execute a created execution and record its outcome."""
         # Step 3: Execute workflow
         try:
             result = await self._execute_workflow(
                 execution.id,
                 parsed_workflow,
-                input_data,
+                execution.input_data,
                 user_id=user_id
             )
             
             # Update workflow execution count
             workflow.execution_count += 1
-            await workflow.asave()
+            await workflow.asave(update_fields=['execution_count'])
             
             return result
             
@@ -148,8 +198,42 @@ class WorkflowExecutor:
                 str(execution.id),
                 str(e)
             )
+            await self._emit_execution_error(
+                str(execution.id),
+                'Workflow execution failed',
+                str(e)
+            )
             raise WorkflowExecutionError(f"Workflow execution failed: {str(e)}")
     
+    def _get_parsed_workflow(self, workflow) -> ParsedWorkflow:
+        """Parse a workflow definition, cached per workflow version."""
+        # Check cache for parsed workflow
+        cache_key = f'workflow_parsed_{workflow.id}_{workflow.updated_at.timestamp()}'
+        parsed_workflow = cache.get(cache_key)
+        
+        if parsed_workflow is None:
+            # Ensure definition has required fields from model
+            definition = workflow.definition.copy() if isinstance(workflow.definition, dict) else {}
+            if 'name' not in definition:
+                definition['name'] = workflow.name
+            if 'version' not in definition:
+                definition['version'] = workflow.version
+            if 'description' not in definition and workflow.description:
+                definition['description'] = workflow.description
+            
+            # Validate definition has steps
+            if 'steps' not in definition or not definition['steps']:
+                raise WorkflowExecutionError("Workflow definition must have at least one step")
+            
+            try:
+                parsed_workflow = self.parser.parse(definition)
+                # Cache parsed workflow for 10 minutes
+                cache.set(cache_key, parsed_workflow, settings.CACHE_TIMEOUT_LONG)
+            except Exception as e:
+                raise WorkflowExecutionError(f"Failed to parse workflow definition: {str(e)}")
+        
+        return parsed_workflow
+    
     async def _execute_workflow(
         self,
         execution_id: uuid.UUID,
@@ -186,227 +270,23 @@ class WorkflowExecutor:
             'running'
         )
         
-        # Get total steps for progress calculation
-        total_steps = len(parsed_workflow.steps)
-        completed_steps: Set[str] = set()
-        last_output = None
-        last_completed_output = None  # Track last non-skipped output
+        progress = {
+            'total': len(parsed_workflow.steps),
+            'completed': 0,
+            'last_output': None,
+            'last_completed_output': None,  # Track last non-skipped output
+        }
         
-        # Execute workflow using dependency-based approach (supports parallel execution)
-        while len(completed_steps) < total_steps:
-            # Find steps ready to execute (including parallel groups)
-            step_groups = find_parallel_steps(parsed_workflow, completed_steps)
-            
-            if not step_groups:
-                # No more steps ready - check if we're stuck or done
-                if len(completed_steps) < total_steps:
-                    # Some steps not completed but none are ready - possible deadlock
-                    remaining = [s.id for s in parsed_workflow.steps if s.id not in completed_steps]
-                    raise WorkflowExecutionError(
-                        f"Workflow execution deadlock: steps {remaining} cannot execute. "
-                        f"Check dependencies and conditions."
-                    )
-                break
-            
-            # Execute each group (parallel groups execute simultaneously, sequential groups one at a time)
-            for step_group in step_groups:
-                if len(step_group) == 1:
-                    # Single step - execute sequentially
-                    step_id = step_group[0]
-                    step = parsed_workflow.step_map.get(step_id)
-                    if not step:
-                        continue
-                    
-                    # Handle branch groups: if this step is part of a branch group, evaluate all branches
-                    if step.branch_group:
-                        # Find all steps in this branch group that haven't been completed
-                        branch_steps = [
-                            s for s in parsed_workflow.steps
-                            if s.branch_group == step.branch_group and s.id not in completed_steps
-                        ]
-                        
-                        # Evaluate conditions and execute the first matching branch
-                        branch_executed = False
-                        for branch_step in branch_steps:
-                            # Check if branch condition is met (condition is checked in _execute_step)
-                            # But we need to check here to decide which branch to execute
-                            if branch_step.condition:
-                                try:
-                                    should_execute = self.evaluator.evaluate(branch_step.condition, context)
-                                    if should_execute:
-                                        # Execute this branch
-                                        await self._emit_step_started(
-                                            str(execution_id),
-                                            branch_step.id,
-                                            branch_step.name,
-                                            len(completed_steps) + 1,
-                                            total_steps
-                                        )
-                                        
-                                        step_result = await self._execute_step(
-                                            execution_id,
-                                            branch_step,
-                                            context,
-                                            user_id=user_id
-                                        )
-                                        
-                                        normalized_result, last_output, last_completed_output = await self._process_step_result(
-                                            execution_id,
-                                            branch_step,
-                                            step_result,
-                                            context,
-                                            last_output,
-                                            last_completed_output,
-                                            len(completed_steps) + 1,
-                                            total_steps
-                                        )
-                                        
-                                        completed_steps.add(branch_step.id)
-                                        branch_executed = True
-                                        break
-                                except ConditionalEvaluationError:
-                                    # Condition evaluation failed, try next branch
-                                    continue
-                            else:
-                                # No condition means this branch always executes (else branch)
-                                await self._emit_step_started(
-                                    str(execution_id),
-                                    branch_step.id,
-                                    branch_step.name,
-                                    len(completed_steps) + 1,
-                                    total_steps
-                                )
-                                
-                                step_result = await self._execute_step(
-                                    execution_id,
-                                    branch_step,
-                                    context,
-                                    user_id=user_id
-                                )
-                                
-                                normalized_result, last_output, last_completed_output = await self._process_step_result(
-                                    execution_id,
-                                    branch_step,
-                                    step_result,
-                                    context,
-                                    last_output,
-                                    last_completed_output,
-                                    len(completed_steps) + 1,
-                                    total_steps
-                                )
-                                
-                                completed_steps.add(branch_step.id)
-                                branch_executed = True
-                                break
-                        
-                        # Mark all other branches in the group as skipped
-                        for branch_step in branch_steps:
-                            if branch_step.id not in completed_steps:
-                                completed_steps.add(branch_step.id)
-                                # Store skipped status in context
-                                if 'steps' not in context:
-                                    context['steps'] = {}
-                                context['steps'][branch_step.id] = {
-                                    'success': True,
-                                    'output': {'skipped': True, 'reason': 'branch not selected'},
-                                    'skipped': True
-                                }
-                        
-                        # Save state after branch execution
-                        if branch_executed:
-                            await self.state_manager.save_state(
-                                str(execution_id),
-                                step.id,
-                                context,
-                                'running'
-                            )
-                    else:
-                        # Regular step execution
-                        # Emit step started event
-                        await self._emit_step_started(
-                            str(execution_id),
-                            step.id,
-                            step.name,
-                            len(completed_steps) + 1,
-                            total_steps
-                        )
-                        
-                        # Execute step
-                        step_result = await self._execute_step(
-                            execution_id,
-                            step,
-                            context,
-                            user_id=user_id
-                        )
-                        
-                        # Process result
-                        normalized_result, last_output, last_completed_output = await self._process_step_result(
-                            execution_id,
-                            step,
-                            step_result,
-                            context,
-                            last_output,
-                            last_completed_output,
-                            len(completed_steps) + 1,
-                            total_steps
-                        )
-                        
-                        completed_steps.add(step_id)
-                        
-                        # Save state
-                        await self.state_manager.save_state(
-                            str(execution_id),
-                            step.id,
-                            context,
-                            'running'
-                        )
-                else:
-                    # Parallel group - execute all steps simultaneously
-                    for step_id in step_group:
-                        step = parsed_workflow.step_map.get(step_id)
-                        if step:
-                            await self._emit_step_started(
-                                str(execution_id),
-                                step.id,
-                                step.name,
-                                len(completed_steps) + 1,
-                                total_steps
-                            )
-                    
-                    # Execute all steps in parallel
-                    parallel_results = await execute_parallel_steps(
-                        self,
-                        str(execution_id),
-                        step_group,
-                        parsed_workflow,
-                        context,
-                        user_id
-                    )
-                    
-                    # Process all parallel results
-                    for i, step_id in enumerate(step_group):
-                        step = parsed_workflow.step_map.get(step_id)
-                        if step and i < len(parallel_results):
-                            step_result = parallel_results[i]
-                            normalized_result, last_output, last_completed_output = await self._process_step_result(
-                                execution_id,
-                                step,
-                                step_result,
-                                context,
-                                last_output,
-                                last_completed_output,
-                                len(completed_steps) + 1,
-                                total_steps
-                            )
-                            completed_steps.add(step_id)
-                    
-                    # Save state after parallel group
-                    await self.state_manager.save_state(
-                        str(execution_id),
-                        step_group[0] if step_group else None,
-                        context,
-                        'running'
-                    )
+        # Execute workflow from its dependency graph (independent steps run concurrently)
+        await self._run_workflow_graph(
+            execution_id,
+            parsed_workflow,
+            context,
+            progress,
+            user_id=user_id
+        )
+        last_output = progress['last_output']
+        last_completed_output = progress['last_completed_output']
         
         # Workflow complete
         # Use last completed output if available, otherwise use last output
@@ -432,6 +312,162 @@ class WorkflowExecutor:
             'completed_at': datetime.now().isoformat()
         }
     
+    async def _run_workflow_graph(
+        self,
+        execution_id: uuid.UUID,
+        parsed_workflow: ParsedWorkflow,
+        context: Dict[str, Any],
+        progress: Dict[str, Any],
+        completed_steps: Optional[Set[str]] = None,
+        user_id: Optional[str] = None
+    ):
+        """
+        Run all pending steps with the dependency-driven scheduler.
+        
+        Args:
+            execution_id: Execution UUID
+            parsed_workflow: Parsed workflow definition
+            context: Current workflow context (updated in place)
+            progress: Completed count and last outputs (updated in place)
+            completed_steps: Step IDs already finished (when resuming)
+            user_id: Optional user ID
+            
+        Raises:
+            WorkflowExecutionError: If some steps can never become ready
+        """
+        graph = build_workflow_graph(parsed_workflow)
+        
+        async def run_unit(step_ids: List[str]):
+            await self._run_workflow_unit(execution_id, parsed_workflow, step_ids, context, progress, user_id)
+        
+        tenant_key = await self._get_tenant_key(user_id)
+        scheduler = StepScheduler(
+            graph,
+            run_unit,
+            max_concurrency=getattr(settings, 'WORKFLOW_MAX_PARALLEL_STEPS', 8),
+            tenant_semaphore=tenant_semaphore(
+                tenant_key, getattr(settings, 'WORKFLOW_TENANT_MAX_PARALLEL_STEPS', 32)
+            ),
+        )
+        remaining = await scheduler.run(completed_steps or ())
+        if remaining:
+            raise WorkflowExecutionError(
+                f"Workflow execution deadlock: steps {remaining} cannot execute. "
+                f"Check dependencies and conditions."
+            )
+    
+    async def _run_workflow_unit(
+        self,
+        execution_id: uuid.UUID,
+        parsed_workflow: ParsedWorkflow,
+        step_ids: List[str],
+        context: Dict[str, Any],
+        progress: Dict[str, Any],
+        user_id: Optional[str] = None
+    ):
+        """Execute one scheduled unit: a single step or a whole branch group."""
+        steps = [parsed_workflow.step_map[step_id] for step_id in step_ids]
+        
+        if steps[0].branch_group:
+            # Evaluate branch conditions in order and execute the first matching branch
+            selected = None
+            for branch_step in steps:
+                if not branch_step.condition:
+                    # No condition means this branch always executes (else branch)
+                    selected = branch_step
+                    break
+                try:
+                    if self.evaluator.evaluate(branch_step.condition, context):
+                        selected = branch_step
+                        break
+                except ConditionalEvaluationError:
+                    # Condition evaluation failed, try next branch
+                    continue
+            
+            if selected:
+                await self._run_single_step(execution_id, selected, context, progress, user_id)
+            
+            # Mark all other branches in the group as skipped
+            for branch_step in steps:
+                if branch_step is not selected:
+                    progress['completed'] += 1
+                    context['steps'][branch_step.id] = {
+                        'success': True,
+                        'output': {'skipped': True, 'reason': 'branch not selected'},
+                        'skipped': True
+                    }
+                    await self.state_manager.save_step_state(
+                        str(execution_id),
+                        branch_step.id,
+                        context['steps'][branch_step.id]
+                    )
+            return
+        
+        await self._run_single_step(execution_id, steps[0], context, progress, user_id)
+    
+    async def _run_single_step(
+        self,
+        execution_id: uuid.UUID,
+        step: ParsedStep,
+        context: Dict[str, Any],
+        progress: Dict[str, Any],
+        user_id: Optional[str] = None
+    ):
+        """Execute a step, record its result in the context and save state."""
+        await self._emit_step_started(
+            str(execution_id),
+            step.id,
+            step.name,
+            progress['completed'] + 1,
+            progress['total']
+        )
+        
+        try:
+            step_result = await self._execute_step(
+                execution_id,
+                step,
+                context,
+                user_id=user_id
+            )
+        except Exception as e:
+            if not step.parallel:
+                raise
+            # Parallel steps report failures as results instead of aborting siblings
+            step_result = {'success': False, 'output': {'error': str(e)}, 'error': str(e)}
+        
+        progress['completed'] += 1
+        _, progress['last_output'], progress['last_completed_output'] = await self._process_step_result(
+            execution_id,
+            step,
+            step_result,
+            context,
+            progress['last_output'],
+            progress['last_completed_output'],
+            progress['completed'],
+            progress['total']
+        )
+        
+        # Persist only this step's result; the head was written at start
+        await self.state_manager.save_step_state(
+            str(execution_id),
+            step.id,
+            context['steps'][step.id]
+        )
+    
+    async def _get_tenant_key(self, user_id: Optional[str]) -> Optional[str]:
+        """Key under which concurrent steps are capped: the user's organization, else the user."""
+        if not user_id:
+            return None
+        from apps.authentication.models import User
+        
+        try:
+            organization_id = await User.objects.filter(id=user_id).values_list(
+                'organization_id', flat=True
+            ).afirst()
+        except Exception:
+            organization_id = None
+        return f'org:{organization_id}' if organization_id else f'user:{user_id}'
+    
     async def _process_step_result(
         self,
         execution_id: uuid.UUID,
@@ -986,9 +1022,9 @@ class WorkflowExecutor:
         # Resume execution status
         await self.state_manager.resume_execution(execution_id)
         
-        # Get current state from database
-        state = execution.state or {}
-        context = state.get('context', {})
+        # Materialize current state from the head and step checkpoints
+        state = await self.state_manager.materialize_state(execution_id, execution.state)
+        context = state.get('context') or (state if 'input' in state else {})
         if not context:
             # Fallback: reconstruct context from input_data
             context = {
@@ -1008,6 +1044,11 @@ class WorkflowExecutor:
             ).values_list('step_name', flat=True)
         )
         completed_steps = set(completed_steps_query)
+        # Steps checkpointed as successful are done as well
+        completed_steps.update(
+            step_id for step_id, step_data in (context.get('steps') or {}).items()
+            if isinstance(step_data, dict) and step_data.get('success')
+        )
         
         # Get workflow definition and parse it
         workflow = execution.workflow
@@ -1017,25 +1058,27 @@ class WorkflowExecutor:
         current_step_name = execution.current_step
         step_to_resume = None
         
+        # Steps are recorded by id (checkpoints, current_step) or by name (WorkflowStep)
+        pending_steps = [
+            step for step in parsed_workflow.steps
+            if step.id not in completed_steps and step.name not in completed_steps
+        ]
+        
         if current_step_name:
             # Try to find the current step
-            for step in parsed_workflow.steps:
-                if step.name == current_step_name:
-                    if step.name not in completed_steps:
-                        step_to_resume = step
-                        break
-        else:
-            # Find first incomplete step
-            for step in parsed_workflow.steps:
-                if step.name not in completed_steps:
+            for step in pending_steps:
+                if current_step_name in (step.id, step.name):
                     step_to_resume = step
                     break
+        if not step_to_resume and pending_steps:
+            # Find first incomplete step
+            step_to_resume = pending_steps[0]
         
         if not step_to_resume:
             # All steps completed, mark as completed
-            await self.state_manager.complete_execution(
+            await self.state_manager.record_execution_complete(
                 execution_id,
-                output_data=state.get('output_data', execution.output_data or {})
+                state.get('output_data', execution.output_data or {})
             )
             return
         
@@ -1059,7 +1102,7 @@ class WorkflowExecutor:
             )
         except Exception as e:
             logger.error(f"Failed to resume workflow execution: {str(e)}", exc_info=True)
-            await self.state_manager.fail_execution(execution_id, str(e))
+            await self.state_manager.record_execution_failure(execution_id, str(e))
             raise
     
     async def _continue_workflow_execution(
@@ -1072,114 +1115,44 @@ class WorkflowExecutor:
         user_id: Optional[str] = None
     ):
         """Continue workflow execution from a specific step."""
-        from typing import Set
-        
-        total_steps = len(parsed_workflow.steps)
-        last_output = None
-        last_completed_output = None
+        progress = {
+            'total': len(parsed_workflow.steps),
+            'completed': 0,
+            'last_output': None,
+            'last_completed_output': None,
+        }
         
         # Restore last output from context if available
         if 'steps' in context and context['steps']:
             # Get the last completed step's output
             for step_id, step_data in context['steps'].items():
                 if step_data.get('success') and not step_data.get('skipped'):
-                    last_output = step_data.get('output')
-                    last_completed_output = last_output
+                    progress['last_output'] = step_data.get('output')
+                    progress['last_completed_output'] = progress['last_output']
+        context.setdefault('steps', {})
+        
+        # Completed steps may be recorded by id or by name; everything downstream of
+        # them (including start_from_step) is released by the dependency graph
+        done = {
+            step.id for step in parsed_workflow.steps
+            if step.id in completed_steps or (step.name and step.name in completed_steps)
+        }
+        progress['completed'] = len(done)
         
-        # Continue execution loop from current step
-        while len(completed_steps) < total_steps:
-            # Find steps ready to execute (considering dependencies and completed steps)
-            step_groups = find_parallel_steps(parsed_workflow, completed_steps)
-            
-            if not step_groups:
-                # Check if we're done or stuck
-                if len(completed_steps) < total_steps:
-                    remaining = [s.id for s in parsed_workflow.steps if s.id not in completed_steps]
-                    raise WorkflowExecutionError(
-                        f"Workflow execution cannot continue: steps {remaining} cannot execute. "
-                        f"Check dependencies and conditions."
-                    )
-                break
-            
-            # Execute each group
-            for step_group in step_groups:
-                if len(step_group) == 1:
-                    step_id = step_group[0]
-                    step = parsed_workflow.step_map.get(step_id)
-                    if not step or step.name in completed_steps:
-                        continue
-                    
-                    # Skip if we haven't reached the start step yet
-                    if step.name != start_from_step and start_from_step not in completed_steps:
-                        # Check if this step depends on start_from_step
-                        if step.depends_on:
-                            # Check if any dependency is the start step
-                            depends_on_names = [s.name for s in parsed_workflow.steps if s.id in step.depends_on]
-                            if start_from_step not in depends_on_names:
-                                continue
-                    
-                    # Execute step (reuse existing step execution logic)
-                    await self._emit_step_started(
-                        str(execution_id),
-                        step.id,
-                        step.name,
-                        len(completed_steps) + 1,
-                        total_steps
-                    )
-                    
-                    step_result = await self._execute_step(
-                        execution_id,
-                        step,
-                        context,
-                        user_id=user_id
-                    )
-                    
-                    normalized_result, last_output, last_completed_output = await self._process_step_result(
-                        execution_id,
-                        step,
-                        step_result,
-                        context,
-                        last_output,
-                        last_completed_output,
-                        len(completed_steps) + 1,
-                        total_steps
-                    )
-                    
-                    completed_steps.add(step.id)
-                    
-                    # Save state after step
-                    await self.state_manager.save_state(
-                        str(execution_id),
-                        step.id,
-                        context,
-                        'running'
-                    )
-                    
-                    # Update start_from_step flag after first step
-                    if step.name == start_from_step:
-                        start_from_step = None  # Clear flag to allow all subsequent steps
-                else:
-                    # Parallel group execution
-                    await execute_parallel_steps(
-                        execution_id,
-                        step_group,
-                        parsed_workflow,
-                        context,
-                        user_id,
-                        self._execute_step,
-                        self._process_step_result,
-                        self.state_manager,
-                        self._emit_step_started
-                    )
-                    
-                    # Mark all steps in group as completed
-                    for step_id in step_group:
-                        completed_steps.add(step_id)
+        await self._run_workflow_graph(
+            execution_id,
+            parsed_workflow,
+            context,
+            progress,
+            completed_steps=done,
+            user_id=user_id
+        )
+        last_completed_output = progress['last_completed_output']
         
         # Mark execution as completed
-        await self.state_manager.complete_execution(
+        await self.state_manager.record_execution_complete(
             str(execution_id),
-            output_data=last_completed_output or {}
+            last_completed_output or {}
         )
     
     async def cancel(self, execution_id: str):
@@ -1626,3 +1599,42 @@ class WorkflowExecutor:
 
 # Global instance
 workflow_executor = WorkflowExecutor()
+
+
+async def run_workflow_job(payload: Dict[str, Any]):
+    """
+    Job queue handler: run a workflow execution submitted asynchronously.
+    
+    Progress and completion reach clients through the execution's
+    ``workflow_execution_<id>`` WebSocket group.
+    
+    Args:
+        payload: {'execution_id': ..., 'organization_id': ...}
+    """
+    from apps.workflows.models import WorkflowExecution
+    
+    execution_id = payload['execution_id']
+    status = await WorkflowExecution.objects.filter(id=execution_id).values_list(
+        'status', flat=True
+    ).afirst()
+    if status != 'pending':
+        # Cancelled (or already picked up) while waiting in the queue
+        return
+    
+    try:
+        result = await workflow_executor.run(execution_id)
+    except WorkflowExecutionError:
+        # Failure is recorded on the execution and emitted to the group
+        return
+    
+    organization_id = payload.get('organization_id')
+    if organization_id and result.get('success', True):
+        from apps.organizations.models import Organization
+        from apps.organizations.services import SubscriptionService
+        from asgiref.sync import sync_to_async
+        
+        try:
+            organization = await Organization.objects.aget(id=organization_id)
+            await sync_to_async(SubscriptionService.increment_usage)(organization, 'workflow_executions')
+        except Exception as e:
+            logger.warning(f"Failed to increment usage count: {e}")
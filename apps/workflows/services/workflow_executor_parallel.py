@@ -1,158 +1,287 @@
 """
 Parallel Workflow Step Execution Support
 
-This module provides utilities for identifying and executing independent workflow steps in parallel.
+This module builds the dependency graph of a workflow once per execution and
+runs it with an indegree-based ready queue: each step is launched as soon as
+the steps it depends on have finished, so independent branches run
+concurrently and a workflow finishes in critical-path time.
+
+Dependencies of a step are:
+- its explicit ``depends_on`` list
+- implicit edges from steps whose ``on_success``/``on_failure`` point to it
+- data edges to earlier steps it reads through ``{{steps.<id>...}}`` in its
+  inputs, ``condition`` or ``skip_if``
+
+Steps of one ``branch_group`` form a single unit: the first branch whose
+condition holds runs and the others are marked skipped.
+
+Steps that declare neither ``parallel`` nor ``depends_on`` keep their
+historical one-at-a-time behaviour: they share a sequential lane per
+execution and are started in definition order.
 """
 
-import uuid
+import re
+import heapq
 import asyncio
-from typing import Dict, Any, List, Set, Optional, Tuple
+import logging
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
 from .workflow_parser import ParsedWorkflow, ParsedStep
 
+logger = logging.getLogger(__name__)
 
-def find_parallel_steps(parsed_workflow: ParsedWorkflow, completed_steps: Set[str]) -> List[List[str]]:
-    """
-    Find steps that can be executed in parallel.
+# {{steps.<id>...}} references and whole-context {{steps}} references
+_STEP_REFERENCE = re.compile(r'\bsteps\.([A-Za-z0-9_\-]+)')
+_ALL_STEPS_REFERENCE = re.compile(r'\{\{\s*steps\s*\}\}')
+
+# Per event loop: tenant key -> semaphore shared by all executions of that tenant
+_tenant_semaphores: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+
+@dataclass
+class WorkflowGraph:
+    """Precomputed dependency graph of a workflow."""
+    units: Dict[str, List[str]]  # unit id -> step ids (several for a branch group)
+    unit_of: Dict[str, str]  # step id -> unit id
+    dependencies: Dict[str, Set[str]]  # unit id -> unit ids it waits for
+    dependents: Dict[str, List[str]]  # unit id -> unit ids waiting for it
+    order: Dict[str, int]  # unit id -> definition position of its first step
+    sequential: Set[str] = field(default_factory=set)  # units on the sequential lane
+    
+    def is_branch(self, unit: str) -> bool:
+        return unit.startswith('branch:')
+    
+    def critical_path_length(self) -> int:
+        """Number of units on the longest dependency chain."""
+        depth: Dict[str, int] = {}
+        for unit in self.topological_order():
+            depth[unit] = 1 + max((depth[d] for d in self.dependencies[unit] if d in depth), default=0)
+        return max(depth.values(), default=0)
     
-    Steps can run in parallel if:
-    1. They have parallel=True flag
-    2. They're in the same parallel_group (or no group specified)
-    3. All their dependencies (depends_on) are completed
-    4. They're not already completed
+    def topological_order(self) -> List[str]:
+        """Units in dependency order (units on a cycle are omitted)."""
+        indegree = {unit: len(deps) for unit, deps in self.dependencies.items()}
+        ready = [(self.order[u], u) for u, n in indegree.items() if n == 0]
+        heapq.heapify(ready)
+        result = []
+        while ready:
+            _, unit = heapq.heappop(ready)
+            result.append(unit)
+            for dependent in self.dependents[unit]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    heapq.heappush(ready, (self.order[dependent], dependent))
+        return result
+
+
+def _step_references(step: ParsedStep) -> Iterable[str]:
+    text = ' '.join(
+        str(value) for value in (step.inputs, step.condition, step.skip_if) if value
+    )
+    if _ALL_STEPS_REFERENCE.search(text):
+        yield '*'
+    yield from _STEP_REFERENCE.findall(text)
+
+
+def build_workflow_graph(parsed_workflow: ParsedWorkflow) -> WorkflowGraph:
+    """
+    Build the dependency graph of a workflow in O(steps + edges).
     
     Args:
         parsed_workflow: Parsed workflow definition
-        completed_steps: Set of completed step IDs
-        
+    
     Returns:
-        List of step groups, where each group can be executed in parallel
+        WorkflowGraph
     """
-    # Build dependency graph from depends_on, on_success, and on_failure
-    dependencies: Dict[str, Set[str]] = {}
     step_map = parsed_workflow.step_map
+    position = {step.id: index for index, step in enumerate(parsed_workflow.steps)}
     
-    for step_id, step in step_map.items():
-        # Check on_success dependencies (implicit dependency)
-        if step.on_success:
-            if step.on_success in step_map:
-                if step.on_success not in dependencies:
-                    dependencies[step.on_success] = set()
-                dependencies[step.on_success].add(step_id)
-        
-        # Check on_failure dependencies (implicit dependency)
-        if step.on_failure:
-            if step.on_failure in step_map:
-                if step.on_failure not in dependencies:
-                    dependencies[step.on_failure] = set()
-                dependencies[step.on_failure].add(step_id)
-    
-    # Find steps ready to execute (all dependencies completed)
-    ready_steps = []
-    branch_groups_seen = {}  # Track which branch groups have already been evaluated
-    
-    for step_id, step in step_map.items():
-        if step_id in completed_steps:
-            continue
-        
-        # Check explicit depends_on
-        step_deps = set(step.depends_on) if step.depends_on else set()
-        # Add implicit dependencies
-        step_deps.update(dependencies.get(step_id, set()))
-        
-        if step_deps.issubset(completed_steps):
-            # Handle branch groups: only add steps from branch groups if they haven't been evaluated yet
-            if step.branch_group:
-                if step.branch_group not in branch_groups_seen:
-                    # First time seeing this branch group - add it
-                    ready_steps.append(step_id)
-                    branch_groups_seen[step.branch_group] = step_id
-                # If branch group already seen, skip (only one branch per group executes)
-            else:
-                ready_steps.append(step_id)
-    
-    # Group steps by parallel_group
-    parallel_groups_by_group: Dict[Optional[str], List[str]] = {}
-    sequential_steps = []
-    
-    for step_id in ready_steps:
-        step = step_map[step_id]
-        if step.parallel:
-            # Group by parallel_group (None means no group, can run with other ungrouped parallel steps)
-            group_key = step.parallel_group if step.parallel_group else "__ungrouped__"
-            if group_key not in parallel_groups_by_group:
-                parallel_groups_by_group[group_key] = []
-            parallel_groups_by_group[group_key].append(step_id)
-        else:
-            # Sequential step
-            sequential_steps.append(step_id)
-    
-    # Build result: parallel groups first, then sequential steps
-    result = []
-    
-    # Add parallel groups (each group executes in parallel)
-    for group_steps in parallel_groups_by_group.values():
-        if group_steps:
-            result.append(group_steps)
-    
-    # Add sequential steps (one at a time)
-    for step_id in sequential_steps:
-        result.append([step_id])
-    
-    return result if result else []
-
-
-async def execute_parallel_steps(
-    executor,
-    execution_id: str,
-    step_ids: List[str],
-    parsed_workflow: ParsedWorkflow,
-    context: Dict[str, Any],
-    user_id: Optional[str] = None
-) -> List[Dict[str, Any]]:
+    # Step-level dependencies
+    step_deps: Dict[str, Set[str]] = {step.id: set(step.depends_on or []) for step in parsed_workflow.steps}
+    for step in parsed_workflow.steps:
+        for target in (step.on_success, step.on_failure):
+            if target and target in step_map and target != step.id:
+                step_deps[target].add(step.id)
+        for ref in _step_references(step):
+            if ref == '*':
+                step_deps[step.id].update(s.id for s in parsed_workflow.steps[:position[step.id]])
+            elif ref in step_map and position[ref] < position[step.id]:
+                step_deps[step.id].add(ref)
+    
+    # Collapse branch groups into single units
+    units: Dict[str, List[str]] = {}
+    unit_of: Dict[str, str] = {}
+    for step in parsed_workflow.steps:
+        unit = f'branch:{step.branch_group}' if step.branch_group else step.id
+        units.setdefault(unit, []).append(step.id)
+        unit_of[step.id] = unit
+    
+    dependencies: Dict[str, Set[str]] = {unit: set() for unit in units}
+    for step_id, deps in step_deps.items():
+        unit = unit_of[step_id]
+        for dep in deps:
+            # Unknown step ids stay as unsatisfiable dependencies (reported as deadlock)
+            dep_unit = unit_of.get(dep, f'missing:{dep}')
+            if dep_unit != unit:
+                dependencies[unit].add(dep_unit)
+    
+    dependents: Dict[str, List[str]] = {unit: [] for unit in units}
+    for unit, deps in dependencies.items():
+        for dep in deps:
+            if dep in dependents:
+                dependents[dep].append(unit)
+    
+    sequential = {
+        unit for unit, step_ids in units.items()
+        if any(not step_map[s].parallel and not step_map[s].depends_on for s in step_ids)
+    }
+    order = {unit: position[step_ids[0]] for unit, step_ids in units.items()}
+    return WorkflowGraph(units, unit_of, dependencies, dependents, order, sequential)
+
+
+def tenant_semaphore(tenant_key: Optional[str], limit: int) -> Optional[asyncio.Semaphore]:
     """
-    Execute multiple steps in parallel.
+    Get the semaphore capping concurrent steps of one tenant in this process.
     
     Args:
-        executor: WorkflowExecutor instance
-        execution_id: Execution UUID
-        step_ids: List of step IDs to execute in parallel
-        parsed_workflow: Parsed workflow definition
-        context: Current workflow context
-        user_id: Optional user ID
-        
+        tenant_key: Organization (or user) key; None disables the cap
+        limit: Maximum concurrent steps for the tenant; 0 disables the cap
+    
     Returns:
-        List of step execution results
+        Semaphore shared by executions on the running event loop, or None
+    """
+    if not tenant_key or limit <= 0:
+        return None
+    semaphores = _tenant_semaphores.setdefault(asyncio.get_running_loop(), {})
+    if tenant_key not in semaphores:
+        semaphores[tenant_key] = asyncio.Semaphore(limit)
+    return semaphores[tenant_key]
+
+
+class StepScheduler:
+    """
+    Run a workflow graph with a ready queue.
+    
+    ``run_unit`` is called with the step ids of a unit once all of its
+    dependencies have finished. Units are started in definition order among
+    those ready; concurrency is bounded by the per-execution limit and the
+    optional tenant semaphore.
     """
-    # Create tasks for parallel execution
-    tasks = []
-    for step_id in step_ids:
-        step = parsed_workflow.step_map.get(step_id)
-        if step:
-            task = executor._execute_step(
-                uuid.UUID(execution_id),
-                step,
-                context,
-                user_id
-            )
-            tasks.append(task)
-    
-    # Execute all steps in parallel
-    if tasks:
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def __init__(
+        self,
+        graph: WorkflowGraph,
+        run_unit: Callable[[List[str]], Awaitable[Any]],
+        max_concurrency: int = 8,
+        tenant_semaphore: Optional[asyncio.Semaphore] = None
+    ):
+        """
+        Initialize scheduler.
         
-        # Process results
-        step_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                step_results.append({
-                    'success': False,
-                    'output': {'error': str(result)},
-                    'error': str(result)
-                })
-            else:
-                step_results.append(result)
+        Args:
+            graph: Workflow graph from build_workflow_graph
+            run_unit: Coroutine function executing one unit's steps
+            max_concurrency: Maximum steps running at once in this execution (0 = unbounded)
+            tenant_semaphore: Semaphore shared by the tenant's executions
+        """
+        self.graph = graph
+        self.run_unit = run_unit
+        self.max_concurrency = max_concurrency
+        self.tenant_semaphore = tenant_semaphore
+        self.running_units = 0
+        self.max_running = 0
+    
+    async def run(self, completed: Iterable[str] = ()) -> List[str]:
+        """
+        Execute every unit not yet completed.
+        
+        Args:
+            completed: Step ids already finished (e.g. when resuming)
+        
+        Returns:
+            Step ids that could not run because of unsatisfiable dependencies
+        
+        Raises:
+            Exception: The first exception raised by ``run_unit``; units still
+                       running are cancelled
+        """
+        graph = self.graph
+        done_units = {
+            unit for unit, step_ids in graph.units.items()
+            if all(s in completed for s in step_ids)
+        }
+        indegree = {
+            unit: len(deps - done_units)
+            for unit, deps in graph.dependencies.items() if unit not in done_units
+        }
+        ready_free: List = []
+        ready_sequential: List = []
+        
+        def enqueue(unit):
+            queue = ready_sequential if unit in graph.sequential else ready_free
+            heapq.heappush(queue, (graph.order[unit], unit))
+        
+        for unit, count in indegree.items():
+            if count == 0:
+                enqueue(unit)
         
-        return step_results
+        execution_semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+        running: Dict[asyncio.Task, str] = {}
+        lane_busy = False
+        
+        try:
+            while True:
+                while ready_free:
+                    _, unit = heapq.heappop(ready_free)
+                    running[asyncio.ensure_future(self._run_bounded(unit, execution_semaphore))] = unit
+                if not lane_busy and ready_sequential:
+                    _, unit = heapq.heappop(ready_sequential)
+                    running[asyncio.ensure_future(self._run_bounded(unit, execution_semaphore))] = unit
+                    lane_busy = True
+                if not running:
+                    break
+                
+                finished, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    unit = running.pop(task)
+                    task.result()  # re-raise step failures
+                    if unit in graph.sequential:
+                        lane_busy = False
+                    done_units.add(unit)
+                    for dependent in graph.dependents[unit]:
+                        if dependent in indegree:
+                            indegree[dependent] -= 1
+                            if indegree[dependent] == 0:
+                                enqueue(dependent)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        
+        return [
+            step_id for unit in sorted(indegree, key=graph.order.get) if unit not in done_units
+            for step_id in graph.units[unit]
+        ]
     
-    return []
-
+    async def _run_bounded(self, unit: str, execution_semaphore: Optional[asyncio.Semaphore]):
+        if execution_semaphore is not None:
+            await execution_semaphore.acquire()
+        try:
+            if self.tenant_semaphore is not None:
+                async with self.tenant_semaphore:
+                    await self._run(unit)
+            else:
+                await self._run(unit)
+        finally:
+            if execution_semaphore is not None:
+                execution_semaphore.release()
+    
+    async def _run(self, unit: str):
+        self.running_units += 1
+        self.max_running = max(self.max_running, self.running_units)
+        try:
+            await self.run_unit(self.graph.units[unit])
+        finally:
+            self.running_units -= 1
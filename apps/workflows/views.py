@@ -11,6 +11,7 @@ from drf_spectacular.utils import extend_schema
 from django.db import models
 from django.conf import settings
 from django.core.cache import cache
+from django.urls import reverse
 from asgiref.sync import async_to_sync
 import uuid
 import logging
@@ -24,9 +25,11 @@ from apps.workflows.serializers import (
     WorkflowDetailSerializer,
     WorkflowExecutionRequestSerializer,
     WorkflowExecutionStatusSerializer,
-    WorkflowExecutionResponseSerializer
+    WorkflowExecutionResponseSerializer,
+    WorkflowExecutionSubmittedSerializer
 )
-from apps.workflows.services.workflow_executor import workflow_executor
+from apps.workflows.services.workflow_executor import workflow_executor, WorkflowExecutionError
+from apps.core.services.job_queue import job_queue, JobQueueFull
 from apps.core.services.roles import RoleService
 from apps.organizations.services import OrganizationStatusService, SubscriptionService, FeatureService
 
@@ -131,8 +134,11 @@ class WorkflowViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         request=WorkflowExecutionRequestSerializer,
-        responses={200: WorkflowExecutionResponseSerializer},
-        description="Execute a workflow with provided input data"
+        responses={200: WorkflowExecutionResponseSerializer, 202: WorkflowExecutionSubmittedSerializer},
+        description=(
+            "Execute a workflow with provided input data. With run_async the execution is "
+            "queued and 202 is returned right away; progress is streamed on the execution WebSocket."
+        )
     )
     @action(detail=True, methods=['post'])
     def execute(self, request, pk=None):
@@ -167,6 +173,9 @@ class WorkflowViewSet(viewsets.ModelViewSet):
         input_data = serializer.validated_data['input_data']
         user_id = str(request.user.id) if request.user.is_authenticated else None
         
+        if serializer.validated_data['run_async']:
+            return self._submit_execution(workflow, input_data, user_id, organization)
+        
         try:
             # Execute workflow asynchronously using async_to_sync for ASGI compatibility
             async def run_execution():
@@ -237,6 +246,43 @@ class WorkflowViewSet(viewsets.ModelViewSet):
             
             return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _submit_execution(self, workflow, input_data, user_id, organization):
+        """Create a pending execution, queue it and return 202."""
+        try:
+            job_queue.check_capacity(organization)
+            execution = async_to_sync(workflow_executor.prepare)(
+                workflow_id=str(workflow.id),
+                input_data=input_data,
+                user_id=user_id
+            )
+        except JobQueueFull as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        except WorkflowExecutionError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        execution_id = str(execution.id)
+        try:
+            job = job_queue.submit(
+                'workflow_execution',
+                {
+                    'execution_id': execution_id,
+                    'organization_id': str(organization.id) if organization else None,
+                },
+                organization=organization
+            )
+        except JobQueueFull as e:
+            WorkflowExecution.objects.filter(id=execution_id).update(status='cancelled', error_message=str(e))
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        return Response({
+            'success': True,
+            'execution_id': execution_id,
+            'status': 'pending',
+            'queue': job['queue'],
+            'status_url': reverse('workflowexecution-detail', args=[execution_id]),
+            'stream_url': f'/ws/workflows/execution/{execution_id}/',
+        }, status=status.HTTP_202_ACCEPTED)
+    
     @extend_schema(
         description="List workflow templates",
         responses={200: WorkflowListSerializer(many=True)}
@@ -21,6 +21,7 @@ from apps.agents import routing as agents_routing
 from apps.workflows import routing as workflows_routing
 from apps.projects import routing as projects_routing
 from core.middleware import JWTAuthMiddlewareStack
+from apps.core.services.job_queue import job_queue
 
 # WebSocket routing with authentication
 websocket_router = URLRouter(
@@ -45,7 +46,8 @@ if os.environ.get('DJANGO_SETTINGS_MODULE', '').endswith('development'):
 else:
     websocket_app = AllowedHostsOriginValidator(websocket_stack)
 
-application = ProtocolTypeRouter({
+# In-process background jobs run on this server's event loop
+application = job_queue.bind_server_loop(ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": websocket_app,
-})
+}))
@@ -51,6 +51,22 @@ app.conf.beat_schedule = {
         'task': 'apps.chat.tasks.check_conversations_for_summarization',
         'schedule': crontab(minute='*/30'),  # Run every 30 minutes to check for conversations needing summarization
     },
+    'process-work-item-events': {
+        'task': 'apps.projects.tasks.process_work_item_events',
+        'schedule': crontab(minute='*/1'),  # Sweep for work item events whose batch was never scheduled
+    },
+    'flush-audit-events': {
+        'task': 'apps.monitoring.tasks.flush_audit_events',
+        'schedule': 5.0,  # Every 5 seconds; drains the Redis audit buffer (AUDIT_SINK_BACKEND = 'redis')
+    },
+    'flush-usage': {
+        'task': 'apps.integrations.tasks.flush_usage',
+        'schedule': 5.0,  # Every 5 seconds; drains the Redis usage buffers (USAGE_ACCUMULATOR_BACKEND = 'redis')
+    },
+    'roll-up-usage': {
+        'task': 'apps.monitoring.tasks.roll_up_usage',
+        'schedule': crontab(minute='*/5'),  # Closed hours are rolled up within minutes for the analytics endpoints
+    },
 }
 
 @app.task(bind=True, ignore_result=True)
@@ -0,0 +1,245 @@
+"""
+Multi-process channel layer configuration.
+
+``ShardedRedisChannelLayer`` extends channels_redis' ``RedisChannelLayer``
+(which already shards channels and groups across several Redis hosts by
+consistent hashing) with:
+
+- per-group capacity and expiry, matched by regex on the group name
+- a local fast path: when every member of a group is a channel owned by this
+  process, ``group_send`` delivers straight into the local receive buffers
+  after a single membership read instead of writing one message per member
+  to Redis and reading it back. While a receiver is blocked on Redis for
+  this process, local messages are handed to it directly so it wakes up.
+  Only senders on the loop that owns the receive buffers (the one channels
+  are created and received on) take it; other loops go through Redis
+
+``build_channel_layers`` returns the ``CHANNEL_LAYERS`` setting: the sharded
+Redis layer when Redis hosts are configured, the in-memory layer otherwise.
+"""
+
+from typing import Dict, List, Optional
+import asyncio
+import contextvars
+import logging
+import re
+import time
+
+import msgpack
+from channels_redis.core import RedisChannelLayer
+
+logger = logging.getLogger(__name__)
+
+# Group currently being sent to, so get_capacity can apply group capacities
+_current_group: contextvars.ContextVar = contextvars.ContextVar('channel_layer_group', default=None)
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):
+    """Redis channel layer with per-group tuning and a same-process fast path."""
+    
+    def __init__(
+        self,
+        hosts=None,
+        group_capacity: Optional[Dict[str, int]] = None,
+        group_expiry_overrides: Optional[Dict[str, int]] = None,
+        local_fast_path: bool = True,
+        **kwargs
+    ):
+        """
+        Initialize channel layer.
+        
+        Args:
+            hosts: Redis hosts; groups and channels are sharded across them
+            group_capacity: Regex on group name -> per-member message capacity
+            group_expiry_overrides: Regex on group name -> seconds a member
+                                    stays in the group without re-joining
+            local_fast_path: Deliver in-process when all members are local
+            **kwargs: Other ``RedisChannelLayer`` options (prefix, expiry,
+                      group_expiry, capacity, channel_capacity, ...)
+        """
+        super().__init__(hosts=hosts, **kwargs)
+        self.group_capacity = self.compile_capacities(group_capacity or {})
+        self.group_expiry_overrides = [
+            (re.compile(pattern), int(seconds))
+            for pattern, seconds in (group_expiry_overrides or {}).items()
+        ]
+        self.local_fast_path = local_fast_path
+        self._local_prefix = f"specific.{self.client_prefix}!"
+        # Loop owning the receive buffers, and local messages for the
+        # receiver blocked on Redis in receive_single, if any
+        self._receive_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._local_inbox: Optional[asyncio.Queue] = None
+        self._redis_waiters = 0
+        self.local_deliveries = 0
+        self.redis_deliveries = 0
+    
+    def get_group_expiry(self, group: str) -> int:
+        for pattern, seconds in self.group_expiry_overrides:
+            if pattern.match(group):
+                return seconds
+        return self.group_expiry
+    
+    def get_group_capacity(self, group: Optional[str]) -> Optional[int]:
+        if group is None:
+            return None
+        for pattern, capacity in self.group_capacity:
+            if pattern.match(group):
+                return capacity
+        return None
+    
+    def get_capacity(self, channel):
+        group_capacity = self.get_group_capacity(_current_group.get())
+        if group_capacity is not None:
+            return group_capacity
+        return super().get_capacity(channel)
+    
+    async def new_channel(self, prefix="specific"):
+        self._bind_receive_loop()
+        return await super().new_channel(prefix)
+    
+    def is_local_channel(self, channel: str) -> bool:
+        """Whether ``channel`` was created by this process (``new_channel``)."""
+        return channel.startswith(self._local_prefix)
+    
+    async def group_add(self, group, channel):
+        await super().group_add(group, channel)
+        group_expiry = self.get_group_expiry(group)
+        if group_expiry != self.group_expiry:
+            connection = self.connection(self.consistent_hash(group))
+            await connection.expire(self._group_key(group), group_expiry)
+    
+    async def group_members(self, group: str) -> List[str]:
+        """Prune expired members and return the rest in one round-trip."""
+        key = self._group_key(group)
+        connection = self.connection(self.consistent_hash(group))
+        pipe = connection.pipeline()
+        pipe.zremrangebyscore(key, min=0, max=int(time.time()) - self.get_group_expiry(group))
+        pipe.zrange(key, 0, -1)
+        _, members = await pipe.execute()
+        return [m.decode('utf8') if isinstance(m, bytes) else m for m in members]
+    
+    async def group_send(self, group, message):
+        assert self.valid_group_name(group), "Group name not valid"
+        token = _current_group.set(group)
+        try:
+            if self.local_fast_path or self.group_expiry_overrides:
+                members = await self.group_members(group)
+                if not members:
+                    return
+                if (
+                    self.local_fast_path
+                    and self._receive_loop is asyncio.get_running_loop()
+                    and all(self.is_local_channel(m) for m in members)
+                ):
+                    self._deliver_locally(members, message)
+                    return
+            self.redis_deliveries += 1
+            await super().group_send(group, message)
+        finally:
+            _current_group.reset(token)
+    
+    async def receive_single(self, channel):
+        """
+        Wait for the next message for this process from Redis or the fast path.
+        
+        The coroutine holding the receive lock waits here on Redis while the
+        other receivers wait on their buffers. It would not see a message put
+        into its own buffer, so local deliveries go through ``_local_inbox``
+        while it waits and the Redis pop is cancelled; channels_redis keeps
+        a backup of popped messages, so nothing is lost.
+        """
+        self._bind_receive_loop()
+        if not self._local_inbox.empty():
+            return self._local_inbox.get_nowait()
+        
+        self._redis_waiters += 1
+        pop = asyncio.ensure_future(super().receive_single(channel))
+        wake = asyncio.ensure_future(self._local_inbox.get())
+        woken = False
+        try:
+            await asyncio.wait([pop, wake], return_when=asyncio.FIRST_COMPLETED)
+            woken = not pop.done()
+        finally:
+            self._redis_waiters -= 1
+            for task in (pop, wake):
+                if not task.done():
+                    task.cancel()
+            if not woken and wake.done() and not wake.cancelled():
+                # Not returned below; keep the local message in its buffer
+                local_channel, local_message = wake.result()
+                self.receive_buffer[local_channel].put_nowait(local_message)
+        
+        return wake.result() if woken else pop.result()
+    
+    def _bind_receive_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._receive_loop is not loop:
+            self._receive_loop = loop
+            self._local_inbox = asyncio.Queue()
+    
+    def _deliver_locally(self, channels: List[str], message: dict):
+        # Only called on the receive loop: the buffers are not thread-safe
+        # Round-trip through msgpack so each receiver gets its own copy and
+        # messages stay restricted to what the Redis path can carry
+        packed = msgpack.packb(message, use_bin_type=True)
+        capacity = self.get_capacity(channels[0])
+        for channel in channels:
+            queue = self.receive_buffer[channel]
+            if queue.qsize() >= capacity:
+                logger.info(f"Channel {channel} over capacity in group {_current_group.get()}")
+                continue
+            copy = msgpack.unpackb(packed, raw=False)
+            if self._redis_waiters:
+                self._local_inbox.put_nowait((channel, copy))
+            else:
+                queue.put_nowait(copy)
+        self.local_deliveries += 1
+
+
+def build_channel_layers(
+    redis_urls: Optional[List[str]] = None,
+    prefix: str = 'hishamos',
+    capacity: int = 200,
+    expiry: int = 60,
+    group_expiry: int = 86400,
+    group_capacity: Optional[Dict[str, int]] = None,
+    group_expiry_overrides: Optional[Dict[str, int]] = None,
+    local_fast_path: bool = True
+) -> Dict[str, dict]:
+    """
+    Build the ``CHANNEL_LAYERS`` setting.
+    
+    Args:
+        redis_urls: Redis URLs to shard across; in-memory layer when empty
+        prefix: Key prefix in Redis
+        capacity: Default per-channel message capacity
+        expiry: Seconds an undelivered message is kept
+        group_expiry: Default seconds a member stays in a group
+        group_capacity: Regex on group name -> per-member capacity
+        group_expiry_overrides: Regex on group name -> member expiry seconds
+        local_fast_path: Deliver in-process when all group members are local
+    
+    Returns:
+        CHANNEL_LAYERS dict
+    """
+    if not redis_urls:
+        return {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    
+    # The base layer prunes with group_expiry; overrides may only shorten it
+    overrides = group_expiry_overrides or {}
+    group_expiry = max([group_expiry] + list(overrides.values()))
+    return {
+        'default': {
+            'BACKEND': 'core.channel_layers.ShardedRedisChannelLayer',
+            'CONFIG': {
+                'hosts': list(redis_urls),
+                'prefix': prefix,
+                'capacity': capacity,
+                'expiry': expiry,
+                'group_expiry': group_expiry,
+                'group_capacity': group_capacity or {},
+                'group_expiry_overrides': overrides,
+                'local_fast_path': local_fast_path,
+            },
+        },
+    }
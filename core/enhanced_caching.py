@@ -1,26 +1,479 @@
 """
 Enhanced Multi-Layer Caching Strategy
 Memory + Redis + Database caching with smart invalidation.
+
+The memory tier is a size-bounded LRU with per-entry TTL and per-namespace
+budgets. Deletes and pattern clears are broadcast over Redis pub/sub so every
+worker drops its local copy, and a Redis-side key registry lets pattern
+invalidation run without KEYS/SCAN.
 """
+import asyncio
+import concurrent.futures
 import logging
 import hashlib
 import json
-from typing import Any, Optional, Callable
+import math
+import os
+import pickle
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Optional, Callable, Dict, List, Tuple
 from functools import wraps
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
 from django.core.cache.backends.base import BaseCache
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
-# In-memory cache (process-local)
-_memory_cache = {}
+# Sentinel used to tell a cached ``None`` apart from a miss
+_MISSING = object()
+
+DEFAULT_NAMESPACE = 'default'
+
+
+def get_namespace(key: str) -> str:
+    """Return the namespace of a cache key (the part before the first ':')."""
+    if ':' in key:
+        return key.split(':', 1)[0] or DEFAULT_NAMESPACE
+    return DEFAULT_NAMESPACE
+
+
+def get_redis_client():
+    """
+    Get the raw Redis client behind the default cache.
+    
+    Returns None when the default cache is not backed by django-redis
+    (e.g. LocMemCache in development, DummyCache in tests).
+    """
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
+    except Exception as e:
+        logger.warning(f"Could not obtain Redis connection: {e}")
+        return None
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate the memory footprint of a cached value in bytes."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _NamespaceLRU:
+    """LRU bucket for a single namespace with entry and byte budgets."""
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[str, Tuple[Any, Optional[float], int]]' = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        # Earliest time the next expiry sweep may run
+        self.next_purge = 0.0
+    
+    def is_full(self, incoming_bytes: int) -> bool:
+        return len(self.entries) >= self.max_entries or self.total_bytes + incoming_bytes > self.max_bytes
+    
+    def pop(self, key: str) -> Optional[int]:
+        """Remove ``key``; returns its size, or None if it was not cached."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.total_bytes -= entry[2]
+        return entry[2]
+    
+    def put(self, key: str, value: Any, expiry: Optional[float], size: int) -> List[Tuple[str, int]]:
+        """Store an entry; returns the ``(key, size)`` pairs evicted to stay within budget."""
+        self.pop(key)
+        self.entries[key] = (value, expiry, size)
+        self.total_bytes += size
+        return self._enforce_budget()
+    
+    def _enforce_budget(self) -> List[Tuple[str, int]]:
+        evicted = []
+        while self.entries and (
+            len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes
+        ):
+            key, (_, _, size) = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            evicted.append((key, size))
+        return evicted
+
+
+class BoundedMemoryCache:
+    """
+    Process-local LRU + TTL cache with per-namespace memory budgets.
+    
+    Each namespace (key prefix before the first ':') gets its own LRU bucket,
+    so a noisy namespace such as ``ai_response`` cannot evict hot entries of
+    another namespace. A process-wide entry and byte budget caps the sum of
+    all buckets; past it the globally least recently used entries go first.
+    Expired entries are dropped on access. A write to a
+    full bucket first sweeps its expired entries, so they go before live ones,
+    but at most once per ``purge_interval`` seconds to keep writes O(1)
+    amortized.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        namespace_budgets: Optional[Dict[str, Dict[str, int]]] = None,
+        purge_interval: float = 1.0,
+        total_max_entries: Optional[int] = None,
+        total_max_bytes: Optional[int] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.namespace_budgets = namespace_budgets or {}
+        self.purge_interval = purge_interval
+        # Process-wide budget across namespaces; defaults to one namespace's worth
+        self.total_max_entries = total_max_entries or max_entries
+        self.total_max_bytes = total_max_bytes or max_bytes
+        self._buckets: Dict[str, _NamespaceLRU] = {}
+        # Recency of every key across buckets, least recently used first
+        self._recency: 'OrderedDict[str, None]' = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _bucket(self, namespace: str) -> _NamespaceLRU:
+        bucket = self._buckets.get(namespace)
+        if bucket is None:
+            budget = self.namespace_budgets.get(namespace, {})
+            bucket = _NamespaceLRU(
+                max_entries=budget.get('max_entries', self.max_entries),
+                max_bytes=budget.get('max_bytes', self.max_bytes),
+            )
+            self._buckets[namespace] = bucket
+        return bucket
+    
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        """Return the cached value, or ``default`` on miss/expiry."""
+        with self._lock:
+            bucket = self._buckets.get(get_namespace(key))
+            entry = bucket.entries.get(key) if bucket else None
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expiry, _ = entry
+            if expiry is not None and expiry <= time.monotonic():
+                self._remove(bucket, key)
+                self.misses += 1
+                return default
+            bucket.entries.move_to_end(key)
+            self._recency.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value; ``ttl`` of None or 0 means no expiry."""
+        size = _estimate_size(value)
+        expiry = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            bucket = self._bucket(get_namespace(key))
+            self._remove(bucket, key)
+            if size > bucket.max_bytes or size > self.total_max_bytes:
+                # Never let a single oversized value flush the whole namespace
+                return
+            if bucket.is_full(size) and bucket.next_purge <= time.monotonic():
+                self._purge_expired(bucket)
+                bucket.next_purge = time.monotonic() + self.purge_interval
+            for evicted_key, evicted_size in bucket.put(key, value, expiry, size):
+                self._recency.pop(evicted_key, None)
+                self.total_bytes -= evicted_size
+            self._recency[key] = None
+            self.total_bytes += size
+            self._enforce_total_budget()
+    
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(get_namespace(key))
+            return self._remove(bucket, key) if bucket else False
+    
+    def delete_matching(self, pattern: str) -> int:
+        """Delete all keys containing ``pattern``."""
+        removed = 0
+        with self._lock:
+            for bucket in self._buckets.values():
+                for key in [k for k in bucket.entries if pattern in k]:
+                    self._remove(bucket, key)
+                    removed += 1
+        return removed
+    
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._recency.clear()
+            self.total_bytes = 0
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not _MISSING
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._recency)
+    
+    def _remove(self, bucket: _NamespaceLRU, key: str) -> bool:
+        size = bucket.pop(key)
+        if size is None:
+            return False
+        self._recency.pop(key, None)
+        self.total_bytes -= size
+        return True
+    
+    def _enforce_total_budget(self):
+        while self._recency and (
+            len(self._recency) > self.total_max_entries or self.total_bytes > self.total_max_bytes
+        ):
+            key, _ = self._recency.popitem(last=False)
+            size = self._buckets[get_namespace(key)].pop(key)
+            self.total_bytes -= size or 0
+            self.evictions += 1
+    
+    def _purge_expired(self, bucket: _NamespaceLRU):
+        now = time.monotonic()
+        expired = [k for k, (_, exp, _) in bucket.entries.items() if exp is not None and exp <= now]
+        for key in expired:
+            self._remove(bucket, key)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and per-namespace usage."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._recency),
+                'bytes': self.total_bytes,
+                'max_entries': self.total_max_entries,
+                'max_bytes': self.total_max_bytes,
+                'evictions': self.evictions,
+                'namespaces': {
+                    name: {
+                        'entries': len(bucket.entries),
+                        'bytes': bucket.total_bytes,
+                        'max_entries': bucket.max_entries,
+                        'max_bytes': bucket.max_bytes,
+                        'evictions': bucket.evictions,
+                    }
+                    for name, bucket in self._buckets.items()
+                },
+            }
+
+
+class CacheKeyRegistry:
+    """
+    Registry of keys written through MultiLayerCache.
+    
+    With Redis, keys are tracked in one sorted set per namespace, scored by
+    the key's expiry time (plus a SET of known namespaces), so pattern
+    invalidation only reads the registries instead of issuing KEYS/SCAN over
+    the whole keyspace. Expired members are trimmed on every registration
+    and lookup, so the sets only hold keys that may still exist. Without
+    Redis the registry is process-local, which matches the scope of a
+    local-memory cache.
+    """
+    
+    NAMESPACES_KEY = 'cache_registry:namespaces'
+    # Process-local namespaces are trimmed when they double past this size
+    LOCAL_TRIM_SIZE = 1024
+    
+    def __init__(self, ttl: int = 3600):
+        self.ttl = ttl
+        # namespace -> {key: expiry timestamp}
+        self._local: Dict[str, Dict[str, float]] = {}
+        self._local_trim_at: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def _registry_key(self, namespace: str) -> str:
+        return cache.make_key(f"cache_registry:z:{namespace}")
+    
+    def register(self, key: str, ttl: Optional[int] = None):
+        namespace = get_namespace(key)
+        now = time.time()
+        expires_at = now + (ttl or self.ttl)
+        client = get_redis_client()
+        if client is None:
+            with self._lock:
+                keys = self._local.setdefault(namespace, {})
+                keys[key] = expires_at
+                if len(keys) >= self._local_trim_at.get(namespace, self.LOCAL_TRIM_SIZE):
+                    self._trim_local(keys, now)
+                    self._local_trim_at[namespace] = max(self.LOCAL_TRIM_SIZE, 2 * len(keys))
+            return
+        registry_key = self._registry_key(namespace)
+        namespaces_key = cache.make_key(self.NAMESPACES_KEY)
+        expire = max(ttl or 0, self.ttl)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(registry_key, {key: expires_at})
+            pipe.zremrangebyscore(registry_key, '-inf', now)
+            pipe.expire(registry_key, expire)
+            pipe.sadd(namespaces_key, namespace)
+            pipe.expire(namespaces_key, expire)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to register cache key {key}: {e}")
+    
+    def unregister(self, keys: List[str]):
+        if not keys:
+            return
+        by_namespace: Dict[str, List[str]] = {}
+        for key in keys:
+            by_namespace.setdefault(get_namespace(key), []).append(key)
+        client = get_redis_client()
+        if client is None:
+            with self._lock:
+                for namespace, ns_keys in by_namespace.items():
+                    registered = self._local.get(namespace, {})
+                    for key in ns_keys:
+                        registered.pop(key, None)
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for namespace, ns_keys in by_namespace.items():
+                pipe.zrem(self._registry_key(namespace), *ns_keys)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to unregister cache keys: {e}")
+    
+    def match(self, pattern: str) -> List[str]:
+        """Return registered, unexpired keys containing ``pattern``."""
+        now = time.time()
+        client = get_redis_client()
+        if client is None:
+            with self._lock:
+                matched = []
+                for keys in self._local.values():
+                    self._trim_local(keys, now)
+                    matched.extend(k for k in keys if pattern in k)
+                return matched
+        try:
+            namespaces = [
+                ns.decode('utf-8') if isinstance(ns, bytes) else ns
+                for ns in client.smembers(cache.make_key(self.NAMESPACES_KEY))
+            ]
+            pipe = client.pipeline(transaction=False)
+            for ns in namespaces:
+                registry_key = self._registry_key(ns)
+                pipe.zremrangebyscore(registry_key, '-inf', now)
+                pipe.zrange(registry_key, 0, -1)
+            results = pipe.execute()
+            matched = []
+            for members in results[1::2]:
+                for key in members:
+                    key = key.decode('utf-8') if isinstance(key, bytes) else key
+                    if pattern in key:
+                        matched.append(key)
+            return matched
+        except Exception as e:
+            logger.warning(f"Failed to read cache key registry for {pattern}: {e}")
+            return []
+    
+    @staticmethod
+    def _trim_local(keys: Dict[str, float], now: float):
+        for key in [k for k, expires_at in keys.items() if expires_at <= now]:
+            del keys[key]
+
+
+class CacheInvalidationBus:
+    """
+    Cross-worker L1 invalidation over Redis pub/sub.
+    
+    Each process lazily starts a daemon listener thread the first time it
+    publishes or the cache is used. Messages published by the same process
+    are ignored since the local tier has already been updated.
+    """
+    
+    def __init__(self, channel: str, handler: Callable[[Dict[str, Any]], None]):
+        self.channel = channel
+        self.handler = handler
+        self._origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._pid = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def ensure_listening(self):
+        """Start the listener thread for this process if Redis is available."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Forked worker: new identity, new listener
+                self._origin = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+            self._pid = pid
+            if get_redis_client() is None:
+                return
+            self._thread = threading.Thread(
+                target=self._listen, name='cache-invalidation-listener', daemon=True
+            )
+            self._thread.start()
+    
+    def publish(self, op: str, target: str = ''):
+        client = get_redis_client()
+        if client is None:
+            return
+        self.ensure_listening()
+        message = json.dumps({'op': op, 'target': target, 'origin': self._origin})
+        try:
+            client.publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Failed to publish cache invalidation {op}:{target}: {e}")
+    
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                client = get_redis_client()
+                if client is None:
+                    return
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = 1
+                for message in pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    self._dispatch(message.get('data'))
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error, reconnecting in {backoff}s: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+    
+    def _dispatch(self, data: Any):
+        try:
+            if isinstance(data, bytes):
+                data = data.decode('utf-8')
+            payload = json.loads(data)
+        except (ValueError, TypeError):
+            return
+        if payload.get('origin') == self._origin:
+            return
+        try:
+            self.handler(payload)
+        except Exception as e:
+            logger.warning(f"Failed to apply cache invalidation {payload}: {e}")
 
 
 class MultiLayerCache:
     """
     Multi-layer caching system:
-    1. Memory (fastest, process-local)
+    1. Memory (fastest, process-local, bounded LRU + TTL)
     2. Redis (shared across processes)
     3. Database (persistent fallback)
     """
@@ -29,19 +482,42 @@ class MultiLayerCache:
         self.memory_ttl = getattr(settings, 'MEMORY_CACHE_TTL', 60)  # 1 minute
         self.redis_ttl = getattr(settings, 'REDIS_CACHE_TTL', 300)  # 5 minutes
         self.db_ttl = getattr(settings, 'DB_CACHE_TTL', 3600)  # 1 hour
+        self.memory = BoundedMemoryCache(
+            max_entries=getattr(settings, 'MEMORY_CACHE_MAX_ENTRIES', 10000),
+            max_bytes=getattr(settings, 'MEMORY_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+            namespace_budgets=getattr(settings, 'MEMORY_CACHE_NAMESPACE_BUDGETS', {}),
+            total_max_entries=getattr(settings, 'MEMORY_CACHE_TOTAL_MAX_ENTRIES', None),
+            total_max_bytes=getattr(settings, 'MEMORY_CACHE_TOTAL_MAX_BYTES', None),
+        )
+        self.registry = CacheKeyRegistry(ttl=self.db_ttl)
+        self.bus = CacheInvalidationBus(
+            channel=getattr(settings, 'CACHE_INVALIDATION_CHANNEL', 'hishamos:cache:invalidate'),
+            handler=self._apply_invalidation,
+        )
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get from cache (memory -> Redis -> DB)."""
+        self.bus.ensure_listening()
+        
         # Try memory first
-        if key in _memory_cache:
-            data, expiry = _memory_cache[key]
-            if expiry is None or expiry > self._now():
-                logger.debug(f"Cache HIT (memory): {key}")
-                return data
-            else:
-                # Expired, remove
-                del _memory_cache[key]
+        data = self.memory.get(key)
+        if data is not _MISSING:
+            logger.debug(f"Cache HIT (memory): {key}")
+            return data
+        return self._get_shared(key, default)
+    
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """Async ``get``: the memory tier is read inline, Redis from a worker thread."""
+        self.bus.ensure_listening()
         
+        data = self.memory.get(key)
+        if data is not _MISSING:
+            logger.debug(f"Cache HIT (memory): {key}")
+            return data
+        return await sync_to_async(self._get_shared, thread_sensitive=False)(key, default)
+    
+    def _get_shared(self, key: str, default: Any = None) -> Any:
+        """Get from the shared layers (Redis -> DB), filling the memory tier on a hit."""
         # Try Redis
         try:
             data = cache.get(key)
@@ -64,45 +540,80 @@ class MultiLayerCache:
         
         # Set in memory
         self._set_memory(key, value, min(ttl, self.memory_ttl))
-        
+        self._set_shared(key, value, ttl)
+    
+    async def aset(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Async ``set``: the memory tier is written inline, Redis from a worker thread."""
+        ttl = ttl or self.redis_ttl
+        self._set_memory(key, value, min(ttl, self.memory_ttl))
+        await sync_to_async(self._set_shared, thread_sensitive=False)(key, value, ttl)
+    
+    def _set_shared(self, key: str, value: Any, ttl: int):
         # Set in Redis
         try:
             cache.set(key, value, ttl)
+            self.registry.register(key, ttl)
         except Exception as e:
             logger.warning(f"Failed to set Redis cache for {key}: {e}")
     
     def delete(self, key: str):
-        """Delete from all cache layers."""
+        """Delete from all cache layers and evict from every worker's memory tier."""
         # Delete from memory
-        _memory_cache.pop(key, None)
+        self.memory.delete(key)
         
         # Delete from Redis
         try:
             cache.delete(key)
+            self.registry.unregister([key])
         except Exception as e:
             logger.warning(f"Failed to delete Redis cache for {key}: {e}")
+        
+        self.bus.publish('delete', key)
     
-    def clear_pattern(self, pattern: str):
-        """Clear all keys matching pattern."""
+    def clear_pattern(self, pattern: str) -> int:
+        """
+        Clear all keys containing ``pattern`` from every layer.
+        
+        Redis keys are resolved through the key registry, so no KEYS/SCAN is
+        issued. Returns the number of Redis keys deleted.
+        """
         # Clear memory cache matching pattern
-        keys_to_delete = [k for k in _memory_cache.keys() if pattern in k]
-        for key in keys_to_delete:
-            del _memory_cache[key]
+        self.memory.delete_matching(pattern)
         
         # Clear Redis cache matching pattern
-        # Note: Redis doesn't support pattern deletion directly
-        # Would need to use SCAN or maintain a key registry
-        logger.warning("Pattern-based cache clearing not fully implemented for Redis")
+        keys = self.registry.match(pattern)
+        if keys:
+            try:
+                cache.delete_many(keys)
+                self.registry.unregister(keys)
+            except Exception as e:
+                logger.warning(f"Failed to clear Redis cache for pattern {pattern}: {e}")
+        
+        self.bus.publish('pattern', pattern)
+        return len(keys)
+    
+    def _apply_invalidation(self, payload: Dict[str, Any]):
+        """Apply an invalidation message received from another worker."""
+        op = payload.get('op')
+        target = payload.get('target', '')
+        if op == 'delete':
+            self.memory.delete(target)
+        elif op == 'pattern':
+            self.memory.delete_matching(target)
+        elif op == 'clear':
+            self.memory.clear()
     
     def _set_memory(self, key: str, value: Any, ttl: int):
         """Set in memory cache."""
-        expiry = self._now() + ttl if ttl else None
-        _memory_cache[key] = (value, expiry)
+        self.memory.set(key, value, ttl)
     
     def _now(self) -> int:
         """Get current timestamp."""
-        import time
         return int(time.time())
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return memory tier statistics."""
+        return self.memory.stats()
 
 
 # Global instance
@@ -125,65 +636,366 @@ def cache_key(*args, **kwargs) -> str:
     return hashlib.md5(key_string.encode()).hexdigest()
 
 
-def cached(ttl: int = 300, key_func: Optional[Callable] = None):
+# Marker key for values stored by the caching decorators
+_ENVELOPE = '__cached_envelope__'
+
+
+class SingleFlight:
+    """
+    Per-key request coalescing.
+    
+    The first caller for a key becomes the leader and computes the value;
+    concurrent callers wait on the leader's ``concurrent.futures.Future``.
+    The same future is shared by threads (``future.result()``) and asyncio
+    tasks (``asyncio.wrap_future``), so sync and async callers of a key are
+    coalesced together. A leader that is cancelled abandons the flight with
+    ``NO_RESULT`` and its followers compute the value themselves.
+    """
+    
+    NO_RESULT = object()
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+    
+    def begin(self, key: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Tuple[concurrent.futures.Future, bool]:
+        """Return ``(future, is_leader)`` for ``key``."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = concurrent.futures.Future()
+            future.owner_loop = loop
+            self._calls[key] = future
+            return future, True
+    
+    def finish(self, key: str, future: concurrent.futures.Future, result: Any = None,
+               exc: Optional[BaseException] = None):
+        """Publish the leader's outcome and release the key."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+    
+    def abandon(self, key: str, future: concurrent.futures.Future):
+        """Release the key without a result; followers see ``NO_RESULT``."""
+        self.finish(key, future, result=self.NO_RESULT)
+    
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+_flights = SingleFlight()
+
+
+class DistributedCacheLock:
+    """
+    Best-effort cluster-wide lock built on ``cache.add``.
+    
+    Used so that a cold key costs one computation across all workers rather
+    than one per worker. The lock expires on its own after ``timeout``
+    seconds in case the holder dies.
+    """
+    
+    def __init__(self, key: str, timeout: int = 30):
+        self.key = f"lock:{key}"
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+        self.acquired = False
+    
+    def acquire(self) -> bool:
+        try:
+            self.acquired = bool(cache.add(self.key, self.token, self.timeout))
+        except Exception as e:
+            logger.warning(f"Distributed lock unavailable for {self.key}: {e}")
+            # Fail open: compute locally rather than blocking on a broken cache
+            self.acquired = True
+        return self.acquired
+    
+    def release(self):
+        if not self.acquired:
+            return
+        try:
+            if cache.get(self.key) == self.token:
+                cache.delete(self.key)
+        except Exception as e:
+            logger.warning(f"Failed to release distributed lock {self.key}: {e}")
+        self.acquired = False
+
+
+def _wrap_entry(value: Any, delta: float, ttl: int) -> Dict[str, Any]:
+    return {_ENVELOPE: True, 'value': value, 'delta': delta, 'expiry': time.time() + ttl}
+
+
+def _as_entry(entry: Any) -> Optional[Dict[str, Any]]:
+    """Normalize a stored value to a decorator cache entry, wrapping legacy raw values."""
+    if entry is None:
+        return None
+    if isinstance(entry, dict) and entry.get(_ENVELOPE):
+        return entry
+    return {_ENVELOPE: True, 'value': entry, 'delta': 0, 'expiry': float('inf')}
+
+
+def _lookup_entry(key: str) -> Optional[Dict[str, Any]]:
+    """Read a decorator cache entry."""
+    return _as_entry(_cache.get(key))
+
+
+async def _alookup_entry(key: str) -> Optional[Dict[str, Any]]:
+    """Read a decorator cache entry without blocking the event loop on Redis."""
+    return _as_entry(await _cache.aget(key))
+
+
+def get_cached_value(key: str, default: Any = None) -> Any:
+    """Read a value stored by the caching helpers without computing it."""
+    entry = _lookup_entry(key)
+    return default if entry is None else entry['value']
+
+
+def set_cached_value(key: str, value: Any, ttl: int, compute_time: float = 0):
+    """Store a value in the format used by ``get_or_compute``."""
+    _cache.set(key, _wrap_entry(value, compute_time, ttl), ttl)
+
+
+async def aget_cached_value(key: str, default: Any = None) -> Any:
+    """Async ``get_cached_value``: Redis is read from a worker thread."""
+    entry = await _alookup_entry(key)
+    return default if entry is None else entry['value']
+
+
+async def aset_cached_value(key: str, value: Any, ttl: int, compute_time: float = 0):
+    """Async ``set_cached_value``: Redis is written from a worker thread."""
+    await _cache.aset(key, _wrap_entry(value, compute_time, ttl), ttl)
+
+
+def _should_refresh_early(entry: Dict[str, Any], beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch).
+    
+    Callers increasingly volunteer to recompute as the entry approaches its
+    expiry, weighted by how long the value took to compute, so a hot key is
+    refreshed by one caller before it expires instead of by all at once.
+    """
+    if beta <= 0 or not entry.get('delta'):
+        return False
+    return time.time() - entry['delta'] * beta * math.log(random.random() or 1e-12) >= entry['expiry']
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_or_compute(key: str, ttl: int, compute: Callable[[], Any], beta: float = 1.0,
+                   distributed_lock: bool = False, lock_timeout: int = 30) -> Tuple[Any, bool]:
+    """Return ``(value, from_cache)`` computing at most once per key per process."""
+    entry = _lookup_entry(key)
+    if entry is not None and (not _should_refresh_early(entry, beta) or _flights.in_flight(key)):
+        return entry['value'], True
+    
+    future, leader = _flights.begin(key)
+    if not leader:
+        if entry is not None:
+            # Stale-while-revalidate: someone else is already refreshing
+            return entry['value'], True
+        owner_loop = getattr(future, 'owner_loop', None)
+        if owner_loop is None or owner_loop is not _running_loop():
+            value = future.result()
+            if value is SingleFlight.NO_RESULT:
+                return get_or_compute(key, ttl, compute, beta, distributed_lock, lock_timeout)
+            return value, True
+        # Waiting here would block the loop the leader runs on
+        return compute(), False
+    
+    try:
+        if entry is None:
+            entry = _lookup_entry(key)
+            if entry is not None:
+                _flights.finish(key, future, result=entry['value'])
+                return entry['value'], True
+        
+        lock = DistributedCacheLock(key, lock_timeout) if distributed_lock else None
+        if lock is not None and not lock.acquire():
+            if entry is not None:
+                _flights.finish(key, future, result=entry['value'])
+                return entry['value'], True
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                waited = _lookup_entry(key)
+                if waited is not None:
+                    _flights.finish(key, future, result=waited['value'])
+                    return waited['value'], True
+            lock = None
+        
+        try:
+            started = time.monotonic()
+            value = compute()
+            _cache.set(key, _wrap_entry(value, time.monotonic() - started, ttl), ttl)
+        finally:
+            if lock is not None:
+                lock.release()
+    except Exception as e:
+        _flights.finish(key, future, exc=e)
+        raise
+    except BaseException:
+        # Cancelled or interrupted: followers must not fail with it, they recompute
+        _flights.abandon(key, future)
+        raise
+    _flights.finish(key, future, result=value)
+    return value, False
+
+
+async def aget_or_compute(key: str, ttl: int, compute: Callable[[], Awaitable[Any]], beta: float = 1.0,
+                          distributed_lock: bool = False, lock_timeout: int = 30) -> Tuple[Any, bool]:
+    """
+    Async counterpart of ``get_or_compute``.
+    
+    Redis reads, writes and lock calls run in worker threads, and waiting on
+    another worker's lock polls with a growing ``asyncio.sleep``, so the event
+    loop is never blocked.
+    """
+    entry = await _alookup_entry(key)
+    if entry is not None and (not _should_refresh_early(entry, beta) or _flights.in_flight(key)):
+        return entry['value'], True
+    
+    future, leader = _flights.begin(key, loop=_running_loop())
+    if not leader:
+        if entry is not None:
+            return entry['value'], True
+        value = await asyncio.wrap_future(future)
+        if value is SingleFlight.NO_RESULT:
+            return await aget_or_compute(key, ttl, compute, beta, distributed_lock, lock_timeout)
+        return value, True
+    
+    try:
+        if entry is None:
+            entry = await _alookup_entry(key)
+            if entry is not None:
+                _flights.finish(key, future, result=entry['value'])
+                return entry['value'], True
+        
+        lock = DistributedCacheLock(key, lock_timeout) if distributed_lock else None
+        if lock is not None and not await sync_to_async(lock.acquire, thread_sensitive=False)():
+            if entry is not None:
+                _flights.finish(key, future, result=entry['value'])
+                return entry['value'], True
+            deadline = time.monotonic() + lock_timeout
+            delay = 0.05
+            while time.monotonic() < deadline:
+                await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+                delay = min(delay * 2, 1.0)
+                waited = await _alookup_entry(key)
+                if waited is not None:
+                    _flights.finish(key, future, result=waited['value'])
+                    return waited['value'], True
+            lock = None
+        
+        try:
+            started = time.monotonic()
+            value = await compute()
+            await _cache.aset(key, _wrap_entry(value, time.monotonic() - started, ttl), ttl)
+        finally:
+            if lock is not None:
+                await sync_to_async(lock.release, thread_sensitive=False)()
+    except Exception as e:
+        _flights.finish(key, future, exc=e)
+        raise
+    except BaseException:
+        # Cancelled or interrupted: followers must not fail with it, they recompute
+        _flights.abandon(key, future)
+        raise
+    _flights.finish(key, future, result=value)
+    return value, False
+
+
+def cached(ttl: int = 300, key_func: Optional[Callable] = None, early_refresh_beta: float = 1.0,
+           distributed_lock: bool = False, lock_timeout: int = 30):
     """
     Decorator for caching function results.
     
+    Works on both regular and ``async def`` functions. Concurrent callers of
+    the same key share one computation, hot keys are refreshed early with
+    probability controlled by ``early_refresh_beta`` (0 disables), and
+    ``distributed_lock`` coalesces cold keys across workers through the cache.
+    
     Usage:
         @cached(ttl=600)
         def expensive_function(arg1, arg2):
             return result
     """
     def decorator(func):
+        def build_key(args, kwargs):
+            if key_func:
+                return key_func(*args, **kwargs)
+            return f"{func.__module__}.{func.__name__}:{cache_key(*args, **kwargs)}"
+        
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                result, _ = await aget_or_compute(
+                    build_key(args, kwargs), ttl, lambda: func(*args, **kwargs),
+                    early_refresh_beta, distributed_lock, lock_timeout,
+                )
+                return result
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Generate cache key
-            if key_func:
-                cache_key_str = key_func(*args, **kwargs)
-            else:
-                cache_key_str = f"{func.__module__}.{func.__name__}:{cache_key(*args, **kwargs)}"
-            
-            # Try to get from cache
-            cached_result = _cache.get(cache_key_str)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute function
-            result = func(*args, **kwargs)
-            
-            # Store in cache
-            _cache.set(cache_key_str, result, ttl)
-            
+            result, _ = get_or_compute(
+                build_key(args, kwargs), ttl, lambda: func(*args, **kwargs),
+                early_refresh_beta, distributed_lock, lock_timeout,
+            )
             return result
         return wrapper
     return decorator
 
 
-def ai_response_cache(ttl: int = 3600):
+def ai_response_cache(ttl: int = 3600, early_refresh_beta: float = 1.0,
+                      distributed_lock: bool = True, lock_timeout: int = 120):
     """
     Specialized cache for AI responses.
     Uses content-based hashing for cache keys.
+    
+    Identical prompts in flight at the same time trigger a single paid LLM
+    call; by default the call is also coalesced across workers.
     """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
+        def build_key(args, kwargs):
             # Generate cache key from prompt/content
             prompt = kwargs.get('prompt') or (args[0] if args else '')
-            cache_key_str = f"ai_response:{hashlib.sha256(str(prompt).encode()).hexdigest()}"
-            
-            # Try cache
-            cached_result = _cache.get(cache_key_str)
-            if cached_result is not None:
+            return f"ai_response:{hashlib.sha256(str(prompt).encode()).hexdigest()}"
+        
+        def log_result(from_cache):
+            if from_cache:
                 logger.info("AI response cache HIT")
-                return cached_result
-            
-            # Execute
-            result = func(*args, **kwargs)
-            
-            # Cache result
-            _cache.set(cache_key_str, result, ttl)
-            logger.info("AI response cached")
-            
+            else:
+                logger.info("AI response cached")
+        
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                result, from_cache = await aget_or_compute(
+                    build_key(args, kwargs), ttl, lambda: func(*args, **kwargs),
+                    early_refresh_beta, distributed_lock, lock_timeout,
+                )
+                log_result(from_cache)
+                return result
+            return async_wrapper
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            result, from_cache = get_or_compute(
+                build_key(args, kwargs), ttl, lambda: func(*args, **kwargs),
+                early_refresh_beta, distributed_lock, lock_timeout,
+            )
+            log_result(from_cache)
             return result
         return wrapper
     return decorator
@@ -251,12 +251,29 @@ CACHE_TIMEOUT_SHORT = 60  # 1 minute
 CACHE_TIMEOUT_MEDIUM = 300  # 5 minutes
 CACHE_TIMEOUT_LONG = 600  # 10 minutes
 
-# Channels - Using InMemory for development (no Redis required)
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+# Channels - InMemory unless Redis hosts are configured (required for more than one ASGI process)
+# CHANNEL_LAYER_REDIS_URLS is a comma-separated list; groups and channels are sharded across hosts
+from core.channel_layers import build_channel_layers  # noqa: E402
+
+CHANNEL_LAYER_REDIS_URLS = env.list('CHANNEL_LAYER_REDIS_URLS', default=[])
+CHANNEL_LAYERS = build_channel_layers(
+    redis_urls=CHANNEL_LAYER_REDIS_URLS,
+    prefix=env('CHANNEL_LAYER_PREFIX', default='hishamos'),
+    capacity=env.int('CHANNEL_LAYER_CAPACITY', default=200),
+    expiry=env.int('CHANNEL_LAYER_EXPIRY', default=60),
+    group_expiry=env.int('CHANNEL_LAYER_GROUP_EXPIRY', default=86400),
+    group_capacity={
+        r'^chat_': 500,  # Streamed response frames
+        r'^workflow_execution_': 1000,  # Step progress events
+        r'^agent_execution_': 500,
     },
-}
+    group_expiry_overrides={
+        r'^chat_': 6 * 3600,
+        r'^workflow_execution_': 6 * 3600,
+        r'^agent_execution_': 3600,
+    },
+    local_fast_path=env.bool('CHANNEL_LAYER_LOCAL_FAST_PATH', default=True),
+)
 
 # AI Platform Configuration
 OPENAI_API_KEY = env('OPENAI_API_KEY', default='')
@@ -395,6 +412,8 @@ SPECTACULAR_SETTINGS = {
 # Rate Limiting
 RATE_LIMIT_PER_MINUTE = env.int('RATE_LIMIT_PER_MINUTE', default=60)
 RATE_LIMIT_PER_HOUR = env.int('RATE_LIMIT_PER_HOUR', default=1000)
+# AI platform rate limiter Redis (defaults to the cache Redis when that is Redis-backed)
+RATE_LIMIT_REDIS_URL = env('RATE_LIMIT_REDIS_URL', default=None)
 
 # Secrets Management (HashiCorp Vault)
 VAULT_ENABLED = env.bool('VAULT_ENABLED', default=False)
@@ -413,6 +432,130 @@ ALERT_WEBHOOK_URL = env('ALERT_WEBHOOK_URL', default='')
 MEMORY_CACHE_TTL = env.int('MEMORY_CACHE_TTL', default=60)  # 1 minute
 REDIS_CACHE_TTL = env.int('REDIS_CACHE_TTL', default=300)  # 5 minutes
 DB_CACHE_TTL = env.int('DB_CACHE_TTL', default=3600)  # 1 hour
+MEMORY_CACHE_MAX_ENTRIES = env.int('MEMORY_CACHE_MAX_ENTRIES', default=10000)  # Per namespace
+MEMORY_CACHE_MAX_BYTES = env.int('MEMORY_CACHE_MAX_BYTES', default=64 * 1024 * 1024)  # Per namespace
+MEMORY_CACHE_TOTAL_MAX_ENTRIES = env.int('MEMORY_CACHE_TOTAL_MAX_ENTRIES', default=20000)  # All namespaces together
+MEMORY_CACHE_TOTAL_MAX_BYTES = env.int('MEMORY_CACHE_TOTAL_MAX_BYTES', default=128 * 1024 * 1024)  # All namespaces together
+# Per-namespace overrides, keyed by the key prefix before the first ':'
+MEMORY_CACHE_NAMESPACE_BUDGETS = {
+    'ai_response': {'max_entries': 2000, 'max_bytes': 32 * 1024 * 1024},
+}
+# AI response cache (opt-in per agent / command template)
+AI_RESPONSE_CACHE_TTL = env.int('AI_RESPONSE_CACHE_TTL', default=3600)
+AI_RESPONSE_CACHE_LOCK_TIMEOUT = env.int('AI_RESPONSE_CACHE_LOCK_TIMEOUT', default=120)
+AI_RESPONSE_CACHE_SEMANTIC_ENABLED = env.bool('AI_RESPONSE_CACHE_SEMANTIC_ENABLED', default=False)  # Allows executions to opt in to near-duplicate hits
+AI_RESPONSE_CACHE_SEMANTIC_THRESHOLD = env.float('AI_RESPONSE_CACHE_SEMANTIC_THRESHOLD', default=0.9)
+AI_RESPONSE_CACHE_SEMANTIC_INDEX_SIZE = env.int('AI_RESPONSE_CACHE_SEMANTIC_INDEX_SIZE', default=200)
+
+# Agent metrics: weight of the newest execution in the average response time (EWMA)
+AGENT_RESPONSE_TIME_EWMA_ALPHA = env.float('AGENT_RESPONSE_TIME_EWMA_ALPHA', default=0.1)
+
+# AI platform fallback: hedged requests and circuit breakers
+AI_HEDGE_ENABLED = env.bool('AI_HEDGE_ENABLED', default=False)  # Hedged requests may bill two platforms
+AI_HEDGE_PERCENTILE = env.float('AI_HEDGE_PERCENTILE', default=0.95)  # Latency budget before hedging
+AI_HEDGE_DEFAULT_DELAY_SECONDS = env.float('AI_HEDGE_DEFAULT_DELAY_SECONDS', default=10.0)
+AI_CIRCUIT_BREAKER_ERROR_THRESHOLD = env.float('AI_CIRCUIT_BREAKER_ERROR_THRESHOLD', default=0.5)
+AI_CIRCUIT_BREAKER_LATENCY_THRESHOLD = env.float('AI_CIRCUIT_BREAKER_LATENCY_THRESHOLD', default=60.0)
+AI_CIRCUIT_BREAKER_COOLDOWN_SECONDS = env.float('AI_CIRCUIT_BREAKER_COOLDOWN_SECONDS', default=30.0)
+AI_CIRCUIT_BREAKER_MIN_SAMPLES = env.int('AI_CIRCUIT_BREAKER_MIN_SAMPLES', default=5)
+
+# Shared outbound HTTP connection pools (AI adapters, internal API caller)
+AI_HTTP_POOL_MAX_CONNECTIONS = env.int('AI_HTTP_POOL_MAX_CONNECTIONS', default=100)  # Per upstream host
+AI_HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS = env.int('AI_HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS', default=20)
+AI_HTTP_POOL_KEEPALIVE_EXPIRY = env.float('AI_HTTP_POOL_KEEPALIVE_EXPIRY', default=60.0)
+AI_HTTP_POOL_HTTP2 = env.bool('AI_HTTP_POOL_HTTP2', default=True)  # Requires the h2 package
+AI_HTTP_POOL_DNS_TTL = env.float('AI_HTTP_POOL_DNS_TTL', default=300.0)
+AI_HTTP_POOL_TIMEOUT = env.float('AI_HTTP_POOL_TIMEOUT', default=60.0)
+AI_HTTP_POOL_CONNECT_TIMEOUT = env.float('AI_HTTP_POOL_CONNECT_TIMEOUT', default=10.0)
+AI_HTTP_POOL_CONNECT_RETRIES = env.int('AI_HTTP_POOL_CONNECT_RETRIES', default=1)
+
+# Token counting: local tokenizer vocabularies (<encoding>.tiktoken or <family>.json).
+# Not shipped with the repo; without them token counts are heuristic estimates.
+TOKENIZER_VOCAB_DIR = env('TOKENIZER_VOCAB_DIR', default=str(BASE_DIR / 'tokenizers'))
+TOKEN_COUNT_CACHE_SIZE = env.int('TOKEN_COUNT_CACHE_SIZE', default=50000)
+
+# Chat streaming: chunks are coalesced into one WebSocket frame per window
+CHAT_STREAM_FLUSH_INTERVAL_MS = env.int('CHAT_STREAM_FLUSH_INTERVAL_MS', default=30)
+CHAT_STREAM_FLUSH_BYTES = env.int('CHAT_STREAM_FLUSH_BYTES', default=1024)
+
+# Chat history: newest messages per conversation kept in a cache ring buffer
+CHAT_HISTORY_RING_SIZE = env.int('CHAT_HISTORY_RING_SIZE', default=50)
+CHAT_HISTORY_CACHE_TTL = env.int('CHAT_HISTORY_CACHE_TTL', default=3600)
+
+# Role resolution: per-user membership matrix in the shared cache and memoized on request.user
+ROLE_CACHE_TTL = env.int('ROLE_CACHE_TTL', default=300)
+ROLE_CACHE_LOCAL_TTL = env.int('ROLE_CACHE_LOCAL_TTL', default=5)
+
+# Search: page size of unified search results
+SEARCH_PAGE_SIZE = env.int('SEARCH_PAGE_SIZE', default=50)
+
+# Bulk work item operations: items loaded and written per chunk (one transaction each)
+BULK_OPERATION_CHUNK_SIZE = env.int('BULK_OPERATION_CHUNK_SIZE', default=500)
+
+# Story export/import: rows read per server-side cursor fetch, rows inserted per import batch
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+IMPORT_BATCH_SIZE = env.int('IMPORT_BATCH_SIZE', default=500)
+IMPORT_PROGRESS_TTL = env.int('IMPORT_PROGRESS_TTL', default=86400)  # Seconds an import job's progress stays readable
+
+# Burndown, velocity, trend and statistics caches are invalidated by work item changes (per-project version);
+# the timeout only bounds how long unused entries stay cached
+SERIES_CACHE_TIMEOUT = env.int('SERIES_CACHE_TIMEOUT', default=86400)
+
+# Story dependency graphs kept in memory per process (least recently used projects are dropped)
+DEPENDENCY_GRAPH_CACHE_SIZE = env.int('DEPENDENCY_GRAPH_CACHE_SIZE', default=100)
+
+# Audit logging: events are buffered and bulk-inserted off the request path
+# memory = in-process flusher thread; redis = Redis list drained by Celery beat; sync = write immediately
+# Defaults to redis whenever the cache is Redis-backed so events survive process restarts
+AUDIT_SINK_BACKEND = env(
+    'AUDIT_SINK_BACKEND',
+    default='redis' if CACHES['default']['BACKEND'].startswith('django_redis') else 'memory'
+)
+AUDIT_BATCH_SIZE = env.int('AUDIT_BATCH_SIZE', default=200)
+AUDIT_FLUSH_INTERVAL = env.float('AUDIT_FLUSH_INTERVAL', default=2.0)  # Seconds (memory backend)
+AUDIT_CHAIN_LOCK_TIMEOUT = env.int('AUDIT_CHAIN_LOCK_TIMEOUT', default=30)
+AUDIT_CONFIG_CACHE_TTL = env.int('AUDIT_CONFIG_CACHE_TTL', default=30)  # Active AuditConfiguration rows, per process
+
+# Usage accounting: AI platform usage and organization usage counts are written behind in batches
+# memory = in-process flusher thread; redis = Redis list/hash drained by Celery beat; sync = write immediately
+# Defaults to redis whenever the cache is Redis-backed so usage survives restarts and quotas are shared
+USAGE_ACCUMULATOR_BACKEND = env(
+    'USAGE_ACCUMULATOR_BACKEND',
+    default='redis' if CACHES['default']['BACKEND'].startswith('django_redis') else 'memory'
+)
+USAGE_BATCH_SIZE = env.int('USAGE_BATCH_SIZE', default=500)
+USAGE_FLUSH_INTERVAL = env.float('USAGE_FLUSH_INTERVAL', default=5.0)  # Seconds (memory backend)
+USAGE_ROLLUP_LATE_WINDOW_HOURS = env.int('USAGE_ROLLUP_LATE_WINDOW_HOURS', default=2)  # Closed hours re-rolled each run to pick up rows flushed or committed late
+
+# Work item events: automation, tagging, mentions and notifications run after commit, off the request path
+# celery = Redis list drained by a Celery task (in-process when the cache is not Redis); inprocess; sync
+WORK_ITEM_EVENTS_BACKEND = env('WORK_ITEM_EVENTS_BACKEND', default='celery')
+WORK_ITEM_EVENTS_BATCH_SIZE = env.int('WORK_ITEM_EVENTS_BATCH_SIZE', default=100)
+WORK_ITEM_EVENTS_BATCH_WINDOW = env.float('WORK_ITEM_EVENTS_BATCH_WINDOW', default=1.0)  # Seconds events are collected before a batch runs
+WORK_ITEM_EVENTS_IDEMPOTENCY_TTL = env.int('WORK_ITEM_EVENTS_IDEMPOTENCY_TTL', default=86400)
+
+CACHE_INVALIDATION_CHANNEL = env('CACHE_INVALIDATION_CHANNEL', default='hishamos:cache:invalidate')
+
+# Workflow step scheduling: concurrent steps per execution and per organization (0 = unbounded)
+WORKFLOW_MAX_PARALLEL_STEPS = env.int('WORKFLOW_MAX_PARALLEL_STEPS', default=8)
+WORKFLOW_TENANT_MAX_PARALLEL_STEPS = env.int('WORKFLOW_TENANT_MAX_PARALLEL_STEPS', default=32)
+
+# Background jobs (run_async workflow/command executions)
+# 'celery' falls back to the in-process pool when the broker is unreachable
+JOB_QUEUE_BACKEND = env('JOB_QUEUE_BACKEND', default='celery')  # celery | inprocess
+JOB_QUEUE_INPROCESS_WORKERS = env.int('JOB_QUEUE_INPROCESS_WORKERS', default=4)
+# Celery workers must consume these queues: celery -A core worker -Q celery,jobs_high,jobs_default,jobs_low
+JOB_QUEUE_TIERS = {
+    'enterprise': {'queue': 'jobs_high', 'priority': 0},
+    'professional': {'queue': 'jobs_high', 'priority': 3},
+    'basic': {'queue': 'jobs_default', 'priority': 5},
+    'trial': {'queue': 'jobs_low', 'priority': 8},
+}
+JOB_QUEUE_DEFAULT_ROUTE = {'queue': 'jobs_default', 'priority': 5}
+JOB_ORG_MAX_CONCURRENT = env.int('JOB_ORG_MAX_CONCURRENT', default=5)  # Running jobs per organization (0 = unbounded)
+JOB_ORG_MAX_QUEUED = env.int('JOB_ORG_MAX_QUEUED', default=100)  # Waiting jobs per organization (0 = unbounded)
+JOB_QUEUE_SLOT_RETRY_SECONDS = env.int('JOB_QUEUE_SLOT_RETRY_SECONDS', default=5)
+JOB_QUEUE_COUNTER_TIMEOUT = env.int('JOB_QUEUE_COUNTER_TIMEOUT', default=3600)
 
 # Security Settings (Override in production)
 SECURE_SSL_REDIRECT = False
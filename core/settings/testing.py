@@ -42,3 +42,13 @@ EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 # Celery eager mode for synchronous task execution in tests
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+
+# Write audit logs immediately, inside the test transaction
+AUDIT_SINK_BACKEND = 'sync'
+AUDIT_CONFIG_CACHE_TTL = 0  # Test transactions roll configurations back without signals
+
+# Write AI platform and organization usage immediately
+USAGE_ACCUMULATOR_BACKEND = 'sync'
+
+# Run work item automation and notifications in the save path
+WORK_ITEM_EVENTS_BACKEND = 'sync'
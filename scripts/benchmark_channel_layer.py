@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Channel layer group_send benchmark.
+
+Measures group_send throughput for ``workflow_execution_{id}`` and
+``chat_{id}`` groups, with all members in this process (local fast path)
+and with members split across two simulated ASGI processes (Redis path).
+
+Usage:
+    python scripts/benchmark_channel_layer.py --redis redis://localhost:6379/3
+    python scripts/benchmark_channel_layer.py --fake   # fakeredis stand-in
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.development')
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.layers import InMemoryChannelLayer  # noqa: E402
+from core.channel_layers import ShardedRedisChannelLayer  # noqa: E402
+
+
+def make_layer(args, local_fast_path=True):
+    if args.fake:
+        import redis.asyncio as aioredis
+        from fakeredis.aioredis import FakeConnection
+        
+        servers = args.fake_servers
+        layer = ShardedRedisChannelLayer(
+            hosts=[f'redis://fake{i}' for i in range(len(servers))],
+            local_fast_path=local_fast_path,
+            capacity=args.messages * 2,
+        )
+        layer.create_pool = lambda index: aioredis.ConnectionPool(
+            connection_class=FakeConnection, server=servers[index]
+        )
+        return layer
+    return ShardedRedisChannelLayer(
+        hosts=args.redis, local_fast_path=local_fast_path, capacity=args.messages * 2,
+    )
+
+
+async def drain(layer, channel, count):
+    for _ in range(count):
+        await layer.receive(channel)
+
+
+async def run_case(name, group, senders_layer, member_layers, messages):
+    """Send ``messages`` to ``group`` and wait until every member received them."""
+    channels = []
+    for layer in member_layers:
+        channel = await layer.new_channel()
+        await layer.group_add(group, channel)
+        channels.append((layer, channel))
+    
+    receivers = [asyncio.ensure_future(drain(layer, channel, messages)) for layer, channel in channels]
+    payload = {'type': 'message_chunk', 'data': {'type': 'message_chunk', 'content': 'x' * 64, 'seq': 0}}
+    start = time.perf_counter()
+    for seq in range(messages):
+        payload['data']['seq'] = seq
+        await senders_layer.group_send(group, payload)
+    await asyncio.gather(*receivers)
+    elapsed = time.perf_counter() - start
+    
+    for layer, channel in channels:
+        await layer.group_discard(group, channel)
+    print(f"{name:<56} {messages / elapsed:>10.0f} group_send/s  ({len(channels)} members)")
+
+
+async def main(args):
+    if args.fake:
+        import fakeredis
+        args.fake_servers = [fakeredis.FakeServer() for _ in range(2)]
+    elif not args.redis:
+        print("Pass --redis URL [URL ...] or --fake")
+        return
+    
+    print(f"{'case':<56} {'throughput':>10}")
+    memory = InMemoryChannelLayer(capacity=args.messages * 2)
+    await run_case('in-memory, chat_1', 'chat_1', memory, [memory, memory], args.messages)
+    
+    for fast_path in (False, True):
+        process_a = make_layer(args, local_fast_path=fast_path)
+        label = 'fast path' if fast_path else 'redis only'
+        await run_case(f'redis ({label}), chat_2, same process', 'chat_2',
+                       process_a, [process_a, process_a], args.messages)
+        await run_case(f'redis ({label}), workflow_execution_2, same process', 'workflow_execution_2',
+                       process_a, [process_a], args.messages)
+    
+    process_a, process_b = make_layer(args), make_layer(args)
+    await run_case('redis, chat_3, two processes', 'chat_3',
+                   process_a, [process_a, process_b], args.messages)
+    await run_case('redis, workflow_execution_3, two processes', 'workflow_execution_3',
+                   process_a, [process_a, process_b], args.messages)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--redis', nargs='*', help='Redis URLs (one per shard)')
+    parser.add_argument('--fake', action='store_true', help='Use fakeredis servers instead of Redis')
+    parser.add_argument('--messages', type=int, default=2000, help='Messages per case')
+    asyncio.run(main(parser.parse_args()))
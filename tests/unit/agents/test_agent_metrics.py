@@ -0,0 +1,65 @@
+"""
+Unit tests for incremental agent metrics.
+"""
+from decimal import Decimal
+
+import pytest
+from apps.agents.models import Agent, AgentExecution
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def agent():
+    return Agent.objects.create(
+        agent_id='metrics-agent',
+        name='Metrics Agent',
+        description='Test agent',
+        system_prompt='You are a test agent',
+        preferred_platform='openai',
+        status='active'
+    )
+
+
+class TestAgentMetrics:
+    """Test suite for Agent.record_execution and recalculate_metrics."""
+    
+    def test_record_execution_updates_counters_in_place(self, agent, settings, django_assert_num_queries):
+        """Test each finished execution is one UPDATE with running totals and an EWMA."""
+        settings.AGENT_RESPONSE_TIME_EWMA_ALPHA = 0.5
+        
+        with django_assert_num_queries(1):
+            Agent.record_execution(agent.id, success=True, tokens_used=100, cost=0.25, execution_time=4.0)
+        Agent.record_execution(agent.id, success=True, tokens_used=50, cost=0.5, execution_time=2.0)
+        Agent.record_execution(agent.id, success=False)
+        Agent.record_execution(agent.id, success=True, tokens_used=10, cost=0, execution_time=0)
+        
+        agent.refresh_from_db()
+        assert agent.total_invocations == 4
+        assert agent.total_successes == 3
+        assert agent.total_failures == 1
+        assert agent.success_rate == pytest.approx(75.0)
+        assert agent.total_tokens_used == 160
+        assert agent.total_cost == Decimal('0.75')
+        assert agent.average_response_time == pytest.approx(3.0)
+        assert agent.last_invoked_at is not None
+    
+    def test_recalculate_metrics_matches_history(self, agent, user):
+        """Test the drift correction rebuilds metrics from executions."""
+        for status, tokens, seconds in [('completed', 10, 1.0), ('completed', 30, 3.0), ('failed', 0, 0), ('running', 0, 0)]:
+            AgentExecution.objects.create(
+                agent=agent, user=user, input_data={}, status=status,
+                platform_used='openai', model_used='gpt-4', tokens_used=tokens, execution_time=seconds
+            )
+        Agent.objects.filter(id=agent.id).update(total_invocations=99, success_rate=1)
+        
+        agent.recalculate_metrics()
+        agent.refresh_from_db()
+        
+        assert agent.total_invocations == 4
+        assert agent.total_successes == 2
+        assert agent.total_failures == 1
+        assert agent.success_rate == pytest.approx(200 / 3)
+        assert agent.total_tokens_used == 40
+        assert agent.average_response_time == pytest.approx(2.0)
@@ -0,0 +1,108 @@
+"""
+Unit tests for windowed conversation history and message counters.
+"""
+import pytest
+from django.core.cache import cache
+from apps.agents.models import Agent
+from apps.chat.models import Conversation, Message
+from apps.chat.services.conversation_history import ConversationHistory
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """The ring buffer needs a real cache; the testing settings use DummyCache."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'chat-history-tests',
+        }
+    }
+    settings.CHAT_HISTORY_RING_SIZE = 5
+    cache.clear()
+
+
+@pytest.fixture
+def conversation(user):
+    agent = Agent.objects.create(
+        agent_id='history-agent',
+        name='History Agent',
+        description='Test agent',
+        system_prompt='You are a test agent',
+        preferred_platform='openai',
+        status='active'
+    )
+    return Conversation.objects.create(user=user, agent=agent, title='History')
+
+
+def add_messages(conversation, count, start=0):
+    for i in range(start, start + count):
+        Message.objects.create(
+            conversation=conversation,
+            role='user' if i % 2 == 0 else 'assistant',
+            content=f'message {i}'
+        )
+
+
+class TestConversationHistory:
+    """Tests for ConversationHistory."""
+    
+    def test_counters_follow_saves_and_deletes(self, conversation):
+        add_messages(conversation, 3)
+        conversation.refresh_from_db()
+        assert conversation.message_count == 3
+        assert conversation.token_count > 0
+        
+        conversation.messages.first().delete()
+        conversation.refresh_from_db()
+        assert conversation.message_count == 2
+    
+    def test_window_returns_newest_messages_oldest_first(self, conversation):
+        add_messages(conversation, 8)
+        history = ConversationHistory()
+        
+        window = history.get_window(conversation, limit=3)
+        
+        assert [m['content'] for m in window] == ['message 5', 'message 6', 'message 7']
+        # The tail read refilled the ring buffer, trimmed to its size
+        buffer = cache.get(history._key(conversation.id))
+        assert len(buffer['messages']) == 5
+        assert buffer['complete'] is False
+    
+    def test_saved_messages_make_the_buffer_stale(
+        self, conversation, django_capture_on_commit_callbacks
+    ):
+        add_messages(conversation, 2)
+        history = ConversationHistory()
+        assert len(history.get_window(conversation, limit=10)) == 2
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            add_messages(conversation, 4, start=2)
+        
+        window = history.get_window(conversation, limit=3)
+        assert [m['content'] for m in window] == ['message 3', 'message 4', 'message 5']
+        buffer = cache.get(history._key(conversation.id))
+        assert [m['content'] for m in buffer['messages']] == [f'message {i}' for i in range(1, 6)]
+    
+    def test_refill_racing_a_save_is_not_served(
+        self, conversation, mocker, django_capture_on_commit_callbacks
+    ):
+        add_messages(conversation, 2)
+        history = ConversationHistory()
+        original_set = cache.set
+        
+        def save_before_buffer_write(*args, **kwargs):
+            # Another worker commits a message after the keyset query ran
+            # but before the refilled buffer is written
+            with django_capture_on_commit_callbacks(execute=True):
+                add_messages(conversation, 1, start=2)
+            return original_set(*args, **kwargs)
+        
+        mocker.patch.object(cache, 'set', side_effect=save_before_buffer_write)
+        assert len(history.get_window(conversation, limit=10)) == 2
+        mocker.stopall()
+        
+        window = history.get_window(conversation, limit=10)
+        assert [m['content'] for m in window] == ['message 0', 'message 1', 'message 2']
@@ -0,0 +1,110 @@
+"""
+Unit tests for streamed chunk coalescing.
+"""
+import asyncio
+import json
+import pytest
+from apps.chat.services.stream_coalescer import (
+    ChunkCoalescer,
+    decode_binary_chunk_frame,
+    encode_chunk_frame,
+)
+
+
+class FrameRecorder:
+    """Collects frames, optionally simulating a slow client."""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.frames = []
+    
+    async def __call__(self, content, seq):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append((seq, content))
+
+
+class TestChunkCoalescer:
+    """Tests for ChunkCoalescer."""
+    
+    async def test_chunks_within_window_become_one_frame(self):
+        recorder = FrameRecorder()
+        async with ChunkCoalescer(recorder, flush_interval=0.05, max_bytes=1024) as coalescer:
+            for token in ['Hello', ', ', 'world', '!']:
+                coalescer.add(token)
+                await asyncio.sleep(0.001)
+        
+        assert recorder.frames == [(1, 'Hello, world!')]
+        assert coalescer.chunks_received == 4
+    
+    async def test_time_window_flushes_while_streaming(self):
+        recorder = FrameRecorder()
+        coalescer = ChunkCoalescer(recorder, flush_interval=0.01, max_bytes=1024)
+        coalescer.add('first ')
+        await asyncio.sleep(0.05)
+        assert recorder.frames == [(1, 'first ')]
+        
+        coalescer.add('second')
+        await coalescer.close()
+        assert recorder.frames == [(1, 'first '), (2, 'second')]
+    
+    async def test_byte_threshold_flushes_immediately(self):
+        recorder = FrameRecorder()
+        coalescer = ChunkCoalescer(recorder, flush_interval=10, max_bytes=8)
+        coalescer.add('12345')
+        coalescer.add('6789')
+        await asyncio.sleep(0.01)
+        assert recorder.frames == [(1, '123456789')]
+        await coalescer.close()
+    
+    async def test_slow_client_merges_pending_chunks(self):
+        recorder = FrameRecorder(delay=0.05)
+        async with ChunkCoalescer(recorder, flush_interval=0.001, max_bytes=1024) as coalescer:
+            coalescer.add('a')
+            await asyncio.sleep(0.01)  # First frame is now in flight
+            for token in 'bcdef':
+                coalescer.add(token)
+                await asyncio.sleep(0.001)
+        
+        assert recorder.frames == [(1, 'a'), (2, 'bcdef')]
+    
+    async def test_write_yields_for_bulk_text(self):
+        recorder = FrameRecorder()
+        async with ChunkCoalescer(recorder, flush_interval=10, max_bytes=20) as coalescer:
+            for word in ('word ' * 20).split():
+                await coalescer.write(word + ' ')
+        
+        assert ''.join(content for _, content in recorder.frames) == 'word ' * 20
+        assert len(recorder.frames) > 1
+    
+    async def test_send_errors_do_not_stop_stream(self):
+        sent = []
+        
+        async def flaky(content, seq):
+            if seq == 1:
+                raise ConnectionError('client gone')
+            sent.append(content)
+        
+        coalescer = ChunkCoalescer(flaky, flush_interval=0.001, max_bytes=1024)
+        coalescer.add('lost')
+        await asyncio.sleep(0.01)
+        coalescer.add('kept')
+        await coalescer.close()
+        assert sent == ['kept']
+
+
+class TestFrameEncoding:
+    """Tests for chunk frame encoding."""
+    
+    def test_json_frame(self):
+        assert json.loads(encode_chunk_frame('hi', 3)) == {'type': 'message_chunk', 'content': 'hi', 'seq': 3}
+    
+    def test_compact_frame(self):
+        assert encode_chunk_frame('hi', 3, 'compact') == '{"t":"c","s":3,"c":"hi"}'
+    
+    def test_binary_frame_round_trip(self):
+        frame = encode_chunk_frame('héllo', 7, 'binary')
+        assert isinstance(frame, bytes)
+        assert decode_binary_chunk_frame(frame) == (7, 'héllo')
+        with pytest.raises(ValueError):
+            decode_binary_chunk_frame(b'\x09' + frame[1:])
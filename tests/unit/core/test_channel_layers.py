@@ -0,0 +1,150 @@
+"""
+Unit tests for the sharded Redis channel layer.
+"""
+import asyncio
+import pytest
+from core.channel_layers import ShardedRedisChannelLayer, build_channel_layers
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture
+def servers():
+    return [fakeredis.FakeServer(), fakeredis.FakeServer()]
+
+
+@pytest.fixture
+def make_layer(servers):
+    """Build layers for simulated ASGI processes sharing two fake Redis shards."""
+    import redis.asyncio as aioredis
+    from fakeredis.aioredis import FakeConnection
+    
+    def factory(**kwargs):
+        layer = ShardedRedisChannelLayer(hosts=['redis://shard0', 'redis://shard1'], **kwargs)
+        layer.create_pool = lambda index: aioredis.ConnectionPool(
+            connection_class=FakeConnection, server=servers[index]
+        )
+        return layer
+    
+    return factory
+
+
+async def _receive(layer, channel):
+    return await asyncio.wait_for(layer.receive(channel), timeout=2)
+
+
+class TestShardedRedisChannelLayer:
+    """Tests for ShardedRedisChannelLayer."""
+    
+    async def test_local_group_skips_redis_writes(self, make_layer):
+        layer = make_layer()
+        first, second = await layer.new_channel(), await layer.new_channel()
+        await layer.group_add('chat_1', first)
+        await layer.group_add('chat_1', second)
+        
+        await layer.group_send('chat_1', {'type': 'message_chunk', 'data': {'content': 'hi'}})
+        
+        assert await _receive(layer, first) == {'type': 'message_chunk', 'data': {'content': 'hi'}}
+        assert await _receive(layer, second) == {'type': 'message_chunk', 'data': {'content': 'hi'}}
+        assert layer.local_deliveries == 1
+        assert layer.redis_deliveries == 0
+    
+    async def test_local_delivery_wakes_receiver_waiting_on_redis(self, make_layer):
+        layer = make_layer()
+        first, second = await layer.new_channel(), await layer.new_channel()
+        await layer.group_add('chat_6', first)
+        await layer.group_add('chat_6', second)
+        receivers = [asyncio.ensure_future(_receive(layer, channel)) for channel in (first, second)]
+        await asyncio.sleep(0.05)  # One receiver now holds the receive lock and waits on Redis
+        
+        await layer.group_send('chat_6', {'type': 'new_message'})
+        
+        assert await asyncio.gather(*receivers) == [{'type': 'new_message'}] * 2
+        assert layer.local_deliveries == 1
+    
+    async def test_send_from_another_loop_uses_redis(self, make_layer):
+        import threading
+        
+        layer = make_layer()
+        channel = await layer.new_channel()
+        await layer.group_add('workflow_execution_2', channel)
+        
+        # e.g. a job running on a worker thread's own event loop
+        sender = threading.Thread(
+            target=asyncio.run, args=(layer.group_send('workflow_execution_2', {'type': 'step_update'}),)
+        )
+        sender.start()
+        sender.join()
+        
+        assert await _receive(layer, channel) == {'type': 'step_update'}
+        assert layer.local_deliveries == 0
+        assert layer.redis_deliveries == 1
+    
+    async def test_cross_process_group_uses_redis(self, make_layer):
+        process_a, process_b = make_layer(), make_layer()
+        channel_a, channel_b = await process_a.new_channel(), await process_b.new_channel()
+        await process_a.group_add('workflow_execution_1', channel_a)
+        await process_b.group_add('workflow_execution_1', channel_b)
+        
+        await process_a.group_send('workflow_execution_1', {'type': 'step_update', 'step': 1})
+        
+        assert await _receive(process_a, channel_a) == {'type': 'step_update', 'step': 1}
+        assert await _receive(process_b, channel_b) == {'type': 'step_update', 'step': 1}
+        assert process_a.redis_deliveries == 1
+    
+    async def test_fast_path_can_be_disabled(self, make_layer):
+        layer = make_layer(local_fast_path=False)
+        channel = await layer.new_channel()
+        await layer.group_add('chat_2', channel)
+        await layer.group_send('chat_2', {'type': 'new_message'})
+        
+        assert await _receive(layer, channel) == {'type': 'new_message'}
+        assert layer.local_deliveries == 0
+    
+    async def test_group_capacity_applies_to_members(self, make_layer):
+        process_a = make_layer(group_capacity={r'^chat_': 2}, capacity=100)
+        process_b = make_layer(group_capacity={r'^chat_': 2}, capacity=100)
+        channel_b = await process_b.new_channel()
+        await process_b.group_add('chat_3', channel_b)
+        
+        for seq in range(4):
+            await process_a.group_send('chat_3', {'type': 'message_chunk', 'seq': seq})
+        
+        received = [await _receive(process_b, channel_b) for _ in range(2)]
+        assert [m['seq'] for m in received] == [0, 1]
+        assert process_a.get_capacity(channel_b) == 100
+    
+    async def test_group_expiry_override(self, make_layer):
+        layer = make_layer(group_expiry_overrides={r'^chat_': 60})
+        channel = await layer.new_channel()
+        await layer.group_add('chat_4', channel)
+        await layer.group_add('project_4', channel)
+        
+        chat_conn = layer.connection(layer.consistent_hash('chat_4'))
+        project_conn = layer.connection(layer.consistent_hash('project_4'))
+        assert 0 < await chat_conn.ttl(layer._group_key('chat_4')) <= 60
+        assert await project_conn.ttl(layer._group_key('project_4')) > 60
+    
+    async def test_send_to_empty_group_is_noop(self, make_layer):
+        layer = make_layer()
+        await layer.group_send('chat_5', {'type': 'new_message'})
+        assert layer.local_deliveries == 0
+        assert layer.redis_deliveries == 0
+
+
+class TestBuildChannelLayers:
+    """Tests for build_channel_layers."""
+    
+    def test_in_memory_without_hosts(self):
+        assert build_channel_layers([]) == {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    
+    def test_sharded_redis_config(self):
+        layers = build_channel_layers(
+            ['redis://a:6379/1', 'redis://b:6379/1'],
+            group_expiry=3600,
+            group_expiry_overrides={r'^chat_': 7200},
+        )
+        config = layers['default']['CONFIG']
+        assert layers['default']['BACKEND'] == 'core.channel_layers.ShardedRedisChannelLayer'
+        assert config['hosts'] == ['redis://a:6379/1', 'redis://b:6379/1']
+        assert config['group_expiry'] == 7200
@@ -0,0 +1,247 @@
+"""
+Unit tests for the multi-layer cache and caching decorators.
+"""
+import time
+import pytest
+from django.core.cache import caches
+from core.enhanced_caching import (
+    ai_response_cache,
+    cached,
+    BoundedMemoryCache,
+    MultiLayerCache,
+    _MISSING,
+)
+
+
+class TestBoundedMemoryCache:
+    """Test suite for BoundedMemoryCache."""
+    
+    def test_lru_eviction_respects_entry_budget(self):
+        """Test least recently used entries are evicted first."""
+        memory = BoundedMemoryCache(max_entries=2)
+        memory.set('ns:a', 1, 60)
+        memory.set('ns:b', 2, 60)
+        memory.get('ns:a')  # a becomes most recently used
+        memory.set('ns:c', 3, 60)
+        
+        assert memory.get('ns:a') == 1
+        assert memory.get('ns:b') is _MISSING
+        assert memory.get('ns:c') == 3
+    
+    def test_ttl_expiry(self):
+        """Test entries expire after their TTL."""
+        memory = BoundedMemoryCache()
+        memory.set('ns:a', 'value', 0.01)
+        time.sleep(0.02)
+        
+        assert memory.get('ns:a') is _MISSING
+        assert len(memory) == 0
+    
+    def test_namespace_budgets_are_isolated(self):
+        """Test filling one namespace does not evict another."""
+        memory = BoundedMemoryCache(
+            max_entries=10,
+            namespace_budgets={'ai_response': {'max_entries': 1}},
+        )
+        memory.set('agents:list', ['x'], 60)
+        memory.set('ai_response:1', 'a', 60)
+        memory.set('ai_response:2', 'b', 60)
+        
+        assert memory.get('agents:list') == ['x']
+        assert memory.get('ai_response:1') is _MISSING
+        assert memory.get('ai_response:2') == 'b'
+        assert memory.stats()['namespaces']['ai_response']['evictions'] == 1
+    
+    def test_total_budget_evicts_globally_least_recent(self):
+        """Test the process-wide budget caps all namespaces together."""
+        memory = BoundedMemoryCache(max_entries=10, total_max_entries=3)
+        memory.set('agents:a', 1, 60)
+        memory.set('workflow:b', 2, 60)
+        memory.set('projects:c', 3, 60)
+        memory.get('agents:a')  # workflow:b is now the least recently used overall
+        memory.set('ai_response:d', 4, 60)
+        
+        assert len(memory) == 3
+        assert memory.get('workflow:b') is _MISSING
+        assert memory.get('agents:a') == 1
+        assert memory.stats()['evictions'] == 1
+    
+    def test_byte_budget(self):
+        """Test byte budget evicts and oversized values are not stored."""
+        memory = BoundedMemoryCache(max_bytes=300)
+        memory.set('ns:big', 'x' * 1000, 60)
+        
+        assert memory.get('ns:big') is _MISSING
+    
+    def test_expired_entries_go_before_live_ones(self):
+        """Test a full bucket sweeps expired entries instead of evicting live ones."""
+        memory = BoundedMemoryCache(max_entries=2)
+        memory.set('ns:old', 1, 0.01)
+        memory.set('ns:live', 2, 60)
+        time.sleep(0.02)
+        memory.set('ns:new', 3, 60)
+        
+        assert memory.get('ns:live') == 2
+        assert memory.get('ns:new') == 3
+        assert memory.stats()['namespaces']['ns']['evictions'] == 0
+    
+    def test_cached_none_is_a_hit(self):
+        """Test a cached None is distinguished from a miss."""
+        memory = BoundedMemoryCache()
+        memory.set('ns:none', None, 60)
+        
+        assert memory.get('ns:none') is None
+
+
+class TestMultiLayerCache:
+    """Test suite for MultiLayerCache invalidation."""
+    
+    @pytest.fixture
+    def layered(self, settings):
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'enhanced-caching-tests',
+            }
+        }
+        caches['default'].clear()
+        yield MultiLayerCache()
+        caches['default'].clear()
+    
+    def test_clear_pattern_uses_registry(self, layered):
+        """Test pattern clear removes matching keys from both layers."""
+        layered.set('workflow:1:state', {'a': 1})
+        layered.set('workflow:2:state', {'b': 2})
+        layered.set('agents:list', [1])
+        
+        removed = layered.clear_pattern('workflow:')
+        
+        assert removed == 2
+        assert layered.get('workflow:1:state') is None
+        assert layered.get('workflow:2:state') is None
+        assert layered.get('agents:list') == [1]
+    
+    def test_registry_drops_expired_keys(self, layered):
+        """Test expired keys are trimmed from the key registry on lookup."""
+        layered.registry.register('workflow:old', ttl=-1)
+        layered.registry.register('workflow:live', ttl=60)
+        
+        assert layered.registry.match('workflow:') == ['workflow:live']
+        assert list(layered.registry._local['workflow']) == ['workflow:live']
+    
+    def test_remote_invalidation_evicts_memory(self, layered):
+        """Test invalidation messages from other workers evict the memory tier."""
+        layered._set_memory('agents:list', [1], 60)
+        layered.bus._dispatch('{"op": "delete", "target": "agents:list", "origin": "other"}')
+        
+        assert layered.memory.get('agents:list') is _MISSING
+
+
+class TestCachedDecorators:
+    """Test suite for request coalescing in the caching decorators."""
+    
+    def test_concurrent_sync_callers_compute_once(self):
+        """Test concurrent threads share a single computation."""
+        import threading
+        calls = []
+        
+        @cached(ttl=60, early_refresh_beta=0)
+        def slow_square(x):
+            calls.append(x)
+            time.sleep(0.05)
+            return x * x
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow_square(7))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert results == [49] * 8
+        assert calls == [7]
+    
+    async def test_concurrent_async_callers_compute_once(self):
+        """Test concurrent tasks share a single computation."""
+        import asyncio
+        calls = []
+        
+        @ai_response_cache(ttl=60, distributed_lock=False)
+        async def fake_completion(prompt):
+            calls.append(prompt)
+            await asyncio.sleep(0.05)
+            return f"answer to {prompt}"
+        
+        results = await asyncio.gather(*[fake_completion('single-flight prompt') for _ in range(5)])
+        
+        assert set(results) == {'answer to single-flight prompt'}
+        assert len(calls) == 1
+    
+    async def test_cancelled_leader_does_not_fail_followers(self):
+        """Test a follower recomputes when the leader's request is cancelled."""
+        import asyncio
+        from core.enhanced_caching import aget_or_compute
+        
+        started = asyncio.Event()
+        
+        async def hang():
+            started.set()
+            await asyncio.sleep(10)
+        
+        async def compute():
+            return 'follower value'
+        
+        leader = asyncio.ensure_future(aget_or_compute('cancelled-leader-test', 60, hang))
+        await started.wait()
+        follower = asyncio.ensure_future(aget_or_compute('cancelled-leader-test', 60, compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        
+        assert await asyncio.wait_for(follower, 1) == ('follower value', False)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+    
+    async def test_async_callers_keep_cache_io_off_the_loop(self, monkeypatch):
+        """Test shared-cache reads, writes and lock calls run outside the event loop thread."""
+        import threading
+        from core import enhanced_caching
+        
+        loop_thread = threading.get_ident()
+        io_threads = []
+        
+        def record(result):
+            def call(*args, **kwargs):
+                io_threads.append(threading.get_ident())
+                return result
+            return call
+        
+        monkeypatch.setattr(enhanced_caching.cache, 'get', record(None))
+        monkeypatch.setattr(enhanced_caching.cache, 'set', record(None))
+        monkeypatch.setattr(enhanced_caching.cache, 'add', record(True))
+        monkeypatch.setattr(enhanced_caching.cache, 'delete', record(None))
+        
+        async def compute():
+            return 'computed'
+        
+        value, from_cache = await enhanced_caching.aget_or_compute(
+            'off-loop-io-test', 60, compute, distributed_lock=True
+        )
+        
+        assert (value, from_cache) == ('computed', False)
+        assert io_threads
+        assert loop_thread not in io_threads
+    
+    def test_exception_is_not_cached(self):
+        """Test a failing computation is retried by the next caller."""
+        attempts = []
+        
+        @cached(ttl=60)
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ValueError('boom')
+            return 'ok'
+        
+        with pytest.raises(ValueError):
+            flaky()
+        assert flaky() == 'ok'
@@ -0,0 +1,92 @@
+"""
+Unit tests for the background job queue.
+"""
+import pytest
+from types import SimpleNamespace
+from django.core.cache import cache
+from apps.core.services import job_queue as job_queue_module
+from apps.core.services.job_queue import JobQueue, JobQueueFull
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """Slot counters need a real cache; the testing settings use DummyCache."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'job-queue-tests',
+        }
+    }
+    cache.clear()
+
+
+@pytest.fixture
+def organization():
+    return SimpleNamespace(id='org-1', subscription_tier='trial')
+
+
+class TestJobQueue:
+    """Test suite for JobQueue."""
+    
+    def test_route_by_subscription_tier(self, organization):
+        """Test jobs are routed to the queue configured for the tier."""
+        queue = JobQueue()
+        
+        assert queue.route(organization) == ('jobs_low', 8)
+        assert queue.route(SimpleNamespace(id='org-2', subscription_tier='enterprise')) == ('jobs_high', 0)
+        assert queue.route(None) == ('jobs_default', 5)
+    
+    def test_waiting_jobs_are_bounded_per_organization(self, organization, settings, monkeypatch):
+        """Test submit rejects jobs once the organization's queue is full."""
+        settings.JOB_ORG_MAX_QUEUED = 2
+        settings.JOB_QUEUE_BACKEND = 'inprocess'
+        queue = JobQueue()
+        submitted = []
+        monkeypatch.setattr(queue._pool, 'put', lambda *args: submitted.append(args))
+        
+        queue.submit('workflow_execution', {'execution_id': '1'}, organization=organization)
+        queue.submit('workflow_execution', {'execution_id': '2'}, organization=organization)
+        with pytest.raises(JobQueueFull):
+            queue.submit('workflow_execution', {'execution_id': '3'}, organization=organization)
+        
+        assert len(submitted) == 2
+        assert submitted[0][0] == 8  # trial priority
+    
+    async def test_running_jobs_are_capped_per_organization(self, settings, monkeypatch):
+        """Test a job is handed back while its organization is at the cap."""
+        settings.JOB_ORG_MAX_CONCURRENT = 1
+        queue = JobQueue()
+        calls = []
+        
+        async def handler(payload):
+            calls.append(payload)
+            # A second job of the same organization cannot start meanwhile
+            assert await queue.run_job('workflow_execution', {'execution_id': '2'}, 'org-1') is False
+        
+        monkeypatch.setattr(job_queue_module, 'import_string', lambda path: handler)
+        
+        assert await queue.run_job('workflow_execution', {'execution_id': '1'}, 'org-1') is True
+        assert calls == [{'execution_id': '1'}]
+        # The slot is released once the job finishes
+        assert queue._acquire_slot('org-1') is True
+    
+    async def test_inprocess_jobs_run_on_the_server_loop(self, settings, monkeypatch):
+        """Test jobs submitted from a sync view thread run on the bound ASGI loop."""
+        import asyncio
+        from asgiref.sync import sync_to_async
+        
+        settings.JOB_QUEUE_BACKEND = 'inprocess'
+        queue = JobQueue()
+        ran_on = asyncio.get_running_loop().create_future()
+        
+        async def handler(payload):
+            ran_on.set_result(asyncio.get_running_loop())
+        
+        monkeypatch.setattr(job_queue_module, 'import_string', lambda path: handler)
+        
+        async def view(scope, receive, send):
+            await sync_to_async(queue.submit, thread_sensitive=False)('workflow_execution', {'execution_id': '1'})
+        
+        await queue.bind_server_loop(view)({}, None, None)
+        
+        assert await asyncio.wait_for(ran_on, 1) is asyncio.get_running_loop()
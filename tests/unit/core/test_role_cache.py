@@ -0,0 +1,89 @@
+"""
+Unit tests for cached role resolution in RoleService.
+"""
+import pytest
+from django.core.cache import cache
+from apps.core.services.roles import RoleService
+from apps.organizations.models import Organization, OrganizationMember
+from apps.projects.models import Project, ProjectMember
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """The shared matrix needs a real cache; the testing settings use DummyCache."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'role-cache-tests',
+        }
+    }
+    cache.clear()
+
+
+@pytest.fixture
+def organization(admin_user):
+    return Organization.objects.create(name='Acme', slug='acme', owner=admin_user)
+
+
+@pytest.fixture
+def project(organization, admin_user):
+    return Project.objects.create(name='Apollo', organization=organization, owner=admin_user)
+
+
+class TestRoleCache:
+    """Test suite for RoleService role caching."""
+    
+    def test_matrix_resolves_memberships_in_two_queries(
+        self, user, organization, project, django_assert_num_queries
+    ):
+        """Test the permission matrix covers organizations and projects."""
+        OrganizationMember.objects.create(organization=organization, user=user, role='org_admin')
+        ProjectMember.objects.create(project=project, user=user, roles=['developer', 'qa'])
+        
+        with django_assert_num_queries(2):
+            matrix = RoleService.get_permission_matrix(user)
+        
+        assert matrix['organizations'][str(organization.id)] == {'role': 'org_admin', 'is_owner': False}
+        assert matrix['projects'][str(project.id)] == {'roles': ['developer', 'qa'], 'is_owner': False}
+    
+    def test_repeated_checks_are_served_from_cache(self, user, organization, project, django_assert_num_queries):
+        """Test role checks on a request user do not query again."""
+        OrganizationMember.objects.create(organization=organization, user=user, role='org_member')
+        RoleService.get_permission_matrix(user)
+        
+        with django_assert_num_queries(0):
+            for _ in range(5):
+                assert RoleService.is_org_admin(user, organization) is False
+                assert 'owner' not in RoleService.get_user_roles(user, project=project, organization=organization)
+    
+    def test_membership_changes_invalidate_cache(self, user, organization, project):
+        """Test signals on members and owners drop the cached matrix."""
+        member = OrganizationMember.objects.create(organization=organization, user=user, role='org_member')
+        assert RoleService.is_org_admin(user, organization) is False
+        
+        member.role = 'org_admin'
+        member.save()
+        assert RoleService.is_org_admin(user, organization) is True
+        
+        project.owner = user
+        project.save()
+        assert 'owner' in RoleService.get_user_roles(user, project=project)
+        
+        member.delete()
+        assert RoleService.get_user_organizations(user) == []
+    
+    def test_commit_invalidates_matrix_cached_before_it(
+        self, user, organization, django_capture_on_commit_callbacks
+    ):
+        """Test a matrix another request cached from pre-commit data is dropped on commit."""
+        with django_capture_on_commit_callbacks(execute=True):
+            OrganizationMember.objects.create(organization=organization, user=user, role='org_admin')
+            # A concurrent request still reads the committed state: no membership
+            stale_key = f"{RoleService.MATRIX_CACHE_PREFIX}{user.pk}_{RoleService._get_version(user.pk)}"
+            cache.set(stale_key, {'organizations': {}, 'projects': {}})
+        
+        user.refresh_from_db()
+        assert RoleService.is_org_admin(user, organization) is True
@@ -0,0 +1,164 @@
+"""
+Unit tests for hedged fallback and circuit breakers.
+"""
+import asyncio
+import pytest
+from apps.integrations.adapters.base import CompletionRequest, CompletionResponse
+from apps.integrations.services.adapter_registry import AdapterRegistry
+from apps.integrations.services.circuit_breaker import CircuitBreaker
+from apps.integrations.services import fallback_handler as fallback_module
+from apps.integrations.services.fallback_handler import FallbackHandler
+from apps.integrations.utils.exceptions import PlatformUnavailableError
+
+
+class FakeAdapter:
+    """Adapter with a fixed delay and optional failure."""
+    
+    def __init__(self, name, delay=0.0, fail=False):
+        self.platform_name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = False
+    
+    async def generate_completion(self, request, model=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.platform_name} down")
+        return CompletionResponse(
+            content=self.platform_name, model='m', platform=self.platform_name,
+            tokens_used=1, cost=0.0, finish_reason='stop',
+        )
+    
+    async def check_health(self):
+        return {'status': 'healthy', 'available': True}
+
+
+class GatedAdapter(FakeAdapter):
+    """Adapter that answers once a shared gate opens."""
+    
+    def __init__(self, name, gate):
+        super().__init__(name)
+        self.gate = gate
+    
+    async def generate_completion(self, request, model=None):
+        await self.gate.wait()
+        return await super().generate_completion(request, model)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Isolated registry patched into the fallback handler."""
+    test_registry = AdapterRegistry()
+    test_registry._initialized = True
+    monkeypatch.setattr(fallback_module, 'registry', test_registry)
+    return test_registry
+
+
+class TestFallbackHandler:
+    """Test suite for FallbackHandler."""
+    
+    async def test_hedge_wins_over_slow_primary(self, registry):
+        """Test a slow primary is raced and cancelled once the hedge answers."""
+        slow, fast = FakeAdapter('slow', delay=1.0), FakeAdapter('fast', delay=0.01)
+        registry._adapters = {'slow': slow, 'fast': fast}
+        handler = FallbackHandler(['slow', 'fast'], hedge=True, hedge_delay=0.05)
+        
+        response = await handler.generate_with_fallback(CompletionRequest(prompt='hi'))
+        await asyncio.sleep(0)
+        
+        assert response.platform == 'fast'
+        assert slow.cancelled is True
+        assert registry.get_hedge_stats('fast').hedge_wins == 1
+        assert registry.get_hedge_stats('slow').cancelled == 1
+    
+    async def test_attempt_finishing_with_the_winner_is_not_cancelled(self, registry):
+        """Test an attempt that completes alongside the winner is not recorded as cancelled."""
+        gate = asyncio.Event()
+        registry._adapters = {'first': GatedAdapter('first', gate), 'second': GatedAdapter('second', gate)}
+        handler = FallbackHandler(['first', 'second'], hedge=True, hedge_delay=0.01)
+        asyncio.get_running_loop().call_later(0.05, gate.set)
+        
+        response = await handler.generate_with_fallback(CompletionRequest(prompt='hi'))
+        
+        assert [a['status'] for a in response.metadata['fallback_attempts']] == ['success']
+        assert registry.get_hedge_stats('first').cancelled == 0
+        assert registry.get_hedge_stats('second').cancelled == 0
+    
+    async def test_sequential_fallback_on_failure(self, registry):
+        """Test a failing primary falls through to the next platform."""
+        registry._adapters = {'a': FakeAdapter('a', fail=True), 'b': FakeAdapter('b')}
+        handler = FallbackHandler(['a', 'b'], hedge=False)
+        
+        response = await handler.generate_with_fallback(CompletionRequest(prompt='hi'))
+        
+        assert response.platform == 'b'
+        assert [a['status'] for a in response.metadata['fallback_attempts']] == ['failed', 'success']
+    
+    async def test_open_breaker_is_skipped(self, registry):
+        """Test platforms with an open breaker are not attempted."""
+        down, up = FakeAdapter('down'), FakeAdapter('up')
+        registry._adapters = {'down': down, 'up': up}
+        registry._breakers['down'] = CircuitBreaker('down', min_samples=1, cooldown_seconds=60)
+        for _ in range(5):
+            registry._breakers['down'].record_failure(0.1, 'boom')
+        handler = FallbackHandler(['down', 'up'], hedge=False)
+        
+        response = await handler.generate_with_fallback(CompletionRequest(prompt='hi'))
+        health = await registry.check_all_health()
+        
+        assert response.platform == 'up'
+        assert down.calls == 0
+        assert health['down']['circuit_breaker']['state'] == CircuitBreaker.OPEN
+    
+    async def test_attempt_cancelled_before_starting_releases_probe(self, registry, monkeypatch):
+        """Test a half-open probe cancelled before its first step frees the probe slot."""
+        adapter = FakeAdapter('probe')
+        registry._adapters = {'probe': adapter}
+        breaker = registry._breakers['probe'] = CircuitBreaker('probe', min_samples=1, cooldown_seconds=0)
+        for _ in range(5):
+            breaker.record_failure(0.1, 'boom')
+        ensure_future = asyncio.ensure_future
+        
+        def cancelled_at_once(coro):
+            task = ensure_future(coro)
+            task.cancel()
+            return task
+        
+        monkeypatch.setattr(fallback_module.asyncio, 'ensure_future', cancelled_at_once)
+        handler = FallbackHandler(['probe'], hedge=False)
+        
+        with pytest.raises(asyncio.CancelledError):
+            await handler.generate_with_fallback(CompletionRequest(prompt='hi'))
+        
+        assert adapter.calls == 0
+        assert breaker.allow_request() is True
+    
+    async def test_all_failed(self, registry):
+        """Test PlatformUnavailableError when every platform fails."""
+        registry._adapters = {'a': FakeAdapter('a', fail=True)}
+        handler = FallbackHandler(['a'])
+        
+        with pytest.raises(PlatformUnavailableError):
+            await handler.generate_with_fallback(CompletionRequest(prompt='hi'))
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker."""
+    
+    def test_half_open_probe_closes_breaker(self):
+        """Test a successful probe after cooldown closes the breaker."""
+        breaker = CircuitBreaker('p', min_samples=1, cooldown_seconds=0)
+        for _ in range(5):
+            breaker.record_failure(0.1)
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False  # Only one probe at a time
+        breaker.record_success(0.1)
+        assert breaker.state == CircuitBreaker.CLOSED
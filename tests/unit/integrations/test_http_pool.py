@@ -0,0 +1,116 @@
+"""
+Unit tests for the shared outbound HTTP connection pools.
+"""
+import asyncio
+import socket
+import pytest
+from apps.integrations.services.http_pool import DNSCache, HTTPPoolManager
+
+
+async def _handle(reader, writer):
+    """Minimal keep-alive HTTP/1.1 server."""
+    try:
+        while True:
+            request = await reader.readuntil(b'\r\n\r\n')
+            if not request:
+                break
+            body = b'{"ok": true}'
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+@pytest.fixture
+async def server():
+    srv = await asyncio.start_server(_handle, '127.0.0.1', 0)
+    port = srv.sockets[0].getsockname()[1]
+    yield f'http://127.0.0.1:{port}'
+    srv.close()
+    await srv.wait_closed()
+
+
+def _manager():
+    return HTTPPoolManager(max_connections=10, max_keepalive_connections=5, http2=False)
+
+
+class TestHTTPPoolManager:
+    """Tests for HTTPPoolManager."""
+    
+    async def test_clients_share_connections(self, server):
+        manager = _manager()
+        first = manager.client(base_url=server)
+        second = manager.client(base_url=server, headers={'Authorization': 'Bearer x'})
+        for _ in range(3):
+            assert (await first.get('/a')).json() == {'ok': True}
+            assert (await second.get('/b')).status_code == 200
+        
+        stats = next(iter(manager.stats().values()))
+        assert stats['connections_opened'] == 1
+        assert stats['idle'] == 1
+        assert stats['waiting'] == 0
+        await manager.aclose()
+    
+    async def test_closing_client_keeps_pool(self, server):
+        manager = _manager()
+        client = manager.client(base_url=server)
+        await client.get('/')
+        await client.aclose()
+        
+        await manager.client(base_url=server).get('/')
+        assert next(iter(manager.stats().values()))['connections_opened'] == 1
+        await manager.aclose()
+    
+    async def test_concurrent_requests_bounded_by_limits(self, server):
+        manager = HTTPPoolManager(max_connections=2, max_keepalive_connections=2, http2=False)
+        client = manager.client(base_url=server)
+        responses = await asyncio.gather(*[client.get('/') for _ in range(8)])
+        assert all(r.status_code == 200 for r in responses)
+        
+        stats = next(iter(manager.stats().values()))
+        assert stats['connections_opened'] <= 2
+        assert stats['max_connections'] == 2
+        await manager.aclose()
+
+
+    def test_pools_close_with_their_event_loop(self):
+        manager = _manager()
+        
+        async def request_once():
+            srv = await asyncio.start_server(_handle, '127.0.0.1', 0)
+            port = srv.sockets[0].getsockname()[1]
+            assert (await manager.client().get(f'http://localhost:{port}/')).status_code == 200
+            assert len(manager.stats()) == 1
+            srv.close()
+        
+        for _ in range(3):
+            asyncio.run(request_once())
+        
+        assert manager.stats() == {}
+
+
+class TestDNSCache:
+    """Tests for DNSCache."""
+    
+    async def test_resolves_once_within_ttl(self, monkeypatch):
+        loop = asyncio.get_running_loop()
+        calls = []
+        
+        async def fake_getaddrinfo(host, port, **kwargs):
+            calls.append(host)
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', port))]
+        
+        monkeypatch.setattr(loop, 'getaddrinfo', fake_getaddrinfo)
+        cache = DNSCache(ttl=60)
+        assert await cache.resolve('api.example.com', 443) == ['10.0.0.1']
+        assert await cache.resolve('api.example.com', 443) == ['10.0.0.1']
+        assert calls == ['api.example.com']
+        
+        cache.invalidate('api.example.com', 443)
+        await cache.resolve('api.example.com', 443)
+        assert len(calls) == 2
@@ -0,0 +1,70 @@
+"""
+Unit tests for the GCRA rate limiter (local bucket store and Redis Lua script).
+"""
+import pytest
+from apps.integrations.services.rate_limiter import RateLimiter, RateLimit, _create_limiter
+
+
+class TestRateLimiter:
+    """Test suite for RateLimiter."""
+    
+    @pytest.fixture(params=['local', 'redis'])
+    def limiter(self, request):
+        """Create a local limiter, or one running the GCRA script on fakeredis."""
+        if request.param == 'local':
+            return RateLimiter(None)
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')  # Lua scripting in fakeredis
+        limiter = RateLimiter(fakeredis.FakeRedis())
+        limiter._check_local_limits = None  # Fail loudly instead of falling back
+        return limiter
+    
+    async def test_allows_burst_up_to_limit(self, limiter):
+        """Test max_requests are admitted back-to-back, then rejected."""
+        results = [await limiter.check_rate_limit('user:1', 5, 60) for _ in range(6)]
+        
+        assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+        assert [remaining for _, remaining in results][:5] == [4, 3, 2, 1, 0]
+    
+    async def test_keys_are_independent(self, limiter):
+        """Test one exhausted key does not affect another."""
+        for _ in range(2):
+            await limiter.check_rate_limit('user:1', 2, 60)
+        
+        allowed, _ = await limiter.check_rate_limit('user:2', 2, 60)
+        
+        assert allowed is True
+    
+    async def test_batch_is_all_or_nothing(self, limiter):
+        """Test a batch rejected by one limit consumes none of the others."""
+        await limiter.check_rate_limit('global', 1, 60)
+        
+        results = await limiter.check_many([
+            RateLimit('user:1', 10, 60),
+            RateLimit('global', 1, 60),
+        ])
+        
+        assert [r.allowed for r in results] == [False, False]
+        assert results[1].retry_after > 0
+        user_result = await limiter.check_many([RateLimit('user:1', 10, 60)])
+        assert user_result[0].remaining == 9
+    
+    async def test_redis_buckets_expire_with_their_window(self):
+        """Test the script stores the arrival time with a TTL of the consumed interval only."""
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        client = fakeredis.FakeRedis()
+        limiter = RateLimiter(client)
+        
+        await limiter.check_rate_limit('user:1', 5, 60)
+        
+        assert 0 < client.pttl('ratelimit:user:1') <= 12_001
+    
+    def test_dedicated_limiter_redis_without_redis_cache(self, settings):
+        """Test RATE_LIMIT_REDIS_URL is used even when the default cache is not Redis."""
+        settings.RATE_LIMIT_REDIS_URL = 'redis://limiter:6379/3'
+        
+        assert _create_limiter().redis_url == 'redis://limiter:6379/3'
+        
+        settings.RATE_LIMIT_REDIS_URL = None
+        assert _create_limiter().distributed is False
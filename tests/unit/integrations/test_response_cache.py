@@ -0,0 +1,171 @@
+"""
+Unit tests for the AI response cache.
+"""
+import uuid
+import pytest
+from apps.integrations.adapters.base import CompletionRequest, CompletionResponse
+from apps.integrations.services.response_cache import (
+    CachingAdapter,
+    ResponseCacheConfig,
+    build_cache_key,
+    compute_sketch,
+    estimate_similarity,
+)
+
+
+class FakeAdapter:
+    """Minimal adapter that counts provider calls."""
+    
+    platform_name = 'fake'
+    default_model = 'fake-model'
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_completion(self, request, model=None):
+        self.calls += 1
+        return CompletionResponse(
+            content=f"reply to {request.prompt}",
+            model=model or self.default_model,
+            platform=self.platform_name,
+            tokens_used=120,
+            cost=0.002,
+            finish_reason='stop',
+        )
+    
+    async def generate_streaming_completion(self, request, model=None):
+        self.calls += 1
+        for chunk in ['Hello', ' ', 'world']:
+            yield chunk
+    
+    def calculate_cost(self, model, input_tokens, output_tokens):
+        return 0.001
+
+
+class TestResponseCache:
+    """Test suite for CachingAdapter."""
+    
+    @pytest.fixture
+    def prompt(self):
+        return f"Summarize ticket {uuid.uuid4()}"
+    
+    def test_cache_key_covers_full_request(self, prompt):
+        """Test the key changes with system prompt, history and sampling params."""
+        base = CompletionRequest(prompt=prompt)
+        
+        assert build_cache_key(base, 'fake', 'm') == build_cache_key(CompletionRequest(prompt=prompt), 'fake', 'm')
+        assert build_cache_key(base, 'fake', 'm') != build_cache_key(base, 'fake', 'other-model')
+        assert build_cache_key(base, 'fake', 'm') != build_cache_key(
+            CompletionRequest(prompt=prompt, system_prompt='Be terse'), 'fake', 'm')
+        assert build_cache_key(base, 'fake', 'm') != build_cache_key(
+            CompletionRequest(prompt=prompt, temperature=0.1), 'fake', 'm')
+        assert build_cache_key(base, 'fake', 'm') != build_cache_key(
+            CompletionRequest(prompt=prompt, messages=[{'role': 'user', 'content': 'hi'}]), 'fake', 'm')
+    
+    def test_cache_key_is_scoped_to_organization_and_user(self, prompt):
+        """Test identical requests from other organizations or users do not share entries."""
+        request = CompletionRequest(prompt=prompt)
+        key = build_cache_key(request, 'fake', 'm', organization_id='org-1', user_id='user-1')
+        
+        assert key != build_cache_key(request, 'fake', 'm', organization_id='org-2', user_id='user-1')
+        assert key != build_cache_key(request, 'fake', 'm', organization_id='org-1', user_id='user-2')
+        assert key == build_cache_key(
+            CompletionRequest(prompt=prompt, user_id='user-1'), 'fake', 'm', organization_id='org-1'
+        )
+    
+    def test_semantic_tier_needs_execution_opt_in(self, settings):
+        """Test the semantic tier stays off unless both the deployment and the execution enable it."""
+        assert ResponseCacheConfig.resolve(agent_enabled=True).semantic is False
+        assert ResponseCacheConfig.resolve(overrides={'enabled': True, 'semantic': True}).semantic is False
+        
+        settings.AI_RESPONSE_CACHE_SEMANTIC_ENABLED = True
+        assert ResponseCacheConfig.resolve(agent_enabled=True).semantic is False
+        assert ResponseCacheConfig.resolve(overrides={'enabled': True, 'semantic': True}).semantic is True
+    
+    async def test_exact_hit_is_not_billed(self, prompt):
+        """Test a repeated request is served from cache with zero cost."""
+        adapter = FakeAdapter()
+        cached = CachingAdapter(adapter, ResponseCacheConfig(enabled=True))
+        
+        first = await cached.generate_completion(CompletionRequest(prompt=prompt))
+        second = await cached.generate_completion(CompletionRequest(prompt=prompt))
+        
+        assert adapter.calls == 1
+        assert second.content == first.content
+        assert second.cost == 0.0
+        assert second.metadata['cache_hit'] is True
+        assert second.metadata['tokens_saved'] == 120
+    
+    async def test_conversation_bound_requests_bypass_cache(self, prompt):
+        """Test requests tied to a provider thread always reach the provider."""
+        adapter = FakeAdapter()
+        cached = CachingAdapter(adapter, ResponseCacheConfig(enabled=True))
+        request = CompletionRequest(prompt=prompt, conversation_id='thread_1')
+        
+        await cached.generate_completion(request)
+        await cached.generate_completion(request)
+        
+        assert adapter.calls == 2
+    
+    async def test_stream_replay(self, prompt):
+        """Test a cached stream is replayed chunk by chunk."""
+        adapter = FakeAdapter()
+        cached = CachingAdapter(adapter, ResponseCacheConfig(enabled=True))
+        request = CompletionRequest(prompt=prompt)
+        
+        first = [chunk async for chunk in cached.generate_streaming_completion(request)]
+        second = [chunk async for chunk in cached.generate_streaming_completion(request)]
+        
+        assert first == second == ['Hello', ' ', 'world']
+        assert adapter.calls == 1
+    
+    async def test_semantic_near_duplicate_hit(self, prompt):
+        """Test a near-duplicate prompt is served by the semantic tier."""
+        adapter = FakeAdapter()
+        cached = CachingAdapter(
+            adapter, ResponseCacheConfig(enabled=True, semantic=True, semantic_threshold=0.8)
+        )
+        long_prompt = prompt + ' ' + ' '.join(f"word{i}" for i in range(200))
+        
+        await cached.generate_completion(CompletionRequest(prompt=long_prompt))
+        response = await cached.generate_completion(CompletionRequest(prompt=long_prompt + ' thanks'))
+        
+        assert adapter.calls == 1
+        assert response.metadata['cache_type'] == 'semantic'
+    
+    @pytest.mark.parametrize('semantic', [False, True])
+    async def test_cache_io_stays_off_the_loop(self, prompt, monkeypatch, semantic):
+        """Test completions and streams only touch the shared cache from worker threads."""
+        import threading
+        from core import enhanced_caching
+        
+        loop_thread = threading.get_ident()
+        io_threads = []
+        stored = {}
+        
+        def get(key, default=None):
+            io_threads.append(threading.get_ident())
+            return stored.get(key, default)
+        
+        def set_(key, value, timeout=None):
+            io_threads.append(threading.get_ident())
+            stored[key] = value
+        
+        monkeypatch.setattr(enhanced_caching.cache, 'get', get)
+        monkeypatch.setattr(enhanced_caching.cache, 'set', set_)
+        monkeypatch.setattr(enhanced_caching.cache, 'add', lambda *args, **kwargs: True)
+        monkeypatch.setattr(enhanced_caching.cache, 'delete', lambda *args, **kwargs: None)
+        cached = CachingAdapter(FakeAdapter(), ResponseCacheConfig(enabled=True, semantic=semantic))
+        
+        await cached.generate_completion(CompletionRequest(prompt=prompt))
+        [chunk async for chunk in cached.generate_streaming_completion(CompletionRequest(prompt=prompt))]
+        
+        assert io_threads
+        assert loop_thread not in io_threads
+    
+    def test_sketch_similarity(self):
+        """Test sketch similarity separates related and unrelated text."""
+        text = ' '.join(f"token{i}" for i in range(100))
+        
+        assert estimate_similarity(compute_sketch(text), compute_sketch(text)) == 1.0
+        assert estimate_similarity(compute_sketch(text), compute_sketch('completely different words here')) == 0.0
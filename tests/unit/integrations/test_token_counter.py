@@ -0,0 +1,115 @@
+"""
+Unit tests for the token counting service.
+"""
+import pytest
+from apps.integrations.services.token_counter import (
+    HeuristicTokenizer,
+    MESSAGE_OVERHEAD,
+    REPLY_OVERHEAD,
+    TokenCounter,
+    model_family,
+)
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer that records how often it is called."""
+    
+    name = 'counting'
+    
+    def __init__(self):
+        self.calls = 0
+        self.batch_sizes = []
+    
+    def count(self, text):
+        self.calls += 1
+        return len(text.split())
+    
+    def count_batch(self, texts):
+        self.batch_sizes.append(len(texts))
+        return [len(t.split()) for t in texts]
+
+
+@pytest.fixture
+def counter():
+    counter = TokenCounter(vocab_dir=None, cache_size=100)
+    tokenizer = CountingTokenizer()
+    counter.register_tokenizer('cl100k', tokenizer)
+    return counter, tokenizer
+
+
+class TestModelFamily:
+    """Tests for model_family."""
+    
+    @pytest.mark.parametrize('model, family', [
+        ('gpt-4o-mini', 'o200k'),
+        ('gpt-4', 'cl100k'),
+        ('gpt-3.5-turbo', 'cl100k'),
+        ('claude-3-opus-20240229', 'anthropic'),
+        ('gemini-pro', 'gemini'),
+        ('mistralai/mistral-7b-instruct:free', 'mistral'),
+        ('meta-llama/llama-3-70b', 'llama'),
+        ('unknown-model', 'cl100k'),
+        (None, 'cl100k'),
+    ])
+    def test_mapping(self, model, family):
+        assert model_family(model) == family
+
+
+class TestTokenCounter:
+    """Tests for TokenCounter."""
+    
+    def test_counts_are_memoized(self, counter):
+        counter, tokenizer = counter
+        assert counter.count('one two three', 'gpt-4') == 3
+        assert counter.count('one two three', 'gpt-4') == 3
+        assert tokenizer.calls == 1
+        assert counter.count('') == 0
+    
+    def test_batch_tokenizes_only_unseen_texts(self, counter):
+        counter, tokenizer = counter
+        counter.count('a b', 'gpt-4')
+        
+        counts = counter.count_batch(['a b', 'c d e', 'c d e', '', 'f'], 'gpt-4')
+        assert counts == [2, 3, 3, 0, 1]
+        assert tokenizer.batch_sizes == [2]
+    
+    def test_prompt_total_includes_overheads(self, counter):
+        counter, _ = counter
+        messages = [{'role': 'user', 'content': 'a b c'}, {'role': 'user', 'content': 'd', 'name': 'bob'}]
+        assert counter.count_prompt(messages) == REPLY_OVERHEAD + 2 * MESSAGE_OVERHEAD + 4 + 1
+    
+    def test_falls_back_to_heuristic_without_vocab(self, tmp_path):
+        counter = TokenCounter(vocab_dir=str(tmp_path), cache_size=10)
+        assert isinstance(counter.tokenizer_for('claude-3-opus'), HeuristicTokenizer)
+        assert counter.count('The quick brown fox jumps over the lazy dog.', 'gpt-4') == 10
+    
+    def test_missing_vocab_dir_is_reported_once(self, tmp_path, mocker):
+        warning = mocker.patch('apps.integrations.services.token_counter.logger.warning')
+        counter = TokenCounter(vocab_dir=str(tmp_path / 'missing'), cache_size=10)
+        counter.tokenizer_for('gpt-4')
+        counter.tokenizer_for('claude-3-opus')
+        assert warning.call_count == 1
+    
+    def test_loads_local_huggingface_vocab(self, tmp_path):
+        tokenizers = pytest.importorskip('tokenizers')
+        from tokenizers.models import WordLevel
+        from tokenizers.pre_tokenizers import Whitespace
+        
+        tokenizer = tokenizers.Tokenizer(WordLevel({'[UNK]': 0, 'hello': 1, 'world': 2}, unk_token='[UNK]'))
+        tokenizer.pre_tokenizer = Whitespace()
+        tokenizer.save(str(tmp_path / 'mistral.json'))
+        
+        counter = TokenCounter(vocab_dir=str(tmp_path), cache_size=10)
+        assert counter.count('hello world again', 'mistral-7b-instruct') == 3
+        assert counter.count_batch(['hello', 'hello world'], 'mistral-7b-instruct') == [1, 2]
+
+
+class TestHeuristicTokenizer:
+    """Tests for HeuristicTokenizer."""
+    
+    def test_code_counts_denser_than_prose(self):
+        tokenizer = HeuristicTokenizer()
+        prose = 'This sentence is written in plain English words'
+        code = 'def f(x):\n    return x[0] + y(1, 2)'
+        assert tokenizer.count(prose) == 8
+        assert tokenizer.count(code) / len(code) > tokenizer.count(prose) / len(prose)
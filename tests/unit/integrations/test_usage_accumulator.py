@@ -0,0 +1,156 @@
+"""
+Unit tests for write-behind usage accounting.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from apps.integrations.models import AIPlatform, PlatformUsage
+from apps.integrations.services.usage_accumulator import UsageAccumulator
+from apps.organizations.models import Organization, OrganizationUsage
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def accumulator(settings, monkeypatch):
+    """A buffering accumulator without its background flusher."""
+    settings.USAGE_ACCUMULATOR_BACKEND = 'memory'
+    accumulator = UsageAccumulator()
+    monkeypatch.setattr(accumulator, '_ensure_flusher', lambda: None)
+    return accumulator
+
+
+@pytest.fixture
+def platform():
+    return AIPlatform.objects.create(platform_name='openai', display_name='OpenAI')
+
+
+@pytest.fixture
+def organization(user):
+    return Organization.objects.create(name='Acme', slug='acme', owner=user)
+
+
+class TestUsageAccumulator:
+    """Test suite for UsageAccumulator."""
+    
+    def test_flush_bulk_inserts_rows_and_increments_totals(self, accumulator, platform, user):
+        """Test buffered usage reaches the database only on flush, with summed platform totals."""
+        accumulator.record_platform_usage('openai', 'gpt-4', tokens_used=100, cost=0.5, user=user)
+        accumulator.record_platform_usage('openai', 'gpt-4', tokens_used=50, cost=0.25)
+        accumulator.record_platform_usage('openai', 'gpt-4', success=False, error_message='timeout')
+        accumulator.record_platform_usage('unknown', 'gpt-4', tokens_used=10)
+        assert not PlatformUsage.objects.exists()
+        
+        assert accumulator.flush() == 3
+        
+        platform.refresh_from_db()
+        assert platform.total_requests == 3
+        assert platform.failed_requests == 1
+        assert platform.total_tokens == 150
+        assert platform.total_cost == Decimal('0.75')
+        assert PlatformUsage.objects.filter(user=user).count() == 1
+    
+    def test_org_usage_counts_pending_increments(self, accumulator, organization):
+        """Test limit checks see increments before they are written."""
+        now = timezone.now()
+        OrganizationUsage.objects.create(
+            organization=organization, usage_type='chat_messages', month=now.month, year=now.year, count=5
+        )
+        
+        for _ in range(3):
+            accumulator.increment_org_usage(organization.id, 'chat_messages')
+        
+        assert accumulator.get_org_usage(organization.id, 'chat_messages', now.year, now.month) == 8
+        
+        accumulator.flush()
+        
+        assert OrganizationUsage.objects.get(organization=organization, usage_type='chat_messages').count == 8
+    
+    def test_live_counter_answers_without_queries(self, accumulator, organization, settings, django_assert_num_queries):
+        """Test the cached per-month counter serves limit checks once seeded."""
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'usage-accumulator-tests',
+            }
+        }
+        cache.clear()
+        now = timezone.now()
+        
+        accumulator.increment_org_usage(organization.id, 'agent_executions')
+        accumulator.increment_org_usage(organization.id, 'agent_executions')
+        
+        with django_assert_num_queries(0):
+            assert accumulator.get_org_usage(organization.id, 'agent_executions', now.year, now.month) == 2
+    
+    def test_failed_count_flush_is_not_double_counted(self, accumulator, organization, user, monkeypatch):
+        """Test a flush that fails part-way leaves no counts behind to be added again on retry."""
+        other = Organization.objects.create(name='Other', slug='other', owner=user)
+        now = timezone.now()
+        OrganizationUsage.objects.create(
+            organization=organization, usage_type='chat_messages', month=now.month, year=now.year, count=1
+        )
+        accumulator.increment_org_usage(organization.id, 'chat_messages', 2)
+        accumulator.increment_org_usage(other.id, 'chat_messages', 3)
+        
+        # The second organization's row cannot be created
+        def fail_create(**kwargs):
+            raise RuntimeError('database unavailable')
+        
+        with monkeypatch.context() as patched:
+            patched.setattr(OrganizationUsage.objects, 'create', fail_create)
+            accumulator.flush()
+        assert OrganizationUsage.objects.get(organization=organization).count == 1
+        
+        accumulator.flush()
+        
+        assert OrganizationUsage.objects.get(organization=organization).count == 3
+        assert OrganizationUsage.objects.get(organization=other).count == 3
+    
+    def test_failed_usage_batch_is_requeued(self, accumulator, platform, monkeypatch):
+        """Test usage rows that fail to write are kept for the next flush."""
+        accumulator.record_platform_usage('openai', 'gpt-4', tokens_used=100)
+        accumulator.record_platform_usage('openai', 'gpt-4', tokens_used=50)
+        
+        def fail(events):
+            raise RuntimeError('database unavailable')
+        
+        with monkeypatch.context() as patched:
+            patched.setattr(accumulator, 'write_usage', fail)
+            assert accumulator.flush() == 0
+        
+        assert accumulator.flush() == 2
+        platform.refresh_from_db()
+        assert platform.total_tokens == 150
+    
+    @pytest.mark.parametrize('backend,on_loop', [('memory', True), ('redis', False)])
+    async def test_cost_tracker_keeps_redis_pushes_off_the_loop(self, settings, monkeypatch, backend, on_loop):
+        """Test only the pure in-memory backend records usage on the event loop thread."""
+        import threading
+        from apps.integrations.services.cost_tracker import CostTracker
+        from apps.integrations.services.usage_accumulator import usage_accumulator
+        
+        settings.USAGE_ACCUMULATOR_BACKEND = backend
+        threads = []
+        monkeypatch.setattr(
+            usage_accumulator, 'record_platform_usage', lambda *args, **kwargs: threads.append(threading.get_ident())
+        )
+        
+        await CostTracker._record_usage('openai', 'gpt-4', tokens_used=10)
+        
+        assert (threads == [threading.get_ident()]) is on_loop
+    
+    def test_rows_keep_the_time_usage_was_recorded(self, accumulator, platform, monkeypatch):
+        """Test a late flush does not move usage into a later hour."""
+        recorded_at = timezone.now() - timedelta(hours=1)
+        with monkeypatch.context() as patched:
+            patched.setattr(timezone, 'now', lambda: recorded_at)
+            accumulator.record_platform_usage('openai', 'gpt-4', tokens_used=10)
+        
+        accumulator.flush()
+        
+        assert PlatformUsage.objects.get().timestamp == recorded_at
@@ -0,0 +1,136 @@
+"""
+Unit tests for the batched audit sink and hash chain.
+"""
+import pytest
+from django.db import transaction
+from apps.monitoring.audit import audit_logger
+from apps.monitoring.audit_sink import audit_sink
+from apps.monitoring.models import AuditLog
+
+
+pytestmark = pytest.mark.django_db
+
+
+def log(user, resource_id='1'):
+    return audit_logger.log_action(
+        action='update',
+        resource_type='project',
+        resource_id=resource_id,
+        description='Update project',
+        user=user,
+        changes={'name': {'before': 'Old', 'after': 'New'}},
+    )
+
+
+class TestAuditSink:
+    """Tests for AuditSink."""
+    
+    def test_entries_are_hash_chained(self, user):
+        first = log(user, '1')
+        second = log(user, '2')
+        
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert second.sequence == first.sequence + 1
+        assert second.previous_hash == first.hash
+        assert audit_logger.verify_integrity(first)
+        assert audit_logger.verify_integrity(second)
+    
+    def test_tampered_entry_fails_verification(self, user):
+        entry = log(user)
+        AuditLog.objects.filter(pk=entry.pk).update(description='Nothing happened')
+        
+        entry.refresh_from_db()
+        assert not audit_logger.verify_integrity(entry)
+    
+    def test_memory_backend_buffers_until_commit_and_flush(
+        self, user, settings, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        settings.AUDIT_SINK_BACKEND = 'memory'
+        # Flush from the test thread (the in-memory test database is per connection)
+        monkeypatch.setattr(audit_sink, '_ensure_flusher', lambda: None)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            pending = log(user, 'kept')
+            try:
+                with transaction.atomic():
+                    log(user, 'rolled-back')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        
+        project_logs = AuditLog.objects.filter(resource_type='project')
+        assert not project_logs.exists()
+        assert audit_sink.flush() == 1
+        
+        stored = project_logs.get()
+        assert stored.id == pending.id
+        assert stored.resource_id == 'kept'
+        assert audit_logger.verify_integrity(stored)
+    
+    def test_failed_batch_stays_at_head_of_buffer(
+        self, user, settings, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        settings.AUDIT_SINK_BACKEND = 'memory'
+        monkeypatch.setattr(audit_sink, '_ensure_flusher', lambda: None)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            log(user, '1')
+            log(user, '2')
+        
+        def fail(events):
+            raise RuntimeError('database unavailable')
+        
+        with monkeypatch.context() as patched:
+            patched.setattr(audit_sink, 'write_batch', fail)
+            assert audit_sink.flush() == 0
+        
+        assert audit_sink.flush() == 2
+        stored = AuditLog.objects.filter(resource_type='project').order_by('sequence')
+        assert [entry.resource_id for entry in stored] == ['1', '2']
+
+
+class TestAuditSinkRedis:
+    """Tests for the Redis-backed audit queue."""
+    
+    @pytest.fixture
+    def redis_client(self, settings, monkeypatch):
+        fakeredis = pytest.importorskip('fakeredis')
+        client = fakeredis.FakeRedis()
+        monkeypatch.setattr('core.enhanced_caching.get_redis_client', lambda: client)
+        settings.AUDIT_SINK_BACKEND = 'redis'
+        settings.AUDIT_BATCH_SIZE = 2
+        return client
+    
+    def test_flush_redis_drains_queue_in_order(self, user, redis_client, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            for resource_id in ('1', '2', '3'):
+                log(user, resource_id)
+        
+        assert redis_client.llen(audit_sink.REDIS_KEY) == 3
+        assert audit_sink.flush_redis() == 3
+        assert redis_client.llen(audit_sink.REDIS_KEY) == 0
+        
+        stored = list(AuditLog.objects.filter(resource_type='project').order_by('sequence'))
+        assert [entry.resource_id for entry in stored] == ['1', '2', '3']
+        assert all(audit_logger.verify_integrity(entry) for entry in stored)
+    
+    def test_failed_batch_is_requeued_at_head(
+        self, user, redis_client, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            for resource_id in ('1', '2', '3'):
+                log(user, resource_id)
+        queued = redis_client.lrange(audit_sink.REDIS_KEY, 0, -1)
+        
+        def fail(events):
+            raise RuntimeError('database unavailable')
+        
+        with monkeypatch.context() as patched:
+            patched.setattr(audit_sink, 'write_batch', fail)
+            assert audit_sink.flush_redis() == 0
+        
+        assert redis_client.lrange(audit_sink.REDIS_KEY, 0, -1) == queued
+        assert audit_sink.flush_redis() == 3
+        stored = AuditLog.objects.filter(resource_type='project').order_by('sequence')
+        assert [entry.resource_id for entry in stored] == ['1', '2', '3']
@@ -0,0 +1,72 @@
+"""
+Unit tests for usage rollups.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from apps.integrations.models import AIPlatform, PlatformUsage
+from apps.monitoring.models import UsageRollup
+from apps.monitoring.usage_rollups import aggregate_usage, floor_hour, get_watermark, roll_up_usage
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def platform():
+    return AIPlatform.objects.create(platform_name='openai', display_name='OpenAI')
+
+
+@pytest.fixture
+def add_usage(platform, user):
+    def add(age, tokens=100, cost='0.10', success=True, model='gpt-4'):
+        usage = PlatformUsage.objects.create(
+            platform=platform, user=user, model=model, tokens_used=tokens,
+            cost=Decimal(cost), success=success, response_time=1.0
+        )
+        PlatformUsage.objects.filter(id=usage.id).update(timestamp=timezone.now() - age)
+        return usage
+    return add
+
+
+class TestUsageRollups:
+    """Test suite for usage rollups."""
+    
+    def test_rollups_answer_for_raw_rows(self, add_usage, user):
+        """Test queries match the raw rows and no longer need rows before the watermark."""
+        add_usage(timedelta(days=3))
+        add_usage(timedelta(days=2, hours=5), model='gpt-3.5')
+        add_usage(timedelta(hours=5), tokens=50, cost='0.05')
+        add_usage(timedelta(hours=5), success=False, tokens=0, cost='0')
+        
+        roll_up_usage()
+        
+        assert get_watermark() == floor_hour(timezone.now())
+        assert UsageRollup.objects.filter(granularity='day').exists()
+        
+        start = timezone.now() - timedelta(days=7)
+        PlatformUsage.objects.all().delete()  # Everything above is covered by rollups now
+        totals = aggregate_usage(start, {'user_id': user.id})[0]
+        
+        assert totals['requests'] == 3
+        assert totals['failed_requests'] == 1
+        assert totals['tokens'] == 250
+        assert totals['cost'] == Decimal('0.25')
+        
+        by_model = {item['model']: item['requests'] for item in aggregate_usage(start, group_by=['model'])}
+        assert by_model == {'gpt-4': 2, 'gpt-3.5': 1}
+    
+    def test_current_hour_and_late_rows_are_counted(self, add_usage):
+        """Test rows after the watermark come from raw usage and late rows are re-rolled."""
+        roll_up_usage()
+        add_usage(timedelta(seconds=1))
+        
+        assert aggregate_usage(timezone.now() - timedelta(days=1))[0]['requests'] == 1
+        
+        # A row recorded just before the watermark but flushed after the roll-up
+        add_usage(timezone.now() - floor_hour(timezone.now()) + timedelta(seconds=1))
+        roll_up_usage()
+        
+        assert aggregate_usage(timezone.now() - timedelta(days=1))[0]['requests'] == 2
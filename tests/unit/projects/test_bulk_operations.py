@@ -0,0 +1,107 @@
+"""
+Unit tests for set-based bulk operations.
+"""
+import uuid
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.projects.models import Activity, Project, UserStory
+from apps.projects.services.bulk_operations import BulkOperationsService
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(name='Bulk', owner=user)
+
+
+@pytest.fixture
+def stories(project):
+    return [UserStory.objects.create(project=project, title=f'Story {i}') for i in range(3)]
+
+
+def as_items(objs, item_type='story'):
+    return [{'type': item_type, 'id': str(obj.id)} for obj in objs]
+
+
+class TestBulkOperations:
+    """Test suite for BulkOperationsService."""
+    
+    def test_status_change_is_applied_in_one_batch(self, user, project, stories):
+        """Test items are updated together and recorded as one activity."""
+        missing = str(uuid.uuid4())
+        items = as_items(stories) + [{'type': 'story', 'id': missing}, {'type': 'widget', 'id': missing}]
+        
+        result = BulkOperationsService.bulk_update_status(items, 'in_progress', user)
+        
+        assert result['updated_count'] == 3
+        assert {error['id'] for error in result['item_errors']} == {missing}
+        assert len(result['errors']) == 2
+        assert set(UserStory.objects.values_list('status', flat=True)) == {'in_progress'}
+        assert set(UserStory.objects.values_list('updated_by', flat=True)) == {user.id}
+        
+        activity = Activity.objects.get(activity_type='story_status_changed')
+        assert activity.metadata['count'] == 3
+        assert activity.project == project
+    
+    def test_query_count_does_not_grow_with_items(self, user, project, settings):
+        """Test a larger selection costs the same number of queries."""
+        settings.WORK_ITEM_EVENTS_BACKEND = 'celery'  # Per-item rules run after commit
+        stories = [UserStory.objects.create(project=project, title=f'Story {i}') for i in range(22)]
+        BulkOperationsService.bulk_update_status(as_items(stories[:1]), 'todo', user)  # Warm per-process caches
+        
+        counts = []
+        for selection in (stories[:2], stories[2:]):
+            with CaptureQueriesContext(connection) as queries:
+                result = BulkOperationsService.bulk_update_status(as_items(selection), 'in_progress', user)
+            assert result['updated_count'] == len(selection)
+            counts.append(len(queries))
+        
+        assert counts[0] == counts[1]
+    
+    def test_status_change_runs_automation_rules(self, user, project, stories):
+        """Test each changed story goes through the status change automation rules."""
+        project.configuration.automation_rules = [{
+            'trigger': {'type': 'status_change', 'to': 'in_progress'},
+            'actions': [{'type': 'add_tag', 'tag': 'started'}],
+        }]
+        project.configuration.save()
+        
+        BulkOperationsService.bulk_update_status(as_items(stories[:2]), 'in_progress', user)
+        
+        tags = {str(story.id): story.tags for story in UserStory.objects.all()}
+        assert tags[str(stories[0].id)] == ['started']
+        assert tags[str(stories[1].id)] == ['started']
+        assert tags[str(stories[2].id)] == []
+    
+    def test_invalid_status_is_reported_per_item(self, user, stories):
+        """Test a status the project does not define leaves the items unchanged."""
+        result = BulkOperationsService.bulk_update_status(as_items(stories), 'nonsense', user)
+        
+        assert result['updated_count'] == 0
+        assert len(result['item_errors']) == 3
+        assert not UserStory.objects.filter(status='nonsense').exists()
+    
+    def test_chunks_report_progress(self, user, stories, settings):
+        """Test large selections are processed in chunks with progress callbacks."""
+        settings.BULK_OPERATION_CHUNK_SIZE = 2
+        progress = []
+        
+        result = BulkOperationsService.bulk_add_labels(
+            as_items(stories), ['urgent'], user, progress_callback=lambda done, total: progress.append((done, total))
+        )
+        
+        assert result['updated_count'] == 3
+        assert progress == [(2, 3), (3, 3)]
+        assert all(story.labels == ['urgent'] for story in UserStory.objects.all())
+    
+    def test_delete(self, user, stories):
+        """Test items are deleted with one aggregated activity."""
+        result = BulkOperationsService.bulk_delete(as_items(stories[:2]), user)
+        
+        assert result['deleted_count'] == 2
+        assert list(UserStory.objects.values_list('id', flat=True)) == [stories[2].id]
+        assert Activity.objects.filter(activity_type='story_deleted').count() == 1
@@ -0,0 +1,126 @@
+"""
+Unit tests for the project dependency graph and impact analysis.
+"""
+import pytest
+from django.core.cache import cache
+from apps.projects.models import Project, StoryDependency, StoryLink, UserStory
+from apps.projects.services.dependency_graph import DependencyGraph, dependency_graphs
+from apps.projects.services.dependency_impact_service import DependencyImpactService
+
+
+def build(*edges):
+    """Graph from (waiting, blocking) pairs."""
+    graph = DependencyGraph()
+    for i, (waiting, blocking) in enumerate(edges):
+        graph.add_edge(('dependency', str(i)), (waiting, blocking, 'blocks'))
+    return graph
+
+
+class TestDependencyGraph:
+    """Test suite for the in-memory graph algorithms."""
+    
+    def test_cycles_closure_and_critical_path(self):
+        """Test cycles, transitive counts and the weighted critical path."""
+        # d waits on c waits on b waits on a; e waits on a; x <-> y is a cycle
+        graph = build(('b', 'a'), ('c', 'b'), ('d', 'c'), ('e', 'a'), ('x', 'y'), ('y', 'x'))
+        
+        analysis = graph.analyze({'a': 1, 'b': 2, 'c': 3, 'd': 1, 'e': 10, 'x': 1, 'y': 1})
+        
+        assert analysis['cycles'] == [['x', 'y']]
+        assert analysis['downstream_counts']['a'] == 4
+        assert analysis['upstream_counts']['d'] == 3
+        assert analysis['upstream_counts']['x'] == 1
+        assert analysis['critical_path'] == ['a', 'e']
+        assert analysis['critical_path_weight'] == 11
+    
+    def test_would_create_cycle(self):
+        """Test a new edge is a cycle only when the blocker already waits on the waiter."""
+        graph = build(('b', 'a'), ('c', 'b'))
+        
+        assert graph.would_create_cycle('a', 'c')
+        assert graph.would_create_cycle('a', 'a')
+        assert not graph.would_create_cycle('c', 'a')
+    
+    def test_remove_edge(self):
+        """Test removing an edge drops stories left without edges."""
+        graph = build(('b', 'a'), ('c', 'b'))
+        graph.remove_edge(('dependency', '1'))
+        
+        assert graph.nodes == {'a', 'b'}
+        assert list(graph.walk('a', 'down')) == ['b']
+
+
+@pytest.mark.django_db
+class TestDependencyImpact:
+    """Test suite for graph loading, incremental updates and impact analysis."""
+    
+    @pytest.fixture(autouse=True)
+    def locmem_cache(self, settings):
+        """Graph versions need a real cache; the testing settings use DummyCache."""
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'dependency-graph-tests',
+            }
+        }
+        cache.clear()
+        dependency_graphs.clear()
+    
+    @pytest.fixture
+    def project(self, user):
+        return Project.objects.create(name='Graph', owner=user)
+    
+    def make_stories(self, project, count):
+        return [
+            UserStory.objects.create(project=project, title=f'S{i}', story_points=i + 1, status='todo')
+            for i in range(count)
+        ]
+    
+    def test_load_and_incremental_updates(self, project, django_assert_num_queries,
+                                          django_capture_on_commit_callbacks):
+        """Test the graph loads in two queries and later changes are applied without reloading."""
+        a, b, c = self.make_stories(project, 3)
+        StoryDependency.objects.create(source_story=b, target_story=a)
+        StoryLink.objects.create(project=project, source_story=b, target_story=c, link_type='blocks')
+        StoryLink.objects.create(project=project, source_story=a, target_story=c, link_type='relates_to')
+        
+        with django_assert_num_queries(2):
+            graph = dependency_graphs.get(project.id)
+        assert graph.blocking(str(b.id)) == [(str(a.id), 'blocks')]
+        assert graph.blocking(str(c.id)) == [(str(b.id), 'blocks')]
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            dependency = StoryDependency.objects.create(source_story=a, target_story=c, dependency_type='depends_on')
+        with django_assert_num_queries(0):
+            graph = dependency_graphs.get(project.id)
+        assert graph.analyze()['cycles'] == [sorted([str(a.id), str(b.id), str(c.id)])]
+        assert (str(c.id), 'depends_on') in graph.blocking(str(a.id))
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            dependency.resolved = True
+            dependency.save()
+        with django_assert_num_queries(0):
+            graph = dependency_graphs.get(project.id)
+        assert graph.blocking(str(a.id)) == []
+    
+    def test_project_impact_in_constant_queries(self, project, django_assert_num_queries):
+        """Test project-wide impact does not query per story."""
+        stories = self.make_stories(project, 6)
+        for waiting, blocking in zip(stories[1:], stories):
+            StoryDependency.objects.create(source_story=waiting, target_story=blocking)
+        StoryDependency.objects.create(source_story=stories[0], target_story=stories[5], resolved=True)
+        
+        with django_assert_num_queries(3):
+            result = DependencyImpactService.analyze_project_impact(str(project.id))
+        
+        assert result['total_stories'] == 6
+        assert result['total_blocking_dependencies'] == 5
+        assert result['circular_dependencies'] == []
+        assert result['critical_path'] == [str(story.id) for story in stories]
+        first = next(s for s in result['stories_by_impact'] if s['story_id'] == str(stories[0].id))
+        assert first['blocked_count'] == 1
+        assert first['transitive_blocked_count'] == 5
+        
+        chain = DependencyImpactService.get_dependency_chain(str(stories[2].id))
+        assert [s['id'] for s in chain['upstream']] == [str(stories[1].id), str(stories[0].id)]
+        assert [s['id'] for s in chain['downstream']] == [str(s.id) for s in stories[3:]]
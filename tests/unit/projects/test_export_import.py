@@ -0,0 +1,78 @@
+"""
+Unit tests for streaming story export and chunked import.
+"""
+import csv
+import io
+
+import pytest
+from django.http import StreamingHttpResponse
+from apps.projects.models import Project, SearchDocument, UserStory
+from apps.projects.services.export_import_service import ExportImportService, STORY_EXPORT_HEADERS
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(name='Export', owner=user)
+
+
+def make_csv(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Title', 'Status', 'Story Points', 'Tags'])
+    writer.writerows(rows)
+    return io.BytesIO(output.getvalue().encode('utf-8'))
+
+
+class TestExportImport:
+    """Test suite for ExportImportService."""
+    
+    def test_csv_export_streams_every_story(self, project, settings):
+        """Test the export is streamed and reads stories in chunks."""
+        settings.EXPORT_CHUNK_SIZE = 2
+        for i in range(5):
+            UserStory.objects.create(project=project, title=f'Story {i}', tags=['a', 'b'])
+        
+        response = ExportImportService.export_stories_to_csv(str(project.id))
+        
+        assert isinstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.reader(io.StringIO(content)))
+        assert rows[0] == STORY_EXPORT_HEADERS
+        assert [row[1] for row in rows[1:]] == [f'Story {i}' for i in range(5)]
+        assert rows[1][12] == 'a,b'
+    
+    def test_import_validates_then_inserts_in_batches(self, user, project, settings):
+        """Test invalid rows are reported and valid rows are bulk-created with numbers."""
+        settings.IMPORT_BATCH_SIZE = 2
+        csv_file = make_csv([
+            ['First', 'todo', '3', 'x, y'],
+            ['', 'todo', '', ''],
+            ['Second', 'nonsense', '', ''],
+            ['Third', '', '', ''],
+            ['Fourth', 'done', 'many', ''],
+            ['Fifth', 'review', '5', ''],
+        ])
+        
+        result = ExportImportService.import_stories_from_csv(str(project.id), csv_file, user=user)
+        
+        assert result['imported_count'] == 3
+        assert sorted(error['row'] for error in result['errors']) == [3, 4, 6]
+        stories = {story.title: story for story in UserStory.objects.filter(project=project)}
+        assert set(stories) == {'First', 'Third', 'Fifth'}
+        assert stories['First'].tags == ['x', 'y']
+        assert stories['First'].story_points == 3
+        assert stories['Third'].status == 'backlog'
+        assert stories['Fifth'].created_by == user
+        assert len({story.number for story in stories.values()}) == 3
+        assert SearchDocument.objects.filter(content_type='userstory').count() == 3
+    
+    def test_import_into_missing_project(self):
+        """Test an unknown project is reported without reading the file."""
+        result = ExportImportService.import_stories_from_csv(
+            '00000000-0000-0000-0000-000000000000', make_csv([['A', '', '', '']])
+        )
+        
+        assert result == {'error': 'Project not found'}
@@ -0,0 +1,67 @@
+"""
+Unit tests for indexed search.
+"""
+import pytest
+from apps.projects.models import Project, SearchDocument, UserStory
+from apps.projects.services.search import SearchService
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(name='Search', owner=user)
+
+
+@pytest.fixture
+def stories(project):
+    return [
+        UserStory.objects.create(project=project, title='Login page', description='Users sign in with email'),
+        UserStory.objects.create(project=project, title='Billing export', description='Export invoices for login audits'),
+        UserStory.objects.create(project=project, title='Dashboard', description='Charts of usage', status='done'),
+    ]
+
+
+class TestSearchService:
+    """Test suite for SearchService on the search index."""
+    
+    def test_documents_follow_saves_and_deletes(self, project, stories):
+        """Test signals keep the index in sync with work items."""
+        assert SearchDocument.objects.filter(content_type='userstory').count() == 3
+        
+        stories[0].title = 'Sign-in page'
+        stories[0].save()
+        assert SearchDocument.objects.get(object_id=stories[0].id).title == 'Sign-in page'
+        
+        stories[2].delete()
+        assert not SearchDocument.objects.filter(object_id=stories[2].id).exists()
+    
+    def test_title_matches_rank_first_with_highlights(self, user, stories):
+        """Test results are ranked across types with highlighted snippets."""
+        results = SearchService.search_unified('login', user=user)
+        
+        assert [r['id'] for r in results] == [str(stories[0].id), str(stories[1].id)]
+        assert '<mark>' in results[0]['highlighted_title']
+        assert '<mark>' in results[1]['snippet']
+    
+    def test_highlights_escape_stored_text(self, user, project):
+        """Test user-controlled titles and bodies cannot inject markup into highlights."""
+        UserStory.objects.create(
+            project=project, title='<img src=x onerror=alert(1)> login', description='<script>login</script>'
+        )
+        
+        result = SearchService.search_unified('login', user=user)[0]
+        
+        assert '<img' not in result['highlighted_title']
+        assert '&lt;img src=x onerror=alert(1)&gt; <mark>login</mark>' == result['highlighted_title']
+        assert '<script>' not in result['snippet']
+        assert '<mark>login</mark>' in result['snippet']
+    
+    def test_prefix_filters_and_exclusions(self, user, stories):
+        """Test prefix matching, field filters and excluded terms."""
+        assert len(SearchService.search_unified('log', user=user)) == 2
+        assert len(SearchService.search_unified('log -invoices', user=user)) == 1
+        
+        results = SearchService.search('status:done', user=user)
+        assert [r['id'] for r in results['userstory']] == [str(stories[2].id)]
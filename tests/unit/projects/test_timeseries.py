@@ -0,0 +1,158 @@
+"""
+Unit tests for project time series (burndown, velocity, trends).
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.core.cache import cache
+from apps.projects.models import Activity, Project, Sprint, UserStory
+from apps.projects.services.reports_service import ReportsService
+from apps.projects.services.statistics_service import StatisticsService
+from apps.projects.services.timeseries import completed_points_series, get_sprint_points
+
+
+def at(day):
+    return datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=12)
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(name='Series', owner=user)
+
+
+@pytest.fixture
+def sprint(project):
+    today = date.today()
+    return Sprint.objects.create(
+        project=project, name='Sprint 1', sprint_number=1,
+        start_date=today - timedelta(days=4), end_date=today + timedelta(days=1)
+    )
+
+
+class TestCompletedPointsSeries:
+    """Test suite for the daily completion pass."""
+    
+    def test_transitions_fallback_and_reopen(self):
+        """Test points follow moves in and out of done, with updated_at when history is missing."""
+        days = [date(2026, 3, d) for d in range(1, 6)]
+        stories = [
+            {'id': 'a', 'story_points': 3, 'status': 'done', 'updated_at': at(date(2026, 3, 4))},
+            {'id': 'b', 'story_points': 5, 'status': 'in_progress', 'updated_at': at(date(2026, 3, 4))},
+            {'id': 'c', 'story_points': 2, 'status': 'done', 'updated_at': at(date(2026, 3, 3))},
+            {'id': 'd', 'story_points': 8, 'status': 'done', 'updated_at': at(date(2026, 2, 1))},
+        ]
+        transitions = {
+            'a': [(at(date(2026, 3, 2)), 'todo', 'done')],
+            'b': [(at(date(2026, 3, 1)), 'todo', 'done'), (at(date(2026, 3, 4)), 'done', 'in_progress')],
+        }
+        
+        series = completed_points_series(stories, transitions, days)
+        
+        # d done before the window; a on day 2; c by fallback on day 3; b done day 1, reopened day 4
+        assert series == [8 + 5, 8 + 5 + 3, 8 + 5 + 3 + 2, 8 + 3 + 2, 8 + 3 + 2]
+
+
+@pytest.mark.django_db
+class TestProjectSeries:
+    """Test suite for burndown, velocity and trends built from the database."""
+    
+    def test_status_change_is_recorded_and_drives_burndown(self, project, sprint):
+        """Test single saves log a transition and burndown uses its timestamp, not updated_at."""
+        story = UserStory.objects.create(project=project, sprint=sprint, title='A', story_points=5, status='todo')
+        UserStory.objects.create(project=project, sprint=sprint, title='B', story_points=3, status='todo')
+        story.status = 'done'
+        story.save()
+        
+        activity = Activity.objects.get(activity_type='story_status_changed', object_id=story.id)
+        assert activity.metadata['old_status'] == 'todo'
+        assert activity.metadata['new_status'] == 'done'
+        # Backdate into the sprint; transitions older than the oldest story are not read
+        UserStory.objects.filter(sprint=sprint).update(created_at=at(sprint.start_date))
+        Activity.objects.filter(pk=activity.pk).update(created_at=at(sprint.start_date + timedelta(days=1)))
+        
+        burndown = ReportsService.get_burndown_chart(str(sprint.id))
+        
+        assert burndown['total_points'] == 8
+        assert burndown['completed_points'] == [0, 5, 5, 5, 5, 5]
+        assert burndown['remaining_points'] == [8, 3, 3, 3, 3, 3]
+    
+    def test_bulk_transitions_are_read_from_item_ids(self, user, project, sprint):
+        """Test chunk activities of bulk status changes count for every listed story."""
+        stories = [
+            UserStory.objects.create(project=project, sprint=sprint, title=f'S{i}', story_points=2, status='todo')
+            for i in range(2)
+        ]
+        UserStory.objects.filter(id__in=[s.id for s in stories]).update(status='done')
+        Activity.objects.create(
+            activity_type='story_status_changed', user=user, project=project, description='bulk',
+            metadata={'new_status': 'done', 'bulk': True, 'item_ids': [str(s.id) for s in stories]},
+        )
+        UserStory.objects.filter(sprint=sprint).update(created_at=at(sprint.start_date))
+        Activity.objects.filter(metadata__bulk=True).update(created_at=at(sprint.start_date + timedelta(days=2)))
+        
+        burndown = ReportsService.get_burndown_chart(str(sprint.id))
+        
+        assert burndown['completed_points'] == [0, 0, 4, 4, 4, 4]
+    
+    def test_velocity_points_in_one_query(self, project, django_assert_num_queries):
+        """Test committed and completed points of all sprints come from one grouped query."""
+        sprints = []
+        for number in range(1, 4):
+            sprint = Sprint.objects.create(
+                project=project, name=f'Sprint {number}', sprint_number=number, status='completed',
+                start_date=date(2026, 1, number), end_date=date(2026, 1, number + 7)
+            )
+            UserStory.objects.create(project=project, sprint=sprint, title='Done', story_points=number, status='done')
+            UserStory.objects.create(project=project, sprint=sprint, title='Open', story_points=10, status='todo')
+            sprints.append(sprint)
+        
+        with django_assert_num_queries(1):
+            points = get_sprint_points([s.id for s in sprints])
+        
+        assert points[str(sprints[2].id)] == {'total_points': 13, 'completed_points': 3}
+        
+        velocity = ReportsService.get_velocity_tracking(str(project.id))
+        assert [s['completed_points'] for s in velocity['sprints']] == [3, 2, 1]
+        assert velocity['average_velocity'] == 2
+    
+    def test_story_type_trends_grouped_by_day(self, project):
+        """Test trends count stories per creation day and type."""
+        UserStory.objects.create(project=project, title='F1', story_type='feature')
+        UserStory.objects.create(project=project, title='F2', story_type='feature')
+        UserStory.objects.create(project=project, title='D1', story_type='documentation')
+        
+        trends = StatisticsService().get_story_type_trends(str(project.id), days=3, use_cache=False)
+        
+        assert len(trends) == 4
+        assert trends[-1]['counts'] == {'feature': 2, 'documentation': 1}
+        assert trends[-1]['total'] == 3
+        assert all(day['total'] == 0 for day in trends[:-1])
+    
+    def test_cached_series_invalidated_by_changes(self, project, settings):
+        """Test cached velocity is served until a work item change moves the project's version."""
+        settings.CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'timeseries-tests',
+            }
+        }
+        cache.clear()
+        sprint = Sprint.objects.create(
+            project=project, name='Sprint 1', sprint_number=1, status='completed',
+            start_date=date(2026, 1, 1), end_date=date(2026, 1, 14)
+        )
+        story = UserStory.objects.create(project=project, sprint=sprint, title='A', story_points=5, status='todo')
+        
+        assert ReportsService.get_velocity_tracking(str(project.id))['average_velocity'] == 0
+        
+        # A queryset update bypasses signals: the cached value is still served
+        UserStory.objects.filter(pk=story.pk).update(status='done')
+        assert ReportsService.get_velocity_tracking(str(project.id))['average_velocity'] == 0
+        
+        StatisticsService().invalidate_cache(str(project.id))
+        assert ReportsService.get_velocity_tracking(str(project.id))['average_velocity'] == 5
+        
+        story.refresh_from_db()
+        story.story_points = 8
+        story.save()
+        assert ReportsService.get_velocity_tracking(str(project.id))['average_velocity'] == 8
@@ -0,0 +1,82 @@
+"""
+Unit tests for the deferred work item event pipeline.
+"""
+import pytest
+from apps.projects.models import Project, UserStory
+from apps.projects.services.work_item_events import coalesce_events, work_item_events
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(name='Events', owner=user)
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    """Record story handler runs instead of running rules and notifications."""
+    calls = []
+    monkeypatch.setitem(work_item_events._handlers, 'story', lambda group, claim: calls.append(group))
+    return calls
+
+
+class TestWorkItemEvents:
+    """Test suite for work item change events."""
+    
+    def test_events_for_the_same_item_are_coalesced(self):
+        """Test one group per item keeps the oldest previous state and the latest key."""
+        events = [
+            {'id': 'a', 'item_type': 'story', 'item_id': '1', 'created': True, 'previous': {}, 'actor_id': 'u1'},
+            {'id': 'b', 'item_type': 'story', 'item_id': '2', 'created': False, 'previous': {'status': 'todo'}, 'actor_id': None},
+            {'id': 'c', 'item_type': 'story', 'item_id': '1', 'created': False, 'previous': {'status': 'backlog'}, 'actor_id': None},
+            {'id': 'd', 'item_type': 'story', 'item_id': '2', 'created': False, 'previous': {'status': 'in_progress'}, 'actor_id': 'u2'},
+        ]
+        
+        groups = coalesce_events(events)
+        
+        assert [(g['item_id'], g['key']) for g in groups] == [('1', 'c'), ('2', 'd')]
+        assert groups[0]['created'] is True
+        assert groups[0]['actor_id'] == 'u1'
+        assert groups[1]['previous'] == {'status': 'todo'}
+        assert groups[1]['actor_id'] == 'u2'
+    
+    def test_events_are_queued_on_commit_and_processed_in_one_batch(
+        self, project, handled, settings, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        """Test saves only queue events, and a batch runs one handler per story."""
+        settings.WORK_ITEM_EVENTS_BACKEND = 'inprocess'
+        # Process from the test thread (the in-memory test database is per connection)
+        monkeypatch.setattr(work_item_events, '_ensure_worker', lambda: None)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            story = UserStory.objects.create(project=project, title='Story')
+            story.title = 'Renamed'
+            story.save()
+            assert handled == []
+        
+        queued = list(work_item_events._queue)
+        work_item_events._queue.clear()
+        assert len(queued) == 2
+        
+        assert work_item_events.process(queued) == 1
+        assert handled[0]['item_id'] == str(story.id)
+        assert handled[0]['created'] is True
+        assert handled[0]['previous'] == {'status': story.status, 'assigned_to': None, 'priority': story.priority}
+    
+    def test_saves_made_by_handlers_do_not_emit(self, project, monkeypatch):
+        """Test a handler that re-saves its story does not trigger another run."""
+        calls = []
+        
+        def handler(group, claim):
+            calls.append(group)
+            story = UserStory.objects.get(pk=group['item_id'])
+            story.tags = ['auto']
+            story.save()
+        
+        monkeypatch.setitem(work_item_events._handlers, 'story', handler)
+        
+        UserStory.objects.create(project=project, title='Tagged')
+        
+        assert len(calls) == 1
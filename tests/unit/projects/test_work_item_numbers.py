@@ -0,0 +1,46 @@
+"""
+Unit tests for work item number sequences.
+"""
+import pytest
+from apps.projects.models import Project, UserStory
+from apps.projects.utils.work_item_numbers import (
+    get_next_work_item_number,
+    reserve_work_item_numbers,
+)
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def project(user):
+    return Project.objects.create(name='Numbers', owner=user)
+
+
+class TestWorkItemNumbers:
+    """Test suite for work item number generation."""
+    
+    def test_sequence_is_seeded_from_existing_numbers(self, project):
+        """Test the first number continues after numbers already in use."""
+        UserStory.objects.create(project=project, title='Old', number='STORY-41')
+        
+        assert get_next_work_item_number(str(project.id), 'story') == 'STORY-42'
+        assert get_next_work_item_number(str(project.id), 'story') == 'STORY-43'
+    
+    def test_block_reservation_uses_one_update(self, project, django_assert_max_num_queries):
+        """Test a block of numbers is claimed with a single sequence update."""
+        get_next_work_item_number(str(project.id), 'bug')
+        
+        with django_assert_max_num_queries(4):  # UPDATE + read back, plus savepoint
+            numbers = reserve_work_item_numbers(str(project.id), 'bug', 3, prefix='BUG-')
+        
+        assert numbers == ['BUG-2', 'BUG-3', 'BUG-4']
+    
+    def test_explicit_numbers_move_the_sequence(self, project):
+        """Test generated numbers skip past numbers set by hand."""
+        UserStory.objects.create(project=project, title='First')
+        UserStory.objects.create(project=project, title='Manual', number='STORY-10')
+        
+        story = UserStory.objects.create(project=project, title='Next')
+        
+        assert story.number == 'STORY-11'
@@ -0,0 +1,64 @@
+"""
+Unit tests for delta-based workflow state checkpointing.
+"""
+import pytest
+from apps.workflows.models import Workflow, WorkflowExecution, WorkflowStateCheckpoint
+from apps.workflows.services.state_manager import WorkflowStateManager
+
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def execution():
+    workflow = Workflow.objects.create(
+        name='Checkpoint Test',
+        slug='checkpoint-test',
+        description='',
+        definition={'steps': [{'id': 'a', 'agent': 'a'}]},
+    )
+    return WorkflowExecution.objects.create(
+        workflow=workflow,
+        input_data={'topic': 'x'},
+        status='running',
+        state={'input': {'topic': 'x'}, 'steps': {}},
+    )
+
+
+class TestWorkflowStateCheckpoints:
+    """Tests for WorkflowStateManager checkpoint log."""
+
+    async def test_step_state_is_appended_not_rewritten(self, execution):
+        manager = WorkflowStateManager()
+        execution_id = str(execution.id)
+
+        await manager.save_step_state(execution_id, 'a', {'success': True, 'output': {'text': 'one'}})
+        await manager.save_step_state(execution_id, 'b', {'success': False, 'output': None})
+        await manager.save_step_state(execution_id, 'a', {'success': True, 'output': {'text': 'two'}})
+
+        head = await WorkflowExecution.objects.aget(id=execution.id)
+        assert head.state['steps'] == {}
+
+        sequences = [s async for s in WorkflowStateCheckpoint.objects.filter(
+            execution=execution
+        ).order_by('sequence').values_list('sequence', flat=True)]
+        assert sequences == [1, 2, 3]
+
+        state = await manager.get_state(execution_id)
+        assert state['state']['input'] == {'topic': 'x'}
+        assert state['state']['steps']['a']['output'] == {'text': 'two'}
+
+        recovery = await manager.recover(execution_id)
+        assert recovery['last_successful_step'] == 'a'
+
+    async def test_completion_compacts_checkpoints(self, execution):
+        manager = WorkflowStateManager()
+        execution_id = str(execution.id)
+
+        await manager.record_step_completion(execution_id, 'a', {'text': 'done'})
+        await manager.record_execution_complete(execution_id, {'text': 'done'})
+
+        execution = await WorkflowExecution.objects.aget(id=execution.id)
+        assert execution.status == 'completed'
+        assert execution.state['steps']['a']['output'] == {'text': 'done'}
+        assert not await WorkflowStateCheckpoint.objects.filter(execution=execution).aexists()
@@ -0,0 +1,163 @@
+"""
+Unit tests for the dependency-driven workflow step scheduler.
+"""
+import asyncio
+import pytest
+from apps.workflows.services.workflow_parser import workflow_parser
+from apps.workflows.services.workflow_executor_parallel import (
+    StepScheduler,
+    build_workflow_graph,
+    tenant_semaphore,
+)
+
+
+def parse(steps):
+    return workflow_parser.parse({'name': 'Test', 'version': '1.0', 'steps': steps})
+
+
+def fan_out(width):
+    steps = [{'id': 'init', 'agent': 'a'}]
+    for i in range(width):
+        steps.append({'id': f'review_{i}', 'agent': 'a', 'parallel': True, 'depends_on': ['init']})
+    steps.append({'id': 'summary', 'agent': 'a', 'depends_on': [f'review_{i}' for i in range(width)]})
+    return parse(steps)
+
+
+class Recorder:
+    """run_unit stand-in that records start order and sleeps per unit."""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.started = []
+    
+    async def __call__(self, step_ids):
+        self.started.append(step_ids)
+        await asyncio.sleep(self.delay)
+
+
+class TestBuildWorkflowGraph:
+    """Tests for build_workflow_graph."""
+    
+    def test_implicit_and_data_dependencies(self):
+        graph = build_workflow_graph(parse([
+            {'id': 'checks', 'agent': 'a', 'on_success': 'review', 'on_failure': 'fixes'},
+            {'id': 'review', 'agent': 'a'},
+            {'id': 'fixes', 'agent': 'a', 'inputs': {'notes': '{{steps.review.output.comments}}'}},
+            {'id': 'report', 'agent': 'a', 'depends_on': ['checks'], 'inputs': {'all': '{{steps}}'}},
+        ]))
+        assert graph.dependencies['review'] == {'checks'}
+        assert graph.dependencies['fixes'] == {'checks', 'review'}
+        assert graph.dependencies['report'] == {'checks', 'review', 'fixes'}
+        assert graph.sequential == {'checks', 'review', 'fixes'}
+    
+    def test_branch_group_is_one_unit(self):
+        graph = build_workflow_graph(parse([
+            {'id': 'check', 'agent': 'a'},
+            {'id': 'high', 'agent': 'a', 'branch_group': 'p', 'depends_on': ['check']},
+            {'id': 'low', 'agent': 'a', 'branch_group': 'p', 'depends_on': ['check']},
+            {'id': 'merge', 'agent': '', 'step_type': 'merge', 'merge_after': 'p', 'depends_on': ['high', 'low']},
+        ]))
+        assert graph.units['branch:p'] == ['high', 'low']
+        assert graph.dependencies['merge'] == {'branch:p'}
+        assert graph.critical_path_length() == 3
+    
+    def test_fan_out_critical_path(self):
+        graph = build_workflow_graph(fan_out(50))
+        assert len(graph.units) == 52
+        assert graph.critical_path_length() == 3
+
+
+class TestStepScheduler:
+    """Tests for StepScheduler."""
+    
+    async def test_fan_out_runs_in_critical_path_time(self):
+        recorder = Recorder(delay=0.05)
+        scheduler = StepScheduler(build_workflow_graph(fan_out(10)), recorder, max_concurrency=0)
+        
+        start = asyncio.get_running_loop().time()
+        assert await scheduler.run() == []
+        elapsed = asyncio.get_running_loop().time() - start
+        
+        assert recorder.started[0] == ['init']
+        assert recorder.started[-1] == ['summary']
+        assert scheduler.max_running == 10
+        assert elapsed < 0.05 * 6
+    
+    async def test_execution_concurrency_limit(self):
+        scheduler = StepScheduler(build_workflow_graph(fan_out(10)), Recorder(delay=0.01), max_concurrency=3)
+        await scheduler.run()
+        assert scheduler.max_running == 3
+    
+    async def test_tenant_semaphore_is_shared_across_executions(self):
+        semaphore = tenant_semaphore('org:1', 4)
+        assert tenant_semaphore('org:1', 4) is semaphore
+        assert tenant_semaphore(None, 4) is None
+        
+        schedulers = [
+            StepScheduler(build_workflow_graph(fan_out(6)), Recorder(delay=0.01), tenant_semaphore=semaphore)
+            for _ in range(2)
+        ]
+        running = 0
+        peak = 0
+        
+        def track(scheduler):
+            original = scheduler.run_unit
+            
+            async def run_unit(step_ids):
+                nonlocal running, peak
+                running += 1
+                peak = max(peak, running)
+                try:
+                    await original(step_ids)
+                finally:
+                    running -= 1
+            scheduler.run_unit = run_unit
+        
+        for scheduler in schedulers:
+            track(scheduler)
+        await asyncio.gather(*(s.run() for s in schedulers))
+        assert peak == 4
+    
+    async def test_legacy_steps_run_one_at_a_time_in_order(self):
+        recorder = Recorder()
+        scheduler = StepScheduler(build_workflow_graph(parse([
+            {'id': 'first', 'agent': 'a'},
+            {'id': 'second', 'agent': 'a'},
+            {'id': 'third', 'agent': 'a'},
+        ])), recorder)
+        await scheduler.run()
+        assert recorder.started == [['first'], ['second'], ['third']]
+        assert scheduler.max_running == 1
+    
+    async def test_resume_skips_completed_steps(self):
+        recorder = Recorder()
+        scheduler = StepScheduler(build_workflow_graph(fan_out(2)), recorder)
+        await scheduler.run(completed={'init', 'review_0'})
+        assert recorder.started == [['review_1'], ['summary']]
+    
+    async def test_unsatisfiable_dependencies_are_returned(self):
+        graph = build_workflow_graph(parse([
+            {'id': 'a', 'agent': 'a'},
+            {'id': 'b', 'agent': 'a', 'depends_on': ['c']},
+            {'id': 'c', 'agent': 'a', 'depends_on': ['b']},
+        ]))
+        recorder = Recorder()
+        assert await StepScheduler(graph, recorder).run() == ['b', 'c']
+        assert recorder.started == [['a']]
+    
+    async def test_failure_cancels_running_units(self):
+        cancelled = []
+        
+        async def run_unit(step_ids):
+            if step_ids == ['review_0']:
+                raise RuntimeError('boom')
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(step_ids[0])
+                raise
+        
+        scheduler = StepScheduler(build_workflow_graph(fan_out(3)), run_unit)
+        with pytest.raises(RuntimeError):
+            await scheduler.run(completed={'init'})
+        assert sorted(cancelled) == ['review_1', 'review_2']